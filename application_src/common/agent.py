@@ -325,11 +325,11 @@ def create_agent(prompt, user_id=None, agent_name="qa_agent"):
         # Get guardrail configuration
         guardrail_config = agent_config.get_guardrail_config()
         
-        # Reset knowledge base provider to ensure we get the latest configuration
+        # Release this agent's knowledge base provider; create() picks up the latest configuration
         log_debug(logger, "Resetting knowledge base provider to get latest configuration")
-        reset_knowledge_base_provider()
+        reset_knowledge_base_provider(agent_name)
         
-        # Create a new knowledge base provider with the latest configuration
+        # Create or reuse the knowledge base provider for the latest configuration
         global kb_provider
         kb_provider = KnowledgeBaseFactory.create(agent_name)
         log_debug(logger, "Created KB provider", agent_name=agent_name)
@@ -550,11 +550,11 @@ async def run_agent_and_stream_response(prompt: str, user_id=None, agent_name="q
         # Get guardrail configuration
         guardrail_config = agent_config.get_guardrail_config()
         
-        # Reset knowledge base provider to ensure we get the latest configuration
+        # Release this agent's knowledge base provider; create() picks up the latest configuration
         print("Resetting knowledge base provider to get latest configuration")
-        reset_knowledge_base_provider()
+        reset_knowledge_base_provider(agent_name)
         
-        # Create a new knowledge base provider with the latest configuration
+        # Create or reuse the knowledge base provider for the latest configuration
         global kb_provider
         kb_provider = KnowledgeBaseFactory.create(agent_name)
         print(f"DEBUG AGENT: Created KB provider for agent_name: {agent_name}")
@@ -66,11 +66,11 @@ def create_agent(agent_name="qa_agent", agent_description="A QA agent that can a
         # Get guardrail configuration
         guardrail_config = agent_config.get_guardrail_config()
         
-        # Reset knowledge base provider to ensure we get the latest configuration
+        # Release this agent's knowledge base provider; create() picks up the latest configuration
         print(f"DEBUG AGENT: Resetting knowledge base provider for agent_name: {agent_name}")
-        reset_knowledge_base_provider()
+        reset_knowledge_base_provider(agent_name)
         
-        # Create a new knowledge base provider with the latest configuration
+        # Create or reuse the knowledge base provider for the latest configuration
         kb_provider = KnowledgeBaseFactory.create(agent_name)
         provider_name = getattr(kb_provider, 'provider_name', 'unknown') if kb_provider else 'None'
         print(f"DEBUG AGENT: Created KB provider for agent_name: {agent_name}, provider: {provider_name}")
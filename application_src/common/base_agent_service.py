@@ -397,7 +397,18 @@ def create_agent_app(agent_name: str, agent_description: str, port: int) -> tupl
     async def shutdown_event():  # nosemgrep: useless-inner-function
         """Clean up resources on shutdown."""
         logger.info(f"🔄 Shutting down {agent_name}...")
-        # Add any cleanup logic here
+        # Write interactions still queued by the memory hooks and close cached memory providers
+        try:
+            from memory import close_memory_providers
+            close_memory_providers()
+        except Exception as e:
+            log_exception_safely(logger, "Error closing memory providers", e)
+        # Close cached knowledge base providers and their connections
+        try:
+            from knowledge_base import close_knowledge_base_providers
+            close_knowledge_base_providers()
+        except Exception as e:
+            log_exception_safely(logger, "Error closing knowledge base providers", e)
         logger.info("✅ Shutdown complete")
     
     @app.get("/", response_model=dict[str, str])
@@ -3,9 +3,72 @@ Custom retrieve tool that directly uses the Bedrock Knowledge Base.
 """
 
 import os
+import threading
 import boto3
+from botocore.config import Config as BotoConfig
 from strands import tool
 from typing import Dict, Any, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-result and total text budgets for retrieved content returned to the agent
+MAX_RESULT_CHARS = int(os.environ.get("CUSTOM_RETRIEVE_MAX_RESULT_CHARS", "2000"))
+MAX_TOTAL_CHARS = int(os.environ.get("CUSTOM_RETRIEVE_MAX_TOTAL_CHARS", "8000"))
+NUMBER_OF_RESULTS = int(os.environ.get("CUSTOM_RETRIEVE_NUMBER_OF_RESULTS", "5"))
+TRUNCATION_MARKER = "..."
+
+# Cached bedrock-agent-runtime clients keyed by region and client config
+_clients: Dict[tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_bedrock_agent_runtime_client(region: str, max_pool_connections: int = 10, read_timeout: int = 60):
+    """
+    Get a cached bedrock-agent-runtime client for the region and config.
+
+    Clients are thread-safe once created, so one client per key is shared by
+    every retrieve call instead of resolving credentials and endpoints each time.
+    """
+    key = (region, max_pool_connections, read_timeout)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = boto3.client(
+                    'bedrock-agent-runtime',
+                    region_name=region,
+                    config=BotoConfig(max_pool_connections=max_pool_connections, read_timeout=read_timeout)
+                )
+                _clients[key] = client
+    return client
+
+
+def _format_results(retrieval_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keep only text, source and score, capping text per result and in total.
+
+    The result that reaches the total budget is cut to what is left of it, and
+    the "..." marking a cut counts against both budgets.
+    """
+    content = []
+    remaining = MAX_TOTAL_CHARS
+    for result in retrieval_results:
+        text = result.get('content', {}).get('text', '')
+        limit = min(MAX_RESULT_CHARS, remaining)
+        if len(text) > limit:
+            if limit <= len(TRUNCATION_MARKER):
+                break
+            text = text[:limit - len(TRUNCATION_MARKER)] + TRUNCATION_MARKER
+        remaining -= len(text)
+        content.append({
+            "text": text,
+            "source": result.get('location', {}).get('s3Location', {}).get('uri', 'Unknown source'),
+            "score": result.get('score', 0)
+        })
+    return content
+
 
 @tool
 def custom_retrieve(text: str) -> Dict[str, Any]:
@@ -14,20 +77,18 @@ def custom_retrieve(text: str) -> Dict[str, Any]:
         # Get the knowledge base ID from the environment
         kb_id = os.environ.get("STRANDS_KNOWLEDGE_BASE_ID")
         region = os.environ.get("AWS_REGION", "us-east-1")
-        
-        print(f"Custom retrieve with text: {text}")
-        print(f"STRANDS_KNOWLEDGE_BASE_ID: {kb_id}")
-        print(f"AWS_REGION: {region}")
-        
+
+        logger.debug(f"Custom retrieve with text: {text}, knowledge base: {kb_id}, region: {region}")
+
         if not kb_id:
             return {
                 "status": "error",
                 "content": [{"text": "Error: STRANDS_KNOWLEDGE_BASE_ID environment variable not set"}]
             }
-        
-        # Create a Bedrock agent client
-        bedrock_agent = boto3.client('bedrock-agent-runtime', region_name=region)
-        
+
+        # Reuse a cached Bedrock agent client
+        bedrock_agent = get_bedrock_agent_runtime_client(region)
+
         # Call the Bedrock Knowledge Base
         response = bedrock_agent.retrieve(
             knowledgeBaseId=kb_id,
@@ -36,29 +97,20 @@ def custom_retrieve(text: str) -> Dict[str, Any]:
             },
             retrievalConfiguration={
                 'vectorSearchConfiguration': {
-                    'numberOfResults': 5
+                    'numberOfResults': NUMBER_OF_RESULTS
                 }
             }
         )
-        
-        print(f"Bedrock response: {response}")
-        
-        # Format the response
-        content = []
-        for result in response.get('retrievalResults', []):
-            content.append({
-                "text": result.get('content', {}).get('text', ''),
-                "source": result.get('location', {}).get('s3Location', {}).get('uri', 'Unknown source'),
-                "score": result.get('score', 0)
-            })
-        
+
+        retrieval_results = response.get('retrievalResults', [])
+        logger.debug(f"Bedrock retrieve returned {len(retrieval_results)} results")
+
         return {
             "status": "success",
-            "content": content
+            "content": _format_results(retrieval_results)
         }
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.error(f"Error during retrieval: {str(e)}", exc_info=True)
         return {
             "status": "error",
             "content": [{"text": f"Error during retrieval: {str(e)}"}]
@@ -0,0 +1,429 @@
+"""
+Ingestion throughput benchmark with in-process stand-ins for S3, Bedrock and the vector store.
+
+Measures documents and chunks per second, per-stage latency and peak memory
+of DocumentIngestion without any AWS access, so regressions in splitting,
+embedding or indexing code show up as changed numbers.
+
+Usage:
+    python benchmark.py --documents 200 --embed-latency 0.005
+    python benchmark.py --large-documents 2 --large-document-mb 32 --json
+    python benchmark.py --min-docs-per-sec 50 --max-peak-memory-mb 64
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import math
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from ingestion import DocumentIngestion
+from vector_stores import VectorStoreBase, register_vector_store
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STAGES = ("load", "split", "embed", "index")
+WORDS = ["ingestion", "vector", "chunk", "embedding", "latency", "throughput", "index", "document",
+         "bedrock", "search", "query", "agent", "memory", "pipeline", "stream", "batch"]
+
+
+class InMemoryS3:
+    """In-process S3 client supporting HEAD and (ranged) GET requests."""
+
+    def __init__(self):
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+
+    def put(self, bucket: str, key: str, text: str):
+        self.objects[(bucket, key)] = text.encode("utf-8")
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        body = self.objects[(Bucket, Key)]
+        if Range:
+            start, end = map(int, re.fullmatch(r"bytes=(\d+)-(\d+)", Range).groups())
+            body = body[start:end + 1]
+        return {"Body": io.BytesIO(body), "ContentLength": len(body)}
+
+    def loader(self) -> Callable:
+        """Return a loader factory reading from this client, in place of LangChain's S3FileLoader."""
+        s3 = self
+
+        class InMemoryS3FileLoader:
+            def __init__(self, bucket, key, region_name=None):
+                self.bucket = bucket
+                self.key = key
+
+            def load(self) -> List[Document]:
+                text = s3.objects[(self.bucket, self.key)].decode("utf-8")
+                return [Document(page_content=text, metadata={"source": f"s3://{self.bucket}/{self.key}"})]
+
+        return InMemoryS3FileLoader
+
+
+class FakeEmbedder:
+    """
+    Deterministic embedding model with configurable latency.
+
+    Vectors are derived from a hash of each text, so identical texts always
+    get identical vectors. Each call sleeps ``latency`` seconds plus
+    ``per_text_latency`` per text to model a remote embedding service.
+    """
+
+    def __init__(self, dimensions: int = 256, latency: float = 0.0, per_text_latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.calls = 0
+        self.texts = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.uniform(-1.0, 1.0) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+        delay = self.latency + self.per_text_latency * len(texts)
+        if delay > 0:
+            time.sleep(delay)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@register_vector_store("in_memory")
+class InMemoryVectorStore(VectorStoreBase):
+    """
+    Vector store keeping chunks and vectors in a dictionary, searched by brute force.
+
+    With ``in_memory_retain_chunks`` set to False, chunks are only counted,
+    so that peak memory reflects the ingestion pipeline rather than the
+    contents of the store.
+    """
+
+    def __init__(self, config: Dict[str, Any], embedding_model):
+        self.config = config
+        self.embedding_model = embedding_model
+        self.retain_chunks = config.get("in_memory_retain_chunks", True)
+        self.chunks: Dict[str, Tuple[Document, List[float]]] = {}
+        self.indexed = 0
+        self._lock = threading.Lock()
+
+    def add_documents(self, documents: List[Document]) -> Any:
+        embeddings = self.embedding_model.embed_documents([doc.page_content for doc in documents])
+        return self.add_embedded_documents(documents, embeddings)
+
+    def add_embedded_documents(self, documents: List[Document], embeddings: List[List[float]]) -> Any:
+        with self._lock:
+            self.indexed += len(documents)
+            for doc, embedding in zip(documents, embeddings):
+                if not self.retain_chunks:
+                    continue
+                self.chunks[doc.metadata.get("chunk_id") or f"chunk-{len(self.chunks)}"] = (doc, embedding)
+        return [doc.metadata.get("chunk_id") for doc in documents]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict[str, Any]] = None) -> List[tuple]:
+        query_vector = self.embedding_model.embed_query(query)
+        with self._lock:
+            candidates = [
+                (doc, sum(a * b for a, b in zip(query_vector, vector)))
+                for doc, vector in self.chunks.values()
+                if not filter or all(doc.metadata.get(key) == value for key, value in filter.items())
+            ]
+        return sorted(candidates, key=lambda item: item[1], reverse=True)[:k]
+
+    def delete(self, document_id: str, chunk_ids: Optional[List[str]] = None) -> bool:
+        with self._lock:
+            for chunk_id in [chunk_id for chunk_id, (doc, _) in self.chunks.items()
+                             if doc.metadata.get("document_id") == document_id]:
+                del self.chunks[chunk_id]
+        return True
+
+    def delete_chunks(self, chunk_ids: List[str]) -> bool:
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self.chunks.pop(chunk_id, None)
+        return True
+
+
+class StageTimer:
+    """Record the duration of each call of the ingestion stages."""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def timed(job):
+            start = time.perf_counter()
+            try:
+                return func(job)
+            finally:
+                with self._lock:
+                    self.durations[stage].append(time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, mean, p50, p95 and max latency in milliseconds per stage."""
+        summary = {}
+        for stage, durations in self.durations.items():
+            if not durations:
+                continue
+            ordered = sorted(durations)
+            summary[stage] = {
+                "count": len(ordered),
+                "mean_ms": 1000 * sum(ordered) / len(ordered),
+                "p50_ms": 1000 * ordered[len(ordered) // 2],
+                "p95_ms": 1000 * ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+                "max_ms": 1000 * ordered[-1]
+            }
+        return summary
+
+
+def generate_corpus(s3: InMemoryS3, documents: int = 50, paragraphs: int = 30, words: int = 40,
+                    large_documents: int = 0, large_document_bytes: int = 16 * 1024 * 1024,
+                    bucket: str = "benchmark", seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Write a deterministic corpus to the in-memory S3 client.
+
+    Args:
+        s3: In-memory S3 client
+        documents: Number of regular documents
+        paragraphs: Paragraphs per regular document
+        words: Words per paragraph
+        large_documents: Number of large plain-text documents, which take the streaming path
+        large_document_bytes: Approximate size of each large document
+        bucket: Bucket name
+        seed: Random seed
+
+    Returns:
+        Document descriptors with "bucket_name" and "object_key"
+    """
+    rng = random.Random(seed)
+
+    def paragraph() -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    corpus = []
+    for i in range(documents):
+        key = f"docs/document-{i:05d}.md"
+        s3.put(bucket, key, "\n\n".join(paragraph() for _ in range(paragraphs)))
+        corpus.append({"bucket_name": bucket, "object_key": key})
+    for i in range(large_documents):
+        key = f"large/document-{i:03d}.txt"
+        parts, size = [], 0
+        while size < large_document_bytes:
+            parts.append(paragraph())
+            size += len(parts[-1]) + 2
+        s3.put(bucket, key, "\n\n".join(parts))
+        corpus.append({"bucket_name": bucket, "object_key": key})
+    return corpus
+
+
+def _create_ingestion(s3: InMemoryS3, embedder: FakeEmbedder, config: Dict[str, Any]) -> DocumentIngestion:
+    ingestion = DocumentIngestion(vector_db_type="in_memory", config=dict({
+        "status_store": "sqlite",
+        "run_journal": "none"
+    }, **config), loader_factory=s3.loader())
+    ingestion.s3_client = s3
+    ingestion.embedding_model = embedder
+    ingestion.vector_store.embedding_model = embedder
+    return ingestion
+
+
+def _ingest(ingestion: DocumentIngestion, corpus: List[Dict[str, Any]], pipelined: bool) -> List[Dict[str, Any]]:
+    if pipelined:
+        return ingestion.ingest_documents(corpus)
+    return [ingestion.ingest_document(doc["bucket_name"], doc["object_key"]) for doc in corpus]
+
+
+def run_benchmark(documents: int = 50, paragraphs: int = 30, words: int = 40, large_documents: int = 0,
+                  large_document_bytes: int = 16 * 1024 * 1024, embed_latency: float = 0.0,
+                  embed_per_text_latency: float = 0.0, dimensions: int = 256, pipelined: bool = False,
+                  measure_memory: bool = True, config: Optional[Dict[str, Any]] = None,
+                  seed: int = 0) -> Dict[str, Any]:
+    """
+    Ingest a generated corpus and report throughput, stage latency and peak memory.
+
+    Throughput and latency come from a pass without memory tracing, since
+    tracemalloc slows allocation-heavy code; peak memory comes from a second
+    pass over the same corpus with fresh stores, where the vector store does
+    not retain chunks.
+
+    Args:
+        documents: Number of regular documents
+        paragraphs: Paragraphs per regular document
+        words: Words per paragraph
+        large_documents: Number of large documents taking the streaming path
+        large_document_bytes: Approximate size of each large document
+        embed_latency: Seconds each embedding call takes
+        embed_per_text_latency: Additional seconds per embedded text
+        dimensions: Embedding dimensions
+        pipelined: Use ingest_documents instead of one ingest_document call per document
+        measure_memory: Whether to run the traced pass for peak memory
+        config: Ingestion config overrides
+        seed: Random seed for the corpus
+
+    Returns:
+        Report with "documents", "chunks", "seconds", "docs_per_sec", "chunks_per_sec",
+        "stages" (latency per stage), "embed_calls" and "peak_memory_bytes"
+    """
+    s3 = InMemoryS3()
+    corpus = generate_corpus(s3, documents, paragraphs, words, large_documents, large_document_bytes, seed=seed)
+    config = dict(config or {})
+    if large_documents:
+        config.setdefault("streaming_threshold_bytes", large_document_bytes // 2)
+
+    def new_embedder() -> FakeEmbedder:
+        return FakeEmbedder(dimensions, embed_latency, embed_per_text_latency)
+
+    embedder = new_embedder()
+    ingestion = _create_ingestion(s3, embedder, config)
+    timer = StageTimer()
+    for stage in STAGES:
+        setattr(ingestion, f"_{stage}_stage", timer.wrap(stage, getattr(ingestion, f"_{stage}_stage")))
+
+    start = time.perf_counter()
+    results = _ingest(ingestion, corpus, pipelined)
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if result["status"] != "completed"]
+    if failed:
+        raise RuntimeError(f"{len(failed)} documents failed during the benchmark: {failed[0].get('error')}")
+    chunks = sum(result["chunks"] for result in results)
+
+    peak = None
+    if measure_memory:
+        traced = _create_ingestion(s3, new_embedder(), dict(config, in_memory_retain_chunks=False))
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            _ingest(traced, corpus, pipelined)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "documents": len(corpus),
+        "chunks": chunks,
+        "seconds": elapsed,
+        "docs_per_sec": len(corpus) / elapsed if elapsed > 0 else float("inf"),
+        "chunks_per_sec": chunks / elapsed if elapsed > 0 else float("inf"),
+        "stages": timer.summary(),
+        "embed_calls": embedder.calls,
+        "peak_memory_bytes": peak
+    }
+
+
+def check_thresholds(report: Dict[str, Any], min_docs_per_sec: Optional[float] = None,
+                     min_chunks_per_sec: Optional[float] = None,
+                     max_peak_memory_bytes: Optional[int] = None) -> List[str]:
+    """
+    Compare a report with thresholds.
+
+    Returns:
+        Descriptions of the violated thresholds; empty if all are met
+    """
+    violations = []
+    if min_docs_per_sec is not None and report["docs_per_sec"] < min_docs_per_sec:
+        violations.append(f"docs/s {report['docs_per_sec']:.1f} < {min_docs_per_sec}")
+    if min_chunks_per_sec is not None and report["chunks_per_sec"] < min_chunks_per_sec:
+        violations.append(f"chunks/s {report['chunks_per_sec']:.1f} < {min_chunks_per_sec}")
+    if (max_peak_memory_bytes is not None and report["peak_memory_bytes"] is not None
+            and report["peak_memory_bytes"] > max_peak_memory_bytes):
+        violations.append(f"peak memory {report['peak_memory_bytes']} bytes > {max_peak_memory_bytes}")
+    return violations
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Format a report as a human-readable table."""
+    lines = [
+        f"documents      {report['documents']}",
+        f"chunks         {report['chunks']}",
+        f"elapsed        {report['seconds']:.3f} s",
+        f"docs/s         {report['docs_per_sec']:.1f}",
+        f"chunks/s       {report['chunks_per_sec']:.1f}",
+        f"embed calls    {report['embed_calls']}"
+    ]
+    if report["peak_memory_bytes"] is not None:
+        lines.append(f"peak memory    {report['peak_memory_bytes'] / (1024 * 1024):.1f} MiB")
+    lines.append("")
+    lines.append(f"{'stage':<8}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage, stats in report["stages"].items():
+        lines.append(f"{stage:<8}{stats['count']:>8}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+                     f"{stats['p95_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark DocumentIngestion with in-process stand-ins")
+    parser.add_argument("--documents", type=int, default=50, help="Number of regular documents")
+    parser.add_argument("--paragraphs", type=int, default=30, help="Paragraphs per document")
+    parser.add_argument("--words", type=int, default=40, help="Words per paragraph")
+    parser.add_argument("--large-documents", type=int, default=0, help="Number of large streamed documents")
+    parser.add_argument("--large-document-mb", type=float, default=16, help="Size of each large document in MiB")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embedding call")
+    parser.add_argument("--embed-per-text-latency", type=float, default=0.0, help="Seconds per embedded text")
+    parser.add_argument("--dimensions", type=int, default=256, help="Embedding dimensions")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size in characters")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Chunk overlap in characters")
+    parser.add_argument("--pipelined", action="store_true", help="Use ingest_documents instead of ingest_document")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced pass for peak memory")
+    parser.add_argument("--min-docs-per-sec", type=float, help="Fail if throughput is below this")
+    parser.add_argument("--min-chunks-per-sec", type=float, help="Fail if chunk throughput is below this")
+    parser.add_argument("--max-peak-memory-mb", type=float, help="Fail if peak memory exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_benchmark(
+        documents=args.documents,
+        paragraphs=args.paragraphs,
+        words=args.words,
+        large_documents=args.large_documents,
+        large_document_bytes=int(args.large_document_mb * 1024 * 1024),
+        embed_latency=args.embed_latency,
+        embed_per_text_latency=args.embed_per_text_latency,
+        dimensions=args.dimensions,
+        pipelined=args.pipelined,
+        measure_memory=not args.no_memory,
+        config={"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap}
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+    violations = check_thresholds(
+        report,
+        min_docs_per_sec=args.min_docs_per_sec,
+        min_chunks_per_sec=args.min_chunks_per_sec,
+        max_peak_memory_bytes=int(args.max_peak_memory_mb * 1024 * 1024) if args.max_peak_memory_mb else None
+    )
+    for violation in violations:
+        print(f"THRESHOLD FAILED: {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Content-hash chunk manifests for incremental re-ingestion.
+"""
+
+import hashlib
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+# Config keys that change the chunks or their vectors; a change forces a full re-index
+MANIFEST_CONFIG_KEYS = ("embedding_model_id", "chunk_size", "chunk_overlap")
+
+
+def chunk_hash(text: str) -> str:
+    """Return the SHA-256 hex digest of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def source_key(bucket_name: str, object_key: str) -> str:
+    """Return the key identifying a source document across ingestions."""
+    return f"s3://{bucket_name}/{object_key}"
+
+
+def assign_chunk_ids(document_id: str, hashes: List[str],
+                     occurrences: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Derive chunk IDs from chunk content.
+
+    Unlike positional IDs, content-derived IDs stay the same when text is
+    inserted or removed elsewhere in the document. Repeated identical chunks
+    are told apart by an occurrence suffix.
+
+    Args:
+        document_id: Document ID
+        hashes: Content hash of each chunk, in document order
+        occurrences: Hash occurrence counts carried over from earlier chunks of
+            the same document, when IDs are assigned window by window
+
+    Returns:
+        Chunk IDs in the same order
+    """
+    seen = occurrences if occurrences is not None else {}
+    chunk_ids = []
+    for digest in hashes:
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        suffix = f"-{occurrence}" if occurrence else ""
+        chunk_ids.append(f"{document_id}-chunk-{digest[:16]}{suffix}")
+    return chunk_ids
+
+
+def build_manifest(document_id: str, chunk_ids: List[str], hashes: List[str],
+                   config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the manifest recording which chunks of a document are indexed.
+
+    Args:
+        document_id: Document ID
+        chunk_ids: Chunk IDs, in document order
+        hashes: Content hash of each chunk
+        config: Ingestion configuration
+
+    Returns:
+        Manifest dictionary
+    """
+    return {
+        "document_id": document_id,
+        "config": {key: config.get(key) for key in MANIFEST_CONFIG_KEYS},
+        "chunks": [{"chunk_id": chunk_id, "hash": digest} for chunk_id, digest in zip(chunk_ids, hashes)]
+    }
+
+
+class ChunkDiff(NamedTuple):
+    """Difference between the indexed chunks of a document and its current chunks."""
+    new_positions: List[int]
+    reused: int
+    removed_ids: List[str]
+
+
+def reusable_chunk_ids(manifest: Optional[Dict[str, Any]], config: Dict[str, Any]) -> Set[str]:
+    """
+    Return the IDs of previously indexed chunks whose vectors can be reused.
+
+    Args:
+        manifest: Manifest of the previous ingestion, or None
+        config: Ingestion configuration
+
+    Returns:
+        Chunk IDs; empty if the chunking or embedding settings changed
+    """
+    if not manifest or manifest.get("config") != {key: config.get(key) for key in MANIFEST_CONFIG_KEYS}:
+        # Chunk boundaries or vectors may differ, so nothing can be reused
+        return set()
+    return {chunk["chunk_id"] for chunk in manifest.get("chunks", [])}
+
+
+def removed_chunk_ids(manifest: Optional[Dict[str, Any]], chunk_ids: List[str]) -> List[str]:
+    """Return the previously indexed chunk IDs that are not among the current ones."""
+    current = set(chunk_ids)
+    return [chunk["chunk_id"] for chunk in (manifest or {}).get("chunks", []) if chunk["chunk_id"] not in current]
+
+
+def diff_chunks(manifest: Optional[Dict[str, Any]], chunk_ids: List[str],
+                config: Dict[str, Any]) -> ChunkDiff:
+    """
+    Compare the current chunks of a document with its previous manifest.
+
+    Args:
+        manifest: Manifest of the previous ingestion, or None
+        chunk_ids: Current chunk IDs, in document order
+        config: Ingestion configuration
+
+    Returns:
+        Positions of chunks that must be embedded, the number of reused chunks
+        and the IDs of previously indexed chunks that no longer exist
+    """
+    reusable = reusable_chunk_ids(manifest, config)
+    new_positions = [position for position, chunk_id in enumerate(chunk_ids) if chunk_id not in reusable]
+    return ChunkDiff(new_positions, len(chunk_ids) - len(new_positions), removed_chunk_ids(manifest, chunk_ids))
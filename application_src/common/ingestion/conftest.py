@@ -0,0 +1,8 @@
+"""Pytest configuration for the ingestion tests."""
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: ingestion throughput benchmarks with threshold assertions (deselect with -m 'not benchmark')"
+    )
@@ -4,9 +4,10 @@ Main ingestion module for document processing and vector storage using LangChain
 
 import os
 import uuid
+import hashlib
+import json
 import logging
 import time
-import json
 import boto3
 from typing import Dict, List, Any, Optional, Tuple, Callable
 
@@ -18,10 +19,20 @@ from langchain_community.embeddings import BedrockEmbeddings
 
 # Local imports
 from vector_stores import get_vector_store
+from vector_stores.bedrock_kb_jobs import CANCELLED_STATUS
+from pipeline import IngestionPipeline, PipelineStage
+from status_store import CoalescingStatusWriter, StatusConflictError, get_status_store
+from chunk_manifest import (MANIFEST_CONFIG_KEYS, ChunkDiff, assign_chunk_ids, build_manifest, chunk_hash,
+                            diff_chunks, removed_chunk_ids, reusable_chunk_ids, source_key)
+from run_journal import get_run_journal
+from streaming import S3RangeReader, StreamingTextSplitter
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Conditional writes tried before giving up on a status update of a document another worker owns
+STATUS_UPDATE_ATTEMPTS = 3
+
 class DocumentIngestion:
     """
     Main class for document ingestion, processing, and vector storage using LangChain.
@@ -34,19 +45,31 @@ class DocumentIngestion:
     5. Managing metadata
     """
     
-    def __init__(self, vector_db_type: str = "elasticsearch", config: Dict[str, Any] = None):
+    def __init__(self, vector_db_type: str = "elasticsearch", config: Dict[str, Any] = None,
+                 loader_factory: Optional[Callable[..., Any]] = None):
         """
         Initialize the document ingestion module.
         
         Args:
             vector_db_type: Type of vector database to use ("bedrock_kb" or "elasticsearch", default: "elasticsearch")
             config: Configuration parameters for the ingestion process
+            loader_factory: Callable taking (bucket, key, region_name=...) and returning a document
+                loader with a load() method, defaults to LangChain's S3FileLoader
         """
         self.vector_db_type = vector_db_type
         self.config = self._validate_and_set_defaults(config or {})
+        self.loader_factory = loader_factory or S3FileLoader
         
         # Initialize AWS clients
         self.s3_client = boto3.client('s3', region_name=self.config["region"])
+        
+        # Status store for document metadata (S3 metadata bucket or SQLite)
+        self.status_store = get_status_store(self.config, self.s3_client)
+        self.status_writer = CoalescingStatusWriter(
+            self.status_store, flush_interval=self.config["status_flush_interval"]
+        ) if self.status_store else None
+        # Journal of run progress, so an interrupted ingest_documents run can resume
+        self.run_journal = get_run_journal(self.config, self.s3_client)
         self.bedrock_client = boto3.client('bedrock-runtime', region_name=self.config["region"])
         
         # Initialize embedding model
@@ -55,6 +78,20 @@ class DocumentIngestion:
             model_id=self.config["embedding_model_id"]
         )
         
+        # Text splitters are stateless, so one instance of each is shared by all workers
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.config["chunk_size"],
+            chunk_overlap=self.config["chunk_overlap"],
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""]
+        )
+        # Produces the same chunks as text_splitter without holding the whole text
+        self.streaming_splitter = StreamingTextSplitter(
+            chunk_size=self.config["chunk_size"],
+            chunk_overlap=self.config["chunk_overlap"],
+            separators=["\n\n", "\n", " ", ""]
+        )
+        
         # Initialize vector store
         self.vector_store = get_vector_store(vector_db_type, self.config, self.embedding_model)
         if not self.vector_store:
@@ -80,6 +117,21 @@ class DocumentIngestion:
             "chunk_overlap": 200,
             "max_retries": 3,
             "retry_delay": 1,
+            "load_workers": 4,
+            "split_workers": 2,
+            "embed_workers": 4,
+            "index_workers": 2,
+            "pipeline_queue_size": 16,
+            "status_flush_interval": 2.0,
+            "incremental_ingestion": True,
+            "streaming_threshold_bytes": 64 * 1024 * 1024,
+            "streaming_read_size": 8 * 1024 * 1024,
+            "streaming_window_chunks": 256,
+            "streaming_extensions": [".txt", ".md", ".csv", ".log"],
+            "index_batch_max_tokens": 8000,
+            "index_batch_max_bytes": 5 * 1024 * 1024,
+            "index_batch_max_items": 500,
+            "run_journal_batch_chunks": 256,
             "metadata_bucket": config.get("metadata_bucket", None)
         }
         
@@ -156,105 +208,47 @@ class DocumentIngestion:
             Dictionary with ingestion results
         """
         try:
-            # Generate IDs
-            document_id = f"doc-{uuid.uuid4()}"
-            ingestion_id = f"ing-{uuid.uuid4()}"
-            
-            # Initialize metadata
-            if metadata is None:
-                metadata = {}
-            
-            metadata.update({
-                "document_id": document_id,
-                "ingestion_id": ingestion_id,
-                "bucket_name": bucket_name,
-                "object_key": object_key,
-                "status": "processing",
-                "created_at": time.time(),
-                "updated_at": time.time()
-            })
-            
-            # Store initial metadata in S3
-            self._store_metadata(document_id, metadata)
+            job = self._prepare_job(bucket_name, object_key, metadata)
+            document_id = job["document_id"]
+            ingestion_id = job["ingestion_id"]
+            metadata = job["metadata"]
             
             # Special handling for Bedrock KB - direct S3 ingestion
             if self.vector_db_type == "bedrock_kb":
                 self._update_status(document_id, "ingesting")
                 
-                # Use the BedrockKBVectorStore's direct S3 ingestion capability
-                ingestion_result = self.vector_store.ingest_s3_object(bucket_name, object_key)
+                # Queue the object for a coalesced ingestion job; the job ID and the
+                # job's outcome are recorded by callbacks without holding this thread
+                ingestion_result = self.vector_store.ingest_s3_object(
+                    bucket_name, object_key,
+                    on_complete=lambda job_status: self._record_bedrock_job_result(document_id, job_status),
+                    on_started=lambda job_id: self._record_bedrock_job_started(document_id, job_id)
+                )
                 
-                # Update metadata with ingestion job info
+                # Update metadata with ingestion request info
                 metadata.update({
-                    "bedrock_kb_ingestion_job_id": ingestion_result["ingestion_job_id"],
+                    "bedrock_kb_ingestion_request_id": ingestion_result["ingestion_request_id"],
+                    "bedrock_kb_data_source_id": ingestion_result["data_source_id"],
                     "status": "ingestion_started"
                 })
-                self._store_metadata(document_id, metadata)
+                self._update_status(document_id, "ingestion_started",
+                                    bedrock_kb_ingestion_request_id=ingestion_result["ingestion_request_id"],
+                                    bedrock_kb_data_source_id=ingestion_result["data_source_id"])
                 
                 return {
                     "document_id": document_id,
                     "ingestion_id": ingestion_id,
                     "status": "ingestion_started",
-                    "bedrock_kb_ingestion_job_id": ingestion_result["ingestion_job_id"],
+                    "bedrock_kb_ingestion_request_id": ingestion_result["ingestion_request_id"],
                     "metadata": metadata
                 }
             
-            # For other vector stores, process the document using LangChain
-            # Update status
-            self._update_status(document_id, "loading")
-            
-            # Load document using LangChain's S3FileLoader
-            loader = S3FileLoader(bucket_name, object_key, region_name=self.config["region"])
-            documents = loader.load()
-            
-            if not documents:
-                raise ValueError(f"No content extracted from document: {object_key}")
-            
-            # Extract document content and update metadata
-            document_content = documents[0].page_content
-            doc_metadata = documents[0].metadata
-            
-            # Update metadata with document info
-            metadata.update(doc_metadata)
-            self._store_metadata(document_id, metadata)
-            
-            # Update status
-            self._update_status(document_id, "chunking")
-            
-            # Chunk document using LangChain's RecursiveCharacterTextSplitter
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.config["chunk_size"],
-                chunk_overlap=self.config["chunk_overlap"],
-                length_function=len,
-                separators=["\n\n", "\n", " ", ""]
-            )
-            
-            chunks = text_splitter.split_text(document_content)
-            
-            # Create LangChain documents from chunks
-            langchain_docs = []
-            for i, chunk in enumerate(chunks):
-                chunk_metadata = metadata.copy()
-                chunk_metadata["chunk_id"] = f"{document_id}-chunk-{i}"
-                chunk_metadata["chunk_index"] = i
-                langchain_docs.append(Document(page_content=chunk, metadata=chunk_metadata))
+            # For other vector stores, run the processing stages in sequence
+            with self.vector_store.bulk_session():
+                for stage in (self._load_stage, self._split_stage, self._embed_stage, self._index_stage):
+                    job = stage(job)
             
-            # Update status
-            self._update_status(document_id, "storing")
-            
-            # Store in vector database
-            self.vector_store.add_documents(langchain_docs)
-            
-            # Update status
-            self._update_status(document_id, "completed")
-            
-            return {
-                "document_id": document_id,
-                "ingestion_id": ingestion_id,
-                "status": "completed",
-                "chunks": len(chunks),
-                "metadata": metadata
-            }
+            return self._job_result(job)
             
         except Exception as e:
             logger.error(f"Error ingesting document {object_key}: {str(e)}")
@@ -271,57 +265,522 @@ class DocumentIngestion:
             else:
                 raise
     
-    def _store_metadata(self, document_id: str, metadata: Dict[str, Any]):
+    def ingest_documents(self, documents: List[Dict[str, Any]], run_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Store document metadata in S3.
+        Ingest many documents through a pipelined, parallel load/split/embed/index flow.
+        
+        Each stage runs on its own worker threads (``load_workers``, ``split_workers``,
+        ``embed_workers``, ``index_workers``) with bounded queues of
+        ``pipeline_queue_size`` between stages. A failing document is marked failed
+        without affecting the others.
+        
+        Progress is recorded in the run journal. Calling this again with the
+        same documents (or the same ``run_id``) after an interruption resumes
+        the run: completed documents are skipped, and chunks of batches that
+        were already committed are neither embedded nor indexed again. A run
+        whose documents all completed starts over when called again.
+        
+        Args:
+            documents: List of dicts with "bucket_name", "object_key" and optional "metadata"
+            run_id: Optional run ID; by default derived from the documents and chunking config
+            
+        Returns:
+            List of ingestion results in the same order as the input
+        """
+        # Bedrock KB ingests directly from S3, so there are no local stages to overlap
+        if self.vector_db_type == "bedrock_kb":
+            return [
+                self.ingest_document(doc["bucket_name"], doc["object_key"], doc.get("metadata"))
+                for doc in documents
+            ]
+        
+        sources = [source_key(doc["bucket_name"], doc["object_key"]) for doc in documents]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+        pending = [(index, None) for index in range(len(documents))]
+        if self.run_journal:
+            run_id = run_id or self._run_id(sources)
+            if self._open_run(run_id, sources):
+                pending = []
+                for index, source in enumerate(sources):
+                    entry = self.run_journal.get_document(run_id, source)
+                    if entry and entry["status"] == "completed":
+                        results[index] = entry["result"]
+                    else:
+                        pending.append((index, entry))
+                logger.info(f"Resuming run {run_id}: {len(documents) - len(pending)} of "
+                            f"{len(documents)} documents already completed")
+        else:
+            run_id = None
+        
+        pipeline = IngestionPipeline([
+            PipelineStage("load", self._load_stage, self.config["load_workers"]),
+            PipelineStage("split", self._split_stage, self.config["split_workers"]),
+            PipelineStage("embed", self._embed_stage, self.config["embed_workers"]),
+            PipelineStage("index", self._index_stage, self.config["index_workers"])
+        ], queue_size=self.config["pipeline_queue_size"])
+        
+        # Jobs are prepared by the load stage, so a failing manifest read or
+        # journal write fails that document instead of the whole run
+        requests = [
+            {"bucket_name": documents[index]["bucket_name"], "object_key": documents[index]["object_key"],
+             "metadata": documents[index].get("metadata"), "run_id": run_id, "journal_entry": entry}
+            for index, entry in pending
+        ]
+        
+        # One bulk session lets the store defer work such as index refreshes to the end of the run
+        with self.vector_store.bulk_session():
+            for (index, _), item in zip(pending, pipeline.run(requests)):
+                job = item.value
+                if item.error is None:
+                    results[index] = self._job_result(job)
+                    continue
+                
+                if job.get("document_id"):
+                    self._update_status(job["document_id"], "failed", error=item.error)
+                results[index] = {
+                    "document_id": job.get("document_id"),
+                    "ingestion_id": job.get("ingestion_id"),
+                    "object_key": job["object_key"],
+                    "status": "failed",
+                    "failed_stage": item.failed_stage,
+                    "error": item.error
+                }
+                if run_id:
+                    self.run_journal.finish_document(run_id, sources[index], "failed", results[index])
+        
+        if run_id:
+            self.run_journal.set_run_status(run_id, "finished")
+            for result in results:
+                result["run_id"] = run_id
+        
+        completed = sum(1 for result in results if result["status"] == "completed")
+        logger.info(f"Pipelined ingestion finished: {completed}/{len(results)} documents completed")
+        return results
+    
+    def _run_id(self, sources: List[str]) -> str:
+        """Derive a run ID from the sources and the settings that determine their chunks."""
+        key = json.dumps([sources, [self.config.get(name) for name in MANIFEST_CONFIG_KEYS]])
+        return f"run-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}"
+    
+    def _open_run(self, run_id: str, sources: List[str]) -> bool:
+        """
+        Create a run in the journal, or reopen an unfinished one.
+        
+        Args:
+            run_id: Run ID
+            sources: Source keys of the run's documents, in order
+            
+        Returns:
+            True if an earlier run with unfinished documents is resumed
+        """
+        run = self.run_journal.get_run(run_id)
+        if run is not None and run["sources"] != sources:
+            raise ValueError(f"Run {run_id} was started with different documents")
+        if run is not None and run["completed"] < run["total"]:
+            self.run_journal.set_run_status(run_id, "running")
+            return True
+        if run is not None:
+            # Every document completed, so this is a new ingestion of the same documents
+            self.run_journal.delete_run(run_id)
+        self.run_journal.create_run(run_id, sources)
+        return False
+    
+    def _prepare_job(self, bucket_name: str, object_key: str,
+                     metadata: Optional[Dict[str, Any]] = None, run_id: Optional[str] = None,
+                     journal_entry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Create the IDs and initial metadata for a document ingestion.
+        
+        Args:
+            bucket_name: S3 bucket name
+            object_key: S3 object key
+            metadata: Optional metadata for the document
+            run_id: ID of the journaled run the document belongs to, if any
+            journal_entry: Journal progress of the document from an interrupted run, if any
+            
+        Returns:
+            Job dictionary passed between the ingestion stages
+        """
+        # Re-ingesting a known source keeps its document ID so unchanged chunks can be reused
+        source = source_key(bucket_name, object_key)
+        manifest = None
+        if self.config["incremental_ingestion"] and self.status_store:
+            manifest = self.status_store.get_manifest(source)
+        
+        # Generate IDs; a resumed document keeps the ID its committed chunks were written with
+        if journal_entry:
+            document_id = journal_entry["document_id"]
+        else:
+            document_id = manifest["document_id"] if manifest else f"doc-{uuid.uuid4()}"
+        ingestion_id = f"ing-{uuid.uuid4()}"
+        if run_id and not journal_entry:
+            self.run_journal.start_document(run_id, source, document_id)
+        
+        # Initialize metadata
+        metadata = dict(metadata or {})
+        metadata.update({
+            "document_id": document_id,
+            "ingestion_id": ingestion_id,
+            "bucket_name": bucket_name,
+            "object_key": object_key,
+            "status": "processing",
+            "created_at": time.time(),
+            "updated_at": time.time()
+        })
+        
+        # Store initial metadata and index the ingestion ID
+        self._store_metadata(document_id, metadata, create=True)
+        
+        return {
+            "document_id": document_id,
+            "ingestion_id": ingestion_id,
+            "bucket_name": bucket_name,
+            "object_key": object_key,
+            "metadata": metadata,
+            "manifest": manifest,
+            "run_id": run_id,
+            "committed_chunk_ids": set(journal_entry["chunk_ids"]) if journal_entry else set(),
+            "batch_index": journal_entry["batches"] if journal_entry else 0
+        }
+    
+    def _load_stage(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Load the document content from S3 through the loader factory (LangChain's S3FileLoader by default).
+        
+        Large plain-text objects are not loaded; they are read later in ranged
+        requests as the streaming splitter consumes them. Pipelined ingestion
+        passes document requests, which are prepared into jobs here first.
+        """
+        if "document_id" not in job:
+            # Prepared in place so a later failure here is still reported with the document ID
+            job.update(self._prepare_job(job["bucket_name"], job["object_key"], job.pop("metadata"),
+                                         run_id=job["run_id"], journal_entry=job.pop("journal_entry")))
+        self._update_status(job["document_id"], "loading")
+        
+        size = self._streaming_size(job["bucket_name"], job["object_key"])
+        if size is not None:
+            job["stream"] = S3RangeReader(self.s3_client, job["bucket_name"], job["object_key"],
+                                          read_size=self.config["streaming_read_size"], size=size)
+            job["stream_size"] = size
+            job["metadata"]["source"] = source_key(job["bucket_name"], job["object_key"])
+            logger.info(f"Streaming {size} bytes from {job['metadata']['source']}")
+            return job
+        
+        loader = self.loader_factory(job["bucket_name"], job["object_key"], region_name=self.config["region"])
+        documents = loader.load()
+        
+        if not documents:
+            raise ValueError(f"No content extracted from document: {job['object_key']}")
+        
+        # Extract document content and update metadata with document info
+        job["content"] = documents[0].page_content
+        job["metadata"].update(documents[0].metadata)
+        if self.status_writer:
+            self.status_writer.update(job["document_id"], **documents[0].metadata)
+        return job
+    
+    def _streaming_size(self, bucket_name: str, object_key: str) -> Optional[int]:
+        """Return the object size if the document should be streamed, otherwise None."""
+        if not object_key.lower().endswith(tuple(self.config["streaming_extensions"])):
+            return None
+        size = self.s3_client.head_object(Bucket=bucket_name, Key=object_key)["ContentLength"]
+        return size if size >= self.config["streaming_threshold_bytes"] else None
+    
+    def _chunk_documents(self, job: Dict[str, Any], chunks: List[str], start_index: int = 0,
+                         occurrences: Optional[Dict[str, int]] = None) -> List[Document]:
+        """Create LangChain documents with content-derived chunk IDs from chunk texts."""
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        chunk_ids = assign_chunk_ids(job["document_id"], hashes, occurrences)
+        
+        langchain_docs = []
+        for i, chunk in enumerate(chunks):
+            chunk_metadata = job["metadata"].copy()
+            chunk_metadata["chunk_id"] = chunk_ids[i]
+            chunk_metadata["chunk_index"] = start_index + i
+            chunk_metadata["content_hash"] = hashes[i]
+            langchain_docs.append(Document(page_content=chunk, metadata=chunk_metadata))
+        return langchain_docs
+    
+    def _split_stage(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Chunk the document content into LangChain documents."""
+        self._update_status(job["document_id"], "chunking")
+        
+        if "stream" in job:
+            # Chunks are produced lazily and consumed window by window when indexing
+            job["chunks"] = self.streaming_splitter.split_stream(job.pop("stream"))
+            return job
+        
+        job["documents"] = self._chunk_documents(job, self.text_splitter.split_text(job.pop("content")))
+        job["chunk_ids"] = [doc.metadata["chunk_id"] for doc in job["documents"]]
+        job["hashes"] = [doc.metadata["content_hash"] for doc in job["documents"]]
+        job["diff"] = diff_chunks(job["manifest"], job["chunk_ids"], self.config)
+        if job["committed_chunk_ids"]:
+            # Chunks committed before an interruption are already indexed
+            new_positions = [position for position in job["diff"].new_positions
+                             if job["chunk_ids"][position] not in job["committed_chunk_ids"]]
+            job["diff"] = ChunkDiff(new_positions, len(job["chunk_ids"]) - len(new_positions),
+                                    self._removed_chunk_ids(job, job["chunk_ids"]))
+        return job
+    
+    def _embed_stage(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate embeddings for the chunks that are not already indexed."""
+        self._update_status(job["document_id"], "embedding")
+        
+        if "chunks" in job:
+            # Streamed documents are embedded window by window in the index stage
+            return job
+        
+        texts = [job["documents"][position].page_content for position in job["diff"].new_positions]
+        job["embeddings"] = self.embedding_model.embed_documents(texts) if texts else []
+        return job
+    
+    def _index_stage(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store new chunks, delete removed ones and record the chunk manifest.
+        
+        The manifest is written last, so if indexing or deletion fails the
+        previous manifest still lists every chunk that may be in the store.
+        """
+        self._update_status(job["document_id"], "storing")
+        
+        if "chunks" in job:
+            self._index_stream(job)
+        else:
+            new_documents = [job["documents"][position] for position in job["diff"].new_positions]
+            job["embeddings"] = dict(zip(job["diff"].new_positions, job.pop("embeddings")))
+            self._index_batches(job, new_documents, [job["embeddings"][pos] for pos in job["diff"].new_positions])
+        
+        if job["diff"].removed_ids and not self.vector_store.delete_chunks(job["diff"].removed_ids):
+            # The store cannot delete single chunks, so the document is replaced as a whole
+            self._replace_document(job)
+        job.pop("embeddings", None)
+        diff = job["diff"]
+        embedded = len(diff.new_positions)
+        
+        if self.config["incremental_ingestion"] and self.status_store:
+            self.status_store.put_manifest(
+                source_key(job["bucket_name"], job["object_key"]),
+                build_manifest(job["document_id"], job["chunk_ids"], job["hashes"], self.config)
+            )
+        
+        logger.info(f"Document {job['document_id']}: {embedded} chunks embedded, "
+                    f"{diff.reused} reused, {len(diff.removed_ids)} deleted")
+        self._update_status(job["document_id"], "completed", chunks=len(job["chunk_ids"]),
+                            chunks_embedded=embedded, chunks_deleted=len(diff.removed_ids))
+        if job["run_id"]:
+            self.run_journal.finish_document(job["run_id"], source_key(job["bucket_name"], job["object_key"]),
+                                             "completed", self._job_result(job))
+        return job
+    
+    def _index_batches(self, job: Dict[str, Any], documents: List[Document], embeddings: List[List[float]]):
+        """Index documents in journal-sized batches, committing each batch."""
+        batch_size = self.config["run_journal_batch_chunks"] if job["run_id"] else len(documents)
+        for start in range(0, len(documents), max(batch_size, 1)):
+            batch = documents[start:start + batch_size]
+            self.vector_store.add_documents_batched(batch, embeddings[start:start + batch_size])
+            self._commit_batch(job, batch)
+    
+    def _replace_document(self, job: Dict[str, Any]):
+        """
+        Delete a document from the vector store and index all of its current chunks again.
+        
+        Fallback for stores without single-chunk deletion. Chunks embedded for
+        this ingestion keep their embeddings; reused chunks are embedded again,
+        and streamed documents are streamed from S3 a second time.
+        """
+        removed_ids = job["diff"].removed_ids
+        logger.info(f"{type(self.vector_store).__name__} cannot delete single chunks, "
+                    f"re-indexing document {job['document_id']}")
+        if not self.vector_store.delete(job["document_id"], chunk_ids=list(job["chunk_ids"]) + list(removed_ids)):
+            raise RuntimeError(f"Failed to delete document {job['document_id']} for re-indexing")
+        
+        if "stream_size" in job:
+            job["chunks"] = self.streaming_splitter.split_stream(
+                S3RangeReader(self.s3_client, job["bucket_name"], job["object_key"],
+                              read_size=self.config["streaming_read_size"], size=job["stream_size"]))
+            self._index_stream(job, reuse=False)
+        else:
+            embeddings = job["embeddings"]
+            missing = [position for position in range(len(job["documents"])) if position not in embeddings]
+            if missing:
+                texts = [job["documents"][position].page_content for position in missing]
+                embeddings.update(zip(missing, self.embedding_model.embed_documents(texts)))
+            self._index_batches(job, job["documents"], [embeddings[pos] for pos in range(len(job["documents"]))])
+        job["diff"] = ChunkDiff(list(range(len(job["chunk_ids"]))), 0, removed_ids)
+    
+    def _commit_batch(self, job: Dict[str, Any], documents: List[Document]):
+        """Record a batch of chunks written to the vector store in the run journal."""
+        if not job["run_id"]:
+            return
+        self.run_journal.commit_batch(job["run_id"], source_key(job["bucket_name"], job["object_key"]),
+                                      job["batch_index"], [doc.metadata["chunk_id"] for doc in documents])
+        job["batch_index"] += 1
+    
+    @staticmethod
+    def _removed_chunk_ids(job: Dict[str, Any], chunk_ids: List[str]) -> List[str]:
+        """Return indexed chunk IDs, from the manifest or committed batches, that are no longer current."""
+        removed = removed_chunk_ids(job["manifest"], chunk_ids)
+        current = set(chunk_ids) | set(removed)
+        return removed + sorted(chunk_id for chunk_id in job["committed_chunk_ids"] if chunk_id not in current)
+    
+    def _index_stream(self, job: Dict[str, Any], reuse: bool = True):
+        """
+        Embed and index a streamed document one window of chunks at a time.
+        
+        Only ``streaming_window_chunks`` chunk texts are held in memory at once;
+        chunk IDs and hashes are kept for the manifest. Without ``reuse`` every
+        chunk is embedded and indexed, even if it is already in the store.
+        """
+        reusable = reusable_chunk_ids(job["manifest"], self.config) | job["committed_chunk_ids"] if reuse else set()
+        occurrences: Dict[str, int] = {}
+        job["chunk_ids"], job["hashes"] = [], []
+        new_positions = []
+        
+        window: List[str] = []
+        chunks = job.pop("chunks")
+        while True:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                window.append(chunk)
+                if len(window) < self.config["streaming_window_chunks"]:
+                    continue
+            if window:
+                documents = self._chunk_documents(job, window, len(job["chunk_ids"]), occurrences)
+                new_documents = [doc for doc in documents if doc.metadata["chunk_id"] not in reusable]
+                for doc in documents:
+                    job["chunk_ids"].append(doc.metadata["chunk_id"])
+                    job["hashes"].append(doc.metadata["content_hash"])
+                if new_documents:
+                    embeddings = self.embedding_model.embed_documents([doc.page_content for doc in new_documents])
+                    self.vector_store.add_documents_batched(new_documents, embeddings)
+                    self._commit_batch(job, new_documents)
+                    new_positions.extend(doc.metadata["chunk_index"] for doc in new_documents)
+                window = []
+            if chunk is None:
+                break
+        
+        job["diff"] = ChunkDiff(new_positions, len(job["chunk_ids"]) - len(new_positions),
+                                self._removed_chunk_ids(job, job["chunk_ids"]))
+    
+    @staticmethod
+    def _job_result(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the ingestion result for a completed job."""
+        return {
+            "document_id": job["document_id"],
+            "ingestion_id": job["ingestion_id"],
+            "status": "completed",
+            "chunks": len(job["chunk_ids"]),
+            "chunks_embedded": len(job["diff"].new_positions),
+            "chunks_reused": job["diff"].reused,
+            "chunks_deleted": len(job["diff"].removed_ids),
+            "metadata": job["metadata"]
+        }
+    
+    def _record_bedrock_job_started(self, document_id: str, job_id: str):
+        """
+        Persist the ID of the Bedrock KB ingestion job that syncs a document.
+        
+        The write is not coalesced, so a process restarted before the job
+        finishes can still follow the job through get_ingestion_status.
+        
+        Args:
+            document_id: Document ID
+            job_id: Ingestion job ID
+        """
+        self._update_status(document_id, "ingestion_started", bedrock_kb_ingestion_job_id=job_id)
+        if self.status_writer:
+            self.status_writer.flush(document_id)
+    
+    def _record_bedrock_job_result(self, document_id: str, job_status: Dict[str, Any]):
+        """
+        Record the outcome of the Bedrock KB ingestion job that synced a document.
+        
+        Args:
+            document_id: Document ID
+            job_status: Final job status from the ingestion job coordinator
+        """
+        if job_status["status"] == CANCELLED_STATUS and job_status.get("ingestion_job_id"):
+            # The job still runs in Bedrock; its persisted ID lets get_ingestion_status follow it
+            return
+        status = "completed" if job_status["status"] == "COMPLETE" else "failed"
+        self._update_status(document_id, status, error=job_status.get("error_message") or None,
+                            bedrock_kb_ingestion_job_id=job_status.get("ingestion_job_id"))
+    
+    def _store_metadata(self, document_id: str, metadata: Dict[str, Any], create: bool = False):
+        """
+        Store document metadata in the status store.
         
         Args:
             document_id: Document ID
             metadata: Document metadata
+            create: Whether this is a new document to be tracked by this worker
         """
         try:
-            # Store metadata in S3
-            metadata_bucket = self.config.get("metadata_bucket")
-            
-            if metadata_bucket:
-                metadata_key = f"metadata/{document_id}.json"
-                self.s3_client.put_object(
-                    Bucket=metadata_bucket,
-                    Key=metadata_key,
-                    Body=json.dumps(metadata),
-                    ContentType="application/json"
-                )
-                logger.info(f"Stored metadata for document {document_id} in S3")
+            if self.status_store:
+                if create:
+                    self.status_writer.create(document_id, metadata)
+                else:
+                    self.status_store.put(document_id, metadata)
+                logger.info(f"Stored metadata for document {document_id}")
         except Exception as e:
             logger.warning(f"Error storing metadata for document {document_id}: {str(e)}")
     
-    def _update_status(self, document_id: str, status: str, error: str = None):
+    def _update_status(self, document_id: str, status: str, error: str = None, **fields) -> bool:
         """
         Update the status of a document ingestion.
         
+        Documents created by this worker are updated from in-memory state and
+        rapid transitions are coalesced into one conditional write. Other
+        documents are read and conditionally written back, retrying up to
+        STATUS_UPDATE_ATTEMPTS times when another writer changed them first.
+        
         Args:
             document_id: Document ID
             status: New status
             error: Optional error message
+            **fields: Additional metadata fields to set
+            
+        Returns:
+            True if the status was recorded, False otherwise
         """
         try:
-            # Get existing metadata
-            metadata = self.get_document_metadata(document_id)
+            if not self.status_store:
+                return False
             
-            if metadata:
-                # Update status
-                metadata["status"] = status
-                metadata["updated_at"] = time.time()
-                
-                if error:
-                    metadata["error"] = error
-                
-                # Store updated metadata
-                self._store_metadata(document_id, metadata)
+            fields.update({"status": status, "updated_at": time.time()})
+            if error:
+                fields["error"] = error
+            
+            if self.status_writer.get(document_id) is not None:
+                self.status_writer.update(document_id, **fields)
+            else:
+                for _ in range(STATUS_UPDATE_ATTEMPTS):
+                    metadata, version = self.status_store.get_with_version(document_id)
+                    if not metadata:
+                        logger.warning(f"Cannot update status of unknown document {document_id} to {status}")
+                        return False
+                    metadata.update(fields)
+                    try:
+                        self.status_store.put(document_id, metadata, expected_version=version)
+                        break
+                    except StatusConflictError:
+                        logger.info(f"Concurrent update of document {document_id}, retrying")
+                else:
+                    logger.error(f"Gave up updating status of document {document_id} to {status} "
+                                 f"after {STATUS_UPDATE_ATTEMPTS} conflicting writes")
+                    return False
                 
             logger.info(f"Document {document_id} status updated to {status}")
+            return True
         except Exception as e:
             logger.warning(f"Error updating status for document {document_id}: {str(e)}")
+            return False
+    
+    def close(self):
+        """Write pending status updates and stop the vector store's background threads."""
+        if self.status_writer:
+            self.status_writer.flush()
+        self.vector_store.close()
     
     def get_ingestion_status(self, ingestion_id: str) -> Dict[str, Any]:
         """
@@ -334,57 +793,89 @@ class DocumentIngestion:
             Dictionary with ingestion status
         """
         try:
-            # Get metadata by ingestion ID
-            metadata_bucket = self.config.get("metadata_bucket")
+            if ingestion_id.startswith("run-") and self.run_journal:
+                return self.get_run_status(ingestion_id)
             
-            if not metadata_bucket:
+            if not self.status_store:
                 return {"status": "unknown", "error": "No metadata bucket configured"}
             
-            # List objects with prefix to find the document with this ingestion ID
-            response = self.s3_client.list_objects_v2(
-                Bucket=metadata_bucket,
-                Prefix="metadata/"
-            )
+            # Direct lookup through the ingestion ID index
+            metadata = self.status_store.find_by_ingestion_id(ingestion_id)
+            
+            if not metadata:
+                return {"status": "not_found", "ingestion_id": ingestion_id}
             
-            for obj in response.get("Contents", []):
-                try:
-                    metadata_obj = self.s3_client.get_object(
-                        Bucket=metadata_bucket,
-                        Key=obj["Key"]
+            # For Bedrock KB, check the ingestion job status
+            if self.vector_db_type == "bedrock_kb" and metadata.get("status") == "ingestion_started":
+                request_status = None
+                if "bedrock_kb_ingestion_request_id" in metadata:
+                    request_status = self.vector_store.get_ingestion_request_status(
+                        metadata["bedrock_kb_ingestion_request_id"]
+                    )
+                if request_status:
+                    # Tracked by the shared poller; the outcome is stored when the job finishes
+                    metadata["job_status"] = request_status
+                elif "bedrock_kb_ingestion_job_id" in metadata:
+                    # Started by an earlier process, so poll the job directly
+                    job_status = self.vector_store.get_ingestion_job_status(
+                        metadata["bedrock_kb_ingestion_job_id"],
+                        metadata.get("bedrock_kb_data_source_id")
                     )
-                    metadata = json.loads(metadata_obj["Body"].read().decode("utf-8"))
                     
-                    if metadata.get("ingestion_id") == ingestion_id:
-                        # For Bedrock KB, check the ingestion job status
-                        if self.vector_db_type == "bedrock_kb" and metadata.get("status") == "ingestion_started":
-                            if "bedrock_kb_ingestion_job_id" in metadata:
-                                job_status = self.vector_store.get_ingestion_job_status(
-                                    metadata["bedrock_kb_ingestion_job_id"]
-                                )
-                                
-                                # Update metadata with job status
-                                if job_status["status"] in ["COMPLETE", "FAILED"]:
-                                    metadata["status"] = "completed" if job_status["status"] == "COMPLETE" else "failed"
-                                    metadata["updated_at"] = time.time()
-                                    if job_status["status"] == "FAILED":
-                                        metadata["error"] = job_status["error_message"]
-                                    
-                                    # Store updated metadata
-                                    self._store_metadata(metadata["document_id"], metadata)
-                                
-                                # Add job status to metadata
-                                metadata["job_status"] = job_status
+                    # Update metadata with job status
+                    if job_status["status"] in ["COMPLETE", "FAILED"]:
+                        metadata["status"] = "completed" if job_status["status"] == "COMPLETE" else "failed"
+                        metadata["updated_at"] = time.time()
+                        if job_status["status"] == "FAILED":
+                            metadata["error"] = job_status["error_message"]
                         
-                        return metadata
-                except:
-                    continue
+                        # Store updated metadata
+                        self._store_metadata(metadata["document_id"], metadata)
+                    
+                    # Add job status to metadata
+                    metadata["job_status"] = job_status
             
-            return {"status": "not_found", "ingestion_id": ingestion_id}
+            return metadata
             
         except Exception as e:
             logger.error(f"Error getting ingestion status for {ingestion_id}: {str(e)}")
             return {"status": "error", "error": str(e), "ingestion_id": ingestion_id}
     
+    def get_run_status(self, run_id: str) -> Dict[str, Any]:
+        """
+        Get the progress of an ingest_documents run.
+        
+        Args:
+            run_id: Run ID, as returned in each result of ingest_documents
+            
+        Returns:
+            Dictionary with run status and document counts
+        """
+        run = self.run_journal.get_run(run_id) if self.run_journal else None
+        if run is None:
+            return {"status": "not_found", "run_id": run_id}
+        run.pop("sources")
+        return run
+    
+    def list_ingestions(self, status: Optional[str] = None, page_size: int = 100,
+                        page_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List document ingestions one page at a time.
+        
+        Args:
+            status: Optional status to filter on
+            page_size: Maximum number of documents per page
+            page_token: Token from the previous page, or None for the first page
+            
+        Returns:
+            Dictionary with "documents" and "next_page_token" (None on the last page)
+        """
+        if not self.status_store:
+            return {"documents": [], "next_page_token": None, "error": "No metadata bucket configured"}
+        
+        documents, next_token = self.status_store.list(status=status, page_size=page_size, page_token=page_token)
+        return {"documents": documents, "next_page_token": next_token}
+    
     def get_document_metadata(self, document_id: str) -> Dict[str, Any]:
         """
         Get metadata for a document.
@@ -396,22 +887,13 @@ class DocumentIngestion:
             Dictionary with document metadata
         """
         try:
-            metadata_bucket = self.config.get("metadata_bucket")
-            
-            if not metadata_bucket:
+            if not self.status_store:
                 return {"status": "unknown", "error": "No metadata bucket configured"}
             
-            metadata_key = f"metadata/{document_id}.json"
-            
-            try:
-                metadata_obj = self.s3_client.get_object(
-                    Bucket=metadata_bucket,
-                    Key=metadata_key
-                )
-                metadata = json.loads(metadata_obj["Body"].read().decode("utf-8"))
-                return metadata
-            except self.s3_client.exceptions.NoSuchKey:
+            metadata = self.status_store.get(document_id)
+            if metadata is None:
                 return {"status": "not_found", "document_id": document_id}
+            return metadata
             
         except Exception as e:
             logger.error(f"Error getting metadata for document {document_id}: {str(e)}")
@@ -434,22 +916,22 @@ class DocumentIngestion:
             if metadata.get("status") == "not_found":
                 return {"status": "not_found", "document_id": document_id}
             
-            # Delete from vector database
-            delete_success = self.vector_store.delete(document_id)
+            # Delete from vector database, by chunk ID when the chunks are known
+            manifest = None
+            if self.status_store and metadata.get("bucket_name") and metadata.get("object_key"):
+                manifest = self.status_store.get_manifest(source_key(metadata["bucket_name"], metadata["object_key"]))
+            chunk_ids = self._indexed_chunk_ids(document_id, metadata, manifest)
+            delete_success = self.vector_store.delete(document_id, chunk_ids=chunk_ids)
             
             if not delete_success and self.vector_db_type == "bedrock_kb":
                 logger.warning("Direct document deletion not supported for Bedrock KB")
             
-            # Delete metadata
+            # Delete metadata and the chunk manifest
             try:
-                metadata_bucket = self.config.get("metadata_bucket")
-                
-                if metadata_bucket:
-                    metadata_key = f"metadata/{document_id}.json"
-                    self.s3_client.delete_object(
-                        Bucket=metadata_bucket,
-                        Key=metadata_key
-                    )
+                if self.status_store:
+                    if manifest is not None:
+                        self.status_store.delete_manifest(source_key(metadata["bucket_name"], metadata["object_key"]))
+                    self.status_store.delete(document_id)
                     logger.info(f"Deleted metadata for document {document_id}")
             except Exception as e:
                 logger.warning(f"Error deleting metadata for document {document_id}: {str(e)}")
@@ -466,6 +948,31 @@ class DocumentIngestion:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _indexed_chunk_ids(document_id: str, metadata: Dict[str, Any],
+                           manifest: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """
+        Return the IDs of all indexed chunks of a document, if they are known.
+        
+        The manifest lists every chunk only if the last ingestion completed and
+        its chunk count matches the one recorded in the document metadata; a
+        failed run may have indexed chunks the manifest does not list.
+        
+        Args:
+            document_id: Document ID
+            metadata: Document metadata
+            manifest: Chunk manifest of the document's source, or None
+            
+        Returns:
+            Chunk IDs, or None if the store must find the chunks by document ID
+        """
+        if not manifest or manifest.get("document_id") != document_id:
+            return None
+        chunk_ids = [chunk["chunk_id"] for chunk in manifest.get("chunks", [])]
+        if metadata.get("status") != "completed" or metadata.get("chunks") != len(chunk_ids):
+            return None
+        return chunk_ids
+    
     def query_similar(self, query: str, top_k: int = 10, 
                       filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
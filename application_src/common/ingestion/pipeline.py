@@ -0,0 +1,145 @@
+"""
+Staged, multi-threaded pipeline for document ingestion.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Marks the end of the input for a stage worker
+_END = object()
+
+
+class PipelineStage(NamedTuple):
+    """A named pipeline step run by a fixed number of worker threads."""
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+class PipelineItem:
+    """
+    State of one input moving through the pipeline.
+
+    Attributes:
+        index: Position of the input, used to return results in input order
+        value: Output of the last completed stage (the input before any stage ran)
+        error: Error message if a stage failed, otherwise None
+        failed_stage: Name of the stage that failed, if any
+        timings: Seconds spent in each completed stage
+    """
+
+    def __init__(self, index: int, value: Any):
+        self.index = index
+        self.value = value
+        self.error: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+
+
+class IngestionPipeline:
+    """
+    Run inputs through a sequence of stages connected by bounded queues.
+
+    Each stage has its own worker threads, so while one document is being
+    embedded the next can be loaded and split, and a bulk load is bounded by the
+    slowest stage rather than the sum of all stages. The bounded queues provide
+    back-pressure so a fast loader cannot buffer the whole corpus in memory.
+    An exception in a stage fails only that item: it skips the remaining
+    stages and is reported with the stage name and error.
+    """
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 8):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: Stages in execution order
+            queue_size: Maximum number of items waiting between two stages
+        """
+        if not stages:
+            raise ValueError("IngestionPipeline requires at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, inputs: Iterable[Any]) -> List[PipelineItem]:
+        """
+        Process all inputs and return their final state in input order.
+
+        Args:
+            inputs: Values passed to the first stage
+
+        Returns:
+            List of PipelineItem objects, one per input
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        done: "queue.Queue[PipelineItem]" = queue.Queue()
+        threads = []
+
+        for position, stage in enumerate(self.stages):
+            inbox = queues[position]
+            outbox = queues[position + 1] if position + 1 < len(self.stages) else done
+            next_workers = self.stages[position + 1].workers if position + 1 < len(self.stages) else 0
+            remaining = {"workers": max(stage.workers, 1)}
+            lock = threading.Lock()
+
+            for worker in range(max(stage.workers, 1)):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, inbox, outbox, next_workers, remaining, lock),
+                    name=f"ingestion-{stage.name}-{worker}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        count = 0
+        try:
+            for index, value in enumerate(inputs):
+                queues[0].put(PipelineItem(index, value))
+                count = index + 1
+        finally:
+            # Stop the workers even if the input iterator raised
+            for _ in range(max(self.stages[0].workers, 1)):
+                queues[0].put(_END)
+
+        for thread in threads:
+            thread.join()
+
+        results = [done.get() for _ in range(count)]
+        results.sort(key=lambda item: item.index)
+        return results
+
+    @staticmethod
+    def _worker(stage: PipelineStage, inbox: queue.Queue, outbox: queue.Queue, next_workers: int,
+                remaining: Dict[str, int], lock: threading.Lock):
+        """Process items from one stage's inbox until the end marker arrives."""
+        while True:
+            item = inbox.get()
+            if item is _END:
+                break
+
+            if item.error is None:
+                start = time.time()
+                try:
+                    item.value = stage.func(item.value)
+                except Exception as e:
+                    logger.error(f"Ingestion pipeline stage '{stage.name}' failed for item {item.index}: {str(e)}")
+                    item.error = str(e)
+                    item.failed_stage = stage.name
+                item.timings[stage.name] = time.time() - start
+
+            outbox.put(item)
+
+        # The last worker of a stage tells every worker of the next stage to stop
+        with lock:
+            remaining["workers"] -= 1
+            last_worker = remaining["workers"] == 0
+        if last_worker:
+            for _ in range(next_workers):
+                outbox.put(_END)
@@ -0,0 +1,399 @@
+"""
+Durable journals of ingestion run progress, used to resume interrupted runs.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class RunJournal(ABC):
+    """
+    Abstract base class for ingestion run journals.
+
+    A run is an ordered list of source documents. For each source the journal
+    records the document ID it was given, the chunk IDs of every batch written
+    to the vector store, and the final result. Every record is written after
+    the work it describes, so after a crash the journal never claims more than
+    was done: a resumed run skips finished documents and the committed batches
+    of the document that was interrupted.
+    """
+
+    @abstractmethod
+    def create_run(self, run_id: str, sources: List[str]):
+        """
+        Record a new run.
+
+        Args:
+            run_id: Run ID
+            sources: Source keys of the run's documents, in order
+        """
+        pass
+
+    @abstractmethod
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a run with its progress.
+
+        Args:
+            run_id: Run ID
+
+        Returns:
+            Dictionary with "run_id", "status", "sources", "total", "completed",
+            "failed", "pending", "created_at" and "updated_at", or None if unknown
+        """
+        pass
+
+    @abstractmethod
+    def set_run_status(self, run_id: str, status: str):
+        """
+        Set the status of a run ("running" or "finished").
+
+        Args:
+            run_id: Run ID
+            status: New status
+        """
+        pass
+
+    @abstractmethod
+    def delete_run(self, run_id: str):
+        """
+        Delete a run and all of its progress.
+
+        Args:
+            run_id: Run ID
+        """
+        pass
+
+    @abstractmethod
+    def start_document(self, run_id: str, source: str, document_id: str):
+        """
+        Record the document ID of a source before anything is written for it.
+
+        Args:
+            run_id: Run ID
+            source: Source key
+            document_id: Document ID used for the source's chunks
+        """
+        pass
+
+    @abstractmethod
+    def get_document(self, run_id: str, source: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the progress of one source document.
+
+        Args:
+            run_id: Run ID
+            source: Source key
+
+        Returns:
+            Dictionary with "document_id", "status" ("processing", "completed" or
+            "failed"), "result", "batches" (number of committed batches) and
+            "chunk_ids" (chunk IDs of all committed batches), or None if the
+            document was not started
+        """
+        pass
+
+    @abstractmethod
+    def commit_batch(self, run_id: str, source: str, batch_index: int, chunk_ids: List[str]):
+        """
+        Record a batch of chunks as written to the vector store.
+
+        Args:
+            run_id: Run ID
+            source: Source key
+            batch_index: Position of the batch within the document
+            chunk_ids: IDs of the chunks in the batch
+        """
+        pass
+
+    @abstractmethod
+    def finish_document(self, run_id: str, source: str, status: str, result: Dict[str, Any]):
+        """
+        Record the final result of a source document.
+
+        Args:
+            run_id: Run ID
+            source: Source key
+            status: "completed" or "failed"
+            result: Ingestion result returned for the document
+        """
+        pass
+
+
+def _source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _progress(run: Dict[str, Any], completed: int, failed: int) -> Dict[str, Any]:
+    total = len(run["sources"])
+    return dict(run, total=total, completed=completed, failed=failed, pending=total - completed - failed)
+
+
+class S3RunJournal(RunJournal):
+    """
+    Run journal keeping small JSON objects in S3.
+
+    Every record is a single PUT of its own object, so no write needs a
+    read-modify-write. Layout under ``prefix`` (default ``runs/``):
+        {prefix}{run_id}/run.json                          run and its sources
+        {prefix}{run_id}/documents/{sha256(source)}.json   document ID of a started source
+        {prefix}{run_id}/batches/{sha256(source)}/{n}.json chunk IDs of committed batch n
+        {prefix}{run_id}/completed/{sha256(source)}.json   result of a completed source
+        {prefix}{run_id}/failed/{sha256(source)}.json      result of a failed source
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str = "runs/"):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, run_id: str, *parts: str) -> str:
+        return "/".join((f"{self.prefix}{run_id}",) + parts)
+
+    def _get_json(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response["Body"].read().decode("utf-8"))
+
+    def _put_json(self, key: str, value: Dict[str, Any]):
+        self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(value),
+                                  ContentType="application/json")
+
+    def _list_keys(self, prefix: str) -> List[str]:
+        keys, token = [], None
+        while True:
+            params = {"Bucket": self.bucket, "Prefix": prefix}
+            if token:
+                params["ContinuationToken"] = token
+            response = self.s3_client.list_objects_v2(**params)
+            keys.extend(obj["Key"] for obj in response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                return keys
+            token = response["NextContinuationToken"]
+
+    def create_run(self, run_id: str, sources: List[str]):
+        now = time.time()
+        self._put_json(self._key(run_id, "run.json"), {
+            "run_id": run_id, "status": "running", "sources": sources, "created_at": now, "updated_at": now
+        })
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        run = self._get_json(self._key(run_id, "run.json"))
+        if run is None:
+            return None
+        completed = len(self._list_keys(self._key(run_id, "completed/")))
+        failed = len(self._list_keys(self._key(run_id, "failed/")))
+        return _progress(run, completed, failed)
+
+    def set_run_status(self, run_id: str, status: str):
+        run = self._get_json(self._key(run_id, "run.json"))
+        if run is not None:
+            run.update(status=status, updated_at=time.time())
+            self._put_json(self._key(run_id, "run.json"), run)
+
+    def delete_run(self, run_id: str):
+        for key in self._list_keys(self._key(run_id, "")):
+            self.s3_client.delete_object(Bucket=self.bucket, Key=key)
+
+    def start_document(self, run_id: str, source: str, document_id: str):
+        self._put_json(self._key(run_id, "documents", f"{_source_hash(source)}.json"),
+                       {"source": source, "document_id": document_id})
+
+    def get_document(self, run_id: str, source: str) -> Optional[Dict[str, Any]]:
+        digest = _source_hash(source)
+        document = self._get_json(self._key(run_id, "documents", f"{digest}.json"))
+        if document is None:
+            return None
+        status, result = "processing", None
+        for finished in ("completed", "failed"):
+            record = self._get_json(self._key(run_id, finished, f"{digest}.json"))
+            if record is not None:
+                status, result = finished, record
+                break
+        batch_keys = sorted(self._list_keys(self._key(run_id, "batches", digest, "")))
+        chunk_ids = []
+        for key in batch_keys:
+            chunk_ids.extend(self._get_json(key)["chunk_ids"])
+        return {"document_id": document["document_id"], "status": status, "result": result,
+                "batches": len(batch_keys), "chunk_ids": chunk_ids}
+
+    def commit_batch(self, run_id: str, source: str, batch_index: int, chunk_ids: List[str]):
+        # Zero-padded so listing returns batches in order
+        self._put_json(self._key(run_id, "batches", _source_hash(source), f"{batch_index:08d}.json"),
+                       {"chunk_ids": chunk_ids})
+
+    def finish_document(self, run_id: str, source: str, status: str, result: Dict[str, Any]):
+        digest = _source_hash(source)
+        self._put_json(self._key(run_id, status, f"{digest}.json"), result)
+        if status == "completed":
+            # A retried document may have failed in an earlier attempt
+            self.s3_client.delete_object(Bucket=self.bucket, Key=self._key(run_id, "failed", f"{digest}.json"))
+
+
+class SQLiteRunJournal(RunJournal):
+    """
+    Run journal backed by a local SQLite database.
+
+    The default for single-node deployments; the database file must be on
+    storage that survives a container restart for runs to be resumable.
+    """
+
+    def __init__(self, path: str = "ingestion_runs.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingestion_runs ("
+                "run_id TEXT PRIMARY KEY, "
+                "status TEXT NOT NULL, "
+                "sources TEXT NOT NULL, "
+                "created_at REAL, "
+                "updated_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingestion_run_documents ("
+                "run_id TEXT NOT NULL, "
+                "source TEXT NOT NULL, "
+                "document_id TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "result TEXT, "
+                "PRIMARY KEY (run_id, source))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingestion_run_batches ("
+                "run_id TEXT NOT NULL, "
+                "source TEXT NOT NULL, "
+                "batch_index INTEGER NOT NULL, "
+                "chunk_ids TEXT NOT NULL, "
+                "PRIMARY KEY (run_id, source, batch_index))"
+            )
+
+    def create_run(self, run_id: str, sources: List[str]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO ingestion_runs (run_id, status, sources, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, "running", json.dumps(sources), now, now)
+            )
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, sources, created_at, updated_at FROM ingestion_runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM ingestion_run_documents WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall())
+        run = {"run_id": run_id, "status": row[0], "sources": json.loads(row[1]),
+               "created_at": row[2], "updated_at": row[3]}
+        return _progress(run, counts.get("completed", 0), counts.get("failed", 0))
+
+    def set_run_status(self, run_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE ingestion_runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                               (status, time.time(), run_id))
+
+    def delete_run(self, run_id: str):
+        with self._lock, self._conn:
+            for table in ("ingestion_run_batches", "ingestion_run_documents", "ingestion_runs"):
+                self._conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+    def start_document(self, run_id: str, source: str, document_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO ingestion_run_documents (run_id, source, document_id, status) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(run_id, source) DO UPDATE SET document_id = excluded.document_id, "
+                "status = excluded.status, result = NULL",
+                (run_id, source, document_id, "processing")
+            )
+
+    def get_document(self, run_id: str, source: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_id, status, result FROM ingestion_run_documents WHERE run_id = ? AND source = ?",
+                (run_id, source)
+            ).fetchone()
+            if row is None:
+                return None
+            batches = self._conn.execute(
+                "SELECT chunk_ids FROM ingestion_run_batches WHERE run_id = ? AND source = ? ORDER BY batch_index",
+                (run_id, source)
+            ).fetchall()
+        chunk_ids = [chunk_id for batch in batches for chunk_id in json.loads(batch[0])]
+        return {"document_id": row[0], "status": row[1], "result": json.loads(row[2]) if row[2] else None,
+                "batches": len(batches), "chunk_ids": chunk_ids}
+
+    def commit_batch(self, run_id: str, source: str, batch_index: int, chunk_ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingestion_run_batches (run_id, source, batch_index, chunk_ids) "
+                "VALUES (?, ?, ?, ?)",
+                (run_id, source, batch_index, json.dumps(chunk_ids))
+            )
+
+    def finish_document(self, run_id: str, source: str, status: str, result: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE ingestion_run_documents SET status = ?, result = ? WHERE run_id = ? AND source = ?",
+                (status, json.dumps(result, default=str), run_id, source)
+            )
+            self._conn.execute("UPDATE ingestion_runs SET updated_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def get_run_journal(config: Dict[str, Any], s3_client=None) -> Optional[RunJournal]:
+    """
+    Create the run journal selected by the ingestion config.
+
+    ``run_journal`` may be "sqlite" (using ``run_journal_path``), "s3" (using
+    ``run_journal_bucket``, default ``metadata_bucket``) or "none". Without an
+    explicit choice, SQLite is used when ``run_journal_path`` is configured,
+    else S3 when a bucket is configured, else no journal.
+
+    Args:
+        config: Ingestion configuration
+        s3_client: S3 client for the S3 backend
+
+    Returns:
+        Run journal instance, or None if disabled
+    """
+    journal_type = (config.get("run_journal") or "").lower()
+    if not journal_type:
+        if config.get("run_journal_path"):
+            journal_type = "sqlite"
+        elif config.get("run_journal_bucket") or config.get("metadata_bucket"):
+            journal_type = "s3"
+        else:
+            journal_type = "none"
+
+    if journal_type == "none":
+        return None
+
+    if journal_type == "sqlite":
+        return SQLiteRunJournal(config.get("run_journal_path", "ingestion_runs.db"))
+
+    if journal_type == "s3":
+        bucket = config.get("run_journal_bucket") or config.get("metadata_bucket")
+        if not bucket:
+            raise ValueError("run_journal 's3' requires run_journal_bucket or metadata_bucket")
+        return S3RunJournal(s3_client, bucket)
+
+    raise ValueError(f"Unsupported run journal: {journal_type}")
@@ -0,0 +1,610 @@
+"""
+Pluggable stores for document ingestion status and metadata.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Statuses after which no further transitions are expected for a document
+TERMINAL_STATUSES = ("completed", "failed", "ingestion_started")
+
+
+class StatusConflictError(Exception):
+    """Raised when a conditional write finds the stored version has changed."""
+    pass
+
+
+class StatusStore(ABC):
+    """
+    Abstract base class for ingestion status stores.
+
+    Documents are addressed directly by document ID, and a compact index maps
+    ingestion IDs to document IDs, so no lookup needs to scan all documents.
+    """
+
+    @abstractmethod
+    def put(self, document_id: str, metadata: Dict[str, Any],
+            expected_version: Optional[str] = None) -> Optional[str]:
+        """
+        Create or replace the metadata of a document.
+
+        Args:
+            document_id: Document ID
+            metadata: Document metadata, including "ingestion_id" and "status"
+            expected_version: If given, only write when the stored version still matches
+
+        Returns:
+            Version of the written metadata
+
+        Raises:
+            StatusConflictError: If expected_version no longer matches
+        """
+        pass
+
+    def create(self, document_id: str, metadata: Dict[str, Any]) -> Optional[str]:
+        """
+        Store the metadata of a new document and index its ingestion ID.
+
+        Args:
+            document_id: Document ID
+            metadata: Document metadata, including "ingestion_id"
+
+        Returns:
+            Version of the written metadata
+        """
+        return self.put(document_id, metadata)
+
+    @abstractmethod
+    def get_with_version(self, document_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Get the metadata of a document with its version.
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Tuple of (metadata, version); both None if the document is unknown
+        """
+        pass
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata of a document.
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Document metadata, or None if the document is unknown
+        """
+        return self.get_with_version(document_id)[0]
+
+    @abstractmethod
+    def find_by_ingestion_id(self, ingestion_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata of the document created by an ingestion.
+
+        Args:
+            ingestion_id: Ingestion ID
+
+        Returns:
+            Document metadata, or None if the ingestion is unknown
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, document_id: str):
+        """
+        Delete the metadata of a document and its index entries.
+
+        Args:
+            document_id: Document ID
+        """
+        pass
+
+    @abstractmethod
+    def list(self, status: Optional[str] = None, page_size: int = 100,
+             page_token: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List document metadata one page at a time.
+
+        Args:
+            status: Optional status to filter on
+            page_size: Maximum number of documents per page
+            page_token: Token returned by the previous page, or None for the first page
+
+        Returns:
+            Tuple of (documents, next_page_token); the token is None on the last page
+        """
+        pass
+
+    @abstractmethod
+    def get_manifest(self, source: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the chunk manifest of a source document.
+
+        Args:
+            source: Source key, e.g. "s3://bucket/key"
+
+        Returns:
+            Manifest, or None if the source was never ingested
+        """
+        pass
+
+    @abstractmethod
+    def put_manifest(self, source: str, manifest: Dict[str, Any]):
+        """
+        Store the chunk manifest of a source document.
+
+        Args:
+            source: Source key
+            manifest: Manifest listing the indexed chunks
+        """
+        pass
+
+    @abstractmethod
+    def delete_manifest(self, source: str):
+        """
+        Delete the chunk manifest of a source document.
+
+        Args:
+            source: Source key
+        """
+        pass
+
+
+class S3StatusStore(StatusStore):
+    """
+    Status store keeping one JSON object per document in S3.
+
+    Layout under ``prefix`` (default ``metadata/``):
+        {prefix}{document_id}.json                 document metadata
+        {prefix}index/ingestion/{ingestion_id}     document ID for an ingestion
+        {prefix}index/backfilled                   marker: every document has an index entry
+        {prefix}manifests/{sha256(source)}.json    chunk manifest of a source document
+
+    Documents written before the ingestion index existed have no index entry.
+    The first lookup that misses the index backfills it once from a scan of
+    the documents and records the marker, so later misses cost a single GET.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str = "metadata/"):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self._backfill_lock = threading.Lock()
+        self._index_backfilled = False
+
+    def _document_key(self, document_id: str) -> str:
+        return f"{self.prefix}{document_id}.json"
+
+    def _ingestion_index_key(self, ingestion_id: str) -> str:
+        return f"{self.prefix}index/ingestion/{ingestion_id}"
+
+    def _backfill_marker_key(self) -> str:
+        return f"{self.prefix}index/backfilled"
+
+    def _manifest_key(self, source: str) -> str:
+        return f"{self.prefix}manifests/{hashlib.sha256(source.encode('utf-8')).hexdigest()}.json"
+
+    def _get_json(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None, None
+        return json.loads(response["Body"].read().decode("utf-8")), response.get("ETag")
+
+    def put(self, document_id: str, metadata: Dict[str, Any],
+            expected_version: Optional[str] = None) -> Optional[str]:
+        params = {
+            "Bucket": self.bucket,
+            "Key": self._document_key(document_id),
+            "Body": json.dumps(metadata),
+            "ContentType": "application/json"
+        }
+        if expected_version:
+            # S3 conditional write: rejected with 412 if another writer changed the object
+            params["IfMatch"] = expected_version
+        try:
+            response = self.s3_client.put_object(**params)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409"):
+                raise StatusConflictError(f"Metadata for document {document_id} was changed by another writer") from e
+            raise
+        return response.get("ETag")
+
+    def create(self, document_id: str, metadata: Dict[str, Any]) -> Optional[str]:
+        version = self.put(document_id, metadata)
+        # The index entry never changes, so it is written once when the document is created
+        if metadata.get("ingestion_id"):
+            self._put_index_entry(metadata["ingestion_id"], document_id)
+        return version
+
+    def _put_index_entry(self, ingestion_id: str, document_id: str):
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self._ingestion_index_key(ingestion_id),
+            Body=document_id.encode("utf-8"),
+            ContentType="text/plain"
+        )
+
+    def get_with_version(self, document_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        return self._get_json(self._document_key(document_id))
+
+    def find_by_ingestion_id(self, ingestion_id: str) -> Optional[Dict[str, Any]]:
+        document_id = self._read_index_entry(ingestion_id)
+        if document_id is None and self._ensure_index_backfilled():
+            document_id = self._read_index_entry(ingestion_id)
+        return self.get(document_id) if document_id is not None else None
+
+    def _read_index_entry(self, ingestion_id: str) -> Optional[str]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._ingestion_index_key(ingestion_id))
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read().decode("utf-8")
+
+    def _ensure_index_backfilled(self) -> bool:
+        """Backfill the ingestion index unless that was already done; True if entries were added."""
+        with self._backfill_lock:
+            if self._index_backfilled:
+                return False
+            if self._get_json(self._backfill_marker_key())[0] is not None:
+                self._index_backfilled = True
+                return False
+            return self.backfill_ingestion_index() > 0
+
+    def backfill_ingestion_index(self) -> int:
+        """
+        Write missing ingestion index entries for documents created before the index existed.
+
+        Reads every document once, then records a marker so the scan is not repeated.
+
+        Returns:
+            Number of index entries written
+        """
+        indexed = set()
+        params = {"Bucket": self.bucket, "Prefix": self._ingestion_index_key("")}
+        while True:
+            response = self.s3_client.list_objects_v2(**params)
+            indexed.update(obj["Key"][len(params["Prefix"]):] for obj in response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                break
+            params["ContinuationToken"] = response["NextContinuationToken"]
+
+        written = 0
+        page_token = None
+        while True:
+            documents, page_token = self.list(page_size=1000, page_token=page_token)
+            for metadata in documents:
+                ingestion_id = metadata.get("ingestion_id")
+                if ingestion_id and metadata.get("document_id") and ingestion_id not in indexed:
+                    self._put_index_entry(ingestion_id, metadata["document_id"])
+                    written += 1
+            if not page_token:
+                break
+
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._backfill_marker_key(),
+                                  Body=json.dumps({"backfilled_at": time.time()}), ContentType="application/json")
+        self._index_backfilled = True
+        logger.info(f"Backfilled {written} ingestion index entries in s3://{self.bucket}/{self.prefix}")
+        return written
+
+    def delete(self, document_id: str):
+        metadata = self.get(document_id)
+        self.s3_client.delete_object(Bucket=self.bucket, Key=self._document_key(document_id))
+        if metadata and metadata.get("ingestion_id"):
+            self.s3_client.delete_object(Bucket=self.bucket, Key=self._ingestion_index_key(metadata["ingestion_id"]))
+
+    def list(self, status: Optional[str] = None, page_size: int = 100,
+             page_token: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        params = {
+            "Bucket": self.bucket,
+            "Prefix": self.prefix,
+            # The delimiter keeps index entries out of the listing
+            "Delimiter": "/",
+            "MaxKeys": page_size
+        }
+        if page_token:
+            params["ContinuationToken"] = page_token
+
+        response = self.s3_client.list_objects_v2(**params)
+        documents = []
+        for obj in response.get("Contents", []):
+            if not obj["Key"].endswith(".json"):
+                continue
+            metadata, _ = self._get_json(obj["Key"])
+            if metadata and (status is None or metadata.get("status") == status):
+                documents.append(metadata)
+
+        next_token = response.get("NextContinuationToken") if response.get("IsTruncated") else None
+        return documents, next_token
+
+    def get_manifest(self, source: str) -> Optional[Dict[str, Any]]:
+        return self._get_json(self._manifest_key(source))[0]
+
+    def put_manifest(self, source: str, manifest: Dict[str, Any]):
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self._manifest_key(source),
+            Body=json.dumps(manifest),
+            ContentType="application/json"
+        )
+
+    def delete_manifest(self, source: str):
+        self.s3_client.delete_object(Bucket=self.bucket, Key=self._manifest_key(source))
+
+
+class SQLiteStatusStore(StatusStore):
+    """
+    Status store backed by a local SQLite database.
+
+    Suitable for tests and single-node deployments. Pages are keyset-paginated
+    by document ID, so concurrent inserts never shift or repeat entries.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingestion_status ("
+                "document_id TEXT PRIMARY KEY, "
+                "ingestion_id TEXT, "
+                "status TEXT, "
+                "updated_at REAL, "
+                "version INTEGER NOT NULL DEFAULT 1, "
+                "metadata TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingestion_status_ingestion_id ON ingestion_status (ingestion_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingestion_status_status ON ingestion_status (status, document_id)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_manifests (source TEXT PRIMARY KEY, manifest TEXT NOT NULL)"
+            )
+
+    def put(self, document_id: str, metadata: Dict[str, Any],
+            expected_version: Optional[str] = None) -> Optional[str]:
+        values = (metadata.get("ingestion_id"), metadata.get("status"), metadata.get("updated_at"), json.dumps(metadata))
+        with self._lock, self._conn:
+            if expected_version is not None:
+                cursor = self._conn.execute(
+                    "UPDATE ingestion_status SET ingestion_id = ?, status = ?, updated_at = ?, metadata = ?, "
+                    "version = version + 1 WHERE document_id = ? AND version = ?",
+                    values + (document_id, int(expected_version))
+                )
+                if cursor.rowcount == 0:
+                    raise StatusConflictError(f"Metadata for document {document_id} was changed by another writer")
+                return str(int(expected_version) + 1)
+
+            self._conn.execute(
+                "INSERT INTO ingestion_status (document_id, ingestion_id, status, updated_at, metadata) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(document_id) DO UPDATE SET "
+                "ingestion_id = excluded.ingestion_id, status = excluded.status, updated_at = excluded.updated_at, "
+                "metadata = excluded.metadata, version = version + 1",
+                (document_id,) + values
+            )
+            row = self._conn.execute("SELECT version FROM ingestion_status WHERE document_id = ?",
+                                     (document_id,)).fetchone()
+            return str(row[0])
+
+    def _fetch_one(self, sql: str, params: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_with_version(self, document_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT metadata, version FROM ingestion_status WHERE document_id = ?",
+                                     (document_id,)).fetchone()
+        return (json.loads(row[0]), str(row[1])) if row else (None, None)
+
+    def find_by_ingestion_id(self, ingestion_id: str) -> Optional[Dict[str, Any]]:
+        return self._fetch_one("SELECT metadata FROM ingestion_status WHERE ingestion_id = ?", (ingestion_id,))
+
+    def delete(self, document_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM ingestion_status WHERE document_id = ?", (document_id,))
+
+    def list(self, status: Optional[str] = None, page_size: int = 100,
+             page_token: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        sql = "SELECT document_id, metadata FROM ingestion_status WHERE document_id > ?"
+        params: List[Any] = [page_token or ""]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY document_id LIMIT ?"
+        # Fetch one extra row to know whether another page exists
+        params.append(page_size + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_token = rows[page_size - 1][0] if len(rows) > page_size else None
+        return [json.loads(row[1]) for row in rows[:page_size]], next_token
+
+    def get_manifest(self, source: str) -> Optional[Dict[str, Any]]:
+        return self._fetch_one("SELECT manifest FROM chunk_manifests WHERE source = ?", (source,))
+
+    def put_manifest(self, source: str, manifest: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO chunk_manifests (source, manifest) VALUES (?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET manifest = excluded.manifest",
+                (source, json.dumps(manifest))
+            )
+
+    def delete_manifest(self, source: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunk_manifests WHERE source = ?", (source,))
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class CoalescingStatusWriter:
+    """
+    Keep authoritative per-document state in memory and write it sparingly.
+
+    The ingestion worker owns the state of the documents it is processing, so a
+    status transition is applied in memory without reading the stored object.
+    Transitions within ``flush_interval`` seconds of the last write are
+    coalesced and written together with the next one; terminal statuses are
+    always written immediately. Writes are conditional on the version last
+    written, so a concurrent writer is detected: the stored metadata is re-read,
+    the fields this worker changed are applied on top, and the write is retried.
+    """
+
+    def __init__(self, store: StatusStore, flush_interval: float = 2.0, max_conflict_retries: int = 3,
+                 clock: Callable[[], float] = time.time):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_conflict_retries = max_conflict_retries
+        self.clock = clock
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"writes": 0, "coalesced": 0, "conflicts": 0}
+
+    def create(self, document_id: str, metadata: Dict[str, Any]):
+        """Write a new document and start tracking its state."""
+        version = self.store.create(document_id, metadata)
+        with self._lock:
+            self._documents[document_id] = {
+                "metadata": dict(metadata),
+                "version": version,
+                "dirty": set(),
+                "last_write": self.clock(),
+                # Serializes the writes of one document without blocking other documents
+                "write_lock": threading.Lock()
+            }
+            self.stats["writes"] += 1
+
+    def update(self, document_id: str, **fields: Any) -> bool:
+        """
+        Apply field changes to a tracked document, writing them if due.
+
+        A terminal status stops the tracking of the document even if its
+        write fails, so a failed write does not keep the document in memory.
+
+        Returns:
+            True if the change was written, False if it is pending or the document is not tracked
+        """
+        with self._lock:
+            state = self._documents.get(document_id)
+            if state is None:
+                return False
+            state["metadata"].update(fields)
+            state["dirty"].update(fields)
+
+            terminal = state["metadata"].get("status") in TERMINAL_STATUSES
+            due = (fields.get("status") in TERMINAL_STATUSES
+                   or self.clock() - state["last_write"] >= self.flush_interval)
+            if not due:
+                self.stats["coalesced"] += 1
+                return False
+        try:
+            self._write(document_id, state)
+        finally:
+            if terminal:
+                with self._lock:
+                    if self._documents.get(document_id) is state:
+                        del self._documents[document_id]
+        return True
+
+    def flush(self, document_id: Optional[str] = None):
+        """Write pending changes of one document, or of all tracked documents."""
+        with self._lock:
+            document_ids = [document_id] if document_id else list(self._documents)
+            states = [(doc_id, self._documents.get(doc_id)) for doc_id in document_ids]
+        for doc_id, state in states:
+            if state is not None:
+                self._write(doc_id, state)
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get the in-memory state of a tracked document."""
+        with self._lock:
+            state = self._documents.get(document_id)
+            return dict(state["metadata"]) if state else None
+
+    def _write(self, document_id: str, state: Dict[str, Any]):
+        """
+        Conditionally write a document, merging with concurrent changes on conflict.
+
+        The state is snapshotted under the writer lock and written outside it;
+        fields changed while the write was in flight stay pending.
+        """
+        with state["write_lock"]:
+            with self._lock:
+                if not state["dirty"]:
+                    return
+                metadata, dirty, version = dict(state["metadata"]), set(state["dirty"]), state["version"]
+
+            for attempt in range(self.max_conflict_retries + 1):
+                try:
+                    version = self.store.put(document_id, metadata, expected_version=version)
+                    break
+                except StatusConflictError:
+                    with self._lock:
+                        self.stats["conflicts"] += 1
+                    if attempt == self.max_conflict_retries:
+                        raise
+                    remote, version = self.store.get_with_version(document_id)
+                    logger.warning(f"Concurrent update of document {document_id} detected, merging and retrying")
+                    merged = dict(remote or {})
+                    merged.update({key: metadata[key] for key in dirty})
+                    metadata = merged
+
+            with self._lock:
+                state["version"] = version
+                state["dirty"] = {key for key in state["dirty"]
+                                  if key not in dirty or state["metadata"].get(key) != metadata.get(key)}
+                # Adopt fields merged from a concurrent writer
+                state["metadata"].update({key: value for key, value in metadata.items() if key not in state["dirty"]})
+                state["last_write"] = self.clock()
+                self.stats["writes"] += 1
+
+
+def get_status_store(config: Dict[str, Any], s3_client=None) -> Optional[StatusStore]:
+    """
+    Create the status store selected by the ingestion config.
+
+    ``status_store`` may be "sqlite" (using ``status_store_path``, default
+    in-memory) or "s3" (using ``metadata_bucket``). Without an explicit choice,
+    S3 is used when a metadata bucket is configured.
+
+    Args:
+        config: Ingestion configuration
+        s3_client: S3 client for the S3 backend
+
+    Returns:
+        Status store instance, or None if no store is configured
+    """
+    store_type = (config.get("status_store") or "").lower()
+
+    if store_type == "sqlite":
+        return SQLiteStatusStore(config.get("status_store_path", ":memory:"))
+
+    if store_type in ("", "s3") and config.get("metadata_bucket"):
+        return S3StatusStore(s3_client, config["metadata_bucket"])
+
+    if store_type not in ("", "s3"):
+        raise ValueError(f"Unsupported status store: {store_type}")
+    return None
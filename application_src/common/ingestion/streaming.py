@@ -0,0 +1,240 @@
+"""
+Streaming loading and splitting for ingestion sources too large to hold in memory.
+"""
+
+import codecs
+import logging
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Union
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+class S3RangeReader:
+    """
+    Read an S3 object as text in ranged GET requests.
+
+    Only one range is held in memory at a time. Multi-byte characters split
+    across range boundaries are decoded correctly by an incremental decoder.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, object_key: str,
+                 read_size: int = 8 * 1024 * 1024, encoding: str = "utf-8", size: Optional[int] = None):
+        """
+        Initialize the range reader.
+
+        Args:
+            s3_client: Boto3 S3 client
+            bucket_name: S3 bucket name
+            object_key: S3 object key
+            read_size: Bytes requested per ranged GET
+            encoding: Text encoding of the object
+            size: Object size in bytes if already known, saving a HEAD request
+        """
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.read_size = read_size
+        self.encoding = encoding
+        self.size = size
+
+    def __iter__(self) -> Iterator[str]:
+        size = self.size
+        if size is None:
+            size = self.s3_client.head_object(Bucket=self.bucket_name, Key=self.object_key)["ContentLength"]
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        start = 0
+        while start < size:
+            end = min(start + self.read_size, size) - 1
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.object_key,
+                                                 Range=f"bytes={start}-{end}")
+            yield decoder.decode(response["Body"].read())
+            start = end + 1
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+        logger.debug(f"Streamed {size} bytes from s3://{self.bucket_name}/{self.object_key}")
+
+
+class _SeparatorScanner:
+    """
+    Cut a stream of text pieces into splits at separator occurrences.
+
+    Splits start with their separator, as with ``keep_separator=True``.
+    Splits shorter than ``chunk_size`` are returned as strings. Longer splits
+    are returned as iterators over their text. An iterator must be consumed
+    completely before the scanner continues.
+    """
+
+    def __init__(self, pieces: Iterator[str], separator: str, chunk_size: int):
+        self.pieces = pieces
+        self.separator = separator
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        # Start of the current split in the buffer
+        self.start = 0
+        # Position from which the next separator occurrence is searched
+        self.scan = 0
+        self.eof = False
+
+    def _read(self) -> bool:
+        """Append the next piece to the buffer; return False at the end of the stream."""
+        # A separator may straddle the boundary, so rescan the last len(separator) - 1 characters
+        self.scan = max(self.scan, len(self.buffer) - len(self.separator) + 1)
+        for piece in self.pieces:
+            if piece:
+                # Drop consumed text only when reading, so cutting splits never copies the buffer
+                self.buffer = self.buffer[self.start:] + piece
+                self.scan -= self.start
+                self.start = 0
+                return True
+        self.eof = True
+        return False
+
+    def _cut(self, position: int) -> str:
+        """Return the current split up to a separator occurrence and start the next one there."""
+        split = self.buffer[self.start:position]
+        self.start = position
+        self.scan = position + len(self.separator)
+        return split
+
+    def _rest(self) -> str:
+        """Return the remaining text at the end of the stream."""
+        rest = self.buffer[self.start:]
+        self.buffer, self.start, self.scan = "", 0, 0
+        return rest
+
+    def splits(self) -> Iterator[Union[str, Iterator[str]]]:
+        while True:
+            position = self.buffer.find(self.separator, self.scan)
+            if position != -1:
+                split = self._cut(position)
+                if split:
+                    yield split if len(split) < self.chunk_size else iter([split])
+            elif len(self.buffer) - self.start >= self.chunk_size:
+                yield self._long_split()
+            elif self.eof or not self._read():
+                rest = self._rest()
+                if rest:
+                    yield rest
+                return
+
+    def _long_split(self) -> Iterator[str]:
+        """Yield the current split's text as it arrives, up to the next separator."""
+        while True:
+            position = self.buffer.find(self.separator, self.scan)
+            if position != -1:
+                split = self._cut(position)
+                if split:
+                    yield split
+                return
+            # No separator can start before this point, so the text is final
+            safe = len(self.buffer) - len(self.separator) + 1
+            if safe > self.start:
+                yield self.buffer[self.start:safe]
+                self.start = safe
+                self.scan = max(self.scan, safe)
+            if self.eof or not self._read():
+                rest = self._rest()
+                if rest:
+                    yield rest
+                return
+
+
+class _SplitMerger:
+    """Incremental version of TextSplitter._merge_splits for an empty join separator."""
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.current: deque = deque()
+        self.total = 0
+
+    def _join(self) -> Optional[str]:
+        text = "".join(self.current).strip()
+        return text or None
+
+    def add(self, split: str) -> Iterator[str]:
+        length = len(split)
+        if self.total + length > self.chunk_size and self.current:
+            doc = self._join()
+            if doc is not None:
+                yield doc
+            # Keep only the trailing splits that fit in the overlap
+            while self.total > self.chunk_overlap or (self.total + length > self.chunk_size and self.total > 0):
+                self.total -= len(self.current.popleft())
+        self.current.append(split)
+        self.total += length
+
+    def finish(self) -> Iterator[str]:
+        doc = self._join()
+        if doc is not None:
+            yield doc
+        self.current.clear()
+        self.total = 0
+
+
+class StreamingTextSplitter:
+    """
+    Recursive character splitter that consumes text incrementally.
+
+    Produces exactly the chunks of LangChain's ``RecursiveCharacterTextSplitter``
+    with the same ``chunk_size``, ``chunk_overlap`` and ``separators`` (using
+    ``len`` as the length function, the default ``keep_separator=True`` and
+    ``strip_whitespace=True``), including overlap across read boundaries. Each
+    separator level buffers at most one split shorter than ``chunk_size`` plus
+    one read piece, so memory does not depend on the document size.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 separators: Optional[List[str]] = None):
+        """
+        Initialize the streaming splitter.
+
+        Args:
+            chunk_size: Maximum chunk size in characters
+            chunk_overlap: Overlap between consecutive chunks in characters
+            separators: Separators tried in order, default paragraph, line, word, character
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+        if chunk_overlap < 0 or chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap must be between 0 and chunk_size, got {chunk_overlap}")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators or DEFAULT_SEPARATORS)
+
+    def split_stream(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Split a stream of text pieces into chunks.
+
+        Args:
+            pieces: Consecutive pieces of the document text, of any size
+
+        Returns:
+            Iterator over chunks, produced as soon as they are complete
+        """
+        return self._split_level(iter(pieces), self.separators)
+
+    def _splits(self, pieces: Iterator[str], separator: str) -> Iterator[Union[str, Iterator[str]]]:
+        if separator:
+            return _SeparatorScanner(pieces, separator, self.chunk_size).splits()
+        return (char if len(char) < self.chunk_size else iter([char]) for piece in pieces for char in piece)
+
+    def _split_level(self, pieces: Iterator[str], separators: List[str]) -> Iterator[str]:
+        separator, finer_separators = separators[0], separators[1:]
+        merger = _SplitMerger(self.chunk_size, self.chunk_overlap)
+        for split in self._splits(pieces, separator):
+            if isinstance(split, str):
+                yield from merger.add(split)
+                continue
+            # A split too long for one chunk ends the current run and is split more finely
+            yield from merger.finish()
+            if finer_separators:
+                yield from self._split_level(split, finer_separators)
+            else:
+                yield "".join(split)
+        yield from merger.finish()
@@ -0,0 +1,89 @@
+"""
+Benchmark tests for document ingestion.
+
+Thresholds are deliberately loose so that they only trip on real
+regressions, not on a busy CI machine; run ``python benchmark.py`` for
+the full report.
+"""
+
+import os
+
+import pytest
+
+from benchmark import FakeEmbedder, InMemoryS3, check_thresholds, generate_corpus, run_benchmark
+
+MIN_DOCS_PER_SEC = float(os.environ.get("INGESTION_BENCHMARK_MIN_DOCS_PER_SEC", 20))
+MIN_CHUNKS_PER_SEC = float(os.environ.get("INGESTION_BENCHMARK_MIN_CHUNKS_PER_SEC", 200))
+MAX_PEAK_MEMORY_BYTES = int(os.environ.get("INGESTION_BENCHMARK_MAX_PEAK_MEMORY_MB", 64)) * 1024 * 1024
+
+
+class TestHarness:
+    """Tests for the benchmark stand-ins."""
+
+    def test_fake_embedder_is_deterministic(self):
+        """Test that the fake embedder returns identical unit vectors for identical texts."""
+        first = FakeEmbedder(dimensions=16).embed_documents(["alpha", "beta"])
+        second = FakeEmbedder(dimensions=16).embed_documents(["alpha", "beta"])
+        assert first == second
+        assert first[0] != first[1]
+        assert abs(sum(value * value for value in first[0]) - 1.0) < 1e-9
+
+    def test_corpus_is_deterministic(self):
+        """Test that the same seed produces the same corpus."""
+        first, second = InMemoryS3(), InMemoryS3()
+        generate_corpus(first, documents=3, seed=7)
+        generate_corpus(second, documents=3, seed=7)
+        assert first.objects == second.objects
+
+    def test_ranged_get(self):
+        """Test that the in-memory S3 client honours byte ranges."""
+        s3 = InMemoryS3()
+        s3.put("bucket", "key", "0123456789")
+        assert s3.head_object(Bucket="bucket", Key="key")["ContentLength"] == 10
+        assert s3.get_object(Bucket="bucket", Key="key", Range="bytes=2-5")["Body"].read() == b"2345"
+
+    def test_check_thresholds(self):
+        """Test that violated thresholds are reported."""
+        report = {"docs_per_sec": 10.0, "chunks_per_sec": 100.0, "peak_memory_bytes": 2048}
+        assert check_thresholds(report, min_docs_per_sec=5, min_chunks_per_sec=50, max_peak_memory_bytes=4096) == []
+        assert len(check_thresholds(report, min_docs_per_sec=20, max_peak_memory_bytes=1024)) == 2
+
+
+@pytest.mark.benchmark
+class TestIngestionBenchmark:
+    """Throughput benchmarks with threshold assertions."""
+
+    def test_sequential_throughput(self):
+        """Test that ingest_document meets the throughput and memory thresholds."""
+        report = run_benchmark(documents=40, paragraphs=30)
+
+        assert report["documents"] == 40
+        assert report["chunks"] > report["documents"]
+        assert set(report["stages"]) == {"load", "split", "embed", "index"}
+        assert all(stats["count"] == 40 for stats in report["stages"].values())
+        assert check_thresholds(report, MIN_DOCS_PER_SEC, MIN_CHUNKS_PER_SEC, MAX_PEAK_MEMORY_BYTES) == []
+
+    def test_embedding_latency_is_attributed_to_embed_stage(self):
+        """Test that embedder latency shows up in the embed stage and not in the others."""
+        report = run_benchmark(documents=10, paragraphs=10, embed_latency=0.02, measure_memory=False)
+
+        assert report["peak_memory_bytes"] is None
+        assert report["stages"]["embed"]["p50_ms"] >= 20
+        assert report["stages"]["split"]["p50_ms"] < report["stages"]["embed"]["p50_ms"]
+        assert report["seconds"] >= 10 * 0.02
+
+    def test_pipelined_overlaps_embedding_latency(self):
+        """Test that ingest_documents overlaps embedding latency across documents."""
+        sequential = run_benchmark(documents=16, paragraphs=10, embed_latency=0.02, measure_memory=False)
+        pipelined = run_benchmark(documents=16, paragraphs=10, embed_latency=0.02, measure_memory=False,
+                                  pipelined=True)
+
+        assert pipelined["chunks"] == sequential["chunks"]
+        assert pipelined["docs_per_sec"] > sequential["docs_per_sec"]
+
+    def test_streamed_document_memory_is_bounded(self):
+        """Test that a large streamed document stays within the peak memory threshold."""
+        report = run_benchmark(documents=0, large_documents=1, large_document_bytes=4 * 1024 * 1024)
+
+        assert report["chunks"] > 2500
+        assert check_thresholds(report, max_peak_memory_bytes=MAX_PEAK_MEMORY_BYTES) == []
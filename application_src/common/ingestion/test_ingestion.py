@@ -0,0 +1,364 @@
+"""
+Tests for document ingestion.
+
+This module tests the pipelined ingestion flow with a fake S3 loader, a fake
+embedding model and an in-memory vector store.
+"""
+
+import threading
+import time
+
+import pytest
+import ingestion as ingestion_module
+from ingestion import DocumentIngestion
+from status_store import StatusConflictError
+from vector_stores import VectorStoreBase, register_vector_store
+
+
+class Timeline:
+    """Thread-safe record of stage start and end times per document."""
+
+    def __init__(self):
+        self.intervals = []
+        self.lock = threading.Lock()
+
+    def record(self, stage, key, start):
+        with self.lock:
+            self.intervals.append((stage, key, start, time.time()))
+
+    def overlapping(self, first_stage, second_stage):
+        """Whether some document's first stage ran while another document's second stage ran."""
+        for stage_a, key_a, start_a, end_a in self.intervals:
+            for stage_b, key_b, start_b, end_b in self.intervals:
+                if stage_a == first_stage and stage_b == second_stage and key_a != key_b:
+                    if start_a < end_b and start_b < end_a:
+                        return True
+        return False
+
+
+TIMELINE = Timeline()
+FAKE_S3 = {}
+STAGE_DELAY = 0.05
+
+
+class FakeS3FileLoader:
+    """Fake S3FileLoader reading from an in-memory bucket."""
+
+    def __init__(self, bucket, key, region_name=None):
+        self.bucket = bucket
+        self.key = key
+
+    def load(self):
+        start = time.time()
+        time.sleep(STAGE_DELAY)
+        TIMELINE.record("load", self.key, start)
+        if (self.bucket, self.key) not in FAKE_S3:
+            raise FileNotFoundError(f"NoSuchKey: {self.key}")
+        return [ingestion_module.Document(page_content=FAKE_S3[(self.bucket, self.key)],
+                                          metadata={"source": f"s3://{self.bucket}/{self.key}"})]
+
+
+class FakeS3Client:
+    """Fake S3 client answering HEAD requests for the in-memory bucket."""
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in FAKE_S3:
+            raise FileNotFoundError(f"NoSuchKey: {Key}")
+        return {"ContentLength": len(FAKE_S3[(Bucket, Key)].encode("utf-8"))}
+
+
+class FakeEmbeddings:
+    """Fake embedding model returning fixed vectors after a delay."""
+
+    def __init__(self):
+        self.embedded_texts = []
+
+    def embed_documents(self, texts):
+        self.embedded_texts.extend(texts)
+        start = time.time()
+        time.sleep(STAGE_DELAY)
+        TIMELINE.record("embed", texts[0][:20] if texts else "", start)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@register_vector_store("memory")
+class InMemoryVectorStore(VectorStoreBase):
+    """In-memory vector store recording indexed chunks."""
+
+    def __init__(self, config, embedding_model):
+        self.documents = []
+        self.embedded_calls = 0
+        self.deletes = []
+        self.lock = threading.Lock()
+
+    def add_documents(self, documents):
+        raise AssertionError("Pipelined ingestion must index precomputed embeddings")
+
+    def add_embedded_documents(self, documents, embeddings):
+        assert len(documents) == len(embeddings)
+        start = time.time()
+        time.sleep(STAGE_DELAY)
+        with self.lock:
+            self.documents.extend(documents)
+            self.embedded_calls += 1
+        TIMELINE.record("index", documents[0].metadata["object_key"], start)
+
+    def similarity_search(self, query, k=4, filter=None):
+        return []
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return []
+
+    def delete(self, document_id, chunk_ids=None):
+        with self.lock:
+            self.deletes.append((document_id, chunk_ids))
+            self.documents = [doc for doc in self.documents if doc.metadata["document_id"] != document_id]
+        return True
+
+    def delete_chunks(self, chunk_ids):
+        with self.lock:
+            self.documents = [doc for doc in self.documents if doc.metadata["chunk_id"] not in set(chunk_ids)]
+        return True
+
+
+class NoChunkDeletionVectorStore(InMemoryVectorStore):
+    """In-memory vector store that can only delete whole documents."""
+
+    delete_chunks = VectorStoreBase.delete_chunks
+
+
+@pytest.fixture
+def document_ingestion():
+    """Create a DocumentIngestion backed by the fakes."""
+    TIMELINE.intervals.clear()
+    FAKE_S3.clear()
+    ingestion = DocumentIngestion(vector_db_type="memory", loader_factory=FakeS3FileLoader, config={
+        "chunk_size": 100,
+        "chunk_overlap": 0,
+        "load_workers": 4,
+        "split_workers": 2,
+        "embed_workers": 4,
+        "index_workers": 2,
+        "pipeline_queue_size": 4,
+        "status_store": "sqlite",
+        "run_journal_path": ":memory:"
+    })
+    ingestion.embedding_model = FakeEmbeddings()
+    ingestion.s3_client = FakeS3Client()
+    return ingestion
+
+
+class TestPipelinedIngestion:
+    """Test cases for DocumentIngestion.ingest_documents."""
+
+    def test_stages_overlap_and_chunk_counts_are_correct(self, document_ingestion):
+        """Test that documents move through stages concurrently and every chunk is indexed."""
+        documents = []
+        for i in range(12):
+            key = f"docs/file-{i}.txt"
+            FAKE_S3[("bucket", key)] = chr(ord("a") + i) * (100 * (i % 3 + 1) + 50)
+            documents.append({"bucket_name": "bucket", "object_key": key, "metadata": {"team": "qa"}})
+
+        start = time.time()
+        results = document_ingestion.ingest_documents(documents)
+        elapsed = time.time() - start
+
+        assert [result["status"] for result in results] == ["completed"] * 12
+        assert [result["chunks"] for result in results] == [(i % 3 + 1) + 1 for i in range(12)]
+        assert [result["metadata"]["object_key"] for result in results] == [d["object_key"] for d in documents]
+        assert len(document_ingestion.vector_store.documents) == sum(result["chunks"] for result in results)
+        assert TIMELINE.overlapping("load", "embed")
+        # Sequential processing would take 12 documents x 3 delayed stages
+        assert elapsed < 12 * 3 * STAGE_DELAY / 2
+
+    def test_failing_document_does_not_affect_others(self, document_ingestion):
+        """Test that a document failing in one stage is reported while the rest complete."""
+        FAKE_S3[("bucket", "good-1.txt")] = "x" * 250
+        FAKE_S3[("bucket", "good-2.txt")] = "y" * 120
+        documents = [
+            {"bucket_name": "bucket", "object_key": "good-1.txt"},
+            {"bucket_name": "bucket", "object_key": "missing.txt"},
+            {"bucket_name": "bucket", "object_key": "good-2.txt"}
+        ]
+
+        results = document_ingestion.ingest_documents(documents)
+
+        assert [result["status"] for result in results] == ["completed", "failed", "completed"]
+        assert results[1]["failed_stage"] == "load"
+        assert "NoSuchKey" in results[1]["error"]
+        assert results[0]["chunks"] == 3 and results[2]["chunks"] == 2
+        assert len(document_ingestion.vector_store.documents) == 5
+
+    def test_failing_preparation_fails_only_that_document(self, document_ingestion, monkeypatch):
+        """Test that a manifest read error fails its document without aborting the run."""
+        FAKE_S3[("bucket", "good.txt")] = "x" * 250
+        FAKE_S3[("bucket", "bad.txt")] = "y" * 120
+        get_manifest = document_ingestion.status_store.get_manifest
+
+        def flaky_get_manifest(source):
+            if source.endswith("bad.txt"):
+                raise ConnectionError("metadata store unavailable")
+            return get_manifest(source)
+
+        monkeypatch.setattr(document_ingestion.status_store, "get_manifest", flaky_get_manifest)
+
+        results = document_ingestion.ingest_documents([
+            {"bucket_name": "bucket", "object_key": "bad.txt"},
+            {"bucket_name": "bucket", "object_key": "good.txt"}
+        ])
+
+        assert [result["status"] for result in results] == ["failed", "completed"]
+        assert results[0]["failed_stage"] == "load"
+        assert "metadata store unavailable" in results[0]["error"]
+        assert threading.active_count() < 10
+
+    def test_single_document_ingestion_uses_the_same_stages(self, document_ingestion):
+        """Test that ingest_document still processes one document end to end."""
+        FAKE_S3[("bucket", "single.txt")] = "z" * 300
+
+        result = document_ingestion.ingest_document("bucket", "single.txt")
+
+        assert result["status"] == "completed"
+        assert result["chunks"] == 3
+        assert document_ingestion.vector_store.embedded_calls == 1
+
+    def test_ingestion_status_is_tracked_in_the_status_store(self, document_ingestion):
+        """Test that statuses are looked up by ingestion ID and listed by status."""
+        FAKE_S3[("bucket", "ok.txt")] = "x" * 150
+        results = document_ingestion.ingest_documents([
+            {"bucket_name": "bucket", "object_key": "ok.txt"},
+            {"bucket_name": "bucket", "object_key": "missing.txt"}
+        ])
+
+        status = document_ingestion.get_ingestion_status(results[0]["ingestion_id"])
+        failed = document_ingestion.list_ingestions(status="failed")
+
+        assert status["status"] == "completed"
+        assert [doc["object_key"] for doc in failed["documents"]] == ["missing.txt"]
+        assert failed["next_page_token"] is None
+        assert document_ingestion.get_ingestion_status("ing-unknown")["status"] == "not_found"
+
+    def test_status_update_reports_failure_after_repeated_conflicts(self, document_ingestion, monkeypatch, caplog):
+        """Test that a status update losing every conditional write is reported as failed."""
+        store = document_ingestion.status_store
+        store.put("doc-other", {"ingestion_id": "ing-other", "status": "ingestion_started"})
+        attempts = []
+
+        def conflicting_put(document_id, metadata, expected_version=None):
+            attempts.append(expected_version)
+            raise StatusConflictError(document_id)
+
+        monkeypatch.setattr(store, "put", conflicting_put)
+        caplog.set_level("INFO")
+
+        assert document_ingestion._update_status("doc-other", "completed") is False
+        assert len(attempts) == ingestion_module.STATUS_UPDATE_ATTEMPTS
+        assert "Gave up updating status of document doc-other" in caplog.text
+        assert "status updated to completed" not in caplog.text
+
+
+def paragraphs(count, changed=None):
+    """Build a document of distinct paragraphs that each fit in one chunk."""
+    texts = [f"Section {i}: " + " ".join(["lorem ipsum dolor sit amet"] * 2) for i in range(count)]
+    for index, text in (changed or {}).items():
+        texts[index] = text
+    return "\n\n".join(text for text in texts if text is not None)
+
+
+REWRITTEN = "Section 30: this paragraph was rewritten after the first ingestion"
+
+
+class TestIncrementalIngestion:
+    """Test cases for content-hash deduplication on re-ingestion."""
+
+    def ingest(self, document_ingestion, content):
+        FAKE_S3[("bucket", "handbook.txt")] = content
+        document_ingestion.embedding_model.embedded_texts.clear()
+        return document_ingestion.ingest_document("bucket", "handbook.txt")
+
+    def indexed_texts(self, document_ingestion):
+        return sorted(doc.page_content for doc in document_ingestion.vector_store.documents)
+
+    def test_only_changed_section_is_embedded(self, document_ingestion):
+        """Test that editing one section of a large document embeds only that section's chunk."""
+        first = self.ingest(document_ingestion, paragraphs(60))
+        assert first["chunks"] == 60 and first["chunks_embedded"] == 60
+
+        second = self.ingest(document_ingestion, paragraphs(60, changed={30: REWRITTEN}))
+
+        assert second["document_id"] == first["document_id"]
+        assert document_ingestion.embedding_model.embedded_texts == [REWRITTEN]
+        assert (second["chunks_embedded"], second["chunks_reused"], second["chunks_deleted"]) == (1, 59, 1)
+        assert self.indexed_texts(document_ingestion) == sorted(
+            paragraphs(60, changed={30: REWRITTEN}).split("\n\n"))
+
+    def test_unchanged_document_is_not_embedded(self, document_ingestion):
+        """Test that re-ingesting identical content makes no embedding call."""
+        self.ingest(document_ingestion, paragraphs(20))
+
+        result = self.ingest(document_ingestion, paragraphs(20))
+
+        assert result["status"] == "completed"
+        assert document_ingestion.embedding_model.embedded_texts == []
+        assert len(document_ingestion.vector_store.documents) == 20
+
+    def test_removed_and_shifted_sections(self, document_ingestion):
+        """Test that removing a section deletes its chunk while later sections are reused."""
+        self.ingest(document_ingestion, paragraphs(20))
+
+        result = self.ingest(document_ingestion, paragraphs(20, changed={3: None}))
+
+        assert document_ingestion.embedding_model.embedded_texts == []
+        assert (result["chunks"], result["chunks_deleted"]) == (19, 1)
+        assert self.indexed_texts(document_ingestion) == sorted(paragraphs(20, changed={3: None}).split("\n\n"))
+
+    def test_changed_chunking_config_reindexes_everything(self, document_ingestion):
+        """Test that a different embedding model invalidates the manifest."""
+        self.ingest(document_ingestion, paragraphs(10))
+        document_ingestion.config["embedding_model_id"] = "amazon.titan-embed-text-v2:0"
+
+        result = self.ingest(document_ingestion, paragraphs(10))
+
+        assert result["chunks_embedded"] == 10
+        assert len(document_ingestion.vector_store.documents) == 20 - result["chunks_deleted"]
+
+    def test_store_without_chunk_deletion_replaces_document(self, document_ingestion):
+        """Test that a changed document is re-indexed as a whole when the store cannot delete chunks."""
+        document_ingestion.vector_store = NoChunkDeletionVectorStore({}, None)
+        self.ingest(document_ingestion, paragraphs(20))
+
+        result = self.ingest(document_ingestion, paragraphs(20, changed={3: None, 7: REWRITTEN}))
+
+        assert result["status"] == "completed"
+        assert (result["chunks"], result["chunks_embedded"], result["chunks_deleted"]) == (19, 19, 2)
+        assert document_ingestion.vector_store.deletes[-1][0] == result["document_id"]
+        assert self.indexed_texts(document_ingestion) == sorted(
+            paragraphs(20, changed={3: None, 7: REWRITTEN}).split("\n\n"))
+
+
+class TestDocumentDeletion:
+    """Test cases for deleting documents by their recorded chunk IDs."""
+
+    def test_delete_passes_recorded_chunk_ids(self, document_ingestion):
+        """Test that deletion uses the chunk IDs from the manifest and removes the manifest."""
+        FAKE_S3[("bucket", "handbook.txt")] = paragraphs(20)
+        result = document_ingestion.ingest_document("bucket", "handbook.txt")
+        chunk_ids = [doc.metadata["chunk_id"] for doc in document_ingestion.vector_store.documents]
+
+        deleted = document_ingestion.delete_document(result["document_id"])
+
+        assert deleted["status"] == "deleted"
+        assert document_ingestion.vector_store.deletes == [(result["document_id"], chunk_ids)]
+        assert document_ingestion.vector_store.documents == []
+        assert document_ingestion.status_store.get_manifest("s3://bucket/handbook.txt") is None
+
+    def test_legacy_document_is_deleted_by_document_id(self, document_ingestion):
+        """Test that a document without a manifest is deleted without chunk IDs."""
+        FAKE_S3[("bucket", "legacy.txt")] = paragraphs(5)
+        result = document_ingestion.ingest_document("bucket", "legacy.txt")
+        document_ingestion.status_store.delete_manifest("s3://bucket/legacy.txt")
+
+        document_ingestion.delete_document(result["document_id"])
+
+        assert document_ingestion.vector_store.deletes == [(result["document_id"], None)]
+        assert document_ingestion.vector_store.documents == []
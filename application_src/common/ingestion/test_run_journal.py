@@ -0,0 +1,370 @@
+"""
+Tests for checkpointed, resumable ingestion runs.
+
+This module tests the run journal backends and kills ingestion runs at random
+points, in a forked process that exits immediately like a restarted container,
+to check that resuming produces every chunk exactly once.
+"""
+
+import io
+import multiprocessing
+import os
+import random
+import re
+import sqlite3
+import threading
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+import ingestion as ingestion_module
+from ingestion import DocumentIngestion
+from run_journal import S3RunJournal, SQLiteRunJournal, get_run_journal
+from vector_stores import VectorStoreBase, register_vector_store
+
+FAKE_S3 = {}
+KILLED = 137
+CHUNK_SIZE = 100
+BATCH_CHUNKS = 4
+INDEX_WORKERS = 2
+
+
+class FakeS3FileLoader:
+    """Fake S3FileLoader reading from an in-memory bucket."""
+
+    def __init__(self, bucket, key, region_name=None):
+        self.bucket = bucket
+        self.key = key
+
+    def load(self):
+        return [ingestion_module.Document(page_content=FAKE_S3[(self.bucket, self.key)].decode("utf-8"),
+                                          metadata={"source": f"s3://{self.bucket}/{self.key}"})]
+
+
+class FakeS3Client:
+    """In-memory S3 client for ingestion sources and the S3 run journal."""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self, objects=None):
+        self.objects = objects if objects is not None else {}
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body = self.objects[(Bucket, Key)]
+        if Range:
+            start, end = map(int, re.fullmatch(r"bytes=(\d+)-(\d+)", Range).groups())
+            body = body[start:end + 1]
+        return {"Body": io.BytesIO(body)}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[(Bucket, Key)] = Body.encode("utf-8") if isinstance(Body, str) else Body
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None):
+        keys = sorted(key for bucket, key in self.objects
+                      if bucket == Bucket and key.startswith(Prefix) and key > (ContinuationToken or ""))
+        # Small pages so pagination is exercised
+        page = keys[:3]
+        response = {"Contents": [{"Key": key} for key in page], "IsTruncated": len(keys) > 3}
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+
+class FaultInjector:
+    """Exit the process without cleanup when the configured event is reached."""
+
+    kill_at = None
+    events = 0
+    lock = threading.Lock()
+
+    @classmethod
+    def tick(cls):
+        with cls.lock:
+            cls.events += 1
+            if cls.kill_at is not None and cls.events >= cls.kill_at:
+                os._exit(KILLED)
+
+
+class FakeEmbeddings:
+    """Fake embedding model that may be killed before returning."""
+
+    def embed_documents(self, texts):
+        FaultInjector.tick()
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@register_vector_store("killable")
+class KillableVectorStore(VectorStoreBase):
+    """
+    Vector store persisting chunks to a SQLite file, one autocommitted write per chunk.
+
+    Every write is counted, so rewrites after a resume are visible, and the
+    process may be killed before or after any single chunk write.
+    """
+
+    path = None
+
+    def __init__(self, config, embedding_model):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, document_id TEXT, "
+                          "object_key TEXT, text TEXT, writes INTEGER NOT NULL)")
+        self.lock = threading.Lock()
+
+    def add_documents(self, documents):
+        raise AssertionError("Pipelined ingestion must index precomputed embeddings")
+
+    def add_documents_batched(self, documents, embeddings=None):
+        for doc in documents:
+            FaultInjector.tick()
+            with self.lock:
+                self.conn.execute(
+                    "INSERT INTO chunks VALUES (?, ?, ?, ?, 1) ON CONFLICT(chunk_id) DO UPDATE SET writes = writes + 1",
+                    (doc.metadata["chunk_id"], doc.metadata["document_id"], doc.metadata["object_key"],
+                     doc.page_content)
+                )
+            FaultInjector.tick()
+        return {"indexed": len(documents)}
+
+    def similarity_search(self, query, k=4, filter=None):
+        return []
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return []
+
+    def delete(self, document_id, chunk_ids=None):
+        return True
+
+    def delete_chunks(self, chunk_ids):
+        FaultInjector.tick()
+        with self.lock:
+            self.conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in chunk_ids])
+        return True
+
+
+def make_corpus(rng):
+    """Build small documents and two large ones that take the streaming path."""
+    documents = []
+    for i, paragraphs in enumerate([6, 12, 20, 9, 15, 80, 70, 3]):
+        text = "\n\n".join(f"Document {i} paragraph {p}: " + " ".join(rng.choice(["alpha", "beta", "gamma", "delta"])
+                                                                    for _ in range(rng.randint(3, 12)))
+                           for p in range(paragraphs))
+        FAKE_S3[("bucket", f"doc-{i}.txt")] = text.encode("utf-8")
+        documents.append({"bucket_name": "bucket", "object_key": f"doc-{i}.txt"})
+    return documents
+
+
+def make_ingestion(tmp_path, **config):
+    ingestion = DocumentIngestion(vector_db_type="killable", config=dict({
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": 0,
+        "load_workers": 2,
+        "split_workers": 2,
+        "embed_workers": 2,
+        "index_workers": INDEX_WORKERS,
+        "pipeline_queue_size": 2,
+        "status_store": "sqlite",
+        "status_store_path": str(tmp_path / "status.db"),
+        "run_journal_path": str(tmp_path / "runs.db"),
+        "run_journal_batch_chunks": BATCH_CHUNKS,
+        "streaming_window_chunks": BATCH_CHUNKS,
+        "streaming_threshold_bytes": 3000,
+        "streaming_read_size": 512
+    }, **config))
+    ingestion.s3_client = FakeS3Client(FAKE_S3)
+    ingestion.embedding_model = FakeEmbeddings()
+    return ingestion
+
+
+def run_in_child(tmp_path, documents, kill_at):
+    """Run the ingestion in a forked process that is killed at the given event."""
+    def target():
+        FaultInjector.kill_at = kill_at
+        FaultInjector.events = 0
+        make_ingestion(tmp_path).ingest_documents(documents)
+
+    process = multiprocessing.get_context("fork").Process(target=target)
+    process.start()
+    process.join(timeout=60)
+    return process.exitcode
+
+
+@pytest.fixture
+def corpus(monkeypatch, tmp_path):
+    FAKE_S3.clear()
+    monkeypatch.setattr(ingestion_module, "S3FileLoader", FakeS3FileLoader)
+    KillableVectorStore.path = str(tmp_path / "store.db")
+    FaultInjector.kill_at = None
+    FaultInjector.events = 0
+    return make_corpus(random.Random(0))
+
+
+def stored_chunks(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "store.db"))
+    try:
+        return conn.execute("SELECT chunk_id, document_id, object_key, text, writes FROM chunks").fetchall()
+    finally:
+        conn.close()
+
+
+def assert_no_duplicates_or_gaps(tmp_path, documents):
+    """Check that the store holds exactly the chunks of every document, under one document ID each."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=0,
+                                              separators=["\n\n", "\n", " ", ""])
+    rows = stored_chunks(tmp_path)
+    for doc in documents:
+        expected = splitter.split_text(FAKE_S3[("bucket", doc["object_key"])].decode("utf-8"))
+        stored = [row for row in rows if row[2] == doc["object_key"]]
+        assert sorted(row[3] for row in stored) == sorted(expected), doc["object_key"]
+        assert len({row[1] for row in stored}) == 1
+    return rows
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork to kill ingestion runs")
+class TestKilledRuns:
+    """Test cases for resuming runs killed at random points."""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_resume_after_random_kills_has_no_duplicates_or_gaps(self, corpus, tmp_path, seed):
+        """Test that killed and resumed runs index every chunk once and rewrite at most the in-flight batches."""
+        rng = random.Random(seed)
+        kills = 0
+        for _ in range(6):
+            exitcode = run_in_child(tmp_path, corpus, kill_at=rng.randint(1, 80))
+            if exitcode == 0:
+                break
+            assert exitcode == KILLED
+            kills += 1
+        assert kills > 0
+
+        ingestion = make_ingestion(tmp_path)
+        results = ingestion.ingest_documents(corpus)
+
+        assert [result["status"] for result in results] == ["completed"] * len(corpus)
+        assert len({result["run_id"] for result in results}) == 1
+        rows = assert_no_duplicates_or_gaps(tmp_path, corpus)
+        rewrites = sum(row[4] for row in rows) - len(rows)
+        assert rewrites <= kills * INDEX_WORKERS * BATCH_CHUNKS
+        progress = ingestion.get_ingestion_status(results[0]["run_id"])
+        assert (progress["completed"], progress["failed"], progress["pending"]) == (len(corpus), 0, 0)
+
+    def test_uninterrupted_run_writes_each_chunk_once(self, corpus, tmp_path):
+        """Test the baseline: without kills every chunk is written exactly once."""
+        assert run_in_child(tmp_path, corpus, kill_at=None) == 0
+
+        rows = assert_no_duplicates_or_gaps(tmp_path, corpus)
+
+        assert {row[4] for row in rows} == {1}
+
+
+class TestRunResumption:
+    """Test cases for resuming runs in process and reporting progress."""
+
+    def test_failed_documents_are_retried_and_progress_is_reported(self, corpus, tmp_path):
+        """Test that a second call retries only failed documents and the status API reports run progress."""
+        broken = FAKE_S3.pop(("bucket", "doc-3.txt"))
+        ingestion = make_ingestion(tmp_path)
+
+        first = ingestion.ingest_documents(corpus)
+
+        run_id = first[0]["run_id"]
+        assert [result["status"] for result in first].count("failed") == 1
+        progress = ingestion.get_ingestion_status(run_id)
+        assert (progress["status"], progress["total"], progress["completed"], progress["failed"]) == \
+            ("finished", 8, 7, 1)
+
+        FAKE_S3[("bucket", "doc-3.txt")] = broken
+        writes_before = sum(row[4] for row in stored_chunks(tmp_path))
+        second = ingestion.ingest_documents(corpus)
+
+        assert [result["status"] for result in second] == ["completed"] * 8
+        assert [result["document_id"] for result in second] == [result["document_id"] for result in first]
+        rows = assert_no_duplicates_or_gaps(tmp_path, corpus)
+        assert sum(row[4] for row in rows) - writes_before == sum(1 for row in rows if row[2] == "doc-3.txt")
+        assert ingestion.get_ingestion_status(run_id)["completed"] == 8
+
+    def test_completed_run_starts_over(self, corpus, tmp_path):
+        """Test that calling a completed run again re-ingests instead of returning the old results."""
+        ingestion = make_ingestion(tmp_path)
+        first = ingestion.ingest_documents(corpus)
+
+        second = ingestion.ingest_documents(corpus)
+
+        assert [result["ingestion_id"] for result in second] != [result["ingestion_id"] for result in first]
+        assert all(result["chunks_embedded"] == 0 for result in second)
+        assert ingestion.get_ingestion_status("run-unknown")["status"] == "not_found"
+
+
+@pytest.fixture(params=["sqlite", "s3"])
+def journal(request):
+    if request.param == "sqlite":
+        return SQLiteRunJournal(":memory:")
+    return S3RunJournal(FakeS3Client(), "journal-bucket")
+
+
+class TestRunJournal:
+    """Test cases for the journal backends."""
+
+    def test_batches_and_results_are_recorded(self, journal):
+        """Test that committed batches, document IDs and results are returned in order."""
+        journal.create_run("run-1", ["s3://b/a", "s3://b/b", "s3://b/c"])
+        journal.start_document("run-1", "s3://b/a", "doc-a")
+        for index in range(12):
+            journal.commit_batch("run-1", "s3://b/a", index, [f"a-{index}-0", f"a-{index}-1"])
+        journal.start_document("run-1", "s3://b/b", "doc-b")
+        journal.finish_document("run-1", "s3://b/b", "failed", {"status": "failed", "error": "boom"})
+
+        entry = journal.get_document("run-1", "s3://b/a")
+        assert (entry["document_id"], entry["status"], entry["batches"]) == ("doc-a", "processing", 12)
+        assert entry["chunk_ids"] == [f"a-{i}-{j}" for i in range(12) for j in range(2)]
+        assert journal.get_document("run-1", "s3://b/c") is None
+        run = journal.get_run("run-1")
+        assert (run["status"], run["total"], run["completed"], run["failed"], run["pending"]) == \
+            ("running", 3, 0, 1, 2)
+
+        journal.finish_document("run-1", "s3://b/a", "completed", {"status": "completed", "chunks": 24})
+        journal.finish_document("run-1", "s3://b/b", "completed", {"status": "completed", "chunks": 1})
+        journal.set_run_status("run-1", "finished")
+
+        assert journal.get_document("run-1", "s3://b/a")["result"] == {"status": "completed", "chunks": 24}
+        run = journal.get_run("run-1")
+        assert (run["status"], run["completed"], run["failed"], run["pending"]) == ("finished", 2, 0, 1)
+
+    def test_delete_run(self, journal):
+        """Test that deleting a run removes all of its records."""
+        journal.create_run("run-1", ["s3://b/a"])
+        journal.start_document("run-1", "s3://b/a", "doc-a")
+        journal.commit_batch("run-1", "s3://b/a", 0, ["a-0"])
+
+        journal.delete_run("run-1")
+
+        assert journal.get_run("run-1") is None
+        assert journal.get_document("run-1", "s3://b/a") is None
+
+
+class TestGetRunJournal:
+    """Test cases for selecting the journal backend from the config."""
+
+    @pytest.mark.parametrize("config, expected", [
+        ({}, type(None)),
+        ({"metadata_bucket": "metadata"}, S3RunJournal),
+        ({"run_journal_bucket": "journal"}, S3RunJournal),
+        ({"metadata_bucket": "metadata", "run_journal_path": ":memory:"}, SQLiteRunJournal),
+        ({"metadata_bucket": "metadata", "run_journal": "none"}, type(None))
+    ])
+    def test_default_backend(self, config, expected, monkeypatch, tmp_path):
+        """Test that no journal file is created unless a path is configured or SQLite is chosen."""
+        monkeypatch.chdir(tmp_path)
+
+        journal = get_run_journal(config, FakeS3Client())
+
+        assert type(journal) is expected
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,313 @@
+"""
+Tests for ingestion status stores.
+
+This module tests direct lookups and pagination for the SQLite backend and for
+the S3 backend with a fake in-memory S3 client.
+"""
+
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import Counter
+
+import pytest
+from botocore.exceptions import ClientError
+from status_store import (CoalescingStatusWriter, S3StatusStore, SQLiteStatusStore, StatusConflictError,
+                          get_status_store)
+
+
+class FakeS3Client:
+    """In-memory S3 client supporting the calls used by S3StatusStore, including If-Match writes."""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = Counter()
+        self.calls_by_key = Counter()
+
+    @staticmethod
+    def _etag(body):
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None):
+        self.calls["put_object"] += 1
+        self.calls_by_key[Key] += 1
+        body = Body.encode("utf-8") if isinstance(Body, str) else Body
+        if IfMatch is not None:
+            current = self.objects.get((Bucket, Key))
+            if current is None or self._etag(current) != IfMatch:
+                raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": "At least one of the "
+                                             "pre-conditions you specified did not hold"}}, "PutObject")
+        self.objects[(Bucket, Key)] = body
+        return {"ETag": self._etag(body)}
+
+    def get_object(self, Bucket, Key):
+        self.calls["get_object"] += 1
+        self.calls_by_key[Key] += 1
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body = self.objects[(Bucket, Key)]
+        return {"Body": io.BytesIO(body), "ETag": self._etag(body)}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def list_objects_v2(self, Bucket, Prefix="", Delimiter=None, MaxKeys=1000, ContinuationToken=None):
+        self.calls["list_objects_v2"] += 1
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        if Delimiter:
+            keys = [key for key in keys if Delimiter not in key[len(Prefix):]]
+        if ContinuationToken:
+            keys = [key for key in keys if key > ContinuationToken]
+        page = keys[:min(MaxKeys, 1000)]
+        truncated = len(keys) > len(page)
+        response = {"Contents": [{"Key": key} for key in page], "IsTruncated": truncated}
+        if truncated:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+
+def document(i):
+    """Build the metadata of the i-th test document."""
+    return {
+        "document_id": f"doc-{i:05d}",
+        "ingestion_id": f"ing-{i:05d}",
+        "status": "completed" if i % 3 else "failed",
+        "updated_at": float(i)
+    }
+
+
+def fill(store, count):
+    for i in range(count):
+        store.create(f"doc-{i:05d}", document(i))
+
+
+def read_all_pages(store, **kwargs):
+    """Follow page tokens to the end, returning all documents and the page count."""
+    documents, token, pages = [], None, 0
+    while True:
+        page, token = store.list(page_token=token, **kwargs)
+        documents.extend(page)
+        pages += 1
+        if token is None:
+            return documents, pages
+
+
+@pytest.fixture(params=["sqlite", "s3"])
+def store(request):
+    """Provide each status store backend."""
+    if request.param == "sqlite":
+        return SQLiteStatusStore()
+    return S3StatusStore(FakeS3Client(), "metadata-bucket")
+
+
+class TestStatusStores:
+    """Test cases shared by all status store backends."""
+
+    def test_lookups_across_ten_thousand_documents(self, store):
+        """Test that documents are found directly by document and ingestion ID."""
+        fill(store, 10000)
+        if isinstance(store, S3StatusStore):
+            # A migrated bucket: the one-time backfill finds nothing to add
+            assert store.backfill_ingestion_index() == 0
+            store.s3_client.calls.clear()
+
+        assert store.get("doc-09999")["ingestion_id"] == "ing-09999"
+        assert store.find_by_ingestion_id("ing-04321")["document_id"] == "doc-04321"
+        assert store.find_by_ingestion_id("ing-99999") is None
+        assert store.get("doc-99999") is None
+        if isinstance(store, S3StatusStore):
+            assert store.s3_client.calls["list_objects_v2"] == 0
+
+    def test_pagination_returns_every_document_once(self, store):
+        """Test that following page tokens visits each document exactly once, past 1000 objects."""
+        fill(store, 2500)
+
+        documents, pages = read_all_pages(store, page_size=400)
+
+        ids = [doc["document_id"] for doc in documents]
+        assert len(ids) == 2500 and len(set(ids)) == 2500
+        assert pages == 7
+
+    def test_status_filter(self, store):
+        """Test that listing can be filtered by status."""
+        fill(store, 300)
+
+        documents, _ = read_all_pages(store, status="failed", page_size=50)
+
+        assert len(documents) == 100
+        assert all(doc["status"] == "failed" for doc in documents)
+
+    def test_updates_and_deletes(self, store):
+        """Test that status updates replace metadata and deletes remove index entries."""
+        fill(store, 3)
+        store.put("doc-00001", dict(document(1), status="storing"))
+
+        assert store.find_by_ingestion_id("ing-00001")["status"] == "storing"
+
+        store.delete("doc-00001")
+
+        assert store.get("doc-00001") is None
+        assert store.find_by_ingestion_id("ing-00001") is None
+        assert [doc["document_id"] for doc in read_all_pages(store)[0]] == ["doc-00000", "doc-00002"]
+
+    def test_chunk_manifests(self, store):
+        """Test that manifests are stored per source and kept out of document listings."""
+        fill(store, 2)
+        manifest = {"document_id": "doc-00000", "chunks": [{"chunk_id": "doc-00000-chunk-ab", "hash": "ab"}]}
+
+        store.put_manifest("s3://bucket/a/b.txt", manifest)
+
+        assert store.get_manifest("s3://bucket/a/b.txt") == manifest
+        assert store.get_manifest("s3://bucket/other.txt") is None
+        assert len(read_all_pages(store)[0]) == 2
+
+        store.delete_manifest("s3://bucket/a/b.txt")
+
+        assert store.get_manifest("s3://bucket/a/b.txt") is None
+
+
+class TestIngestionIndexBackfill:
+    """Test cases for finding documents written before the S3 ingestion index existed."""
+
+    def test_legacy_documents_are_found_and_indexed_once(self):
+        """Test that an index miss backfills entries for legacy documents and is not repeated."""
+        client = FakeS3Client()
+        store = S3StatusStore(client, "metadata-bucket")
+        for i in range(5):
+            # Written as before the index: document object only
+            store.put(f"doc-{i:05d}", document(i))
+        store.create("doc-00005", document(5))
+
+        assert store.find_by_ingestion_id("ing-00003")["document_id"] == "doc-00003"
+        assert ("metadata-bucket", "metadata/index/ingestion/ing-00001") in client.objects
+
+        scans = client.calls["list_objects_v2"]
+        assert store.find_by_ingestion_id("ing-99999") is None
+        assert S3StatusStore(client, "metadata-bucket").find_by_ingestion_id("ing-88888") is None
+        assert client.calls["list_objects_v2"] == scans
+        assert store.find_by_ingestion_id("ing-00004")["document_id"] == "doc-00004"
+
+
+class TestGetStatusStore:
+    """Test cases for status store selection."""
+
+    def test_backend_selection(self):
+        """Test that the configured backend is created."""
+        assert isinstance(get_status_store({"status_store": "sqlite"}), SQLiteStatusStore)
+        assert isinstance(get_status_store({"metadata_bucket": "bucket"}, FakeS3Client()), S3StatusStore)
+        assert get_status_store({}) is None
+        with pytest.raises(ValueError):
+            get_status_store({"status_store": "dynamodb"})
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCoalescingStatusWriter:
+    """Test cases for coalesced, conditional status writes."""
+
+    def test_rapid_transitions_cost_one_write(self):
+        """Test that a document's status transitions need no reads and are written once at the end."""
+        s3 = FakeS3Client()
+        writer = CoalescingStatusWriter(S3StatusStore(s3, "bucket"), flush_interval=2.0, clock=FakeClock())
+
+        writer.create("doc-1", document(1) | {"status": "processing"})
+        for status in ["loading", "chunking", "embedding", "storing", "completed"]:
+            writer.update("doc-1", status=status)
+
+        assert s3.calls_by_key["metadata/doc-1.json"] == 2
+        assert s3.calls["get_object"] == 0
+        assert json.loads(s3.objects[("bucket", "metadata/doc-1.json")])["status"] == "completed"
+        assert writer.get("doc-1") is None
+
+    def test_slow_transitions_are_written_after_the_interval(self):
+        """Test that a transition after the flush interval is written so the status stays fresh."""
+        s3 = FakeS3Client()
+        clock = FakeClock()
+        writer = CoalescingStatusWriter(S3StatusStore(s3, "bucket"), flush_interval=2.0, clock=clock)
+        writer.create("doc-1", document(1) | {"status": "processing"})
+
+        assert writer.update("doc-1", status="loading") is False
+        clock.now += 5
+        assert writer.update("doc-1", status="embedding") is True
+
+        assert json.loads(s3.objects[("bucket", "metadata/doc-1.json")])["status"] == "embedding"
+
+    @pytest.mark.parametrize("backend", ["s3", "sqlite"])
+    def test_concurrent_writer_is_detected_and_merged(self, backend):
+        """Test that a concurrent change is not lost and the worker's fields still win."""
+        store = S3StatusStore(FakeS3Client(), "bucket") if backend == "s3" else SQLiteStatusStore()
+        writer = CoalescingStatusWriter(store, flush_interval=0, clock=FakeClock())
+        writer.create("doc-1", document(1) | {"status": "processing"})
+
+        # Another process tags the document between this worker's writes
+        remote, version = store.get_with_version("doc-1")
+        store.put("doc-1", dict(remote, reviewed_by="auditor"), expected_version=version)
+
+        writer.update("doc-1", status="completed", chunks=12)
+
+        stored = store.get("doc-1")
+        assert stored["status"] == "completed" and stored["chunks"] == 12
+        assert stored["reviewed_by"] == "auditor"
+        assert writer.stats["conflicts"] == 1
+
+    def test_slow_write_does_not_block_other_documents(self):
+        """Test that the conditional write of one document runs outside the writer lock."""
+        store = SQLiteStatusStore()
+        put = store.put
+        writer = CoalescingStatusWriter(store, flush_interval=0)
+        for i in range(4):
+            writer.create(f"doc-{i}", document(i) | {"status": "processing"})
+
+        def slow_put(document_id, metadata, expected_version=None):
+            time.sleep(0.2)
+            return put(document_id, metadata, expected_version=expected_version)
+
+        store.put = slow_put
+        threads = [threading.Thread(target=writer.update, args=(f"doc-{i}",), kwargs={"status": "loading"})
+                   for i in range(4)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert time.time() - start < 0.6
+        assert all(store.get(f"doc-{i}")["status"] == "loading" for i in range(4))
+
+    def test_failed_terminal_write_stops_tracking(self):
+        """Test that a document whose terminal write fails is not tracked forever."""
+        store = SQLiteStatusStore()
+        writer = CoalescingStatusWriter(store, flush_interval=0)
+        writer.create("doc-1", document(1) | {"status": "processing"})
+
+        def failing_put(document_id, metadata, expected_version=None):
+            raise ConnectionError("S3 unavailable")
+
+        store.put = failing_put
+        with pytest.raises(ConnectionError):
+            writer.update("doc-1", status="failed")
+
+        assert writer.get("doc-1") is None
+
+    def test_stale_version_is_rejected(self):
+        """Test that a write with an outdated version raises a conflict."""
+        store = S3StatusStore(FakeS3Client(), "bucket")
+        first = store.create("doc-1", document(1))
+        store.put("doc-1", document(1) | {"status": "storing"}, expected_version=first)
+
+        with pytest.raises(StatusConflictError):
+            store.put("doc-1", document(1) | {"status": "failed"}, expected_version=first)
@@ -0,0 +1,186 @@
+"""
+Tests for streaming document loading and splitting.
+
+This module checks that the streaming splitter produces exactly the chunks of
+the non-streaming splitter and that large documents are ingested with bounded
+memory.
+"""
+
+import hashlib
+import io
+import random
+import re
+import tracemalloc
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from ingestion import DocumentIngestion
+from streaming import S3RangeReader, StreamingTextSplitter
+from vector_stores import VectorStoreBase, register_vector_store
+
+SEPARATORS = ["\n\n", "\n", " ", ""]
+# Loading the 12 MiB test file whole would need its bytes plus its decoded text
+MEMORY_CAP = 6 * 1024 * 1024
+
+
+class FakeRangeS3Client:
+    """In-memory S3 client supporting HEAD and ranged GET requests."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.ranges = []
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        start, end = map(int, re.fullmatch(r"bytes=(\d+)-(\d+)", Range).groups())
+        self.ranges.append(end - start + 1)
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)][start:end + 1])}
+
+
+class ChunkHasher:
+    """Fake embedding model that keeps no reference to the texts."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[1.0, 0.0] for _ in texts]
+
+
+@register_vector_store("digest")
+class DigestVectorStore(VectorStoreBase):
+    """Vector store that only records a running digest of indexed chunks."""
+
+    def __init__(self, config, embedding_model):
+        self.digest = hashlib.sha256()
+        self.count = 0
+
+    def add_documents(self, documents):
+        raise AssertionError("Streaming ingestion must index precomputed embeddings")
+
+    def add_embedded_documents(self, documents, embeddings):
+        for doc in documents:
+            self.digest.update(doc.page_content.encode("utf-8") + b"\0")
+        self.count += len(documents)
+
+    def similarity_search(self, query, k=4, filter=None):
+        return []
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return []
+
+    def delete(self, document_id, chunk_ids=None):
+        return True
+
+    def delete_chunks(self, chunk_ids):
+        return True
+
+
+def generate_text(rng, size):
+    """Generate text with short and over-long paragraphs, lines and long words."""
+    words = ["alpha", "beta", "gamma", "δέλτα", "epsilon", "zeta", "naïve", "x" * 120]
+    parts, length = [], 0
+    while length < size:
+        paragraph = []
+        for _ in range(rng.choice([3, 10, 60, 400])):
+            paragraph.append(rng.choice(words))
+            if rng.random() < 0.05:
+                paragraph.append("\n")
+        text = " ".join(paragraph)
+        parts.append(text)
+        length += len(text) + 2
+    return rng.choice(["", "\n\n", "  "]).join(parts)
+
+
+def pieces(text, size):
+    """Cut text into consecutive pieces as a reader would deliver them."""
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+class TestStreamingTextSplitter:
+    """Test cases for equivalence with RecursiveCharacterTextSplitter."""
+
+    @pytest.mark.parametrize("chunk_size,chunk_overlap,piece_size", [
+        (1000, 200, 4096), (1000, 200, 7), (200, 0, 1), (300, 300, 33), (50, 10, 1000), (2, 1, 5)
+    ])
+    def test_chunks_match_the_non_streaming_splitter(self, chunk_size, chunk_overlap, piece_size):
+        """Test that chunking in pieces gives identical chunks, including overlap at piece boundaries."""
+        text = generate_text(random.Random(chunk_size + piece_size), 40000)
+        expected = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                                  separators=SEPARATORS).split_text(text)
+
+        splitter = StreamingTextSplitter(chunk_size, chunk_overlap, SEPARATORS)
+        chunks = list(splitter.split_stream(pieces(text, piece_size)))
+
+        assert chunks == expected
+
+    def test_separators_straddling_pieces_and_missing_separators(self):
+        """Test separator runs cut between pieces and text without any separator."""
+        splitter = RecursiveCharacterTextSplitter(chunk_size=20, chunk_overlap=5, separators=SEPARATORS)
+        streaming = StreamingTextSplitter(20, 5, SEPARATORS)
+
+        for text in ["a\n\n\n\nb\n\n\nc" * 10, "y" * 95, "", "\n\n", "word " * 40]:
+            for size in (1, 2, 3):
+                assert list(streaming.split_stream(pieces(text, size))) == splitter.split_text(text)
+
+    def test_invalid_overlap(self):
+        """Test that an overlap larger than the chunk size is rejected."""
+        with pytest.raises(ValueError):
+            StreamingTextSplitter(chunk_size=10, chunk_overlap=11)
+
+
+class TestS3RangeReader:
+    """Test cases for ranged S3 reads."""
+
+    def test_multibyte_characters_across_ranges(self):
+        """Test that characters split between ranges are decoded once and intact."""
+        text = "naïve café — 東京 😀 " * 50
+        s3 = FakeRangeS3Client({("bucket", "doc.txt"): text.encode("utf-8")})
+
+        decoded = "".join(S3RangeReader(s3, "bucket", "doc.txt", read_size=7))
+
+        assert decoded == text
+        assert max(s3.ranges) == 7
+        assert len(s3.ranges) == -(-len(text.encode("utf-8")) // 7)
+
+
+class TestStreamingIngestion:
+    """Test cases for ingesting large documents through the streaming path."""
+
+    def test_large_document_is_ingested_with_bounded_memory(self):
+        """Test that a large file is indexed with the same chunks while peak memory stays far below its size."""
+        text = generate_text(random.Random(3), 12 * 1024 * 1024)
+        expected = RecursiveCharacterTextSplitter(chunk_size=4000, chunk_overlap=200,
+                                                  separators=SEPARATORS).split_text(text)
+        expected_digest = hashlib.sha256(b"".join(chunk.encode("utf-8") + b"\0" for chunk in expected)).hexdigest()
+        expected_count = len(expected)
+        data = text.encode("utf-8")
+        del text, expected
+
+        ingestion = DocumentIngestion(vector_db_type="digest", config={
+            "chunk_size": 4000,
+            "chunk_overlap": 200,
+            "status_store": "sqlite",
+            "run_journal": "none",
+            "streaming_threshold_bytes": 1024 * 1024,
+            "streaming_read_size": 256 * 1024,
+            "streaming_window_chunks": 32
+        })
+        ingestion.s3_client = FakeRangeS3Client({("bucket", "large.txt"): data})
+        ingestion.embedding_model = ChunkHasher()
+
+        tracemalloc.start()
+        try:
+            result = ingestion.ingest_document("bucket", "large.txt")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert result["status"] == "completed"
+        assert result["chunks"] == expected_count == ingestion.vector_store.count
+        assert ingestion.vector_store.digest.hexdigest() == expected_digest
+        assert ingestion.embedding_model.calls == -(-expected_count // 32)
+        assert peak < MEMORY_CAP < len(data)
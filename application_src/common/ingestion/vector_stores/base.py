@@ -3,10 +3,13 @@ Base class for vector store implementations.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Set
 from langchain.schema import Document
 from langchain.embeddings.base import Embeddings
 
+from .batching import BatchIndexer
+
 class VectorStoreBase(ABC):
     """
     Abstract base class for vector store implementations.
@@ -39,6 +42,66 @@ class VectorStoreBase(ABC):
         """
         pass
     
+    def add_embedded_documents(self, documents: List[Document], embeddings: List[List[float]]) -> Any:
+        """
+        Add documents whose embeddings were already computed.
+        
+        Stores that can index precomputed vectors override this and pass them
+        to their client's embedding-aware call, as the template store shows;
+        the default falls back to add_documents, which embeds the documents again.
+        
+        Args:
+            documents: List of LangChain Document objects
+            embeddings: One embedding per document, in the same order
+            
+        Returns:
+            Implementation-specific result
+        """
+        return self.add_documents(documents)
+    
+    def add_documents_batched(self, documents: List[Document],
+                              embeddings: Optional[List[List[float]]] = None) -> Dict[str, Any]:
+        """
+        Add documents in size-bounded batches, retrying only failed documents.
+        
+        Batch budgets come from the store config keys ``index_batch_max_tokens``,
+        ``index_batch_max_bytes`` and ``index_batch_max_items``; retries use
+        ``max_retries`` and ``retry_delay``. Stores with a native bulk API that
+        bounds requests and retries rejected documents itself may override this.
+        
+        Args:
+            documents: List of LangChain Document objects
+            embeddings: Optional precomputed embeddings, one per document
+            
+        Returns:
+            Indexing statistics including per-batch throughput
+            
+        Raises:
+            BatchIndexingError: If documents still fail after all retries
+        """
+        config = getattr(self, "config", None) or {}
+        indexer = BatchIndexer(
+            max_tokens=int(config.get("index_batch_max_tokens", 8000)),
+            max_bytes=int(config.get("index_batch_max_bytes", 5 * 1024 * 1024)),
+            max_items=int(config.get("index_batch_max_items", 500)),
+            max_retries=int(config.get("max_retries", 3)),
+            retry_delay=float(config.get("retry_delay", 1))
+        )
+        return indexer.index(documents, embeddings, self._write_batch)
+    
+    def _write_batch(self, documents: List[Document], embeddings: Optional[List[List[float]]]) -> Set[int]:
+        """
+        Write one batch and return the indices of documents that failed.
+        
+        Stores that can report per-document failures override this; the default
+        writes the batch as a whole, so an exception fails every document in it.
+        """
+        if embeddings is not None:
+            self.add_embedded_documents(documents, embeddings)
+        else:
+            self.add_documents(documents)
+        return set()
+    
     @abstractmethod
     def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
@@ -70,14 +133,46 @@ class VectorStoreBase(ABC):
         pass
     
     @abstractmethod
-    def delete(self, document_id: str) -> bool:
+    def delete(self, document_id: str, chunk_ids: Optional[List[str]] = None) -> bool:
         """
         Delete documents by ID.
         
         Args:
             document_id: Document ID to delete
+            chunk_ids: IDs of all chunks of the document, if recorded at ingestion;
+                stores that can delete by ID use them instead of a query
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        pass
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> bool:
+        """
+        Delete individual chunks by chunk ID.
+        
+        Used by incremental re-ingestion to remove chunks that no longer exist
+        in a changed document. Stores that can delete by ID override this; the
+        default returns False, and ingestion then replaces the whole document.
+        
+        Args:
+            chunk_ids: Chunk IDs to delete
             
         Returns:
             True if successful, False otherwise
         """
+        return False
+    
+    @contextmanager
+    def bulk_session(self) -> Iterator[None]:
+        """
+        Group the indexing calls of an ingestion run.
+        
+        Stores that can defer work such as index refreshes to the end of a run
+        override this; sessions may nest and overlap across threads.
+        """
+        yield
+    
+    def close(self):
+        """Release resources held by the store, such as background threads."""
         pass
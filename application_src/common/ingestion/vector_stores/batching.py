@@ -0,0 +1,170 @@
+"""
+Size-aware batching with partial-failure retry for vector store writes.
+"""
+
+import json
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set
+
+from langchain.schema import Document
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for embedding models
+_CHARS_PER_TOKEN = 4
+# Approximate JSON size of one serialized float in a bulk request
+_BYTES_PER_FLOAT = 20
+
+
+def estimate_tokens(document: Document) -> int:
+    """Estimate the token count of a document's text."""
+    return max(len(document.page_content) // _CHARS_PER_TOKEN, 1)
+
+
+def estimate_bytes(document: Document, embedding: Optional[List[float]] = None) -> int:
+    """Estimate the request payload size of a document with its metadata and embedding."""
+    size = len(document.page_content.encode("utf-8"))
+    size += len(json.dumps(document.metadata, default=str))
+    if embedding is not None:
+        size += len(embedding) * _BYTES_PER_FLOAT
+    return size
+
+
+class BatchIndexingError(Exception):
+    """Raised when some documents could not be indexed after all retries."""
+
+    def __init__(self, failed_positions: List[int], errors: Dict[int, str]):
+        self.failed_positions = failed_positions
+        self.errors = errors
+        first_error = next(iter(errors.values()), "unknown error")
+        super().__init__(f"Failed to index {len(failed_positions)} documents after retries: {first_error}")
+
+
+class BatchIndexer:
+    """
+    Write documents to a vector store in size-bounded batches.
+
+    Batches are closed when adding the next document would exceed ``max_tokens``
+    (estimated text tokens, which bounds embedding requests), ``max_bytes``
+    (estimated request payload) or ``max_items``. A single document larger than
+    a budget is sent in a batch of its own. The write function reports which
+    positions of a batch failed; only those are retried, re-batched, with
+    exponential backoff and jitter, so successfully written documents are never
+    sent twice.
+    """
+
+    def __init__(self, max_tokens: int = 8000, max_bytes: int = 5 * 1024 * 1024, max_items: int = 500,
+                 max_retries: int = 3, retry_delay: float = 1.0, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the batch indexer.
+
+        Args:
+            max_tokens: Maximum estimated tokens per batch
+            max_bytes: Maximum estimated payload bytes per batch
+            max_items: Maximum documents per batch
+            max_retries: Number of retry rounds for failed documents
+            retry_delay: Base delay in seconds for exponential backoff
+            sleep: Sleep function, replaceable in tests
+        """
+        self.max_tokens = max_tokens
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.sleep = sleep
+
+    def batches(self, documents: Sequence[Document], embeddings: Optional[Sequence[List[float]]],
+                positions: Sequence[int]) -> Iterator[List[int]]:
+        """Group document positions into batches that respect the budgets."""
+        batch: List[int] = []
+        batch_tokens = 0
+        batch_bytes = 0
+        for position in positions:
+            tokens = estimate_tokens(documents[position])
+            size = estimate_bytes(documents[position], embeddings[position] if embeddings else None)
+            if batch and (len(batch) >= self.max_items
+                          or batch_tokens + tokens > self.max_tokens
+                          or batch_bytes + size > self.max_bytes):
+                yield batch
+                batch, batch_tokens, batch_bytes = [], 0, 0
+            batch.append(position)
+            batch_tokens += tokens
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def index(self, documents: Sequence[Document], embeddings: Optional[Sequence[List[float]]],
+              write_batch: Callable[[List[Document], Optional[List[List[float]]]], Set[int]]) -> Dict[str, Any]:
+        """
+        Index all documents, retrying failed ones.
+
+        Args:
+            documents: Documents to index
+            embeddings: Optional precomputed embeddings, one per document
+            write_batch: Writes one batch and returns the batch-relative indices that failed;
+                raising an exception fails the whole batch
+
+        Returns:
+            Statistics with "indexed", "failed", "retries" and per-batch "batches" entries
+
+        Raises:
+            BatchIndexingError: If documents still fail after all retries
+        """
+        pending = list(range(len(documents)))
+        errors: Dict[int, str] = {}
+        stats = {"indexed": 0, "failed": 0, "retries": 0, "batches": []}
+
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            if attempt > 0:
+                stats["retries"] += 1
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                logger.info(f"Retrying {len(pending)} failed documents in {delay:.2f}s (attempt {attempt + 1})")
+                self.sleep(delay)
+
+            failed: List[int] = []
+            for batch in self.batches(documents, embeddings, pending):
+                batch_docs = [documents[position] for position in batch]
+                batch_embeddings = [embeddings[position] for position in batch] if embeddings else None
+                start = time.time()
+                try:
+                    failed_in_batch = set(write_batch(batch_docs, batch_embeddings) or ())
+                except Exception as e:
+                    failed_in_batch = set(range(len(batch)))
+                    for position in batch:
+                        errors[position] = str(e)
+                elapsed = time.time() - start
+
+                for index in failed_in_batch:
+                    failed.append(batch[index])
+                    errors.setdefault(batch[index], "rejected by vector store")
+                for index, position in enumerate(batch):
+                    if index not in failed_in_batch:
+                        errors.pop(position, None)
+
+                written = len(batch) - len(failed_in_batch)
+                stats["indexed"] += written
+                batch_bytes = sum(estimate_bytes(d, e) for d, e in zip(batch_docs, batch_embeddings or [None] * len(batch)))
+                stats["batches"].append({
+                    "attempt": attempt + 1,
+                    "items": len(batch),
+                    "failed": len(failed_in_batch),
+                    "bytes": batch_bytes,
+                    "seconds": elapsed
+                })
+                logger.info(
+                    f"Indexed batch of {len(batch)} documents ({batch_bytes} bytes) in {elapsed:.2f}s: "
+                    f"{written / elapsed if elapsed > 0 else float(written):.1f} docs/s, {len(failed_in_batch)} failed"
+                )
+
+            pending = sorted(failed)
+
+        stats["failed"] = len(pending)
+        if pending:
+            raise BatchIndexingError(pending, {position: errors.get(position, "unknown error") for position in pending})
+        return stats
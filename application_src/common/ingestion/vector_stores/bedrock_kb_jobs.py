@@ -0,0 +1,332 @@
+"""
+Coalesced Bedrock Knowledge Base ingestion jobs with shared, non-blocking job tracking.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bedrock ingestion job statuses after which a job no longer changes
+TERMINAL_JOB_STATUSES = ("COMPLETE", "FAILED", "STOPPED")
+
+# Status of requests still queued or running when the coordinator is closed;
+# a started job keeps running in Bedrock and can be followed by its job ID
+CANCELLED_STATUS = "CANCELLED"
+
+
+class IngestionRequest:
+    """An object waiting to be synced into a knowledge base by an ingestion job."""
+
+    def __init__(self, data_source_id: str, object_key: str,
+                 on_started: Optional[Callable[[str], None]] = None):
+        self.request_id = f"kbreq-{uuid.uuid4()}"
+        self.data_source_id = data_source_id
+        self.object_key = object_key
+        self.status = "QUEUED"
+        self.ingestion_job_id: Optional[str] = None
+        # Called with the ingestion job ID once the covering job has started
+        self.on_started = on_started
+        # Resolved with the final job status dictionary
+        self.future: Future = Future()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the request status."""
+        return {
+            "ingestion_request_id": self.request_id,
+            "ingestion_job_id": self.ingestion_job_id,
+            "data_source_id": self.data_source_id,
+            "object_key": self.object_key,
+            "status": self.status
+        }
+
+
+class _DataSourceState:
+    """Pending requests and the running job of one data source."""
+
+    def __init__(self):
+        self.pending: List[IngestionRequest] = []
+        self.start_at: Optional[float] = None
+        self.job_id: Optional[str] = None
+        self.job_requests: List[IngestionRequest] = []
+        self.next_poll = 0.0
+
+
+class IngestionJobCoordinator:
+    """
+    Coalesce object arrivals into one ingestion job per data source and track jobs.
+
+    A Bedrock ingestion job syncs the whole data source, so objects that
+    arrive within ``coalesce_window`` seconds of the first pending one are
+    covered by a single job. Only one job runs per data source; objects that
+    arrive while it runs are queued for the next job. One background poller
+    thread starts due jobs and polls all running jobs every ``poll_interval``
+    seconds, so callers never wait: each request carries a future resolved
+    with the final job status, and its status can be queried at any time.
+    """
+
+    def __init__(self, client, knowledge_base_id: str, coalesce_window: float = 5.0,
+                 poll_interval: float = 10.0, max_tracked_requests: int = 10000,
+                 clock: Callable[[], float] = time.monotonic, background: bool = True):
+        """
+        Initialize the coordinator.
+
+        Args:
+            client: Boto3 bedrock-agent client
+            knowledge_base_id: Knowledge base ID
+            coalesce_window: Seconds to collect arrivals before starting a job
+            poll_interval: Seconds between status polls of a running job
+            max_tracked_requests: Finished requests kept for status queries
+            clock: Monotonic clock, replaceable in tests
+            background: Whether to run the poller thread; without it, call tick()
+        """
+        self.client = client
+        self.knowledge_base_id = knowledge_base_id
+        self.coalesce_window = coalesce_window
+        self.poll_interval = poll_interval
+        self.max_tracked_requests = max_tracked_requests
+        self.clock = clock
+        self.background = background
+        self.stats = {"requests": 0, "jobs_started": 0, "polls": 0}
+        self._sources: Dict[str, _DataSourceState] = {}
+        self._requests: "OrderedDict[str, IngestionRequest]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, data_source_id: str, object_key: str,
+               on_started: Optional[Callable[[str], None]] = None) -> IngestionRequest:
+        """
+        Queue an object for the next ingestion job of its data source.
+
+        Args:
+            data_source_id: Data source containing the object
+            object_key: S3 object key
+            on_started: Optional callback receiving the ingestion job ID once the
+                job has started, so it can be persisted; runs on the poller thread
+
+        Returns:
+            The queued request; returns immediately
+        """
+        request = IngestionRequest(data_source_id, object_key, on_started)
+        if self._stopped:
+            self._finish([request], {"status": CANCELLED_STATUS, "error_message": "Coordinator is closed"})
+            return request
+        with self._lock:
+            state = self._sources.setdefault(data_source_id, _DataSourceState())
+            if not state.pending:
+                state.start_at = self.clock() + self.coalesce_window
+            state.pending.append(request)
+            self._track(request)
+            self.stats["requests"] += 1
+        if self.background:
+            self._ensure_thread()
+            self._wakeup.set()
+        return request
+
+    def get(self, request_id: str) -> Optional[IngestionRequest]:
+        """Get a tracked request, whose future can be awaited."""
+        with self._lock:
+            return self._requests.get(request_id)
+
+    def status(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a request without waiting.
+
+        Args:
+            request_id: Request ID returned by submit
+
+        Returns:
+            Request status, or None if the request is unknown
+        """
+        with self._lock:
+            request = self._requests.get(request_id)
+            return request.to_dict() if request else None
+
+    def tick(self) -> Optional[float]:
+        """
+        Start due jobs and poll running jobs once.
+
+        Returns:
+            Seconds until more work is due, or None if nothing is pending or running
+        """
+        now = self.clock()
+        to_poll, to_start = [], []
+        with self._lock:
+            for data_source_id, state in self._sources.items():
+                if state.job_id is not None and now >= state.next_poll:
+                    to_poll.append((data_source_id, state.job_id))
+                elif state.job_id is None and state.pending and now >= state.start_at:
+                    requests, state.pending = state.pending, []
+                    to_start.append((data_source_id, requests))
+
+        for data_source_id, job_id in to_poll:
+            self._poll(data_source_id, job_id)
+        for data_source_id, requests in to_start:
+            self._start(data_source_id, requests)
+        return self._next_delay()
+
+    def close(self):
+        """
+        Stop the poller thread and resolve unfinished requests as cancelled.
+
+        Requests whose job has started keep their ``ingestion_job_id`` in the
+        final status, since the job itself continues in Bedrock.
+        """
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+        with self._lock:
+            unfinished = [
+                request
+                for state in self._sources.values()
+                for request in state.job_requests + state.pending
+            ]
+            for state in self._sources.values():
+                state.pending, state.job_requests, state.job_id = [], [], None
+        for request in unfinished:
+            self._finish([request], {
+                "status": CANCELLED_STATUS,
+                "ingestion_job_id": request.ingestion_job_id,
+                "error_message": "Coordinator closed before the ingestion job finished"
+            })
+
+    def _track(self, request: IngestionRequest):
+        """Remember a request for status queries, forgetting the oldest finished ones."""
+        self._requests[request.request_id] = request
+        while len(self._requests) > self.max_tracked_requests:
+            oldest_id, oldest = next(iter(self._requests.items()))
+            if not oldest.future.done():
+                break
+            del self._requests[oldest_id]
+
+    def _start(self, data_source_id: str, requests: List[IngestionRequest]):
+        """Start one ingestion job for all coalesced requests of a data source."""
+        try:
+            response = self.client.start_ingestion_job(
+                knowledgeBaseId=self.knowledge_base_id,
+                dataSourceId=data_source_id
+            )
+        except ClientError as e:
+            code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+            if code in ("ConflictException", "ThrottlingException"):
+                # A job started elsewhere is still running; retry after the next poll interval
+                logger.info(f"Cannot start ingestion job for data source {data_source_id} yet ({code}), retrying")
+                with self._lock:
+                    state = self._sources[data_source_id]
+                    state.pending = requests + state.pending
+                    state.start_at = self.clock() + self.poll_interval
+                return
+            self._finish(requests, {"status": "FAILED", "error_message": str(e)})
+            return
+        except Exception as e:
+            self._finish(requests, {"status": "FAILED", "error_message": str(e)})
+            return
+
+        job = response["ingestionJob"]
+        logger.info(f"Started Bedrock KB ingestion job {job['ingestionJobId']} for {len(requests)} objects")
+        with self._lock:
+            state = self._sources[data_source_id]
+            state.job_id = job["ingestionJobId"]
+            state.job_requests = requests
+            state.next_poll = self.clock() + self.poll_interval
+            for request in requests:
+                request.ingestion_job_id = job["ingestionJobId"]
+                request.status = job.get("status", "STARTING")
+            self.stats["jobs_started"] += 1
+
+        for request in requests:
+            if request.on_started is None:
+                continue
+            try:
+                request.on_started(job["ingestionJobId"])
+            except Exception as e:
+                logger.error(f"Error in started callback of {request.request_id}: {str(e)}")
+
+    def _poll(self, data_source_id: str, job_id: str):
+        """Poll a running job and resolve its requests when it finishes."""
+        self.stats["polls"] += 1
+        try:
+            job = self.client.get_ingestion_job(
+                knowledgeBaseId=self.knowledge_base_id,
+                dataSourceId=data_source_id,
+                ingestionJobId=job_id
+            )["ingestionJob"]
+        except Exception as e:
+            logger.warning(f"Error polling ingestion job {job_id}: {str(e)}")
+            with self._lock:
+                self._sources[data_source_id].next_poll = self.clock() + self.poll_interval
+            return
+
+        status = job["status"]
+        with self._lock:
+            state = self._sources[data_source_id]
+            if status not in TERMINAL_JOB_STATUSES:
+                state.next_poll = self.clock() + self.poll_interval
+                for request in state.job_requests:
+                    request.status = status
+                return
+            requests, state.job_requests, state.job_id = state.job_requests, [], None
+            if state.pending:
+                # Objects that arrived during the job have waited long enough
+                state.start_at = min(state.start_at, self.clock())
+
+        logger.info(f"Bedrock KB ingestion job {job_id} finished with status {status}")
+        self._finish(requests, {
+            "status": status,
+            "ingestion_job_id": job_id,
+            "statistics": job.get("statistics", {}),
+            "error_message": job.get("failureReason", ""),
+            "created_at": job.get("startTime", ""),
+            "completed_at": job.get("endTime", "")
+        })
+
+    def _finish(self, requests: List[IngestionRequest], job_status: Dict[str, Any]):
+        """Resolve requests with the final job status."""
+        with self._lock:
+            requests = [request for request in requests if not request.future.done()]
+            for request in requests:
+                request.status = job_status["status"]
+        for request in requests:
+            request.future.set_result(dict(job_status, ingestion_request_id=request.request_id))
+
+    def _next_delay(self) -> Optional[float]:
+        """Return seconds until the next job start or poll is due."""
+        now = self.clock()
+        with self._lock:
+            deadlines = [
+                state.next_poll if state.job_id is not None else state.start_at
+                for state in self._sources.values()
+                if state.job_id is not None or state.pending
+            ]
+        return max(min(deadlines) - now, 0.0) if deadlines else None
+
+    def _ensure_thread(self):
+        """Start the shared poller thread on first use."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="bedrock-kb-ingestion-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Poller loop: do due work, then wait until the next deadline or a new submission."""
+        while not self._stopped:
+            try:
+                delay = self.tick()
+            except Exception as e:
+                logger.error(f"Error in Bedrock KB ingestion poller: {str(e)}")
+                delay = self.poll_interval
+            self._wakeup.wait(timeout=delay)
+            self._wakeup.clear()
@@ -3,15 +3,17 @@ Amazon Bedrock Knowledge Base vector store implementation.
 """
 
 import logging
+import os
 import uuid
 import boto3
 import time
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 
 from langchain.schema import Document
 from langchain.embeddings.base import Embeddings
 
 from .base import VectorStoreBase
+from .bedrock_kb_jobs import IngestionJobCoordinator
 from .factory import register_vector_store
 
 # Configure logging
@@ -41,6 +43,14 @@ class BedrockKBVectorStore(VectorStoreBase):
             self._create_knowledge_base()
         else:
             logger.info(f"Using existing Bedrock Knowledge Base with ID: {config['bedrock_kb_id']}")
+        
+        # One coordinator per store coalesces object arrivals into shared ingestion jobs
+        self.job_coordinator = IngestionJobCoordinator(
+            self.bedrock_agent_client,
+            self.config["bedrock_kb_id"],
+            coalesce_window=float(config.get("bedrock_kb_coalesce_window", 5.0)),
+            poll_interval=float(config.get("bedrock_kb_poll_interval", 10.0))
+        )
     
     def _create_knowledge_base(self):
         """Create a new Bedrock Knowledge Base."""
@@ -176,69 +186,81 @@ class BedrockKBVectorStore(VectorStoreBase):
         logger.warning("Direct document addition not supported for Bedrock KB. Use ingest_s3_object instead.")
         return None
     
-    def ingest_s3_object(self, bucket_name: str, object_key: str) -> Dict[str, Any]:
+    def ingest_s3_object(self, bucket_name: str, object_key: str,
+                         on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                         on_started: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
-        Ingest a document from S3 into Bedrock KB.
+        Queue a document from S3 for ingestion into Bedrock KB.
+        
+        Returns immediately. Objects arriving within the coalescing window are
+        synced by a single data source ingestion job, which is tracked by the
+        shared poller; use get_ingestion_request_status or wait_for_ingestion
+        to follow it.
         
         Args:
             bucket_name: S3 bucket name
             object_key: S3 object key
+            on_complete: Optional callback receiving the final job status; runs on the poller thread
+            on_started: Optional callback receiving the ingestion job ID once the job has
+                started; runs on the poller thread
             
         Returns:
-            Dictionary with ingestion job details
+            Dictionary with the ingestion request details
         """
         try:
             # Ensure we have a data source for this bucket
             data_source_id = self._ensure_data_source(bucket_name)
             
-            # Start ingestion job - using the correct API parameters
-            # Following the pattern from the notebook
-            response = self.bedrock_agent_client.start_ingestion_job(
-                knowledgeBaseId=self.config["bedrock_kb_id"],
-                dataSourceId=data_source_id
-            )
-            
-            ingestion_job_id = response["ingestionJob"]["ingestionJobId"]
-            logger.info(f"Started Bedrock KB ingestion job with ID: {ingestion_job_id}")
-            
-            # Wait for the ingestion job to complete - using exponential backoff with timeout
-            status = "STARTING"
-            max_attempts = 120  # Maximum 10 minutes (120 attempts)
-            attempt = 0
-            wait_time = 2  # Start with 2 seconds
-            
-            while status not in ["COMPLETE", "FAILED", "STOPPED"] and attempt < max_attempts:
-                time.sleep(wait_time)  # nosemgrep: arbitrary-sleep
-                attempt += 1
-                
-                # Exponential backoff: increase wait time up to 15 seconds max for longer operations
-                wait_time = min(wait_time * 1.1, 15)
-                
-                job_status = self.get_ingestion_job_status(ingestion_job_id)
-                status = job_status["status"]
-                logger.info(f"Ingestion job status: {status} (attempt {attempt}/{max_attempts})")
-            
-            if status not in ["COMPLETE", "FAILED", "STOPPED"]:
-                logger.warning("Ingestion job polling timed out - job may still be running")
-                status = "TIMEOUT"
-            
-            if status == "COMPLETE":
-                logger.info("Ingestion job completed successfully")
-            else:
-                logger.error(f"Ingestion job failed: {job_status.get('error_message', '')}")
+            request = self.job_coordinator.submit(data_source_id, object_key, on_started=on_started)
+            if on_complete:
+                request.future.add_done_callback(lambda future: on_complete(future.result()))
+            logger.info(f"Queued s3://{bucket_name}/{object_key} for Bedrock KB ingestion ({request.request_id})")
             
             return {
-                "ingestion_job_id": ingestion_job_id,
+                "ingestion_request_id": request.request_id,
+                "ingestion_job_id": request.ingestion_job_id,
                 "knowledge_base_id": self.config["bedrock_kb_id"],
                 "data_source_id": data_source_id,
                 "bucket_name": bucket_name,
                 "object_key": object_key,
-                "status": status
+                "status": request.status
             }
         except Exception as e:
             logger.error(f"Error creating data source: {str(e)}")  # nosemgrep: logging-error-without-handling
             raise
     
+    def get_ingestion_request_status(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a queued ingestion request without waiting.
+        
+        Args:
+            request_id: Ingestion request ID returned by ingest_s3_object
+            
+        Returns:
+            Dictionary with the request status and job ID once started, or None if unknown
+        """
+        return self.job_coordinator.status(request_id)
+    
+    def wait_for_ingestion(self, request_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Block until the ingestion job covering a request finishes.
+        
+        Args:
+            request_id: Ingestion request ID returned by ingest_s3_object
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            Dictionary with the final job status
+            
+        Raises:
+            KeyError: If the request is unknown
+            concurrent.futures.TimeoutError: If the job does not finish in time
+        """
+        request = self.job_coordinator.get(request_id)
+        if request is None:
+            raise KeyError(f"Unknown ingestion request: {request_id}")
+        return request.future.result(timeout=timeout)
+    
     def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
         Perform similarity search.
@@ -323,7 +345,7 @@ class BedrockKBVectorStore(VectorStoreBase):
             logger.error(f"Error performing similarity search with score: {str(e)}")
             return []
     
-    def delete(self, document_id: str) -> bool:
+    def delete(self, document_id: str, chunk_ids: Optional[List[str]] = None) -> bool:
         """
         Delete documents by ID.
         
@@ -331,6 +353,7 @@ class BedrockKBVectorStore(VectorStoreBase):
         
         Args:
             document_id: Document ID to delete
+            chunk_ids: Unused
             
         Returns:
             True if successful, False otherwise
@@ -338,12 +361,13 @@ class BedrockKBVectorStore(VectorStoreBase):
         logger.warning("Direct document deletion not supported for Bedrock KB")
         return False
     
-    def get_ingestion_job_status(self, ingestion_job_id: str) -> Dict[str, Any]:
+    def get_ingestion_job_status(self, ingestion_job_id: str, data_source_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get the status of an ingestion job.
         
         Args:
             ingestion_job_id: Ingestion job ID
+            data_source_id: Data source the job runs for, defaults to the configured one
             
         Returns:
             Dictionary with job status
@@ -351,7 +375,7 @@ class BedrockKBVectorStore(VectorStoreBase):
         try:
             response = self.bedrock_agent_client.get_ingestion_job(
                 knowledgeBaseId=self.config["bedrock_kb_id"],
-                dataSourceId=self.config["bedrock_data_source_id"],
+                dataSourceId=data_source_id or self.config["bedrock_data_source_id"],
                 ingestionJobId=ingestion_job_id
             )
             
@@ -365,3 +389,7 @@ class BedrockKBVectorStore(VectorStoreBase):
         except Exception as e:
             logger.error(f"Error getting ingestion job status: {str(e)}")
             return {"status": "ERROR", "error_message": str(e)}
+    
+    def close(self):
+        """Stop the ingestion job poller thread."""
+        self.job_coordinator.close()
@@ -0,0 +1,238 @@
+"""
+Parallel, byte-bounded bulk indexing with refresh control for Elasticsearch.
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from elasticsearch.helpers import parallel_bulk
+from langchain.schema import Document
+
+from .batching import BatchIndexingError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class _RefreshState:
+    """Bulk sessions open on one index and the refresh interval they relaxed."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.documents = 0
+        self.relaxed = False
+        self.saved_refresh_interval: Optional[str] = None
+        # Serializes the settings and refresh calls for this index only
+        self.settings_lock = threading.Lock()
+
+
+class ElasticsearchBulkIndexer:
+    """
+    Index documents with precomputed vectors through the Elasticsearch bulk API.
+
+    Actions are generated lazily and sent by ``thread_count`` parallel workers
+    in requests of at most ``chunk_size`` actions and ``max_chunk_bytes``
+    bytes. Items rejected by Elasticsearch (e.g. 429 when the write queue is
+    full) are collected per item and only those are retried with backoff.
+
+    Refresh is handled per bulk session rather than per ``index`` call: once
+    the documents indexed in open sessions reach ``large_job_threshold``,
+    periodic refresh is disabled, and when the last session on the index
+    closes the previous interval is restored and the index is refreshed once.
+    Sessions are counted per index across threads and indexer instances. An
+    ``index`` call outside a session is a session of its own.
+
+    Documents are written in the layout of LangChain's ElasticsearchStore:
+    text in ``text_field``, the vector in ``vector_field`` and metadata under
+    ``metadata``, with the chunk ID as the document ID.
+    """
+
+    # Session state by index name, shared by all indexers in the process; the
+    # lock only guards the counters and is never held during cluster calls
+    _refresh_states: Dict[str, _RefreshState] = {}
+    _refresh_lock = threading.Lock()
+
+    def __init__(self, client, index_name: str, text_field: str = "text", vector_field: str = "vector",
+                 max_chunk_bytes: int = 10 * 1024 * 1024, chunk_size: int = 500, thread_count: int = 4,
+                 large_job_threshold: int = 1000, bulk_refresh_interval: str = "-1",
+                 max_retries: int = 3, retry_delay: float = 1.0, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the bulk indexer.
+
+        Args:
+            client: Elasticsearch client
+            index_name: Target index
+            text_field: Field holding the document text
+            vector_field: Field holding the embedding
+            max_chunk_bytes: Maximum bytes per bulk request
+            chunk_size: Maximum actions per bulk request
+            thread_count: Number of parallel bulk workers
+            large_job_threshold: Document count from which refresh is relaxed during a session
+            bulk_refresh_interval: Refresh interval used during large sessions ("-1" disables refresh)
+            max_retries: Number of retry rounds for rejected documents
+            retry_delay: Base delay in seconds for exponential backoff
+            sleep: Sleep function, replaceable in tests
+        """
+        self.client = client
+        self.index_name = index_name
+        self.text_field = text_field
+        self.vector_field = vector_field
+        self.max_chunk_bytes = max_chunk_bytes
+        self.chunk_size = chunk_size
+        self.thread_count = thread_count
+        self.large_job_threshold = large_job_threshold
+        self.bulk_refresh_interval = bulk_refresh_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.sleep = sleep
+
+    def _actions(self, documents: Sequence[Document], embeddings: Sequence[List[float]],
+                 ids: List[str], positions: List[int]) -> Iterator[Dict[str, Any]]:
+        for position in positions:
+            yield {
+                "_op_type": "index",
+                "_index": self.index_name,
+                "_id": ids[position],
+                self.text_field: documents[position].page_content,
+                self.vector_field: embeddings[position],
+                "metadata": documents[position].metadata
+            }
+
+    def _bulk(self, documents: Sequence[Document], embeddings: Sequence[List[float]],
+              ids: List[str], positions: List[int]) -> Tuple[int, Dict[int, str]]:
+        """
+        Send one pass of bulk requests.
+
+        Returns:
+            Tuple of (number indexed, errors by position for rejected documents)
+        """
+        position_by_id = {ids[position]: position for position in positions}
+        indexed = 0
+        errors: Dict[int, str] = {}
+        for ok, item in parallel_bulk(
+            self.client,
+            self._actions(documents, embeddings, ids, positions),
+            thread_count=self.thread_count,
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False
+        ):
+            if ok:
+                indexed += 1
+                continue
+            info = next(iter(item.values()), {})
+            position = position_by_id.get(info.get("_id"))
+            if position is not None:
+                errors[position] = str(info.get("error") or info.get("exception") or info.get("status"))
+        return indexed, errors
+
+    @contextmanager
+    def bulk_session(self) -> Iterator[_RefreshState]:
+        """
+        Group the index calls of a run so refresh is relaxed and run once for all of them.
+
+        Sessions nest and may overlap across threads; the last one to close
+        restores the refresh interval and refreshes the index.
+        """
+        with self._refresh_lock:
+            state = self._refresh_states.setdefault(self.index_name, _RefreshState())
+            state.sessions += 1
+        try:
+            yield state
+        finally:
+            with self._refresh_lock:
+                state.sessions -= 1
+            self._close_session(state)
+
+    def _close_session(self, state: _RefreshState):
+        """Restore the refresh interval and refresh the index if no session is open any more."""
+        with state.settings_lock:
+            with self._refresh_lock:
+                if state.sessions:
+                    # A session is still open and will finish the work when it closes
+                    return
+                relaxed, state.relaxed, state.documents = state.relaxed, False, 0
+            try:
+                if relaxed:
+                    # None resets the setting to the index default
+                    self.client.indices.put_settings(
+                        index=self.index_name,
+                        settings={"index": {"refresh_interval": state.saved_refresh_interval}}
+                    )
+                    logger.info(f"Restored refresh_interval of {self.index_name} to {state.saved_refresh_interval}")
+            finally:
+                # One refresh per session makes the documents searchable
+                self.client.indices.refresh(index=self.index_name)
+
+    def _count_documents(self, state: _RefreshState, count: int):
+        """Add documents to a session, relaxing refresh once the session is large."""
+        with self._refresh_lock:
+            state.documents += count
+            if state.relaxed or state.documents < self.large_job_threshold:
+                return
+        with state.settings_lock:
+            if state.relaxed:
+                return
+            settings = self.client.indices.get_settings(index=self.index_name, name="index.refresh_interval")
+            index_settings = next(iter(dict(settings).values()), {}).get("settings", {})
+            saved_refresh_interval = index_settings.get("index", {}).get("refresh_interval")
+            self.client.indices.put_settings(
+                index=self.index_name, settings={"index": {"refresh_interval": self.bulk_refresh_interval}}
+            )
+            with self._refresh_lock:
+                state.saved_refresh_interval = saved_refresh_interval
+                state.relaxed = True
+            logger.info(f"Set refresh_interval of {self.index_name} to {self.bulk_refresh_interval} for bulk indexing")
+
+    def index(self, documents: Sequence[Document], embeddings: Sequence[List[float]]) -> Dict[str, Any]:
+        """
+        Index documents with their embeddings, retrying rejected items.
+
+        Args:
+            documents: Documents to index
+            embeddings: One embedding per document
+
+        Returns:
+            Statistics with "indexed", "failed", "retries", "seconds" and the document "ids"
+
+        Raises:
+            BatchIndexingError: If documents are still rejected after all retries
+        """
+        if len(documents) != len(embeddings):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(documents)} documents")
+        ids = [doc.metadata.get("chunk_id") or str(uuid.uuid4()) for doc in documents]
+        stats = {"indexed": 0, "failed": 0, "retries": 0, "seconds": 0.0, "ids": ids}
+        start = time.time()
+
+        pending = list(range(len(documents)))
+        errors: Dict[int, str] = {}
+        with self.bulk_session() as state:
+            self._count_documents(state, len(documents))
+            for attempt in range(self.max_retries + 1):
+                if attempt > 0:
+                    stats["retries"] += 1
+                    delay = self.retry_delay * (2 ** (attempt - 1))
+                    delay = delay / 2 + random.uniform(0, delay / 2)
+                    logger.info(f"Retrying {len(pending)} rejected documents in {delay:.2f}s (attempt {attempt + 1})")
+                    self.sleep(delay)
+                indexed, errors = self._bulk(documents, embeddings, ids, pending)
+                stats["indexed"] += indexed
+                pending = sorted(errors)
+                if not pending:
+                    break
+
+        stats["failed"] = len(pending)
+        stats["seconds"] = time.time() - start
+        logger.info(
+            f"Bulk indexed {stats['indexed']} documents into {self.index_name} in {stats['seconds']:.2f}s "
+            f"with {self.thread_count} workers, {stats['retries']} retries, {stats['failed']} failed"
+        )
+        if pending:
+            raise BatchIndexingError(pending, {position: errors[position] for position in pending})
+        return stats
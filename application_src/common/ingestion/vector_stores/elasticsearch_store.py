@@ -3,7 +3,10 @@ Elasticsearch vector store implementation.
 """
 
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import ContextManager, Dict, List, Any, Optional, Tuple
+
+from elasticsearch import BadRequestError
+from elasticsearch.helpers import bulk
 
 from langchain.schema import Document
 from langchain.embeddings.base import Embeddings
@@ -11,6 +14,7 @@ from langchain.embeddings.base import Embeddings
 from langchain_community.vectorstores import ElasticsearchStore
 
 from .base import VectorStoreBase
+from .elasticsearch_bulk import ElasticsearchBulkIndexer
 from .factory import register_vector_store
 
 # Configure logging
@@ -48,6 +52,22 @@ class ElasticsearchVectorStore(VectorStoreBase):
         
         self.store = ElasticsearchStore(**es_params)
         
+        # Bulk indexing path for precomputed embeddings
+        self.bulk_indexer = ElasticsearchBulkIndexer(
+            self.store.client,
+            config["elasticsearch_index"],
+            text_field=self.store.query_field,
+            vector_field=self.store.vector_query_field,
+            max_chunk_bytes=int(config.get("es_bulk_max_chunk_bytes", 10 * 1024 * 1024)),
+            chunk_size=int(config.get("es_bulk_chunk_size", 500)),
+            thread_count=int(config.get("es_bulk_thread_count", 4)),
+            large_job_threshold=int(config.get("es_bulk_refresh_threshold", 1000)),
+            bulk_refresh_interval=str(config.get("es_bulk_refresh_interval", "-1")),
+            max_retries=int(config.get("max_retries", 3)),
+            retry_delay=float(config.get("retry_delay", 1.0))
+        )
+        self._index_ready = False
+        
         logger.info(f"Initialized Elasticsearch vector store with index: {config['elasticsearch_index']}")
     
     def add_documents(self, documents: List[Document]) -> Any:
@@ -58,16 +78,106 @@ class ElasticsearchVectorStore(VectorStoreBase):
             documents: List of LangChain Document objects
             
         Returns:
-            Implementation-specific result
+            List of IDs of the added documents
         """
         try:
-            result = self.store.add_documents(documents)
+            stats = self.add_documents_batched(documents)
             logger.info(f"Added {len(documents)} documents to Elasticsearch")
-            return result
+            return stats["ids"]
         except Exception as e:
             logger.error(f"Error adding documents to Elasticsearch: {str(e)}")
             raise
     
+    def add_embedded_documents(self, documents: List[Document], embeddings: List[List[float]]) -> Any:
+        """
+        Add documents with precomputed embeddings to the vector store.
+        
+        Args:
+            documents: List of LangChain Document objects
+            embeddings: One embedding per document, in the same order
+            
+        Returns:
+            List of IDs of the added documents
+        """
+        try:
+            stats = self.add_documents_batched(documents, embeddings)
+            logger.info(f"Added {len(documents)} embedded documents to Elasticsearch")
+            return stats["ids"]
+        except Exception as e:
+            logger.error(f"Error adding embedded documents to Elasticsearch: {str(e)}")
+            raise
+    
+    def add_documents_batched(self, documents: List[Document],
+                              embeddings: Optional[List[List[float]]] = None) -> Dict[str, Any]:
+        """
+        Bulk index documents with parallel workers and relaxed refresh.
+        
+        Bulk requests are bounded by the config keys ``es_bulk_max_chunk_bytes``
+        and ``es_bulk_chunk_size`` and sent by ``es_bulk_thread_count`` workers.
+        Once a bulk session has indexed ``es_bulk_refresh_threshold`` documents,
+        the index refresh interval is ``es_bulk_refresh_interval`` until the
+        session ends; see bulk_session.
+        Rejected documents are retried using ``max_retries`` and ``retry_delay``.
+        
+        This replaces the BatchIndexer path of the base class on purpose:
+        parallel_bulk already bounds each request by bytes and actions, and
+        only the items Elasticsearch rejected are retried, with the same
+        ``max_retries`` and ``retry_delay`` settings. Batching again in front of
+        it would only split the job into smaller bulk passes.
+        
+        Args:
+            documents: List of LangChain Document objects
+            embeddings: Optional precomputed embeddings, one per document
+            
+        Returns:
+            Indexing statistics including the IDs of the indexed documents
+        """
+        if not documents:
+            return {"indexed": 0, "failed": 0, "retries": 0, "seconds": 0.0, "ids": []}
+        if embeddings is None:
+            embeddings = self.embedding_model.embed_documents([doc.page_content for doc in documents])
+        if not self._index_ready:
+            self._create_index_if_missing(len(embeddings[0]))
+            self._index_ready = True
+        return self.bulk_indexer.index(documents, embeddings)
+    
+    def _create_index_if_missing(self, dims_length: int):
+        """
+        Create the index with the vector mapping ElasticsearchStore searches, if it does not exist.
+        
+        Args:
+            dims_length: Number of dimensions of the embeddings
+        """
+        client = self.store.client
+        index_name = self.config["elasticsearch_index"]
+        if client.indices.exists(index=index_name):
+            return
+        try:
+            client.indices.create(index=index_name, mappings={
+                "properties": {
+                    self.store.vector_query_field: {
+                        "type": "dense_vector",
+                        "dims": dims_length,
+                        "index": True,
+                        "similarity": "cosine"
+                    }
+                }
+            })
+            logger.info(f"Created Elasticsearch index {index_name} with {dims_length}-dimensional vectors")
+        except BadRequestError as e:
+            # Another worker created the index in the meantime
+            if e.error != "resource_already_exists_exception":
+                raise
+    
+    def bulk_session(self) -> ContextManager[Any]:
+        """
+        Relax refresh across the indexing calls of a run and refresh once at its end.
+        
+        Returns:
+            Context manager counted per index across concurrent runs
+        """
+        return self.bulk_indexer.bulk_session()
+    
     def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
         Perform similarity search.
@@ -104,17 +214,33 @@ class ElasticsearchVectorStore(VectorStoreBase):
             logger.error(f"Error performing similarity search with score: {str(e)}")
             return []
     
-    def delete(self, document_id: str) -> bool:
+    def delete(self, document_id: str, chunk_ids: Optional[List[str]] = None) -> bool:
         """
-        Delete documents by ID.
+        Delete all chunks of a document.
+        
+        With the chunk IDs recorded at ingestion, chunks are deleted by ID in
+        bulk requests, which avoids scrolling the index. Documents indexed
+        before chunk IDs were recorded, or whose chunks are not all found by
+        ID, are removed with a delete_by_query on ``metadata.document_id``.
         
         Args:
             document_id: Document ID to delete
+            chunk_ids: IDs of all chunks of the document, if known
             
         Returns:
             True if successful, False otherwise
         """
         try:
+            if chunk_ids:
+                deleted, missing, errors = self._delete_by_ids(chunk_ids)
+                if errors:
+                    logger.error(f"Failed to delete {len(errors)} of {len(chunk_ids)} chunks of document {document_id}")
+                    return False
+                if not missing:
+                    logger.info(f"Deleted document {document_id} ({deleted} chunks) from Elasticsearch by ID")
+                    return True
+                logger.info(f"{missing} of {len(chunk_ids)} chunks of document {document_id} not found by ID, "
+                            f"falling back to delete_by_query")
             es_client = self.store.client
             es_client.delete_by_query(
                 index=self.config["elasticsearch_index"],
@@ -131,3 +257,49 @@ class ElasticsearchVectorStore(VectorStoreBase):
         except Exception as e:
             logger.error(f"Error deleting document from Elasticsearch: {str(e)}")
             return False
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> bool:
+        """
+        Delete chunks by their Elasticsearch document IDs in bulk requests.
+        
+        Args:
+            chunk_ids: Chunk IDs to delete
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not chunk_ids:
+            return True
+        try:
+            # Chunks that are already gone count as deleted
+            _, _, errors = self._delete_by_ids(chunk_ids)
+            if errors:
+                logger.error(f"Failed to delete {len(errors)} of {len(chunk_ids)} chunks from Elasticsearch")
+                return False
+            logger.info(f"Deleted {len(chunk_ids)} chunks from Elasticsearch")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting chunks from Elasticsearch: {str(e)}")
+            return False
+    
+    def _delete_by_ids(self, chunk_ids: List[str]) -> Tuple[int, int, List[Dict[str, Any]]]:
+        """
+        Bulk delete documents by ID.
+        
+        Returns:
+            Tuple of (number deleted, number not found, per-item errors)
+        """
+        actions = (
+            {"_op_type": "delete", "_index": self.config["elasticsearch_index"], "_id": chunk_id}
+            for chunk_id in chunk_ids
+        )
+        deleted, failures = bulk(
+            self.store.client,
+            actions,
+            chunk_size=self.bulk_indexer.chunk_size,
+            max_chunk_bytes=self.bulk_indexer.max_chunk_bytes,
+            raise_on_error=False
+        )
+        missing = [failure for failure in failures if next(iter(failure.values()), {}).get("status") == 404]
+        errors = [failure for failure in failures if next(iter(failure.values()), {}).get("status") != 404]
+        return deleted, len(missing), errors
@@ -0,0 +1,202 @@
+"""
+Tests for size-aware batched vector store writes.
+
+This module tests batch budgets and partial-failure retry with a fake store that
+rejects random documents.
+"""
+
+import random
+
+import pytest
+from langchain.schema import Document
+from vector_stores import VectorStoreBase
+from vector_stores.batching import BatchIndexer, BatchIndexingError, estimate_bytes, estimate_tokens
+
+
+class FlakyVectorStore(VectorStoreBase):
+    """Fake store that rejects a random subset of each batch."""
+
+    def __init__(self, config, embedding_model=None, reject_rate=0.3, seed=7, always_reject=()):
+        self.config = config
+        self.rng = random.Random(seed)
+        self.reject_rate = reject_rate
+        self.always_reject = set(always_reject)
+        self.stored = {}
+        self.write_counts = {}
+        self.batch_sizes = []
+
+    def _write_batch(self, documents, embeddings):
+        self.batch_sizes.append(len(documents))
+        failed = set()
+        for index, doc in enumerate(documents):
+            chunk_id = doc.metadata["chunk_id"]
+            if chunk_id in self.always_reject or self.rng.random() < self.reject_rate:
+                failed.add(index)
+                continue
+            self.stored[chunk_id] = embeddings[index] if embeddings else None
+            self.write_counts[chunk_id] = self.write_counts.get(chunk_id, 0) + 1
+        return failed
+
+    def add_documents(self, documents):
+        raise AssertionError("Batched writes must go through _write_batch")
+
+    def similarity_search(self, query, k=4, filter=None):
+        return []
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return []
+
+    def delete(self, document_id, chunk_ids=None):
+        return True
+
+
+class CountingEmbeddings:
+    """Fake embedding model counting the texts it embeds."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[-1.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [-1.0]
+
+
+class EmbeddingVectorStore(VectorStoreBase):
+    """Fake store that embeds through its model in add_documents, like the template store."""
+
+    def __init__(self, config, embedding_model):
+        self.config = config
+        self.embedding_model = embedding_model
+        self.stored = {}
+
+    def add_documents(self, documents):
+        embeddings = self.embedding_model.embed_documents([doc.page_content for doc in documents])
+        self._store(documents, embeddings)
+
+    def _store(self, documents, embeddings):
+        for doc, embedding in zip(documents, embeddings):
+            self.stored[doc.metadata["chunk_id"]] = embedding
+
+    def similarity_search(self, query, k=4, filter=None):
+        return []
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return []
+
+    def delete(self, document_id, chunk_ids=None):
+        return True
+
+
+class PrecomputedVectorStore(EmbeddingVectorStore):
+    """Fake store that also indexes precomputed vectors directly."""
+
+    def add_embedded_documents(self, documents, embeddings):
+        self._store(documents, embeddings)
+
+
+def make_documents(count, size=400):
+    """Build chunk documents with distinct IDs."""
+    return [Document(page_content="w" * size, metadata={"chunk_id": f"doc-1-chunk-{i}"}) for i in range(count)]
+
+
+STORE_CONFIG = {"max_retries": 10, "retry_delay": 0, "index_batch_max_items": 25}
+
+
+class TestBatchIndexer:
+    """Test cases for batching and retries."""
+
+    def test_random_rejections_are_indexed_exactly_once(self):
+        """Test that retries cover only failed documents so each is written exactly once."""
+        store = FlakyVectorStore(STORE_CONFIG, reject_rate=0.3)
+        documents = make_documents(200)
+        embeddings = [[float(i), 0.5] for i in range(200)]
+
+        stats = store.add_documents_batched(documents, embeddings)
+
+        assert stats["indexed"] == 200 and stats["failed"] == 0
+        assert stats["retries"] > 0
+        assert set(store.write_counts) == {doc.metadata["chunk_id"] for doc in documents}
+        assert set(store.write_counts.values()) == {1}
+        assert store.stored["doc-1-chunk-42"] == [42.0, 0.5]
+        assert sum(batch["items"] for batch in stats["batches"] if batch["attempt"] == 1) == 200
+        assert max(store.batch_sizes) <= 25
+
+    def test_permanent_failures_raise_after_retries(self):
+        """Test that documents failing every attempt are reported by position."""
+        store = FlakyVectorStore(dict(STORE_CONFIG, max_retries=2), reject_rate=0,
+                                 always_reject={"doc-1-chunk-3", "doc-1-chunk-7"})
+
+        with pytest.raises(BatchIndexingError) as error:
+            store.add_documents_batched(make_documents(10))
+
+        assert error.value.failed_positions == [3, 7]
+        assert len(store.stored) == 8
+        assert store.batch_sizes == [10, 2, 2]
+
+    def test_batch_exceptions_retry_the_whole_batch(self):
+        """Test that a batch that raises is retried as a whole."""
+        calls = []
+
+        def write_batch(documents, embeddings):
+            calls.append(len(documents))
+            if len(calls) == 1:
+                raise TimeoutError("bulk request timed out")
+            return set()
+
+        stats = BatchIndexer(retry_delay=0).index(make_documents(5), None, write_batch)
+
+        assert calls == [5, 5]
+        assert stats["indexed"] == 5
+
+    def test_batches_respect_token_byte_and_item_budgets(self):
+        """Test that batches are closed before exceeding any budget."""
+        documents = make_documents(30, size=400)
+        embeddings = [[0.0] * 256 for _ in documents]
+
+        by_tokens = list(BatchIndexer(max_tokens=1000).batches(documents, None, range(30)))
+        by_bytes = list(BatchIndexer(max_bytes=3 * estimate_bytes(documents[-1], embeddings[-1]))
+                        .batches(documents, embeddings, range(30)))
+        by_items = list(BatchIndexer(max_items=7).batches(documents, None, range(30)))
+
+        assert all(sum(estimate_tokens(documents[i]) for i in batch) <= 1000 for batch in by_tokens)
+        assert [len(batch) for batch in by_tokens] == [10, 10, 10]
+        assert [len(batch) for batch in by_bytes] == [3] * 10
+        assert [len(batch) for batch in by_items] == [7, 7, 7, 7, 2]
+
+    def test_oversized_document_gets_its_own_batch(self):
+        """Test that a document larger than the budget is still sent, alone."""
+        documents = make_documents(2, size=100) + [Document(page_content="x" * 10000, metadata={"chunk_id": "big"})]
+
+        batches = list(BatchIndexer(max_tokens=500).batches(documents, None, range(3)))
+
+        assert batches == [[0, 1], [2]]
+
+
+class TestPrecomputedEmbeddings:
+    """Test cases for indexing precomputed embeddings on the batched path."""
+
+    def test_batched_path_passes_embeddings_to_the_store(self):
+        """Test that a store indexing precomputed vectors receives them without embedding again."""
+        model = CountingEmbeddings()
+        store = PrecomputedVectorStore(STORE_CONFIG, model)
+        documents = [Document(page_content=f"text {i}", metadata={"chunk_id": f"c{i}"}) for i in range(60)]
+
+        store.add_documents_batched(documents, [[float(i)] for i in range(60)])
+
+        assert model.embedded == []
+        assert store.stored["c42"] == [42.0]
+        assert store.embedding_model is model
+
+    def test_store_without_embedded_path_embeds_again(self):
+        """Test that the default falls back to add_documents and leaves the embedding model alone."""
+        model = CountingEmbeddings()
+        store = EmbeddingVectorStore(STORE_CONFIG, model)
+
+        store.add_documents_batched([Document(page_content="a", metadata={"chunk_id": "c0"})], [[1.0]])
+
+        assert model.embedded == ["a"]
+        assert store.stored == {"c0": [-1.0]}
+        assert store.embedding_model is model
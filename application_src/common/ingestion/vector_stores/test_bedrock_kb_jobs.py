@@ -0,0 +1,273 @@
+"""
+Tests for coalesced Bedrock KB ingestion jobs.
+
+This module drives the ingestion job coordinator against a fake bedrock-agent
+client that, like the service, allows one running job per data source.
+"""
+
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from ingestion import DocumentIngestion
+from vector_stores import bedrock_kb_store
+from vector_stores.bedrock_kb_jobs import IngestionJobCoordinator
+
+
+class FakeBedrockAgentClient:
+    """Fake bedrock-agent client whose jobs complete after a number of polls."""
+
+    def __init__(self, polls_until_complete=2):
+        self.polls_until_complete = polls_until_complete
+        self.jobs = {}
+        self.started = []
+        self.lock = threading.Lock()
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId):
+        with self.lock:
+            if any(job["dataSourceId"] == dataSourceId and job["status"] != "COMPLETE" for job in self.jobs.values()):
+                raise ClientError({"Error": {"Code": "ConflictException", "Message": "Job already running"}},
+                                  "StartIngestionJob")
+            job_id = f"job-{len(self.jobs) + 1}"
+            self.jobs[job_id] = {"dataSourceId": dataSourceId, "status": "STARTING",
+                                 "polls_left": self.polls_until_complete}
+            self.started.append(job_id)
+            return {"ingestionJob": {"ingestionJobId": job_id, "status": "STARTING"}}
+
+    def get_ingestion_job(self, knowledgeBaseId, dataSourceId, ingestionJobId):
+        with self.lock:
+            job = self.jobs[ingestionJobId]
+            job["polls_left"] -= 1
+            job["status"] = "COMPLETE" if job["polls_left"] <= 0 else "IN_PROGRESS"
+            return {"ingestionJob": {"ingestionJobId": ingestionJobId, "status": job["status"],
+                                     "statistics": {"numberOfDocumentsScanned": 100}}}
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    """Fail the test if anything calls time.sleep."""
+    def fail(seconds):
+        raise AssertionError(f"time.sleep({seconds}) called")
+    monkeypatch.setattr(time, "sleep", fail)
+
+
+def run_until_idle(coordinator, clock, limit=1000):
+    """Advance the clock to each deadline and tick until no work remains."""
+    for _ in range(limit):
+        delay = coordinator.tick()
+        if delay is None:
+            return
+        clock.now += delay
+    raise AssertionError("Coordinator did not become idle")
+
+
+class TestIngestionJobCoordinator:
+    """Test cases for coalescing and tracking with a manual clock."""
+
+    def test_hundred_objects_trigger_a_handful_of_jobs(self, no_sleep):
+        """Test that 100 arrivals over 50 seconds are synced by a few jobs without any sleep."""
+        client = FakeBedrockAgentClient()
+        clock = FakeClock()
+        coordinator = IngestionJobCoordinator(client, "kb-1", coalesce_window=5, poll_interval=10,
+                                              clock=clock, background=False)
+
+        requests = []
+        for i in range(100):
+            requests.append(coordinator.submit("ds-1", f"docs/file-{i}.txt"))
+            coordinator.tick()
+            clock.now += 0.5
+        run_until_idle(coordinator, clock)
+
+        results = [request.future.result(timeout=0) for request in requests]
+        assert all(result["status"] == "COMPLETE" for result in results)
+        assert 1 < len(client.started) <= 5
+        assert coordinator.stats["jobs_started"] == len(client.started)
+        assert {request.ingestion_job_id for request in requests} == set(client.started)
+
+    def test_status_is_queryable_while_queued_and_running(self):
+        """Test that request status moves from queued to running to complete."""
+        client = FakeBedrockAgentClient(polls_until_complete=2)
+        clock = FakeClock()
+        coordinator = IngestionJobCoordinator(client, "kb-1", coalesce_window=5, poll_interval=10,
+                                              clock=clock, background=False)
+        request = coordinator.submit("ds-1", "a.txt")
+
+        assert coordinator.status(request.request_id)["status"] == "QUEUED"
+        clock.now = 5
+        coordinator.tick()
+        assert coordinator.status(request.request_id) == dict(request.to_dict(), status="STARTING",
+                                                               ingestion_job_id="job-1")
+        clock.now = 15
+        coordinator.tick()
+        assert coordinator.status(request.request_id)["status"] == "IN_PROGRESS"
+        assert not request.future.done()
+        clock.now = 25
+        coordinator.tick()
+        assert coordinator.status(request.request_id)["status"] == "COMPLETE"
+        assert coordinator.status("kbreq-unknown") is None
+
+    def test_conflicting_job_is_retried(self):
+        """Test that a job already running for the data source delays the start instead of failing."""
+        client = FakeBedrockAgentClient(polls_until_complete=1)
+        client.start_ingestion_job("kb-1", "ds-1")
+        clock = FakeClock()
+        coordinator = IngestionJobCoordinator(client, "kb-1", coalesce_window=1, poll_interval=10,
+                                              clock=clock, background=False)
+        request = coordinator.submit("ds-1", "a.txt")
+
+        clock.now = 1
+        coordinator.tick()
+        assert coordinator.status(request.request_id)["status"] == "QUEUED"
+
+        client.get_ingestion_job("kb-1", "ds-1", "job-1")
+        run_until_idle(coordinator, clock)
+
+        assert request.future.result(timeout=0)["status"] == "COMPLETE"
+        assert request.ingestion_job_id == "job-2"
+
+    def test_data_sources_are_independent(self):
+        """Test that each data source gets its own job."""
+        client = FakeBedrockAgentClient(polls_until_complete=1)
+        clock = FakeClock()
+        coordinator = IngestionJobCoordinator(client, "kb-1", coalesce_window=1, poll_interval=1,
+                                              clock=clock, background=False)
+        requests = [coordinator.submit(f"ds-{i % 2}", f"{i}.txt") for i in range(10)]
+
+        run_until_idle(coordinator, clock)
+
+        assert len(client.started) == 2
+        assert all(request.future.done() for request in requests)
+
+    def test_close_resolves_running_and_queued_requests(self):
+        """Test that closing while a job is in progress releases its waiters instead of blocking them."""
+        client = FakeBedrockAgentClient(polls_until_complete=100)
+        clock = FakeClock()
+        coordinator = IngestionJobCoordinator(client, "kb-1", coalesce_window=1, poll_interval=10,
+                                              clock=clock, background=False)
+        running = coordinator.submit("ds-1", "a.txt")
+        clock.now = 1
+        coordinator.tick()
+        queued = coordinator.submit("ds-1", "b.txt")
+        completed = []
+        running.future.add_done_callback(lambda future: completed.append(future.result()))
+        waiter = threading.Thread(target=running.future.result)
+        waiter.start()
+
+        coordinator.close()
+        waiter.join(timeout=1)
+
+        assert not waiter.is_alive()
+        assert completed[0]["status"] == "CANCELLED" and completed[0]["ingestion_job_id"] == "job-1"
+        assert queued.future.result(timeout=0)["status"] == "CANCELLED"
+        assert coordinator.submit("ds-1", "c.txt").future.result(timeout=0)["status"] == "CANCELLED"
+
+    def test_started_callback_receives_job_id(self):
+        """Test that each request's started callback gets the job ID before the job finishes."""
+        client = FakeBedrockAgentClient(polls_until_complete=1)
+        clock = FakeClock()
+        coordinator = IngestionJobCoordinator(client, "kb-1", coalesce_window=1, poll_interval=10,
+                                              clock=clock, background=False)
+        started = []
+        requests = [coordinator.submit("ds-1", f"{i}.txt", on_started=started.append) for i in range(3)]
+
+        clock.now = 1
+        coordinator.tick()
+
+        assert started == ["job-1"] * 3
+        assert not any(request.future.done() for request in requests)
+
+
+class TestBedrockKBIngestion:
+    """Test cases for non-blocking ingestion through BedrockKBVectorStore."""
+
+    def test_ingest_returns_immediately_and_jobs_are_tracked_in_background(self, monkeypatch, no_sleep):
+        """Test that queuing 100 objects does not block and the poller thread resolves them."""
+        client = FakeBedrockAgentClient(polls_until_complete=2)
+        monkeypatch.setattr(bedrock_kb_store.boto3, "client",
+                            lambda service, region_name=None: client if service == "bedrock-agent" else object())
+        store = bedrock_kb_store.BedrockKBVectorStore({
+            "region": "us-east-1",
+            "bedrock_kb_id": "kb-1",
+            "bedrock_data_source_id": "ds-1",
+            "bedrock_kb_coalesce_window": 0.1,
+            "bedrock_kb_poll_interval": 0.02
+        }, embedding_model=None)
+        completed = []
+
+        start = time.monotonic()
+        results = [store.ingest_s3_object("bucket", f"docs/{i}.txt", on_complete=completed.append)
+                   for i in range(100)]
+        elapsed = time.monotonic() - start
+
+        try:
+            final = [store.wait_for_ingestion(result["ingestion_request_id"], timeout=5) for result in results]
+        finally:
+            store.job_coordinator.close()
+
+        assert elapsed < 1.0
+        assert all(result["status"] == "QUEUED" for result in results)
+        assert all(status["status"] == "COMPLETE" for status in final)
+        assert len(client.started) <= 5
+        assert len(completed) == 100
+        assert store.get_ingestion_request_status(results[0]["ingestion_request_id"])["status"] == "COMPLETE"
+
+    def test_close_stops_poller_thread(self, monkeypatch):
+        """Test that closing the store stops the coordinator's poller thread."""
+        client = FakeBedrockAgentClient()
+        monkeypatch.setattr(bedrock_kb_store.boto3, "client",
+                            lambda service, region_name=None: client if service == "bedrock-agent" else object())
+        store = bedrock_kb_store.BedrockKBVectorStore({
+            "region": "us-east-1",
+            "bedrock_kb_id": "kb-1",
+            "bedrock_data_source_id": "ds-1"
+        }, embedding_model=None)
+        store.ingest_s3_object("bucket", "a.txt")
+
+        store.close()
+
+        assert not store.job_coordinator._thread.is_alive()
+
+    def test_job_is_followed_after_restart(self, monkeypatch, tmp_path):
+        """Test that a restarted process finds the persisted job ID and polls the job directly."""
+        client = FakeBedrockAgentClient(polls_until_complete=1)
+        create_client = bedrock_kb_store.boto3.client
+        monkeypatch.setattr(bedrock_kb_store.boto3, "client",
+                            lambda service, region_name=None: client if service == "bedrock-agent"
+                            else create_client(service, region_name=region_name))
+        config = {
+            "bedrock_kb_id": "kb-1",
+            "bedrock_data_source_id": "ds-1",
+            "bedrock_kb_coalesce_window": 0.01,
+            "bedrock_kb_poll_interval": 60,
+            "status_store": "sqlite",
+            "status_store_path": str(tmp_path / "status.db"),
+            "run_journal": "none"
+        }
+        first = DocumentIngestion(vector_db_type="bedrock_kb", config=dict(config))
+        result = first.ingest_document("bucket", "a.txt")
+        deadline = time.monotonic() + 5
+        while not first.status_store.get(result["document_id"]).get("bedrock_kb_ingestion_job_id"):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        first.close()
+
+        restarted = DocumentIngestion(vector_db_type="bedrock_kb", config=dict(config))
+        try:
+            status = restarted.get_ingestion_status(result["ingestion_id"])
+        finally:
+            restarted.close()
+
+        assert status["status"] == "completed"
+        assert status["job_status"]["status"] == "COMPLETE"
+        assert restarted.status_store.get(result["document_id"])["status"] == "completed"
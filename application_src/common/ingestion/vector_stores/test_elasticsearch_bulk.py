@@ -0,0 +1,402 @@
+"""
+Tests for parallel bulk indexing and ID-addressed deletion in Elasticsearch.
+
+This module runs a real Elasticsearch client against a local fake bulk endpoint
+that records request sizes, concurrency, refresh settings and delete requests
+and rejects selected items with 429 like a full write queue.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from elasticsearch import Elasticsearch
+from langchain.schema import Document
+from vector_stores.batching import BatchIndexingError
+from vector_stores.elasticsearch_bulk import ElasticsearchBulkIndexer
+from vector_stores.elasticsearch_store import ElasticsearchVectorStore
+
+INDEX = "chunks"
+
+
+class FakeBulkEndpoint:
+    """State of the fake cluster, shared by the request handler threads."""
+
+    def __init__(self, refresh_interval="5s"):
+        self.lock = threading.Lock()
+        self.documents = {}
+        self.write_counts = {}
+        self.request_sizes = []
+        self.refresh_during_bulk = set()
+        self.refresh_interval = refresh_interval
+        self.refreshes = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # IDs rejected on their first attempt and IDs rejected on every attempt
+        self.reject_once = set()
+        self.reject_always = set()
+        self.attempts = {}
+        self.deleted_ids = []
+        # Document IDs of delete_by_query requests
+        self.queries = []
+        self.index_exists = True
+        self.created_mappings = []
+
+    def bulk(self, body):
+        with self.lock:
+            self.request_sizes.append(len(body))
+            self.refresh_during_bulk.add(self.refresh_interval)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Hold the request briefly so parallel workers overlap
+        time.sleep(0.01)
+        lines = iter(body.decode("utf-8").splitlines())
+        items = []
+        with self.lock:
+            for action_line in lines:
+                op_type, action = next(iter(json.loads(action_line).items()))
+                doc_id = action["_id"]
+                if op_type == "delete":
+                    self.deleted_ids.append(doc_id)
+                    found = self.documents.pop(doc_id, None) is not None
+                    items.append({"delete": {"_index": INDEX, "_id": doc_id, "status": 200 if found else 404,
+                                             "result": "deleted" if found else "not_found"}})
+                    continue
+                source = json.loads(next(lines))
+                self.attempts[doc_id] = self.attempts.get(doc_id, 0) + 1
+                if doc_id in self.reject_always or (doc_id in self.reject_once and self.attempts[doc_id] == 1):
+                    items.append({"index": {"_index": INDEX, "_id": doc_id, "status": 429, "error": {
+                        "type": "es_rejected_execution_exception", "reason": "write queue is full"}}})
+                    continue
+                self.documents[doc_id] = source
+                self.write_counts[doc_id] = self.write_counts.get(doc_id, 0) + 1
+                items.append({"index": {"_index": INDEX, "_id": doc_id, "status": 201, "result": "created"}})
+            self.in_flight -= 1
+        statuses = [next(iter(item.values()))["status"] for item in items]
+        return {"took": 1, "errors": any(status >= 300 for status in statuses), "items": items}
+
+    def delete_by_query(self, body):
+        document_id = body["query"]["term"]["metadata.document_id"]
+        with self.lock:
+            self.queries.append(document_id)
+            matches = [doc_id for doc_id, source in self.documents.items()
+                       if source["metadata"].get("document_id") == document_id]
+            for doc_id in matches:
+                del self.documents[doc_id]
+        return {"took": 1, "deleted": len(matches), "failures": []}
+
+
+def make_handler(endpoint):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, payload, status=200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("X-Elastic-Product", "Elasticsearch")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(data)
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def do_HEAD(self):
+            self._send({}, status=200 if endpoint.index_exists or self.path != f"/{INDEX}" else 404)
+
+        def do_GET(self):
+            if self.path == "/":
+                self._send({"version": {"number": "8.13.0"}, "tagline": "You Know, for Search"})
+            elif "/_settings" in self.path:
+                settings = {"index": {"refresh_interval": endpoint.refresh_interval}} if endpoint.refresh_interval else {}
+                self._send({INDEX: {"settings": settings}})
+            else:
+                self._send({}, status=404)
+
+        def do_PUT(self):
+            body = self._body()
+            if "/_settings" in self.path:
+                with endpoint.lock:
+                    endpoint.refresh_interval = json.loads(body)["index"]["refresh_interval"]
+                self._send({"acknowledged": True})
+            elif self.path == f"/{INDEX}":
+                with endpoint.lock:
+                    endpoint.index_exists = True
+                    endpoint.created_mappings.append(json.loads(body)["mappings"])
+                self._send({"acknowledged": True, "index": INDEX})
+            else:
+                self.do_POST(body)
+
+        def do_POST(self, body=None):
+            body = self._body() if body is None else body
+            if self.path.startswith("/_bulk"):
+                self._send(endpoint.bulk(body))
+            elif "/_delete_by_query" in self.path:
+                self._send(endpoint.delete_by_query(json.loads(body)))
+            elif "/_refresh" in self.path:
+                with endpoint.lock:
+                    endpoint.refreshes += 1
+                self._send({"_shards": {"total": 1, "successful": 1, "failed": 0}})
+            else:
+                self._send({}, status=404)
+
+    return Handler
+
+
+@pytest.fixture
+def endpoint():
+    """Start the fake bulk endpoint on a free local port."""
+    state = FakeBulkEndpoint()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def make_documents(count, size=200):
+    """Build chunk documents with distinct IDs and small embeddings."""
+    documents = [Document(page_content="w" * size, metadata={"chunk_id": f"doc-1-chunk-{i}", "document_id": "doc-1"})
+                 for i in range(count)]
+    embeddings = [[float(i), 0.5, 0.25] for i in range(count)]
+    return documents, embeddings
+
+
+def make_indexer(endpoint, **kwargs):
+    kwargs.setdefault("retry_delay", 0)
+    return ElasticsearchBulkIndexer(Elasticsearch(endpoint.url), INDEX, **kwargs)
+
+
+class TestElasticsearchBulkIndexer:
+    """Test cases for chunked, parallel bulk requests with refresh control."""
+
+    def test_requests_are_bounded_by_bytes_and_sent_in_parallel(self, endpoint):
+        """Test that every bulk request stays under the byte limit and workers overlap."""
+        documents, embeddings = make_documents(400)
+        indexer = make_indexer(endpoint, max_chunk_bytes=16 * 1024, chunk_size=500, thread_count=4)
+
+        stats = indexer.index(documents, embeddings)
+
+        assert stats["indexed"] == 400 and stats["failed"] == 0
+        assert len(endpoint.request_sizes) > 4
+        assert max(endpoint.request_sizes) <= 16 * 1024
+        assert endpoint.max_in_flight > 1
+        assert endpoint.documents["doc-1-chunk-7"] == {
+            "text": "w" * 200, "vector": [7.0, 0.5, 0.25],
+            "metadata": {"chunk_id": "doc-1-chunk-7", "document_id": "doc-1"}
+        }
+
+    def test_rejected_items_are_retried_alone(self, endpoint):
+        """Test that only rejected items are resent and every document is written exactly once."""
+        documents, embeddings = make_documents(300)
+        endpoint.reject_once = {f"doc-1-chunk-{i}" for i in range(0, 300, 7)}
+        indexer = make_indexer(endpoint, chunk_size=50, thread_count=3)
+
+        stats = indexer.index(documents, embeddings)
+
+        assert stats["indexed"] == 300 and stats["retries"] == 1
+        assert set(endpoint.write_counts.values()) == {1}
+        assert len(endpoint.write_counts) == 300
+        assert sum(endpoint.attempts.values()) == 300 + len(endpoint.reject_once)
+
+    def test_large_job_disables_refresh_and_restores_it(self, endpoint):
+        """Test that refresh is disabled during a large job, restored afterwards and run once."""
+        documents, embeddings = make_documents(120)
+        indexer = make_indexer(endpoint, chunk_size=20, large_job_threshold=100)
+
+        indexer.index(documents, embeddings)
+
+        assert endpoint.refresh_during_bulk == {"-1"}
+        assert endpoint.refresh_interval == "5s"
+        assert endpoint.refreshes == 1
+
+    def test_small_job_leaves_refresh_settings_alone(self, endpoint):
+        """Test that jobs below the threshold keep the refresh interval."""
+        documents, embeddings = make_documents(10)
+        indexer = make_indexer(endpoint, large_job_threshold=100)
+
+        indexer.index(documents, embeddings)
+
+        assert endpoint.refresh_during_bulk == {"5s"}
+        assert endpoint.refreshes == 1
+
+    def test_permanent_rejections_raise_and_restore_refresh(self, endpoint):
+        """Test that items rejected on every attempt are reported and the refresh interval is still restored."""
+        documents, embeddings = make_documents(50)
+        endpoint.reject_always = {"doc-1-chunk-4", "doc-1-chunk-40"}
+        indexer = make_indexer(endpoint, max_retries=2, large_job_threshold=10)
+
+        with pytest.raises(BatchIndexingError) as error:
+            indexer.index(documents, embeddings)
+
+        assert error.value.failed_positions == [4, 40]
+        assert "write queue is full" in error.value.errors[4]
+        assert endpoint.attempts["doc-1-chunk-4"] == 3
+        assert len(endpoint.documents) == 48
+        assert endpoint.refresh_interval == "5s"
+
+    def test_concurrent_jobs_restore_refresh_once(self, endpoint):
+        """Test that overlapping large jobs keep refresh disabled until the last one finishes."""
+        indexer = make_indexer(endpoint, chunk_size=10, large_job_threshold=10)
+        endpoint.refresh_interval = None
+
+        def run(offset):
+            documents, embeddings = make_documents(60)
+            for doc in documents:
+                doc.metadata["chunk_id"] += f"-{offset}"
+            indexer.index(documents, embeddings)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert endpoint.refresh_during_bulk == {"-1"}
+        assert endpoint.refresh_interval is None
+        assert len(endpoint.documents) == 180
+
+    def test_session_relaxes_refresh_across_small_calls(self, endpoint):
+        """Test that a session relaxes refresh once its calls add up to a large job and refreshes once at the end."""
+        indexer = make_indexer(endpoint, large_job_threshold=100)
+
+        with indexer.bulk_session():
+            for batch in range(5):
+                documents, embeddings = make_documents(30)
+                for doc in documents:
+                    doc.metadata["chunk_id"] += f"-{batch}"
+                indexer.index(documents, embeddings)
+            assert endpoint.refresh_interval == "-1"
+            assert endpoint.refreshes == 0
+
+        assert endpoint.refresh_during_bulk == {"5s", "-1"}
+        assert endpoint.refresh_interval == "5s"
+        assert endpoint.refreshes == 1
+
+    def test_slow_settings_call_does_not_block_other_indexes(self, endpoint, monkeypatch):
+        """Test that a slow cluster call for one index does not hold up sessions on other indexes."""
+        slow = make_indexer(endpoint, large_job_threshold=1)
+        other = ElasticsearchBulkIndexer(Elasticsearch(endpoint.url), "other-index", large_job_threshold=1000)
+        entered = threading.Event()
+        get_settings = slow.client.indices.get_settings
+
+        def slow_get_settings(**kwargs):
+            entered.set()
+            time.sleep(0.5)
+            return get_settings(**kwargs)
+
+        monkeypatch.setattr(slow.client.indices, "get_settings", slow_get_settings)
+        documents, embeddings = make_documents(5)
+        builder = threading.Thread(target=slow.index, args=(documents, embeddings))
+        builder.start()
+        entered.wait()
+
+        start = time.time()
+        with other.bulk_session() as state:
+            other._count_documents(state, 5)
+        elapsed = time.time() - start
+        builder.join()
+
+        assert elapsed < 0.3
+
+    def test_indexers_share_sessions_per_index(self, endpoint):
+        """Test that overlapping sessions of two indexers restore the original interval, not the relaxed one."""
+        first = make_indexer(endpoint, large_job_threshold=10)
+        second = make_indexer(endpoint, large_job_threshold=10)
+        documents, embeddings = make_documents(20)
+
+        with second.bulk_session():
+            with first.bulk_session():
+                first.index(documents, embeddings)
+            assert endpoint.refresh_interval == "-1"
+            second.index(documents, embeddings)
+
+        assert endpoint.refresh_interval == "5s"
+        assert endpoint.refreshes == 1
+
+
+def make_store(endpoint, **config):
+    return ElasticsearchVectorStore(dict({
+        "elasticsearch_endpoint": endpoint.url,
+        "elasticsearch_index": INDEX,
+        "retry_delay": 0
+    }, **config), embedding_model=None)
+
+
+class TestElasticsearchVectorStore:
+    """Test cases for the store's bulk indexing and deletion paths."""
+
+    def test_embedded_documents_go_through_bulk_indexer(self, endpoint):
+        """Test that precomputed embeddings are bulk indexed under their chunk IDs."""
+        store = make_store(endpoint, es_bulk_chunk_size=5, es_bulk_thread_count=2)
+        documents, embeddings = make_documents(12)
+
+        ids = store.add_embedded_documents(documents, embeddings)
+
+        assert ids == [doc.metadata["chunk_id"] for doc in documents]
+        assert set(endpoint.documents) == set(ids)
+        assert len(endpoint.request_sizes) == 3
+
+    def test_missing_index_is_created_with_vector_mapping(self, endpoint):
+        """Test that the index is created through the client with the store's vector field mapping."""
+        endpoint.index_exists = False
+        store = make_store(endpoint)
+        documents, embeddings = make_documents(3)
+
+        store.add_embedded_documents(documents, embeddings)
+        store.add_embedded_documents(documents, embeddings)
+
+        assert endpoint.created_mappings == [{"properties": {store.store.vector_query_field: {
+            "type": "dense_vector", "dims": len(embeddings[0]), "index": True, "similarity": "cosine"}}}]
+
+    def test_delete_with_chunk_ids_uses_bulk_delete(self, endpoint):
+        """Test that known chunk IDs are deleted in bulk without a delete_by_query."""
+        store = make_store(endpoint, es_bulk_chunk_size=10)
+        documents, embeddings = make_documents(25)
+        ids = store.add_embedded_documents(documents, embeddings)
+        other, other_embeddings = make_documents(3)
+        for doc in other:
+            doc.metadata.update(chunk_id=doc.metadata["chunk_id"].replace("doc-1", "doc-2"), document_id="doc-2")
+        store.add_embedded_documents(other, other_embeddings)
+        sizes_before = len(endpoint.request_sizes)
+
+        assert store.delete("doc-1", chunk_ids=ids)
+
+        assert endpoint.queries == []
+        assert sorted(endpoint.deleted_ids) == sorted(ids)
+        assert len(endpoint.request_sizes) - sizes_before == 3
+        assert set(endpoint.documents) == {doc.metadata["chunk_id"] for doc in other}
+
+    def test_legacy_document_is_deleted_by_query(self, endpoint):
+        """Test that a document without recorded chunk IDs is removed with delete_by_query."""
+        store = make_store(endpoint)
+        documents, embeddings = make_documents(5)
+        for doc in documents:
+            del doc.metadata["chunk_id"]
+        store.add_embedded_documents(documents, embeddings)
+
+        assert store.delete("doc-1")
+
+        assert endpoint.queries == ["doc-1"]
+        assert endpoint.deleted_ids == []
+        assert endpoint.documents == {}
+
+    def test_chunks_missing_by_id_fall_back_to_query(self, endpoint):
+        """Test that chunks stored under other IDs are still removed when the recorded IDs are not found."""
+        store = make_store(endpoint)
+        documents, embeddings = make_documents(5)
+        recorded = [doc.metadata.pop("chunk_id") for doc in documents]
+        store.add_embedded_documents(documents, embeddings)
+
+        assert store.delete("doc-1", chunk_ids=recorded)
+
+        assert endpoint.deleted_ids == recorded
+        assert endpoint.queries == ["doc-1"]
+        assert endpoint.documents == {}
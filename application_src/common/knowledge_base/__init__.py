@@ -8,30 +8,17 @@ try:
 except ImportError:
     from config import Config
 from .base import BaseKnowledgeBaseProvider
+from .registry import KnowledgeBaseProviderRegistry
 
-# Global variable to store the provider instance
-_kb_provider_instance = None
-_kb_provider_agent_name = None
+# Process-wide registry of provider instances, keyed by provider type and config hash
+_kb_registry = KnowledgeBaseProviderRegistry()
 
 class KnowledgeBaseFactory:
     """Factory for creating knowledge base providers."""
     
     @staticmethod
     def create(agent_name="qa_agent"):
-        """Create a knowledge base provider based on configuration."""
-        global _kb_provider_instance, _kb_provider_agent_name
-        
-        print(f"DEBUG KB FACTORY CREATE: Called with agent_name: {agent_name}")
-        print(f"DEBUG KB FACTORY CREATE: Current _kb_provider_agent_name: {_kb_provider_agent_name}")
-        
-        # Check if we need to reset the provider instance due to agent name change
-        if _kb_provider_instance is not None and _kb_provider_agent_name != agent_name:
-            print(f"KB Factory: Agent name changed from {_kb_provider_agent_name} to {agent_name}, resetting instance")
-            reset_knowledge_base_provider()
-            # Force a new instance to be created
-            _kb_provider_instance = None
-            _kb_provider_agent_name = agent_name
-        
+        """Create or reuse a knowledge base provider based on configuration."""
         # Create a config instance with the specified agent_name
         agent_config = Config(agent_name)
         
@@ -42,6 +29,7 @@ class KnowledgeBaseFactory:
         
         if not kb_config["enabled"]:
             print("Knowledge base is disabled")
+            _kb_registry.release(agent_name)
             return None
         
         provider = kb_config["provider"].lower()
@@ -49,64 +37,49 @@ class KnowledgeBaseFactory:
         
         print(f"KB Factory: Requested provider={provider}, type={provider_type}, agent_name={agent_name}")
         
-        # Check if we need to reset the provider instance due to configuration change
-        if _kb_provider_instance is not None:
-            current_provider = getattr(_kb_provider_instance, 'provider_name', '').lower()
-            print(f"KB Factory: Current provider={current_provider}, requested provider={provider}")
-            
-            if current_provider != provider:
-                print(f"KB Factory: Provider changed from {current_provider} to {provider}, resetting instance")
-                reset_knowledge_base_provider()
-            else:
-                print(f"KB Factory: Provider unchanged ({current_provider}), using existing instance")
-        else:
-            print("KB Factory: No existing provider instance")
+        # Providers are shared between agents with identical configuration and
+        # kept separate otherwise, so switching agents never tears down a provider
+        key = _kb_registry.make_key(kb_config)
+        kb_provider = _kb_registry.acquire(
+            agent_name,
+            key,
+            lambda: KnowledgeBaseFactory._create_provider(provider, provider_type, kb_config, agent_name)
+        )
         
-        # If we already have a provider instance, return it
-        if _kb_provider_instance is not None:
-            print(f"KB Factory: Using existing knowledge base provider instance: {_kb_provider_instance.provider_name} for agent: {_kb_provider_agent_name}")
-            # Double check that we're using the right agent
-            if _kb_provider_agent_name != agent_name:
-                print(f"WARNING: Provider agent name mismatch! Expected {agent_name}, got {_kb_provider_agent_name}")
-                # Force reset and recreate
-                reset_knowledge_base_provider()
-                # Continue with creation below
-            else:
-                return _kb_provider_instance
+        if kb_provider is not None:
+            print(f"KB Factory: Using provider instance: {kb_provider.provider_name} for agent: {agent_name}")
+        else:
+            print(f"KB Factory: Failed to create provider instance for {provider}")
         
+        return kb_provider
+    
+    @staticmethod
+    def _create_provider(provider, provider_type, kb_config, agent_name):
+        """Create a new provider instance for the given provider name and type."""
         print(f"KB Factory: Initializing knowledge base provider: {provider} with type: {provider_type}")
-        print(f"KB Factory: Full KB config: {kb_config}")
-        
-        # Store the current agent name
-        _kb_provider_agent_name = agent_name
-        print(f"DEBUG KB FACTORY: Set _kb_provider_agent_name to: {_kb_provider_agent_name}")
         
         # Provider mapping for different knowledge base types
         if provider == "elastic" or provider == "elasticsearch":
             print(f"KB Factory: Creating Elasticsearch provider with type: {provider_type} for agent: {agent_name}")
-            _kb_provider_instance = KnowledgeBaseFactory._create_elastic_provider(kb_config, provider_type)
+            return KnowledgeBaseFactory._create_elastic_provider(kb_config, provider_type)
         elif provider == "bedrock knowledge base" or provider == "bedrock_kb":
             print(f"KB Factory: Creating Bedrock Knowledge Base provider with type: {provider_type} for agent: {agent_name}")
-            _kb_provider_instance = KnowledgeBaseFactory._create_bedrock_provider(kb_config, provider_type)
+            return KnowledgeBaseFactory._create_bedrock_provider(kb_config, provider_type)
         elif provider == "snowflake":
             print(f"KB Factory: Creating Snowflake provider with type: {provider_type} for agent: {agent_name}")
-            _kb_provider_instance = KnowledgeBaseFactory._create_snowflake_provider(kb_config, provider_type)
+            return KnowledgeBaseFactory._create_snowflake_provider(kb_config, provider_type)
         elif provider == "aurora":
             print(f"KB Factory: Creating Aurora provider with type: {provider_type} for agent: {agent_name}")
-            _kb_provider_instance = KnowledgeBaseFactory._create_aurora_provider(kb_config, provider_type)
+            return KnowledgeBaseFactory._create_aurora_provider(kb_config, provider_type)
         elif provider == "mongodb":
             print(f"KB Factory: Creating MongoDB provider with type: {provider_type} for agent: {agent_name}")
-            _kb_provider_instance = KnowledgeBaseFactory._create_mongodb_provider(kb_config, provider_type)
+            return KnowledgeBaseFactory._create_mongodb_provider(kb_config, provider_type)
+        elif provider == "federated":
+            print(f"KB Factory: Creating federated provider for agent: {agent_name}")
+            return KnowledgeBaseFactory._create_federated_provider(kb_config, agent_name)
         else:
             print(f"KB Factory: Unknown knowledge base provider: {provider}")
             return None
-        
-        if _kb_provider_instance is not None:
-            print(f"KB Factory: Successfully created provider instance: {_kb_provider_instance.provider_name}")
-        else:
-            print(f"KB Factory: Failed to create provider instance for {provider}")
-        
-        return _kb_provider_instance
     
     @staticmethod
     def _create_elastic_provider(kb_config, provider_type):
@@ -245,33 +218,54 @@ class KnowledgeBaseFactory:
                 traceback.print_exc()
                 return None
 
-def reset_knowledge_base_provider():
-    """Reset the knowledge base provider instance to force recreation."""
-    global _kb_provider_instance, _kb_provider_agent_name
-    print(f"DEBUG KB RESET: Resetting knowledge base provider. Current agent name: {_kb_provider_agent_name}")
-    _kb_provider_instance = None
-    _kb_provider_agent_name = None
-    print("Knowledge base provider instance has been reset")
+    @staticmethod
+    def _create_federated_provider(kb_config, agent_name):
+        """Create a federated provider over every member listed in provider_details."""
+        from .federated import FederatedKnowledgeBaseProvider
+        
+        members = []
+        for detail in kb_config.get("provider_details", []):
+            name = detail.get("name", "").lower()
+            if name == "federated":
+                continue
+            member_config = dict(kb_config, provider=name, provider_details=[detail],
+                                 knowledge_base_provider_type="custom")
+            member = KnowledgeBaseFactory._create_provider(name, "custom", member_config, agent_name)
+            if member is None:
+                continue
+            if not member.supports_search():
+                print(f"Error: Knowledge base provider '{name}' does not support structured search and cannot "
+                      f"be a federated member; remove it from provider_details or use it as a standalone knowledge base")
+                member.close()
+                continue
+            members.append(member)
+        
+        if not members:
+            print("Error: Federated knowledge base requires at least one member provider")
+            return None
+        return FederatedKnowledgeBaseProvider(kb_config, members)
+
+def reset_knowledge_base_provider(agent_name=None):
+    """
+    Release the knowledge base provider held by an agent, or by all agents if no name is given.
+    
+    Released providers stay cached until they are idle past the registry TTL, so
+    re-creating a provider with unchanged configuration reuses its connections.
+    """
+    print(f"DEBUG KB RESET: Releasing knowledge base provider for agent: {agent_name or 'all agents'}")
+    if agent_name:
+        _kb_registry.release(agent_name)
+    else:
+        _kb_registry.release_all()
+
+def close_knowledge_base_providers():
+    """Close all cached knowledge base providers, e.g. on application shutdown."""
+    _kb_registry.close_all()
+    print("All knowledge base providers have been closed")
 
 def get_knowledge_base_tools(agent_name="qa_agent"):
     """Get knowledge base tools for use with Strands Agent."""
-    # Create a config instance with the specified agent_name
-    agent_config = Config(agent_name)
-    
-    # Force refresh the configuration to check for changes
-    kb_config = agent_config.get_knowledge_base_config()
-    
-    # Check if the provider has changed since the last time
-    global _kb_provider_instance, _kb_provider_agent_name
-    if _kb_provider_instance is not None:
-        current_provider = getattr(_kb_provider_instance, 'provider_name', '').lower()
-        requested_provider = kb_config.get("provider", "").lower()
-        
-        if current_provider != requested_provider or _kb_provider_agent_name != agent_name:
-            print(f"KB Provider changed from {current_provider} to {requested_provider} or agent changed from {_kb_provider_agent_name} to {agent_name}, resetting instance")
-            reset_knowledge_base_provider()
-    
-    # Create or get the knowledge base provider
+    # Create or get the knowledge base provider for the current configuration
     kb_provider = KnowledgeBaseFactory.create(agent_name)
     if kb_provider:
         return kb_provider.get_tools()
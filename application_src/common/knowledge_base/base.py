@@ -33,3 +33,61 @@ class BaseKnowledgeBaseProvider(ABC):
             if provider.get("name", "").lower() == self.provider_name.lower():
                 return provider.get("config", {})
         return {}
+    
+    @staticmethod
+    def _to_int(value, default: int) -> int:
+        """Convert a provider config value to int, falling back to the default."""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+    
+    @staticmethod
+    def _to_float(value, default: float) -> float:
+        """Convert a provider config value to float, falling back to the default."""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+    
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search the knowledge base and return structured results.
+        
+        Each result is a dict with "text", "source", "score" and "metadata" keys,
+        ordered best first. Providers that support federated retrieval override this.
+        """
+        raise NotImplementedError(f"Provider {self.provider_name} does not support structured search")
+    
+    def supports_search(self) -> bool:
+        """Check whether this provider implements structured search."""
+        return type(self).search is not BaseKnowledgeBaseProvider.search
+    
+    def _search_langchain_retriever(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Run a structured search through a Langchain retriever's vector store."""
+        if not getattr(self, "is_initialized", False):
+            self.initialize()
+        retriever = getattr(self, "retriever", None)
+        if retriever is None:
+            raise RuntimeError(f"Provider {self.provider_name} is not initialized")
+        
+        vector_store = getattr(retriever, "vectorstore", None)
+        if vector_store is not None and hasattr(vector_store, "similarity_search_with_score"):
+            docs_with_scores = vector_store.similarity_search_with_score(query, k=top_k)
+        else:
+            docs_with_scores = [(doc, None) for doc in retriever.invoke(query)[:top_k]]
+        
+        results = []
+        for doc, score in docs_with_scores:
+            metadata = doc.metadata or {}
+            results.append({
+                "text": doc.page_content,
+                "source": metadata.get("source", self.provider_name),
+                "score": score,
+                "metadata": metadata
+            })
+        return results
+    
+    def close(self):
+        """Release provider resources. Providers holding connections override this."""
+        pass
@@ -3,13 +3,15 @@ Aurora PostgreSQL knowledge base provider for GenAI-In-A-Box agent.
 This module provides a knowledge base provider using Aurora PostgreSQL with Data API and LLM-powered SQL generation.
 """
 
+import asyncio
 import traceback
 import json
 import time
 import boto3
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from strands import tool
 from ..base import BaseKnowledgeBaseProvider
+from ..result_formatter import TabularResultFormatter
 import logging
 
 # Import SecureLogger with fallback
@@ -55,7 +57,14 @@ class AuroraKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
                 "cluster_arn": provider_config.get("aurora_cluster_arn"),
                 "secret_arn": provider_config.get("aurora_secret_arn"), 
                 "database_name": provider_config.get("aurora_database_name", "db_finserve_intel"),
-                "region": provider_config.get("aurora_region", "us-east-1")
+                "region": provider_config.get("aurora_region", "us-east-1"),
+                # Streaming answer options
+                "stream_summary": str(provider_config.get("aurora_stream_summary", "true")).lower() in ["true", "yes", "1"],
+                "summary_skip_max_rows": self._to_int(provider_config.get("aurora_summary_skip_max_rows"), 0),
+                "preview_rows": self._to_int(provider_config.get("aurora_preview_rows"), 5),
+                # Result formatting options ("markdown" or "csv")
+                "result_format": provider_config.get("aurora_result_format", "markdown"),
+                "result_max_chars": self._to_int(provider_config.get("aurora_result_max_chars"), 8000)
             }
             
             # Get main model ID from config instead of separate aurora model
@@ -411,54 +420,36 @@ Generate the SQL query:"""
             raise
     
     def _format_query_results(self, response: Dict) -> str:
-        """Format SQL query results into readable text."""
+        """Format SQL query results into size-capped readable text."""
         try:
-            if not response.get('records'):
-                return "No results returned from query."
-            
-            records = response['records']
-            columns = []
-            
-            # Extract column names from metadata
-            if response.get('columnMetadata'):
-                columns = [col['name'] for col in response['columnMetadata']]
-            else:
-                # Fallback: use generic column names
-                columns = [f"column_{i+1}" for i in range(len(records[0]) if records else 0)]
-            
+            records = response.get('records')
             if not records:
                 return "No results returned from query."
             
-            # Format as table
-            result_text = ""
-            
-            # Add column headers
-            header = " | ".join(f"{col:20}" for col in columns)
-            result_text += header + "\n"
-            result_text += "-" * len(header) + "\n"
-            
-            # Add data rows (limit to first 50 for readability)
-            for i, record in enumerate(records[:50]):
-                row_values = [self._extract_value(field) for field in record]
-                row_str = " | ".join(f"{str(val):20}" for val in row_values)
-                result_text += row_str + "\n"
-            
-            if len(records) > 50:
-                result_text += f"\n... and {len(records) - 50} more rows\n"
-            
-            result_text += f"\nTotal rows: {len(records)}"
-            
-            return result_text
+            formatter = TabularResultFormatter(
+                mode=self.aurora_config.get("result_format", "markdown"),
+                max_chars=self.aurora_config.get("result_max_chars", 8000),
+                max_rows=50
+            )
+            return formatter.format(
+                self._get_result_columns(response),
+                ([self._extract_value(field) for field in record] for record in records),
+                total_rows=len(records)
+            )
             
         except Exception as e:
             return f"Error formatting results: {str(e)}"
     
-    def _summarize_results_with_llm(self, query: str, sql_query: str, results: str) -> str:
-        """Use LLM to create a summary of the query results."""
-        try:
-            print("🤖 Creating summary with LLM...")
-            
-            prompt = f"""You are a data analyst. Provide a clear, concise summary of the SQL query results.
+    def _get_result_columns(self, response: Dict) -> List[str]:
+        """Get column names from result metadata, falling back to generic names."""
+        if response.get('columnMetadata'):
+            return [col['name'] for col in response['columnMetadata']]
+        records = response.get('records') or []
+        return [f"column_{i+1}" for i in range(len(records[0]) if records else 0)]
+    
+    def _build_summary_prompt(self, query: str, sql_query: str, results: str) -> str:
+        """Build the LLM prompt used to summarize query results."""
+        return f"""You are a data analyst. Provide a clear, concise summary of the SQL query results.
 
 ORIGINAL USER QUESTION: {query}
 
@@ -475,20 +466,29 @@ Please provide:
 4. Direct answer to the user's original question
 
 Keep the summary concise but informative. Focus on business insights rather than technical details."""
-
+    
+    def _build_summary_request_body(self, query: str, sql_query: str, results: str) -> str:
+        """Build the Bedrock request body used to summarize query results."""
+        return json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "messages": [
+                {
+                    "role": "user", 
+                    "content": self._build_summary_prompt(query, sql_query, results)
+                }
+            ],
+            "max_tokens": 800,
+            "temperature": 0.3
+        })
+    
+    def _summarize_results_with_llm(self, query: str, sql_query: str, results: str) -> str:
+        """Use LLM to create a summary of the query results."""
+        try:
+            print("🤖 Creating summary with LLM...")
+            
             response = self.bedrock_client.invoke_model(
                 modelId=self.aurora_config["model_id"],
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "messages": [
-                        {
-                            "role": "user", 
-                            "content": prompt
-                        }
-                    ],
-                    "max_tokens": 800,
-                    "temperature": 0.3
-                })
+                body=self._build_summary_request_body(query, sql_query, results)
             )
             
             response_body = json.loads(response['body'].read())
@@ -502,43 +502,87 @@ Keep the summary concise but informative. Focus on business insights rather than
             print(f"❌ {error_msg}")
             return error_msg
     
-    def _create_tools(self):
-        """Create Aurora PostgreSQL query tools."""
+    def _summarize_results_with_llm_stream(self, query: str, sql_query: str, results: str) -> Iterator[str]:
+        """Use a streaming LLM call to summarize the query results, yielding text deltas as they arrive."""
+        try:
+            print("🤖 Streaming summary with LLM...")
+            
+            response = self.bedrock_client.invoke_model_with_response_stream(
+                modelId=self.aurora_config["model_id"],
+                body=self._build_summary_request_body(query, sql_query, results)
+            )
+            
+            for event in response.get('body', []):
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                payload = json.loads(chunk['bytes'])
+                if payload.get('type') == 'content_block_delta':
+                    text = payload.get('delta', {}).get('text')
+                    if text:
+                        yield text
+            
+            print("✅ Summary streamed successfully")
+            
+        except Exception as e:
+            error_msg = f"Error generating summary: {str(e)}"
+            print(f"❌ {error_msg}")
+            yield error_msg
+    
+    def _format_row_preview(self, response: Dict) -> str:
+        """Format a compact preview of the first few result rows."""
+        records = response.get('records') or []
+        if not records:
+            return "No results returned from query."
         
-        @tool
-        def retriever_aurora_sql_query(query: str) -> str:
-            """
-            Execute natural language queries against Aurora PostgreSQL database using AI-generated SQL.
-            This tool can answer questions about data by generating and executing appropriate SQL queries.
-            """
+        formatter = TabularResultFormatter(
+            mode=self.aurora_config.get("result_format", "markdown"),
+            max_chars=2000,
+            max_rows=self.aurora_config.get("preview_rows", 5),
+            max_cell_width=30
+        )
+        return formatter.format(
+            self._get_result_columns(response),
+            ([self._extract_value(field) for field in record] for record in records),
+            total_rows=len(records)
+        )
+    
+    def _should_skip_summary(self, response: Dict) -> bool:
+        """Check whether the result is small enough to be returned without an LLM summary."""
+        skip_max_rows = self.aurora_config.get("summary_skip_max_rows", 0)
+        return skip_max_rows > 0 and len(response.get('records') or []) <= skip_max_rows
+    
+    def stream_query(self, query: str) -> Iterator[str]:
+        """
+        Answer a natural language query as a stream of text chunks.
+        
+        The generated SQL and a compact row preview are emitted as soon as the query
+        has executed, followed by the LLM summary as it streams and the raw results.
+        """
+        try:
+            print(f"🚀 Processing Aurora query: {query}")
+            start_time = time.time()
+            
+            # Get database schema
+            schema_info = self._get_database_schema()
+            if not schema_info:
+                yield "Error: Could not retrieve database schema information."
+                return
+            
+            # Generate SQL using LLM
+            sql_query = self._generate_sql_with_llm(query, schema_info)
+            if not sql_query:
+                yield "Error: Could not generate SQL query from natural language."
+                return
+            
+            # Execute the SQL query
             try:
-                print(f"🚀 Processing Aurora query: {query}")
-                start_time = time.time()
-                
-                # Get database schema
-                schema_info = self._get_database_schema()
-                if not schema_info:
-                    return "Error: Could not retrieve database schema information."
-                
-                # Generate SQL using LLM
-                sql_query = self._generate_sql_with_llm(query, schema_info)
-                if not sql_query:
-                    return "Error: Could not generate SQL query from natural language."
-                
-                # Execute the SQL query
-                try:
-                    response = self._execute_sql(sql_query)
-                except Exception as e:
-                    return f"Error executing generated SQL query: {str(e)}\n\nGenerated SQL was:\n{sql_query}"
-                
-                # Format results
-                formatted_results = self._format_query_results(response)
-                
-                # Generate summary with LLM
-                summary = self._summarize_results_with_llm(query, sql_query, formatted_results)
-                
-                # Compile final response
-                final_response = f"""🔍 **Query Analysis Complete**
+                response = self._execute_sql(sql_query)
+            except Exception as e:
+                yield f"Error executing generated SQL query: {str(e)}\n\nGenerated SQL was:\n{sql_query}"
+                return
+            
+            yield f"""🔍 **Query Analysis Complete**
 
 **Original Question:** {query}
 
@@ -547,21 +591,55 @@ Keep the summary concise but informative. Focus on business insights rather than
 {sql_query}
 ```
 
-**Summary:**
-{summary}
+**Preview:**
+{self._format_row_preview(response)}
 
-**Raw Results:**
+"""
+            
+            # Format results
+            formatted_results = self._format_query_results(response)
+            
+            # Generate summary with LLM unless the result speaks for itself
+            if not self._should_skip_summary(response):
+                yield "**Summary:**\n"
+                if self.aurora_config.get("stream_summary", True):
+                    yield from self._summarize_results_with_llm_stream(query, sql_query, formatted_results)
+                else:
+                    yield self._summarize_results_with_llm(query, sql_query, formatted_results)
+                yield "\n\n"
+            else:
+                print("⏭️ Skipping summary for small result set")
+            
+            yield f"""**Raw Results:**
 {formatted_results}
 
 *Query completed in {time.time() - start_time:.2f} seconds*"""
-                
-                return final_response
-                
-            except Exception as e:
-                error_msg = f"Error processing Aurora query: {str(e)}"
-                print(f"❌ {error_msg}")
-                traceback.print_exc()
-                return error_msg
+            
+        except Exception as e:
+            error_msg = f"Error processing Aurora query: {str(e)}"
+            print(f"❌ {error_msg}")
+            traceback.print_exc()
+            yield error_msg
+    
+    def _create_tools(self):
+        """Create Aurora PostgreSQL query tools."""
+        
+        @tool
+        async def retriever_aurora_sql_query(query: str):
+            """
+            Execute natural language queries against Aurora PostgreSQL database using AI-generated SQL.
+            This tool can answer questions about data by generating and executing appropriate SQL queries.
+            """
+            # Stream partial output as tool events; the last yielded value is the tool result
+            chunks = []
+            stream = self.stream_query(query)
+            while True:
+                chunk = await asyncio.to_thread(next, stream, None)
+                if chunk is None:
+                    break
+                chunks.append(chunk)
+                yield chunk
+            yield "".join(chunks)
         
         @tool  
         def retriever_aurora_schema_info(schema_name: str = "") -> str:
@@ -17,6 +17,8 @@ class BedrockKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
         super().__init__(config)
         self.provider_name = "bedrock knowledge base"
         self.is_initialized = False
+        self.knowledge_base_id = None
+        self.region = None
     
     def initialize(self) -> List:
         """Initialize the Bedrock Knowledge Base provider and get the tools."""
@@ -34,6 +36,9 @@ class BedrockKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
                 print("Error: Bedrock Knowledge Base ID is required")
                 return []
             
+            self.knowledge_base_id = kb_id
+            self.region = region
+            
             # Set environment variables for Bedrock Knowledge Base
             print(f"Setting KNOWLEDGE_BASE_ID={kb_id}")
             os.environ["KNOWLEDGE_BASE_ID"] = kb_id
@@ -60,6 +65,35 @@ class BedrockKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
         # Use the retrieve tool directly from strands_tools
         self.tools = [retrieve]
     
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Retrieve structured results from the Bedrock Knowledge Base for federated retrieval."""
+        if not self.is_initialized:  # nosemgrep: is-function-without-parentheses
+            self.initialize()
+        if not self.knowledge_base_id:
+            raise RuntimeError("Bedrock Knowledge Base ID is required")
+        
+        try:
+            from custom_retrieve import get_bedrock_agent_runtime_client
+        except ImportError:
+            from ...custom_retrieve import get_bedrock_agent_runtime_client
+        
+        client = get_bedrock_agent_runtime_client(self.region)
+        response = client.retrieve(
+            knowledgeBaseId=self.knowledge_base_id,
+            retrievalQuery={'text': query},
+            retrievalConfiguration={'vectorSearchConfiguration': {'numberOfResults': top_k}}
+        )
+        
+        results = []
+        for result in response.get('retrievalResults', []):
+            results.append({
+                "text": result.get('content', {}).get('text', ''),
+                "source": result.get('location', {}).get('s3Location', {}).get('uri', 'Unknown source'),
+                "score": result.get('score'),
+                "metadata": result.get('metadata', {})
+            })
+        return results
+    
     def close(self):
         """Close the Bedrock Knowledge Base client."""
         if self.is_initialized:  # nosemgrep: is-function-without-parentheses
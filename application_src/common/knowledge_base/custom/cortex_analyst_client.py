@@ -0,0 +1,206 @@
+"""
+Snowflake Cortex Analyst REST client for GenAI-In-A-Box agent.
+This module provides a keep-alive HTTP client with retries, deadlines and background token refresh.
+"""
+
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CortexAnalystError(Exception):
+    """Error returned by the Cortex Analyst API."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Cortex Analyst API error {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+
+
+class CortexAnalystClient:
+    """
+    Client for the Snowflake Cortex Analyst message API.
+
+    Requests go through one pooled ``requests.Session`` so TLS connections are
+    reused across questions. Throttling, 5xx responses, connection errors and
+    timeouts are retried with jittered exponential backoff within a per-call
+    deadline. The session token
+    is refreshed on a background thread once it gets old, so the request path
+    only reads the cached token; a 401 forces a synchronous refresh and retry.
+    """
+
+    def __init__(self, account: str, token_provider: Callable[[], str],
+                 token_refresher: Optional[Callable[[], str]] = None, base_url: Optional[str] = None,
+                 pool_maxsize: int = 10, max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, deadline_seconds: float = 60,
+                 token_refresh_seconds: float = 600):
+        """
+        Initialize the Cortex Analyst client.
+
+        Args:
+            account: Snowflake account identifier
+            token_provider: Callable returning a valid Snowflake session token
+            token_refresher: Callable returning a new token after the current one was rejected,
+                defaults to token_provider
+            base_url: Override for the account URL, e.g. for local testing
+            pool_maxsize: Maximum number of keep-alive connections
+            max_retries: Retries after the first attempt for retryable responses and connection errors
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Maximum delay in seconds between attempts
+            deadline_seconds: Default total time budget per call, including retries
+            token_refresh_seconds: Token age after which a background refresh starts
+        """
+        self.base_url = (base_url or f"https://{account}.snowflakecomputing.com").rstrip("/")
+        self.url = f"{self.base_url}/api/v2/cortex/analyst/message"
+        self._token_provider = token_provider
+        self._token_refresher = token_refresher or token_provider
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline_seconds = deadline_seconds
+        self.token_refresh_seconds = token_refresh_seconds
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._token: Optional[str] = None
+        self._token_time = 0.0
+        self._token_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def _refresh_token(self, rejected: bool = False):
+        """Fetch a new session token, from the token refresher if the current one was rejected."""
+        token = self._token_refresher() if rejected else self._token_provider()
+        with self._token_lock:
+            self._token = token
+            self._token_time = time.time()
+
+    def _background_refresh(self):
+        """Refresh the token on a background thread, keeping the old one on failure."""
+        try:
+            self._refresh_token()
+        except Exception as e:
+            print(f"⚠️ Background Snowflake token refresh failed: {str(e)}")
+
+    def _get_token(self) -> str:
+        """Return the cached token, starting a background refresh when it gets old."""
+        with self._token_lock:
+            token = self._token
+            stale = time.time() - self._token_time > self.token_refresh_seconds
+            refreshing = self._refresh_thread is not None and self._refresh_thread.is_alive()
+            if token and stale and not refreshing:
+                self._refresh_thread = threading.Thread(target=self._background_refresh, daemon=True)
+                self._refresh_thread.start()
+        if not token:
+            self._refresh_token()
+            token = self._token
+        return token
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Compute the delay before the next attempt, honoring Retry-After when present."""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter exponential backoff
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def send_message(self, query: str, semantic_model_file: str,
+                     deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Send a natural language question to Cortex Analyst.
+
+        Args:
+            query: The user question
+            semantic_model_file: Stage path of the semantic model YAML
+            deadline_seconds: Total time budget for this call, defaults to the client setting
+
+        Returns:
+            Parsed JSON response
+
+        Raises:
+            CortexAnalystError: If the API returns a non-retryable error or retries are exhausted
+            TimeoutError: If the deadline passes before a response is received
+            requests.ConnectionError: If the connection keeps failing until retries or the deadline run out
+        """
+        deadline = time.monotonic() + (deadline_seconds or self.deadline_seconds)
+        payload = json.dumps({
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": query
+                        }
+                    ]
+                }
+            ],
+            "semantic_model_file": semantic_model_file
+        })
+        token_refreshed = False
+        attempt = 0
+
+        while True:
+            headers = {
+                "Authorization": f'Snowflake Token="{self._get_token()}"',
+                "Content-Type": "application/json"
+            }
+            # The request timeout only bounds each socket operation, so the
+            # deadline is checked before every attempt
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Cortex Analyst call exceeded its deadline")
+            try:
+                response = self.session.post(self.url, headers=headers, data=payload, timeout=remaining)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt < self.max_retries:
+                    delay = self._backoff_delay(attempt, None)
+                    attempt += 1
+                    if time.monotonic() + delay < deadline:
+                        print(f"🔁 Cortex Analyst request failed ({type(e).__name__}), "
+                              f"retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                        time.sleep(delay)
+                        continue
+                if isinstance(e, requests.Timeout):
+                    raise TimeoutError("Cortex Analyst call exceeded its deadline") from e
+                raise
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code == 401 and not token_refreshed:
+                # Expired session token: refresh synchronously and retry once
+                print("🔄 Cortex Analyst token rejected, refreshing session token...")
+                self._refresh_token(rejected=True)
+                token_refreshed = True
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                delay = self._backoff_delay(attempt, response.headers.get("Retry-After"))
+                attempt += 1
+                if time.monotonic() + delay >= deadline:
+                    raise CortexAnalystError(response.status_code, response.text)
+                print(f"🔁 Cortex Analyst returned {response.status_code}, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            raise CortexAnalystError(response.status_code, response.text)
+
+    def close(self):
+        """Close pooled HTTP connections."""
+        self.session.close()
@@ -183,6 +183,10 @@ class ElasticKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
         
         self.tools = [retriever_elasticsearch_semantic_search]
     
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Perform a structured semantic search for federated retrieval."""
+        return self._search_langchain_retriever(query, top_k)
+    
     def _validate_elasticsearch_url(self, url: str) -> bool:
         """Validate that the Elasticsearch URL has the required components."""
         try:
@@ -212,6 +212,10 @@ class MongoDBKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
         
         self.tools = [retriever_mongodb_semantic_search]
     
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Perform a structured semantic search for federated retrieval."""
+        return self._search_langchain_retriever(query, top_k)
+    
     def close(self):
         """Close the MongoDB client."""
         if self.is_initialized:  # nosemgrep: is-function-without-parentheses
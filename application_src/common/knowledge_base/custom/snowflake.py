@@ -3,21 +3,91 @@ Snowflake Cortex Analyst knowledge base provider for GenAI-In-A-Box agent.
 This module provides a simple knowledge base provider using Snowflake Cortex Analyst REST API.
 """
 
+import re
 import traceback
-import json
 import time
-import requests
 import snowflake.connector
 import base64
 from typing import List, Dict, Any, Optional
 from strands import tool
 from ..base import BaseKnowledgeBaseProvider
+from ..result_formatter import TabularResultFormatter
+from .snowflake_pool import SnowflakeConnectionPool
+from .cortex_analyst_client import CortexAnalystClient, CortexAnalystError
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Snowflake error codes that mean the connection or its session can no longer be used
+_STALE_CONNECTION_ERRNOS = {
+    250001,  # failed to connect to DB
+    250002,  # connection is closed
+    390112,  # session expired
+    390114,  # master token expired
+}
+
+
+def _is_stale_connection_error(error: Exception) -> bool:
+    """Check whether a Snowflake error means the connection must be replaced."""
+    try:
+        return int(getattr(error, "errno", 0) or 0) in _STALE_CONNECTION_ERRNOS
+    except (TypeError, ValueError):
+        return False
+
+
+# Leading whitespace and SQL comments before the first keyword
+_LEADING_COMMENTS = re.compile(r"^(\s+|--[^\n]*(\n|$)|/\*.*?\*/)*", re.DOTALL)
+
+
+# A comment at the end of a statement: /* block */ or a -- line comment
+_TRAILING_COMMENT = re.compile(r"(/\*((?!\*/).)*\*/|--[^\n]*)\s*$", re.DOTALL)
+# A LIMIT clause ending the statement, optionally followed by OFFSET
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+)(\s+OFFSET\s+\d+)?$", re.IGNORECASE)
+# Other row limiting clauses ending the statement
+_TRAILING_OFFSET_FETCH = re.compile(r"\b(OFFSET\s+\d+(\s+ROWS?)?|FETCH\s+(FIRST|NEXT)\s+\d+\s+ROWS?(\s+ONLY)?)$",
+                                    re.IGNORECASE)
+
+
+def _strip_trailing_comments(statement: str) -> str:
+    """Remove comments at the end of a statement, keeping -- inside a string literal."""
+    while True:
+        match = _TRAILING_COMMENT.search(statement)
+        if not match:
+            return statement
+        head = statement[:match.start()]
+        if head[head.rfind("\n") + 1:].count("'") % 2:
+            # The -- sits inside a string literal on its line
+            return statement
+        statement = head.rstrip()
+
+
+def _wrap_with_row_limit(sql_statement: str, limit: int) -> str:
+    """
+    Push a row limit down into a generated query as a top-level LIMIT clause.
+
+    The clause is appended to the statement, so an ORDER BY keeps deciding which
+    rows are returned; an existing trailing LIMIT is only tightened. Only single
+    SELECT/WITH statements are rewritten; anything else, including statements
+    containing a semicolon anywhere but at the end or ending in another row
+    limiting clause, is returned unchanged and bounded by the fetch alone.
+    """
+    statement = sql_statement.strip().rstrip(";").rstrip()
+    body = _LEADING_COMMENTS.sub("", statement)
+    if ";" in statement or not re.match(r"(select|with)\b", body, re.IGNORECASE):
+        return sql_statement
+    statement = _strip_trailing_comments(statement)
+    match = _TRAILING_LIMIT.search(statement)
+    if match:
+        tightened = min(int(match.group(1)), int(limit))
+        return f"{statement[:match.start()]}LIMIT {tightened}{match.group(2) or ''}"
+    if _TRAILING_OFFSET_FETCH.search(statement):
+        return sql_statement
+    # The clause goes on its own line so a trailing line comment cannot swallow it
+    return f"{statement}\nLIMIT {int(limit)}"
+
+
 class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
     """Knowledge base provider for Snowflake using Cortex Analyst REST API."""
     
@@ -25,7 +95,8 @@ class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
         """Initialize the Snowflake knowledge base provider."""
         super().__init__(config)
         self.provider_name = "snowflake"
-        self.snowflake_conn = None
+        self.connection_pool = None
+        self.cortex_client = None
         self.session_token = None
         self.is_initialized = False
         self.snowflake_config = {}
@@ -49,7 +120,20 @@ class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
                 "role": provider_config.get("snowflake_role", "ACCOUNTADMIN"),
                 "warehouse": provider_config.get("snowflake_warehouse", "LARGE_WH"),
                 "database": provider_config.get("snowflake_database", "SALES_INTELLIGENCE"),
-                "schema": provider_config.get("snowflake_schema", "DATA")
+                "schema": provider_config.get("snowflake_schema", "DATA"),
+                # Result formatting options ("markdown" or "csv")
+                "result_format": provider_config.get("snowflake_result_format", "markdown"),
+                "result_max_chars": self._to_int(provider_config.get("snowflake_result_max_chars"), 8000),
+                # Row limit pushed down into generated SQL, rows shown and fetch byte budget
+                "sql_row_limit": self._to_int(provider_config.get("snowflake_sql_row_limit"), 1000),
+                "display_rows": self._to_int(provider_config.get("snowflake_display_rows"), 10),
+                "fetch_max_bytes": self._to_int(provider_config.get("snowflake_fetch_max_bytes"), 1048576),
+                # Connection pool options
+                "pool_size": self._to_int(provider_config.get("snowflake_pool_size"), 4),
+                "health_check_idle_seconds": self._to_float(provider_config.get("snowflake_health_check_idle_seconds"), 300),
+                # Cortex Analyst client options
+                "cortex_max_retries": self._to_int(provider_config.get("snowflake_cortex_max_retries"), 3),
+                "cortex_deadline_seconds": self._to_float(provider_config.get("snowflake_cortex_deadline_seconds"), 60)
             }
             
             # Validate required configuration
@@ -136,7 +220,19 @@ class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
                 print(f"❌ Error loading Snowflake private key from SSM: {str(e)}")
                 raise
             
-            self._create_connection()
+            self._create_connection_pool()
+            
+            # Open the first connection eagerly so configuration errors surface at startup
+            self._ensure_connection()
+            
+            self.cortex_client = CortexAnalystClient(
+                self.snowflake_config["account"],
+                token_provider=self._ensure_connection,
+                token_refresher=self._reconnect,
+                pool_maxsize=self.snowflake_config.get("pool_size", 4),
+                max_retries=self.snowflake_config.get("cortex_max_retries", 3),
+                deadline_seconds=self.snowflake_config.get("cortex_deadline_seconds", 60)
+            )
             
             print(f"✅ Snowflake connection established in {time.time() - start_time:.2f}s")
             print(f"🎫 Session token extracted successfully")
@@ -146,20 +242,20 @@ class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
             traceback.print_exc()
             raise
     
-    def _create_connection(self):
-        """Create or recreate Snowflake connection."""
+    def _create_connection_pool(self):
+        """Create the Snowflake connection pool from the provider configuration."""
+        self.connection_pool = SnowflakeConnectionPool(
+            self._open_connection,
+            size=self.snowflake_config.get("pool_size", 4),
+            health_check_idle_seconds=self.snowflake_config.get("health_check_idle_seconds", 300),
+            is_stale_error=_is_stale_connection_error
+        )
+    
+    def _open_connection(self):
+        """Open a new Snowflake connection for the pool."""
         try:
-            # Close existing connection if any
-            if self.snowflake_conn:
-                try:
-                    self.snowflake_conn.close()
-                except:
-                    pass
-                self.snowflake_conn = None
-                self.session_token = None
-            
             # Connect using JWT authentication
-            self.snowflake_conn = snowflake.connector.connect(
+            connection = snowflake.connector.connect(
                 user=self.snowflake_config["user"],
                 account=self.snowflake_config["account"],
                 private_key=self._private_key,
@@ -170,38 +266,30 @@ class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
                 schema=self.snowflake_config["schema"]
             )
             
-            # Test the connection
-            cursor = self.snowflake_conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            cursor.close()
-            
-            # Extract session token
-            self.session_token = self.snowflake_conn._rest._token
-            
-            print(f"🔄 Snowflake connection refreshed successfully")
+            print(f"🔄 Snowflake connection opened successfully")
+            return connection
             
         except Exception as e:
             print(f"❌ Error creating Snowflake connection: {str(e)}")
             raise
     
-    def _ensure_connection(self):
-        """Ensure we have a valid Snowflake connection, reconnect if needed."""
-        try:
-            if not self.snowflake_conn or not self.session_token:
-                print("🔄 No connection or token, reconnecting...")
-                self._create_connection()
-                return
-            
-            # Test connection with a simple query
-            cursor = self.snowflake_conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            cursor.close()
-            
-        except Exception as e:
-            print(f"🔄 Connection test failed ({str(e)}), reconnecting...")
-            self._create_connection()
+    def _ensure_connection(self, reconnect: bool = False) -> str:
+        """
+        Ensure we have a valid pooled Snowflake connection and return its session token.
+        
+        With ``reconnect`` the pooled connection is replaced by a new one first, so a
+        token the server rejected is not handed out again.
+        """
+        if not self.connection_pool:
+            raise RuntimeError("Snowflake connection pool is not initialized")
+        
+        # Health checks only run for idle or previously failed connections
+        self.session_token = self.connection_pool.run(lambda conn: conn._rest._token, reconnect=reconnect)
+        return self.session_token
+    
+    def _reconnect(self) -> str:
+        """Open a new pooled connection and return its session token."""
+        return self._ensure_connection(reconnect=True)
     
     def _create_tools(self):
         """Create Snowflake Cortex Analyst tools using the REST API."""
@@ -215,47 +303,16 @@ class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
             try:
                 print(f"🚀 Calling Snowflake Cortex Analyst for: {query}")
                 
-                # Ensure we have a valid connection before making the API call
-                self._ensure_connection()
-                
-                # Cortex Analyst REST API endpoint
-                url = f"https://{self.snowflake_config['account']}.snowflakecomputing.com/api/v2/cortex/analyst/message"
-                
-                # Use the working authorization format
-                headers = {
-                    "Authorization": f'Snowflake Token="{self.session_token}"',
-                    "Content-Type": "application/json"
-                }
-                
-                # Request payload
-                payload = {
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": query
-                                }
-                            ]
-                        }
-                    ],
-                    "semantic_model_file": self.semantic_model_path
-                }
-                
                 print(f"📤 Making API request to Snowflake Cortex Analyst")
                 
-                # Make the API call
-                response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=60)
-                
-                print(f"📥 Response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    error_msg = f"Cortex Analyst API error {response.status_code}: {response.text}"
+                # Pooled keep-alive session with retries; the token is refreshed off the hot path
+                try:
+                    response_data = self.cortex_client.send_message(query, self.semantic_model_path)
+                except CortexAnalystError as e:
+                    error_msg = str(e)
                     print(f"❌ {error_msg}")
                     return error_msg
                 
-                response_data = response.json()
                 print(f"✅ Cortex Analyst responded successfully")
                 
                 # Extract response content
@@ -311,95 +368,121 @@ class SnowflakeKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
         self.tools = [retriever_snowflake_cortex_analyst]
     
     def _execute_sql(self, sql_statement: str) -> str:
-        """Execute SQL statement and return formatted results."""
+        """Execute SQL statement on a pooled connection and return formatted results."""
         start_time = time.time()
-        cursor = None
         
         try:
             print(f"🔍 Executing SQL: {sql_statement[:100]}...")
             
-            # Ensure we have a valid connection before executing SQL
-            self._ensure_connection()
-            
-            if not self.snowflake_conn:
+            if not self.connection_pool:
                 print("❌ No Snowflake connection available")
                 return "Error: No Snowflake connection available"
             
-            cursor = self.snowflake_conn.cursor()
-            execute_start = time.time()
-            cursor.execute(sql_statement)
-            execute_time = time.time() - execute_start
-            
-            fetch_start = time.time()
-            results = cursor.fetchall()
-            fetch_time = time.time() - fetch_start
-            
-            columns = [desc[0] for desc in cursor.description]
+            # Stale connections are replaced and the query retried once by the pool
+            columns, results, total_rows, limit_exceeded, execute_time, fetch_time = self.connection_pool.run(
+                lambda conn: self._run_query(conn, sql_statement)
+            )
             
             if not results:
-                if cursor:
-                    cursor.close()
                 return "No results returned from query."
             
-            # Format results as a table
+            # Format results as a size-capped table
             format_start = time.time()
-            result_text = ""
-            
-            # Add column headers
-            header = " | ".join(f"{col:15}" for col in columns)
-            result_text += header + "\n"
-            result_text += "-" * len(header) + "\n"
-            
-            # Add data rows (limit to first 10 for readability)
-            for i, row in enumerate(results[:10]):
-                row_str = " | ".join(f"{str(val):15}" for val in row)
-                result_text += row_str + "\n"
-            
-            if len(results) > 10:
-                result_text += f"\n... and {len(results) - 10} more rows\n"
-            
-            result_text += f"\nTotal rows: {len(results)}"
+            formatter = TabularResultFormatter(
+                mode=self.snowflake_config.get("result_format", "markdown"),
+                max_chars=self.snowflake_config.get("result_max_chars", 8000),
+                max_rows=self.snowflake_config.get("display_rows", 10)
+            )
+            result_text = formatter.format(columns, results, total_rows=total_rows, more_rows=total_rows is None)
+            row_limit = self.snowflake_config.get("sql_row_limit", 1000)
+            if limit_exceeded:
+                result_text += f"\n(More than {row_limit} rows matched; only the first rows were fetched)"
             format_time = time.time() - format_start
             
-            # Close the cursor
-            if cursor:
-                cursor.close()
-            
             total_time = time.time() - start_time
             print(f"✅ SQL execution timing:")
             print(f"   - Total time: {total_time:.3f}s")
             print(f"   - Execute time: {execute_time:.3f}s")
             print(f"   - Fetch time: {fetch_time:.3f}s")
             print(f"   - Format time: {format_time:.3f}s")
-            print(f"   - Rows returned: {len(results)}")
+            print(f"   - Rows fetched: {len(results)} (total: {total_rows if total_rows is not None else 'unknown'})")
             
             return result_text
             
         except Exception as e:
             error_msg = f"Error executing SQL: {str(e)}"
             print(f"❌ {error_msg}")
-            
-            # Clean up resources
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-                
             return error_msg
     
-    def close(self):
-        """Close Snowflake connection and clean up resources."""
-        if self.is_initialized:
+    def _run_query(self, connection, sql_statement: str):
+        """
+        Run a row-limited query and stream only the rows that will be shown.
+        
+        Returns columns, fetched rows, the total row count (None when unknown or
+        beyond the pushed-down limit), whether the limit was exceeded and timings.
+        """
+        row_limit = self.snowflake_config.get("sql_row_limit", 1000)
+        display_rows = self.snowflake_config.get("display_rows", 10)
+        max_bytes = self.snowflake_config.get("fetch_max_bytes", 1048576)
+        
+        # Ask for one extra row so we can tell whether the limit cut the result
+        limited_sql = _wrap_with_row_limit(sql_statement, row_limit + 1)
+        
+        cursor = connection.cursor()
+        try:
+            execute_start = time.time()
+            cursor.execute(limited_sql)
+            execute_time = time.time() - execute_start
+            
+            fetch_start = time.time()
+            results = []
+            fetched_bytes = 0
+            # Start with one row and size later batches from the observed row width
+            batch_size = 1
+            while len(results) < display_rows and fetched_bytes < max_bytes:
+                batch = cursor.fetchmany(min(batch_size, display_rows - len(results)))
+                if not batch:
+                    break
+                for row in batch:
+                    fetched_bytes += sum(len(str(value)) for value in row)
+                    results.append(row)
+                average_row_bytes = max(fetched_bytes / len(results), 1)
+                batch_size = max(1, int((max_bytes - fetched_bytes) / average_row_bytes))
+            fetch_time = time.time() - fetch_start
+            
+            # The server reports the result size with the first chunk, so this is free
+            total_rows = getattr(cursor, "rowcount", None)
+            limit_exceeded = False
+            if total_rows is None or total_rows < 0:
+                total_rows = len(results) if len(results) < display_rows else None
+            elif total_rows > row_limit:
+                total_rows = None
+                limit_exceeded = True
+            
+            columns = [desc[0] for desc in cursor.description]
+            return columns, results, total_rows, limit_exceeded, execute_time, fetch_time
+        finally:
             try:
-                if self.snowflake_conn:
-                    self.snowflake_conn.close()
-                    self.snowflake_conn = None
-                
+                cursor.close()
+            except Exception:
+                pass
+    
+    def close(self):
+        """Close pooled Snowflake connections and clean up resources."""
+        try:
+            if self.cortex_client:
+                self.cortex_client.close()
+                self.cortex_client = None
+            
+            if self.connection_pool:
+                self.connection_pool.close()
+                self.connection_pool = None
+            
+            if self.is_initialized:
                 self.is_initialized = False
                 self.tools = []
                 self.session_token = None
                 print("✅ Snowflake provider resources released")
-            except Exception as e:
-                print(f"❌ Error closing Snowflake resources: {str(e)}")
-                traceback.print_exc()
+        except Exception as e:
+            print(f"❌ Error closing Snowflake resources: {str(e)}")
+            traceback.print_exc()
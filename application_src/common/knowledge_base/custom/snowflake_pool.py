@@ -0,0 +1,235 @@
+"""
+Snowflake connection pool for GenAI-In-A-Box agent.
+This module provides a small thread-safe connection pool with interval-based health checks.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PooledConnection:
+    """A pooled connection with its usage bookkeeping."""
+    connection: Any
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    needs_check: bool = False
+
+
+class SnowflakeConnectionPool:
+    """
+    Thread-safe pool of Snowflake connections.
+
+    Connections are only health-checked with ``SELECT 1`` when they have been idle
+    longer than ``health_check_idle_seconds`` or when the previous use raised an
+    error, so a busy provider pays no extra round trip per query.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 4,
+                 health_check_idle_seconds: float = 300, checkout_timeout: float = 30,
+                 is_stale_error: Optional[Callable[[Exception], bool]] = None):
+        """
+        Initialize the connection pool.
+
+        Args:
+            connect: Callable that opens a new connection
+            size: Maximum number of open connections
+            health_check_idle_seconds: Idle time after which a connection is checked before reuse
+            checkout_timeout: Seconds to wait for a free connection before raising TimeoutError
+            is_stale_error: Predicate telling whether an error means the connection is unusable
+        """
+        if size < 1:
+            raise ValueError("Connection pool size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.health_check_idle_seconds = health_check_idle_seconds
+        self.checkout_timeout = checkout_timeout
+        self._is_stale_error = is_stale_error or (lambda e: False)
+        self._idle: List[PooledConnection] = []
+        self._open_count = 0
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+        self.stats = {
+            "connections_created": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+            "stale_retries": 0
+        }
+
+    def _checkout(self) -> PooledConnection:
+        """Take an idle connection or open a new one, waiting while the pool is exhausted."""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Snowflake connection pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._open_count < self.size:
+                    # Reserve a slot, the connection is opened outside the lock
+                    self._open_count += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Timed out waiting for a Snowflake connection (pool size {self.size})")
+                self._condition.wait(remaining)
+
+        try:
+            if pooled is None:
+                return self._open()
+            if pooled.needs_check or time.time() - pooled.last_used > self.health_check_idle_seconds:
+                if not self._health_check(pooled):
+                    self._close_quietly(pooled)
+                    return self._open()
+            return pooled
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _checkin(self, pooled: PooledConnection, failed: bool = False):
+        """Return a connection to the pool."""
+        pooled.last_used = time.time()
+        pooled.needs_check = failed
+        with self._condition:
+            if self._closed:
+                self._open_count -= 1
+                self._close_quietly(pooled)
+            else:
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    def _discard(self, pooled: PooledConnection):
+        """Close a connection and free its slot."""
+        self._close_quietly(pooled)
+        self._release_slot()
+
+    def _reopen(self, pooled: PooledConnection) -> PooledConnection:
+        """Replace a checked-out connection with a new one in the same slot."""
+        self._close_quietly(pooled)
+        try:
+            return self._open()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _mark_idle_for_check(self):
+        """Force a health check on every idle connection, e.g. after a session expired."""
+        with self._condition:
+            for pooled in self._idle:
+                pooled.needs_check = True
+
+    def _release_slot(self):
+        """Free a reserved slot and wake up one waiter."""
+        with self._condition:
+            self._open_count -= 1
+            self._condition.notify()
+
+    def _open(self) -> PooledConnection:
+        """Open a new connection in an already reserved slot."""
+        connection = self._connect()
+        with self._condition:
+            self.stats["connections_created"] += 1
+        return PooledConnection(connection=connection)
+
+    def _health_check(self, pooled: PooledConnection) -> bool:
+        """Run ``SELECT 1`` on a connection and report whether it is usable."""
+        with self._condition:
+            self.stats["health_checks"] += 1
+        cursor = None
+        try:
+            cursor = pooled.connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            return True
+        except Exception as e:
+            print(f"🔄 Snowflake connection health check failed ({str(e)}), reconnecting...")
+            with self._condition:
+                self.stats["health_check_failures"] += 1
+            return False
+        finally:
+            if cursor:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _close_quietly(pooled: PooledConnection):
+        """Close a connection, ignoring errors."""
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self, reconnect: bool = False):
+        """
+        Check out a connection for the duration of the block.
+
+        A connection whose block raised is health-checked before its next use,
+        or dropped immediately if the error marks it as stale. With ``reconnect``
+        the checked-out connection is replaced by a newly opened one first,
+        e.g. because its session token was rejected.
+        """
+        pooled = self._checkout()
+        if reconnect:
+            pooled = self._reopen(pooled)
+        try:
+            yield pooled.connection
+        except Exception as e:
+            if self._is_stale_error(e):
+                self._discard(pooled)
+                self._mark_idle_for_check()
+            else:
+                self._checkin(pooled, failed=True)
+            raise
+        else:
+            self._checkin(pooled)
+
+    def run(self, operation: Callable[[Any], Any], reconnect: bool = False) -> Any:
+        """
+        Run ``operation(connection)`` on a pooled connection.
+
+        If the operation fails with a stale-connection error the connection is
+        dropped and the operation is retried once on a health-checked or new connection.
+        With ``reconnect`` the operation runs on a newly opened connection.
+        """
+        try:
+            with self.connection(reconnect=reconnect) as conn:
+                return operation(conn)
+        except Exception as e:
+            if not self._is_stale_error(e):
+                raise
+            print(f"🔄 Stale Snowflake connection ({str(e)}), retrying on a new connection...")
+            with self._condition:
+                self.stats["stale_retries"] += 1
+        with self.connection() as conn:
+            return operation(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        with self._condition:
+            return {
+                **self.stats,
+                "size": self.size,
+                "open_connections": self._open_count,
+                "idle_connections": len(self._idle)
+            }
+
+    def close(self):
+        """Close all idle connections; connections in use are closed when returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open_count -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._close_quietly(pooled)
@@ -0,0 +1,133 @@
+"""
+Tests for the Aurora PostgreSQL knowledge base provider.
+
+This module tests the streaming answer path with fake RDS Data API and Bedrock clients.
+"""
+
+import io
+import json
+import time
+
+from knowledge_base.custom.aurora import AuroraKnowledgeBaseProvider
+
+
+class FakeBedrockClient:
+    """Fake bedrock-runtime client with a blocking SQL call and a streaming summary call."""
+
+    def __init__(self, summary_deltas, delta_delay=0.05):
+        self.summary_deltas = summary_deltas
+        self.delta_delay = delta_delay
+        self.invoke_model_calls = 0
+        self.stream_calls = 0
+
+    def invoke_model(self, modelId, body):
+        self.invoke_model_calls += 1
+        payload = {"content": [{"text": "```sql\nSELECT name, total FROM sales.orders LIMIT 20\n```"}]}
+        return {"body": io.BytesIO(json.dumps(payload).encode())}
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        self.stream_calls += 1
+
+        def events():
+            yield {"chunk": {"bytes": json.dumps({"type": "message_start"}).encode()}}
+            for delta in self.summary_deltas:
+                time.sleep(self.delta_delay)
+                yield {"chunk": {"bytes": json.dumps({
+                    "type": "content_block_delta",
+                    "delta": {"type": "text_delta", "text": delta}
+                }).encode()}}
+            yield {"chunk": {"bytes": json.dumps({"type": "message_stop"}).encode()}}
+
+        return {"body": events()}
+
+
+class FakeRdsDataClient:
+    """Fake rds-data client returning a fixed number of rows."""
+
+    def __init__(self, row_count):
+        self.row_count = row_count
+
+    def execute_statement(self, **kwargs):
+        return {
+            "columnMetadata": [{"name": "name"}, {"name": "total"}],
+            "records": [
+                [{"stringValue": f"customer_{i}"}, {"longValue": i * 10}]
+                for i in range(self.row_count)
+            ]
+        }
+
+
+def make_provider(row_count=30, summary_skip_max_rows=0, summary_deltas=None):
+    """Create a provider wired to fake clients without touching AWS."""
+    provider = AuroraKnowledgeBaseProvider({"provider": "aurora", "provider_details": []})
+    provider.aurora_config = {
+        "cluster_arn": "arn:aws:rds:us-east-1:123456789012:cluster:test",
+        "secret_arn": "arn:aws:secretsmanager:us-east-1:123456789012:secret:test",
+        "database_name": "test_db",
+        "region": "us-east-1",
+        "model_id": "test-model",
+        "stream_summary": True,
+        "summary_skip_max_rows": summary_skip_max_rows,
+        "preview_rows": 5
+    }
+    provider.bedrock_client = FakeBedrockClient(summary_deltas or ["Sales ", "are ", "up ", "this ", "quarter."])
+    provider.rds_data_client = FakeRdsDataClient(row_count)
+    provider.schema_cache = "=== DATABASE SCHEMA INFORMATION ===\n"
+    provider.schema_cache_time = time.time()
+    return provider
+
+
+class TestAuroraStreamingAnswer:
+    """Test cases for the Aurora streaming answer path."""
+
+    def test_sql_and_preview_are_emitted_before_summary(self):
+        """Test that the SQL and row preview chunk precedes every summary delta."""
+        provider = make_provider()
+
+        chunks = list(provider.stream_query("How are sales doing?"))
+
+        assert "SELECT name, total FROM sales.orders" in chunks[0]
+        assert "customer_0 | 0" in chunks[0]
+        assert "customer_5" not in chunks[0]
+        assert chunks.index("**Summary:**\n") == 1
+        assert chunks[2:7] == ["Sales ", "are ", "up ", "this ", "quarter."]
+        assert chunks[-1].startswith("**Raw Results:**")
+
+    def test_time_to_first_chunk_excludes_summary_latency(self):
+        """Test that the first chunk arrives before the summary model call has finished."""
+        provider = make_provider(summary_deltas=["a", "b", "c", "d", "e"])
+        stream = provider.stream_query("How are sales doing?")
+
+        start = time.time()
+        first_chunk = next(stream)
+        time_to_first_chunk = time.time() - start
+        rest = list(stream)
+        total_time = time.time() - start
+
+        assert "**Generated SQL:**" in first_chunk
+        assert time_to_first_chunk < 0.1
+        assert total_time >= 0.25
+        assert "abcde" in "".join(rest)
+
+    def test_small_results_skip_summary(self):
+        """Test that results at or below the skip threshold are returned without a summary call."""
+        provider = make_provider(row_count=3, summary_skip_max_rows=5)
+
+        response = "".join(provider.stream_query("Top customers?"))
+
+        assert provider.bedrock_client.stream_calls == 0
+        assert "**Summary:**" not in response
+        assert "Total rows: 3" in response
+
+    def test_non_streaming_summary_fallback(self):
+        """Test that disabling streaming uses a single blocking summary call."""
+        provider = make_provider()
+        provider.aurora_config["stream_summary"] = False
+        provider.bedrock_client.invoke_model = lambda modelId, body: {
+            "body": io.BytesIO(json.dumps({"content": [{"text": "SELECT 1"}]}).encode())
+        }
+
+        response = "".join(provider.stream_query("How are sales doing?"))
+
+        assert provider.bedrock_client.stream_calls == 0
+        assert "**Summary:**\nSELECT 1" in response
@@ -0,0 +1,228 @@
+"""
+Tests for the Snowflake Cortex Analyst REST client.
+
+This module runs the client against a local stub HTTP server that counts
+connections and injects throttling and authentication failures.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from knowledge_base.custom.cortex_analyst_client import CortexAnalystClient, CortexAnalystError
+
+
+class StubCortexServer(ThreadingHTTPServer):
+    """Stub Cortex Analyst server with scripted status codes; "drop" closes the connection unanswered."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubCortexHandler)
+        self.connections = 0
+        self.requests = 0
+        self.tokens = []
+        self.script = []
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubCortexHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler answering with the next scripted status code."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.tokens.append(self.headers["Authorization"])
+            status = self.server.script.pop(0) if self.server.script else 200
+        if status == "drop":
+            self.close_connection = True
+            return
+        time.sleep(self.server.delay)
+        if status == 200:
+            text = body["messages"][0]["content"][0]["text"]
+            payload = json.dumps({"message": {"content": [{"type": "text", "text": f"answer: {text}"}]}})
+        else:
+            payload = json.dumps({"message": f"status {status}"})
+        data = payload.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Run a stub Cortex Analyst server on a background thread."""
+    stub = StubCortexServer()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+def make_client(server, **kwargs):
+    """Create a client pointed at the stub server."""
+    tokens = iter(f"token-{i}" for i in range(1, 100))
+    options = {"backoff_base": 0.01, "backoff_max": 0.05}
+    options.update(kwargs)
+    return CortexAnalystClient("test_account", token_provider=lambda: next(tokens),
+                               base_url=server.base_url, **options)
+
+
+class TestCortexAnalystClient:
+    """Test cases for the Cortex Analyst client."""
+
+    def test_keep_alive_reuses_one_connection(self, server):
+        """Test that sequential questions share a single TCP connection."""
+        client = make_client(server)
+
+        for i in range(10):
+            response = client.send_message(f"question {i}", "@stage/model.yaml")
+            assert response["message"]["content"][0]["text"] == f"answer: question {i}"
+
+        assert server.requests == 10
+        assert server.connections == 1
+        client.close()
+
+    def test_throttling_is_retried(self, server):
+        """Test that 429 and 5xx responses are retried until success."""
+        server.script = [429, 503, 429]
+        client = make_client(server)
+
+        response = client.send_message("question", "@stage/model.yaml")
+
+        assert "answer: question" in json.dumps(response)
+        assert server.requests == 4
+        client.close()
+
+    def test_retries_are_bounded(self, server):
+        """Test that persistent throttling raises after the retry budget is spent."""
+        server.script = [429] * 10
+        client = make_client(server, max_retries=2)
+
+        with pytest.raises(CortexAnalystError) as error:
+            client.send_message("question", "@stage/model.yaml")
+
+        assert error.value.status_code == 429
+        assert server.requests == 3
+        client.close()
+
+    def test_client_errors_are_not_retried(self, server):
+        """Test that non-retryable errors fail immediately."""
+        server.script = [400]
+        client = make_client(server)
+
+        with pytest.raises(CortexAnalystError, match="Cortex Analyst API error 400"):
+            client.send_message("question", "@stage/model.yaml")
+
+        assert server.requests == 1
+        client.close()
+
+    def test_deadline_bounds_the_call(self, server):
+        """Test that a slow server cannot hold the caller beyond the deadline."""
+        server.delay = 0.5
+        client = make_client(server)
+
+        start = time.time()
+        with pytest.raises(TimeoutError):
+            client.send_message("question", "@stage/model.yaml", deadline_seconds=0.2)
+
+        assert time.time() - start < 0.45
+        client.close()
+
+    def test_dropped_connections_are_retried(self, server):
+        """Test that a connection closed without a response is retried on a new one."""
+        server.script = ["drop", "drop"]
+        client = make_client(server)
+
+        response = client.send_message("question", "@stage/model.yaml")
+
+        assert "answer: question" in json.dumps(response)
+        assert server.requests == 3
+        client.close()
+
+    def test_connection_retries_stop_at_the_deadline(self, server):
+        """Test that persistent connection errors cannot hold the caller beyond the deadline."""
+        server.script = ["drop"] * 100
+        client = make_client(server, max_retries=100, backoff_base=0.1, backoff_max=0.1)
+
+        start = time.time()
+        with pytest.raises((requests.ConnectionError, TimeoutError)):
+            client.send_message("question", "@stage/model.yaml", deadline_seconds=0.3)
+
+        assert time.time() - start < 0.45
+        assert server.requests < 100
+        client.close()
+
+    def test_unauthorized_forces_token_refresh(self, server):
+        """Test that a 401 refreshes the token synchronously and retries once."""
+        server.script = [401]
+        client = make_client(server)
+
+        client.send_message("question", "@stage/model.yaml")
+
+        assert server.tokens == ['Snowflake Token="token-1"', 'Snowflake Token="token-2"']
+        client.close()
+
+    def test_unauthorized_uses_token_refresher(self, server):
+        """Test that a rejected token is replaced through the token refresher, not the provider."""
+        server.script = [401]
+        client = make_client(server, token_refresher=lambda: "reconnected")
+
+        client.send_message("question", "@stage/model.yaml")
+
+        assert server.tokens == ['Snowflake Token="token-1"', 'Snowflake Token="reconnected"']
+        client.close()
+
+    def test_old_token_is_refreshed_in_background(self, server):
+        """Test that an aged token is refreshed on a background thread, not on the request path."""
+        refresh_started = threading.Event()
+        release_refresh = threading.Event()
+        calls = []
+
+        def slow_token_provider():
+            calls.append(time.time())
+            if len(calls) > 1:
+                refresh_started.set()
+                release_refresh.wait(2)
+                return "token-new"
+            return "token-old"
+
+        client = CortexAnalystClient("test_account", token_provider=slow_token_provider,
+                                     base_url=server.base_url, token_refresh_seconds=0)
+        client.send_message("first", "@stage/model.yaml")
+
+        start = time.time()
+        client.send_message("second", "@stage/model.yaml")
+        elapsed = time.time() - start
+
+        assert refresh_started.wait(1)
+        assert elapsed < 1
+        assert server.tokens[-1] == 'Snowflake Token="token-old"'
+        release_refresh.set()
+        client._refresh_thread.join(2)
+        assert client._token == "token-new"
+        client.close()
@@ -0,0 +1,370 @@
+"""
+Tests for the Snowflake Cortex Analyst knowledge base provider.
+
+This module tests pooled connection handling and row-limited fetches with a fake
+Snowflake connector module.
+"""
+
+import itertools
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import knowledge_base.custom.snowflake as snowflake_provider_module
+from knowledge_base.custom.snowflake import SnowflakeKnowledgeBaseProvider, _wrap_with_row_limit
+
+
+class FakeSnowflakeError(Exception):
+    """Fake Snowflake error carrying an error code."""
+
+    def __init__(self, msg, errno):
+        super().__init__(msg)
+        self.errno = errno
+
+
+class FakeCursor:
+    """Fake cursor recording executed statements on its connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = [("NAME",), ("TOTAL",)]
+        self.rowcount = -1
+        self._rows = iter([])
+
+    def execute(self, sql):
+        connector = self.connection.connector
+        with connector.lock:
+            connector.statements.append(sql)
+            if sql == "SELECT 1":
+                connector.health_checks += 1
+            connector.active += 1
+            connector.max_active = max(connector.max_active, connector.active)
+        try:
+            if self.connection.fail_with is not None:
+                error, self.connection.fail_with = self.connection.fail_with, None
+                raise error
+            time.sleep(connector.query_delay if sql != "SELECT 1" else 0)
+            if sql == "SELECT 1":
+                rows = [(1,)]
+            else:
+                rows = connector.result_rows
+                # Honor a pushed-down top-level LIMIT like the server would
+                limit_match = re.search(r"\bLIMIT (\d+)$", sql)
+                if limit_match:
+                    limit = int(limit_match.group(1))
+                    self.rowcount = min(connector.result_row_count, limit)
+                    rows = itertools.islice(rows, limit)
+                else:
+                    self.rowcount = connector.result_row_count
+            self._rows = iter(rows)
+        finally:
+            with connector.lock:
+                connector.active -= 1
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size):
+        self.connection.connector.fetch_sizes.append(size)
+        batch = list(itertools.islice(self._rows, size))
+        self.connection.connector.rows_fetched += len(batch)
+        return batch
+
+    def fetchall(self):
+        raise AssertionError("fetchall must not be used for generated SQL")
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Fake Snowflake connection."""
+
+    def __init__(self, connector, number):
+        self.connector = connector
+        self.closed = False
+        self.fail_with = None
+        self._rest = SimpleNamespace(_token=f"token-{number}")
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnector:
+    """Fake snowflake.connector module counting connections and statements."""
+
+    def __init__(self, query_delay=0.0, result_row_count=2, result_row_factory=None):
+        self.query_delay = query_delay
+        self.result_row_count = result_row_count
+        self.result_row_factory = result_row_factory or (lambda i: (["alice", "bob"][i % 2], (i + 1) * 10))
+        self.fetch_sizes = []
+        self.rows_fetched = 0
+        self.connections = []
+        self.statements = []
+        self.health_checks = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    @property
+    def result_rows(self):
+        """Lazily generate the full result set."""
+        return (self.result_row_factory(i) for i in range(self.result_row_count))
+
+    def connect(self, **kwargs):
+        with self.lock:
+            connection = FakeConnection(self, len(self.connections) + 1)
+            self.connections.append(connection)
+        return connection
+
+
+@pytest.fixture
+def make_provider(monkeypatch):
+    """Create providers backed by a fake connector module."""
+    def factory(pool_size=4, health_check_idle_seconds=300, query_delay=0.0, **connector_options):
+        connector = FakeConnector(query_delay=query_delay, **connector_options)
+        monkeypatch.setattr(snowflake_provider_module, "snowflake", SimpleNamespace(connector=connector))
+        provider = SnowflakeKnowledgeBaseProvider({"provider": "snowflake", "provider_details": []})
+        provider.snowflake_config = {
+            "account": "test_account",
+            "user": "test_user",
+            "role": "TEST_ROLE",
+            "warehouse": "TEST_WH",
+            "database": "TEST_DB",
+            "schema": "DATA",
+            "pool_size": pool_size,
+            "health_check_idle_seconds": health_check_idle_seconds,
+            "sql_row_limit": 1000,
+            "display_rows": 10,
+            "fetch_max_bytes": 1048576
+        }
+        provider._create_connection_pool()
+        return provider, connector
+    return factory
+
+
+class TestSnowflakeConnectionPool:
+    """Test cases for pooled Snowflake connections."""
+
+    def test_busy_connection_is_not_health_checked(self, make_provider):
+        """Test that back-to-back queries reuse one connection without SELECT 1 round trips."""
+        provider, connector = make_provider()
+
+        for _ in range(10):
+            result = provider._execute_sql("SELECT name, total FROM orders")
+            assert "alice" in result
+
+        assert len(connector.connections) == 1
+        assert connector.health_checks == 0
+
+    def test_idle_connection_is_health_checked_once(self, make_provider):
+        """Test that a connection idle beyond the threshold is checked before reuse."""
+        provider, connector = make_provider(health_check_idle_seconds=60)
+        provider._execute_sql("SELECT name, total FROM orders")
+
+        for pooled in provider.connection_pool._idle:
+            pooled.last_used -= 120
+        provider._execute_sql("SELECT name, total FROM orders")
+        provider._execute_sql("SELECT name, total FROM orders")
+
+        assert connector.health_checks == 1
+        assert len(connector.connections) == 1
+
+    def test_connection_is_health_checked_after_error(self, make_provider):
+        """Test that a connection whose last use failed is checked before reuse."""
+        provider, connector = make_provider()
+        provider._execute_sql("SELECT name, total FROM orders")
+        connector.connections[0].fail_with = ValueError("syntax error")
+
+        assert provider._execute_sql("SELEC broken").startswith("Error executing SQL")
+        provider._execute_sql("SELECT name, total FROM orders")
+
+        assert connector.health_checks == 1
+        assert len(connector.connections) == 1
+
+    def test_stale_connection_is_replaced_and_query_retried(self, make_provider):
+        """Test that an expired session is replaced and the query retried transparently."""
+        provider, connector = make_provider()
+        provider._ensure_connection()
+        connector.connections[0].fail_with = FakeSnowflakeError("Session expired", 390112)
+
+        result = provider._execute_sql("SELECT name, total FROM orders")
+
+        assert "alice" in result
+        assert len(connector.connections) == 2
+        assert connector.connections[0].closed
+        assert provider.connection_pool.get_stats()["stale_retries"] == 1
+
+    def test_session_token_comes_from_pooled_connection(self, make_provider):
+        """Test that the REST session token is taken from a pooled connection."""
+        provider, connector = make_provider()
+
+        provider._ensure_connection()
+
+        assert provider.session_token == "token-1"
+        assert connector.health_checks == 0
+
+    def test_rejected_token_is_replaced_by_new_connection(self, make_provider):
+        """Test that refreshing a rejected token reconnects instead of re-reading the old token."""
+        provider, connector = make_provider()
+        provider._ensure_connection()
+
+        assert provider._reconnect() == "token-2"
+        assert connector.connections[0].closed
+        assert provider._ensure_connection() == "token-2"
+        assert provider.connection_pool.get_stats()["open_connections"] == 1
+
+    def test_concurrent_checkouts_use_separate_connections(self, make_provider):
+        """Test that concurrent questions run in parallel up to the pool size."""
+        provider, connector = make_provider(pool_size=4, query_delay=0.2)
+
+        threads = [
+            threading.Thread(target=provider._execute_sql, args=("SELECT name, total FROM orders",))
+            for _ in range(4)
+        ]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        assert connector.max_active == 4
+        assert len(connector.connections) == 4
+        assert elapsed < 0.6
+
+    def test_pool_size_bounds_concurrency(self, make_provider):
+        """Test that checkouts beyond the pool size wait for a free connection."""
+        provider, connector = make_provider(pool_size=2, query_delay=0.1)
+
+        threads = [
+            threading.Thread(target=provider._execute_sql, args=("SELECT name, total FROM orders",))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert connector.max_active == 2
+        assert len(connector.connections) == 2
+
+    def test_close_releases_pooled_connections(self, make_provider):
+        """Test that closing the provider closes idle pooled connections."""
+        provider, connector = make_provider()
+        provider._execute_sql("SELECT name, total FROM orders")
+
+        provider.close()
+
+        assert provider.connection_pool is None
+        assert all(connection.closed for connection in connector.connections)
+
+
+class TestSnowflakeConfig:
+    """Test cases for parsing the Snowflake provider config."""
+
+    def test_invalid_numbers_fall_back_to_defaults(self):
+        """Test that empty or malformed numeric settings use their defaults instead of failing."""
+        provider = SnowflakeKnowledgeBaseProvider({"provider": "snowflake", "provider_details": [{
+            "name": "snowflake",
+            "config": {
+                "snowflake_result_max_chars": "",
+                "snowflake_display_rows": "ten",
+                "snowflake_pool_size": "8",
+                "snowflake_cortex_deadline_seconds": None
+            }
+        }]})
+
+        provider.initialize()
+
+        assert provider.snowflake_config["result_max_chars"] == 8000
+        assert provider.snowflake_config["display_rows"] == 10
+        assert provider.snowflake_config["pool_size"] == 8
+        assert provider.snowflake_config["cortex_deadline_seconds"] == 60
+
+
+class TestSnowflakeRowLimitedFetch:
+    """Test cases for pushed-down row limits and streamed fetches."""
+
+    def test_million_row_result_is_fetched_in_bounded_batches(self, make_provider):
+        """Test that only the displayed rows are transferred from a million-row result."""
+        provider, connector = make_provider(result_row_count=1000000)
+
+        result = provider._execute_sql("SELECT name, total FROM orders")
+
+        assert connector.rows_fetched == 10
+        assert max(connector.fetch_sizes) <= 10
+        assert "LIMIT 1001" in connector.statements[-1]
+        assert "More than 1000 rows matched" in result
+        assert "Total rows: unknown" in result
+
+    def test_small_result_reports_exact_total(self, make_provider):
+        """Test that the total row count is reported when it is known for free."""
+        provider, connector = make_provider(result_row_count=37)
+
+        result = provider._execute_sql("SELECT name, total FROM orders")
+
+        assert result.rstrip().endswith("Total rows: 37")
+        assert "showing 10 of 37 rows" in result
+        assert "More than" not in result
+
+    def test_byte_budget_stops_fetching(self, make_provider):
+        """Test that wide rows stop the fetch once the byte budget is spent."""
+        provider, connector = make_provider(result_row_count=1000000,
+                                            result_row_factory=lambda i: ("x" * 400000, i))
+
+        provider._execute_sql("SELECT payload, id FROM blobs")
+
+        assert connector.rows_fetched <= 3
+
+    def test_unlimited_statements_are_not_rewritten(self, make_provider):
+        """Test that statements other than a single SELECT are executed unchanged."""
+        provider, connector = make_provider(result_row_count=5)
+
+        provider._execute_sql("SHOW TABLES")
+
+        assert connector.statements[-1] == "SHOW TABLES"
+
+
+class TestWrapWithRowLimit:
+    """Test cases for the SQL row limit rewrite."""
+
+    def test_select_gets_top_level_limit(self):
+        """Test that a SELECT gets a LIMIT clause appended and its trailing semicolon dropped."""
+        assert _wrap_with_row_limit("SELECT a FROM t;", 11) == "SELECT a FROM t\nLIMIT 11"
+
+    def test_order_by_stays_at_top_level(self):
+        """Test that an ordered query is limited after its ORDER BY instead of inside a subquery."""
+        sql = "SELECT name, total FROM orders ORDER BY total DESC"
+        assert _wrap_with_row_limit(sql, 11) == f"{sql}\nLIMIT 11"
+
+    @pytest.mark.parametrize("sql, expected", [
+        ("SELECT a FROM t ORDER BY a LIMIT 500", "SELECT a FROM t ORDER BY a LIMIT 11"),
+        ("SELECT a FROM t ORDER BY a limit 5", "SELECT a FROM t ORDER BY a LIMIT 5"),
+        ("SELECT a FROM t ORDER BY a LIMIT 500 OFFSET 20", "SELECT a FROM t ORDER BY a LIMIT 11 OFFSET 20"),
+        ("SELECT a FROM t LIMIT 500 -- top rows", "SELECT a FROM t LIMIT 11")
+    ])
+    def test_existing_limit_is_tightened(self, sql, expected):
+        """Test that an existing trailing LIMIT is lowered to the row limit, never raised."""
+        assert _wrap_with_row_limit(sql, 11) == expected
+
+    def test_cte_with_comments_is_limited(self):
+        """Test that a WITH query with comments is limited without the LIMIT landing in a comment."""
+        sql = "-- totals\nWITH x AS (SELECT 1 AS v LIMIT 3) SELECT v FROM x -- done"
+        assert _wrap_with_row_limit(sql, 5) == "-- totals\nWITH x AS (SELECT 1 AS v LIMIT 3) SELECT v FROM x\nLIMIT 5"
+
+    @pytest.mark.parametrize("sql", [
+        "SHOW TABLES",
+        "SELECT 1; DROP TABLE t",
+        "SELECT 'a;b' AS v",
+        "DESCRIBE TABLE orders",
+        "SELECT a FROM t ORDER BY a OFFSET 10 ROWS FETCH NEXT 5 ROWS ONLY"
+    ])
+    def test_other_statements_are_unchanged(self, sql):
+        """Test that anything but a single SELECT/WITH statement without other row limits is left untouched."""
+        assert _wrap_with_row_limit(sql, 5) == sql
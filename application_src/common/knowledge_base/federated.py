@@ -0,0 +1,259 @@
+"""
+Federated knowledge base retrieval for GenAI-In-A-Box agent.
+This module queries several knowledge base providers in parallel and fuses their
+results with reciprocal rank fusion.
+"""
+
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+from strands import tool
+from .base import BaseKnowledgeBaseProvider
+try:
+    from ..text_similarity import jaccard_similarity, token_set
+except ImportError:
+    from text_similarity import jaccard_similarity, token_set
+
+
+class FederatedRetriever:
+    """
+    Query several knowledge base providers concurrently and fuse the results.
+
+    Every provider is searched in a worker thread with its own timeout. Providers
+    that are still running when their timeout expires are reported as timed out
+    and the fused results of the others are returned, so one slow backend costs
+    at most its timeout rather than blocking the whole call. Results are combined
+    with reciprocal rank fusion (score = sum of 1 / (rrf_k + rank)) and chunks
+    whose token sets overlap by at least ``dedupe_threshold`` are merged.
+    """
+
+    def __init__(self, providers: List[BaseKnowledgeBaseProvider], timeout_seconds: float = 10.0,
+                 provider_timeouts: Optional[Dict[str, float]] = None, rrf_k: int = 60,
+                 dedupe_threshold: float = 0.9, max_workers: Optional[int] = None):
+        self.providers = self._name_providers(providers)
+        self.timeout_seconds = timeout_seconds
+        self.provider_timeouts = provider_timeouts or {}
+        self.rrf_k = rrf_k
+        self.dedupe_threshold = dedupe_threshold
+        # Extra workers so a provider stuck past its timeout does not starve the next call
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(2 * len(self.providers), 1),
+            thread_name_prefix="kb-federated"
+        )
+
+    @staticmethod
+    def _name_providers(providers: List[BaseKnowledgeBaseProvider]) -> List[Tuple[str, BaseKnowledgeBaseProvider]]:
+        """Give each provider a unique display name."""
+        named = []
+        seen: Dict[str, int] = {}
+        for provider in providers:
+            base_name = provider.provider_name or "provider"
+            seen[base_name] = seen.get(base_name, 0) + 1
+            name = base_name if seen[base_name] == 1 else f"{base_name}#{seen[base_name]}"
+            named.append((name, provider))
+        return named
+
+    def _timeout_for(self, name: str) -> float:
+        """Get the timeout for a provider, falling back to the default."""
+        return float(self.provider_timeouts.get(name, self.timeout_seconds))
+
+    @staticmethod
+    def _timed_search(provider: BaseKnowledgeBaseProvider, query: str, top_k: int) -> Tuple[List[Dict[str, Any]], float]:
+        """Run one provider search and measure how long it took."""
+        start = time.time()
+        results = provider.search(query, top_k)
+        return results, time.time() - start
+
+    def search(self, query: str, top_k: int = 5) -> Dict[str, Any]:
+        """
+        Search all providers and return fused results.
+
+        Returns a dict with the fused "results", a "partial" flag set when any
+        provider timed out or failed, and per-provider status under "providers".
+        """
+        start = time.time()
+        futures = [
+            (name, self._executor.submit(self._timed_search, provider, query, top_k))
+            for name, provider in self.providers
+        ]
+
+        ranked_lists: List[Tuple[str, List[Dict[str, Any]]]] = []
+        statuses: Dict[str, Dict[str, Any]] = {}
+        for name, future in futures:
+            remaining = max(start + self._timeout_for(name) - time.time(), 0)
+            try:
+                results, elapsed = future.result(timeout=remaining)
+                ranked_lists.append((name, results or []))
+                statuses[name] = {"status": "ok", "count": len(results or []), "elapsed_ms": round(elapsed * 1000)}
+            except FutureTimeoutError:
+                future.cancel()
+                print(f"Federated KB: Provider {name} timed out after {self._timeout_for(name)}s")
+                statuses[name] = {"status": "timeout", "count": 0, "elapsed_ms": round((time.time() - start) * 1000)}
+            except Exception as e:
+                print(f"Federated KB: Provider {name} failed: {str(e)}")
+                statuses[name] = {"status": "error", "count": 0, "error": str(e)}
+
+        return {
+            "results": self.fuse(ranked_lists)[:top_k],
+            "partial": any(status["status"] != "ok" for status in statuses.values()),
+            "providers": statuses
+        }
+
+    def fuse(self, ranked_lists: List[Tuple[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Fuse ranked result lists with reciprocal rank fusion, merging near-duplicates."""
+        clusters: List[Dict[str, Any]] = []
+        for provider_order, (name, results) in enumerate(ranked_lists):
+            for rank, result in enumerate(results, 1):
+                tokens = token_set(result.get("text", ""))
+                cluster = next(
+                    (c for c in clusters if jaccard_similarity(c["tokens"], tokens) >= self.dedupe_threshold),
+                    None
+                )
+                if cluster is None:
+                    cluster = {
+                        "tokens": tokens,
+                        "result": result,
+                        "ranks": {},
+                        "first_seen": (rank, provider_order)
+                    }
+                    clusters.append(cluster)
+                # Each provider contributes its best rank once per cluster
+                if name not in cluster["ranks"]:
+                    cluster["ranks"][name] = rank
+
+        for cluster in clusters:
+            cluster["rrf_score"] = sum(1.0 / (self.rrf_k + rank) for rank in cluster["ranks"].values())
+        clusters.sort(key=lambda c: (-c["rrf_score"], c["first_seen"]))
+
+        fused = []
+        for cluster in clusters:
+            result = cluster["result"]
+            fused.append({
+                "text": result.get("text", ""),
+                "source": result.get("source", ""),
+                "score": round(cluster["rrf_score"], 6),
+                "providers": list(cluster["ranks"]),
+                "metadata": result.get("metadata", {})
+            })
+        return fused
+
+    def close(self):
+        """Shut down the worker threads without waiting for stuck searches."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FederatedKnowledgeBaseProvider(BaseKnowledgeBaseProvider):
+    """Knowledge base provider that searches several member providers at once."""
+
+    def __init__(self, config: Dict[str, Any], providers: List[BaseKnowledgeBaseProvider]):
+        """
+        Initialize the federated provider with already created member providers.
+
+        Raises:
+            ValueError: If a member provider does not support structured search
+        """
+        unsupported = [provider.provider_name for provider in providers if not provider.supports_search()]
+        if unsupported:
+            raise ValueError(
+                f"Federated knowledge base members without structured search: {', '.join(unsupported)}. "
+                "Remove them from provider_details or configure them as a standalone knowledge base."
+            )
+        super().__init__(config)
+        self.provider_name = "federated"
+        self.providers = providers
+        self.retriever = None
+        self.is_initialized = False
+
+    def get_provider_config(self) -> Dict[str, Any]:
+        """Get the federated settings (timeouts, fusion) from the "federated" provider entry."""
+        for provider in self.provider_details:
+            if provider.get("name", "").lower() == "federated":
+                return provider.get("config", {})
+        return {}
+
+    def initialize(self) -> List:
+        """Initialize the member providers and create the federated search tool."""
+        if self.is_initialized:  # nosemgrep: is-function-without-parentheses
+            return self.tools
+
+        try:
+            provider_config = self.get_provider_config()
+
+            # Member providers initialize lazily on their first search
+            self.retriever = FederatedRetriever(
+                self.providers,
+                timeout_seconds=float(provider_config.get("timeout_seconds", 10)),
+                provider_timeouts=provider_config.get("provider_timeouts", {}),
+                rrf_k=int(provider_config.get("rrf_k", 60)),
+                dedupe_threshold=float(provider_config.get("dedupe_threshold", 0.9))
+            )
+
+            self._create_tools()
+            self.is_initialized = True
+
+            print(f"Federated knowledge base provider initialized with {len(self.providers)} providers")
+
+            return self.tools
+
+        except Exception as e:
+            print(f"Error initializing federated knowledge base provider: {str(e)}")
+            traceback.print_exc()
+            self.close()
+            return []
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Perform a structured federated search."""
+        if not self.is_initialized:  # nosemgrep: is-function-without-parentheses
+            self.initialize()
+        return self.retriever.search(query, top_k)["results"]
+
+    def _create_tools(self):
+        """Create the federated search tool."""
+
+        @tool
+        def retriever_federated_search(query: str, top_k: int = 5) -> str:
+            """Search all configured knowledge bases at once and return the best combined results."""
+            try:
+                print(f"Performing federated search across {len(self.providers)} providers for: {query}")
+
+                response = self.retriever.search(query, top_k)
+                results = response["results"]
+
+                unavailable = [
+                    f"{name} ({status['status']})"
+                    for name, status in response["providers"].items()
+                    if status["status"] != "ok"
+                ]
+                note = f"Partial results; unavailable providers: {', '.join(unavailable)}\n\n" if unavailable else ""
+
+                if not results:
+                    return f"{note}No federated search results found for query: '{query}'"
+
+                output = f"{note}Found {len(results)} relevant documents for query: '{query}'\n\n"
+                for i, result in enumerate(results, 1):
+                    output += f"{i}. Content: {result['text']}\n"
+                    output += f"   Source: {result['source']} (from {', '.join(result['providers'])})\n\n"
+
+                return output
+
+            except Exception as e:
+                error_msg = f"Error performing federated search: {str(e)}"
+                print(error_msg)
+                traceback.print_exc()
+                return error_msg
+
+        self.tools = [retriever_federated_search]
+
+    def close(self):
+        """Close the federated retriever and all member providers."""
+        if self.retriever is not None:
+            self.retriever.close()
+            self.retriever = None
+        for provider in self.providers:
+            try:
+                provider.close()
+            except Exception as e:
+                print(f"Error closing federated member provider: {str(e)}")
+        self.is_initialized = False
+        self.tools = []
@@ -0,0 +1,30 @@
+"""
+Knowledge base provider registry for GenAI-In-A-Box agent.
+This module keeps provider instances keyed by provider type and configuration hash.
+"""
+
+from typing import Any, Dict
+
+try:
+    from ..provider_registry import ProviderRegistry
+except ImportError:
+    from provider_registry import ProviderRegistry
+
+
+class KnowledgeBaseProviderRegistry(ProviderRegistry):
+    """
+    Registry of knowledge base provider instances.
+
+    Providers are keyed by provider name, provider type and a hash of the
+    knowledge base configuration, so agents with different knowledge bases get
+    their own instances and agents with the same configuration share one.
+    """
+
+    log_prefix = "KB Registry"
+
+    @staticmethod
+    def make_key(kb_config: Dict[str, Any]) -> str:
+        """Build the registry key for a knowledge base configuration."""
+        provider = str(kb_config.get("provider", "")).lower()
+        provider_type = str(kb_config.get("knowledge_base_provider_type", "custom")).lower()
+        return f"{provider}:{provider_type}:{ProviderRegistry.config_hash(kb_config)}"
@@ -0,0 +1,135 @@
+"""
+Tabular result formatter for SQL knowledge base providers.
+This module formats query results in a single pass with row, column, cell width and size caps.
+"""
+
+from typing import Any, Iterable, List, Optional, Sequence
+
+# Characters kept free at the end of the budget for the truncation notice and row count
+_FOOTER_RESERVE = 200
+
+
+class TabularResultFormatter:
+    """
+    Size-capped formatter for tabular query results.
+
+    Rows are consumed once and formatting stops as soon as the row cap or the
+    character budget is reached, so the cost is bounded by the output size and
+    not by the size of the result set.
+
+    Modes:
+    - markdown: GitHub-style table, readable in chat responses
+    - csv: compact comma-separated rows, cheapest in tokens
+    """
+
+    MODES = ("markdown", "csv")
+
+    def __init__(self, mode: str = "markdown", max_chars: int = 8000, max_rows: int = 50,
+                 max_columns: int = 20, max_cell_width: int = 40, max_tokens: Optional[int] = None):
+        """
+        Initialize the formatter.
+
+        Args:
+            mode: Output mode, either "markdown" or "csv"
+            max_chars: Character budget for the whole output
+            max_rows: Maximum number of data rows to render
+            max_columns: Maximum number of columns to render
+            max_cell_width: Maximum characters per cell before clipping
+            max_tokens: Optional token budget, converted at ~4 characters per token
+        """
+        mode = (mode or "markdown").lower()
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported result format mode: {mode}")
+        self.mode = mode
+        self.max_chars = max_chars if max_tokens is None else min(max_chars, max_tokens * 4)
+        self.max_rows = max_rows
+        self.max_columns = max_columns
+        self.max_cell_width = max(max_cell_width, 4)
+
+    def format(self, columns: Sequence[Any], rows: Iterable[Sequence[Any]],
+               total_rows: Optional[int] = None, more_rows: bool = False) -> str:
+        """
+        Format query results as text.
+
+        Args:
+            columns: Column names
+            rows: Row values; any iterable, consumed at most once
+            total_rows: Total row count if known; defaults to len(rows) for sized inputs
+            more_rows: Whether rows beyond the given ones exist while the total is unknown
+
+        Returns:
+            Formatted results including an explicit truncation notice and the row count
+        """
+        if total_rows is None and not more_rows and hasattr(rows, "__len__"):
+            total_rows = len(rows)
+
+        shown_columns = min(len(columns), self.max_columns)
+        body_budget = max(self.max_chars - _FOOTER_RESERVE, 0)
+
+        parts: List[str] = []
+        header, clipped = self._format_row(columns[:shown_columns])
+        parts.append(header)
+        used = len(header)
+        if self.mode == "markdown":
+            separator = "|" + " --- |" * shown_columns + "\n"
+            parts.append(separator)
+            used += len(separator)
+
+        shown_rows = 0
+        seen_rows = 0
+        budget_exhausted = False
+        for row in rows:
+            seen_rows += 1
+            if shown_rows >= self.max_rows:
+                break
+            line, line_clipped = self._format_row(row[:shown_columns])
+            if used + len(line) > body_budget:
+                budget_exhausted = True
+                break
+            parts.append(line)
+            used += len(line)
+            shown_rows += 1
+            clipped = clipped or line_clipped
+
+        if total_rows is None and not more_rows:
+            # Unsized input that was fully consumed has a known count; otherwise it is unknown
+            total_rows = seen_rows if seen_rows == shown_rows else None
+
+        truncation = []
+        if total_rows is None or shown_rows < total_rows:
+            of_total = f"{total_rows}" if total_rows is not None else "more"
+            reason = "character budget" if budget_exhausted else "row limit"
+            truncation.append(f"showing {shown_rows} of {of_total} rows ({reason})")
+        if shown_columns < len(columns):
+            truncation.append(f"showing {shown_columns} of {len(columns)} columns")
+        if clipped:
+            truncation.append(f"cells clipped to {self.max_cell_width} chars")
+
+        if truncation:
+            parts.append(f"\n[Truncated: {'; '.join(truncation)}]\n")
+        parts.append(f"\nTotal rows: {total_rows if total_rows is not None else 'unknown'}")
+
+        return "".join(parts)[:self.max_chars]
+
+    def _format_row(self, values: Sequence[Any]):
+        """Format one row, returning the line and whether any cell was clipped."""
+        cells = []
+        clipped = False
+        for value in values:
+            text = "NULL" if value is None else str(value)
+            if len(text) > self.max_cell_width:
+                text = text[:self.max_cell_width - 3] + "..."
+                clipped = True
+            cells.append(self._escape(text))
+        if self.mode == "markdown":
+            return "| " + " | ".join(cells) + " |\n", clipped
+        return ",".join(cells) + "\n", clipped
+
+    def _escape(self, text: str) -> str:
+        """Escape a cell for the current mode."""
+        if self.mode == "markdown":
+            return text.replace("|", "\\|").replace("\n", " ")
+        if any(ch in text for ch in (",", '"', "\n")):
+            return '"' + text.replace('"', '""') + '"'
+        return text
+
@@ -0,0 +1,188 @@
+"""
+Tests for federated knowledge base retrieval.
+
+This module tests reciprocal rank fusion, near-duplicate merging and per-provider
+timeouts with in-memory fake providers.
+"""
+
+import time
+
+import pytest
+from knowledge_base import KnowledgeBaseFactory
+from knowledge_base.base import BaseKnowledgeBaseProvider
+from knowledge_base.federated import FederatedKnowledgeBaseProvider, FederatedRetriever
+
+
+class FakeProvider(BaseKnowledgeBaseProvider):
+    """In-memory provider returning fixed ranked texts after a delay."""
+
+    def __init__(self, name, texts, delay=0.0, error=None):
+        super().__init__({"provider": name})
+        self.texts = texts
+        self.delay = delay
+        self.error = error
+        self.closed = False
+
+    def initialize(self):
+        return []
+
+    def search(self, query, top_k=5):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [
+            {"text": text, "source": f"{self.provider_name}/{i}", "score": None, "metadata": {}}
+            for i, text in enumerate(self.texts[:top_k])
+        ]
+
+    def close(self):
+        self.closed = True
+
+
+class NoSearchProvider(BaseKnowledgeBaseProvider):
+    """Provider that only offers an agent tool, like the Snowflake and Aurora providers."""
+
+    def __init__(self, name):
+        super().__init__({"provider": name})
+        self.closed = False
+
+    def initialize(self):
+        return []
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def make_retriever():
+    """Create retrievers and shut them down after the test."""
+    retrievers = []
+
+    def factory(providers, **options):
+        retriever = FederatedRetriever(providers, **options)
+        retrievers.append(retriever)
+        return retriever
+    yield factory
+    for retriever in retrievers:
+        retriever.close()
+
+
+class TestFederatedRetriever:
+    """Test cases for the federated retriever."""
+
+    def test_fusion_orders_by_reciprocal_rank(self, make_retriever):
+        """Test that chunks ranked well by several providers come first."""
+        retriever = make_retriever([
+            FakeProvider("bedrock", ["refund policy details", "shipping times", "warranty terms"]),
+            FakeProvider("elasticsearch", ["warranty terms", "refund policy details", "store hours"]),
+            FakeProvider("mongodb", ["refund policy details", "store hours"])
+        ])
+
+        response = retriever.search("refunds", top_k=5)
+        texts = [result["text"] for result in response["results"]]
+
+        assert texts == ["refund policy details", "warranty terms", "store hours", "shipping times"]
+        assert response["results"][0]["providers"] == ["bedrock", "elasticsearch", "mongodb"]
+        assert response["results"][0]["score"] == pytest.approx(2 / 61 + 1 / 62, abs=1e-6)
+        assert response["partial"] is False
+
+    def test_near_duplicates_are_merged(self, make_retriever):
+        """Test that chunks differing only in case and punctuation count as one result."""
+        retriever = make_retriever([
+            FakeProvider("bedrock", ["The refund window is 30 days."]),
+            FakeProvider("elasticsearch", ["the refund window is 30 days", "Something else entirely"])
+        ])
+
+        response = retriever.search("refunds")
+
+        assert len(response["results"]) == 2
+        assert response["results"][0]["providers"] == ["bedrock", "elasticsearch"]
+
+    def test_wall_time_tracks_slowest_provider(self, make_retriever):
+        """Test that providers run in parallel rather than one after another."""
+        retriever = make_retriever([
+            FakeProvider("bedrock", ["a"], delay=0.2),
+            FakeProvider("elasticsearch", ["b"], delay=0.3),
+            FakeProvider("mongodb", ["c"], delay=0.1)
+        ])
+
+        start = time.time()
+        response = retriever.search("query")
+        elapsed = time.time() - start
+
+        assert len(response["results"]) == 3
+        assert 0.3 <= elapsed < 0.45
+
+    def test_slow_provider_returns_partial_results(self, make_retriever):
+        """Test that a provider past its timeout is skipped and the others are returned."""
+        retriever = make_retriever([
+            FakeProvider("bedrock", ["fast answer"], delay=0.05),
+            FakeProvider("elasticsearch", ["slow answer"], delay=2.0)
+        ], timeout_seconds=1.0, provider_timeouts={"elasticsearch": 0.2})
+
+        start = time.time()
+        response = retriever.search("query")
+        elapsed = time.time() - start
+
+        assert elapsed < 0.4
+        assert [result["text"] for result in response["results"]] == ["fast answer"]
+        assert response["partial"] is True
+        assert response["providers"]["elasticsearch"]["status"] == "timeout"
+
+    def test_failing_provider_is_reported(self, make_retriever):
+        """Test that a provider error does not fail the federated search."""
+        retriever = make_retriever([
+            FakeProvider("bedrock", ["answer"]),
+            FakeProvider("mongodb", [], error=RuntimeError("connection refused"))
+        ])
+
+        response = retriever.search("query")
+
+        assert response["providers"]["mongodb"] == {"status": "error", "count": 0, "error": "connection refused"}
+        assert len(response["results"]) == 1
+
+
+class TestFederatedKnowledgeBaseProvider:
+    """Test cases for the federated provider and its tool."""
+
+    def test_tool_reports_partial_results_and_close_closes_members(self):
+        """Test that the tool output names unavailable providers and close reaches every member."""
+        members = [
+            FakeProvider("bedrock", ["fast answer"]),
+            FakeProvider("elasticsearch", ["slow answer"], delay=1.0)
+        ]
+        provider = FederatedKnowledgeBaseProvider(
+            {"provider": "federated",
+             "provider_details": [{"name": "federated", "config": {"timeout_seconds": 0.2}}]},
+            members
+        )
+
+        tools = provider.initialize()
+        output = tools[0](query="question")
+        provider.close()
+
+        assert "elasticsearch (timeout)" in output
+        assert "fast answer" in output
+        assert all(member.closed for member in members)
+
+    def test_member_without_search_is_rejected(self):
+        """Test that a member without structured search is a configuration error at construction."""
+        with pytest.raises(ValueError, match="snowflake"):
+            FederatedKnowledgeBaseProvider({"provider": "federated"},
+                                           [FakeProvider("bedrock", ["answer"]), NoSearchProvider("snowflake")])
+
+    def test_factory_skips_members_without_search(self, monkeypatch):
+        """Test that the factory leaves out and closes members that cannot be searched."""
+        snowflake = NoSearchProvider("snowflake")
+        members = {"bedrock": FakeProvider("bedrock", ["answer"]), "snowflake": snowflake}
+        monkeypatch.setattr(KnowledgeBaseFactory, "_create_provider",
+                            staticmethod(lambda name, provider_type, kb_config, agent_name: members[name]))
+        kb_config = {
+            "provider": "federated",
+            "provider_details": [{"name": "federated"}, {"name": "bedrock"}, {"name": "snowflake"}]
+        }
+
+        provider = KnowledgeBaseFactory._create_federated_provider(kb_config, "qa_agent")
+
+        assert provider.providers == [members["bedrock"]]
+        assert snowflake.closed
@@ -0,0 +1,245 @@
+"""
+Tests for the knowledge base provider registry.
+
+This module tests keyed provider reuse, reference counting and idle eviction
+through KnowledgeBaseFactory with fake configurations and providers.
+"""
+
+import threading
+import time
+
+import pytest
+import knowledge_base
+from knowledge_base import KnowledgeBaseFactory, reset_knowledge_base_provider
+from knowledge_base.registry import KnowledgeBaseProviderRegistry
+from provider_registry import ProviderRegistry
+
+
+KB_CONFIGS = {
+    "sales_agent": {
+        "enabled": True,
+        "provider": "elasticsearch",
+        "knowledge_base_provider_type": "custom",
+        "provider_details": [{"name": "elasticsearch", "config": {"index_name": "sales"}}]
+    },
+    "support_agent": {
+        "enabled": True,
+        "provider": "elasticsearch",
+        "knowledge_base_provider_type": "custom",
+        "provider_details": [{"name": "elasticsearch", "config": {"index_name": "support"}}]
+    },
+    "sales_agent_copy": {
+        "enabled": True,
+        "provider": "elasticsearch",
+        "knowledge_base_provider_type": "custom",
+        "provider_details": [{"name": "elasticsearch", "config": {"index_name": "sales"}}]
+    },
+    "no_kb_agent": {"enabled": False}
+}
+
+
+class FakeConfig:
+    """Fake Config returning per-agent knowledge base configuration."""
+
+    def __init__(self, agent_name="qa_agent"):
+        self.agent_name = agent_name
+
+    def get_knowledge_base_config(self):
+        return KB_CONFIGS[self.agent_name]
+
+
+class FakeProvider:
+    """Fake provider counting constructions and close calls."""
+
+    constructed = []
+
+    def __init__(self, kb_config):
+        self.provider_name = "elasticsearch"
+        self.kb_config = kb_config
+        self.closed = False
+        FakeProvider.constructed.append(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Install a fresh registry and fake provider construction."""
+    FakeProvider.constructed = []
+    fresh_registry = KnowledgeBaseProviderRegistry(idle_ttl_seconds=900)
+    monkeypatch.setattr(knowledge_base, "_kb_registry", fresh_registry)
+    monkeypatch.setattr(knowledge_base, "Config", FakeConfig)
+    monkeypatch.setattr(KnowledgeBaseFactory, "_create_elastic_provider",
+                        staticmethod(lambda kb_config, provider_type: FakeProvider(kb_config)))
+    return fresh_registry
+
+
+class TestKnowledgeBaseProviderRegistry:
+    """Test cases for the keyed knowledge base provider registry."""
+
+    def test_alternating_configs_construct_each_provider_once(self, registry):
+        """Test that alternating between two KB configs does not thrash providers."""
+        for _ in range(20):
+            sales = KnowledgeBaseFactory.create("sales_agent")
+            support = KnowledgeBaseFactory.create("support_agent")
+
+        assert len(FakeProvider.constructed) == 2
+        assert sales is not support
+        assert sales.kb_config["provider_details"][0]["config"]["index_name"] == "sales"
+        assert not any(provider.closed for provider in FakeProvider.constructed)
+
+    def test_identical_configs_share_a_provider(self, registry):
+        """Test that agents with the same KB configuration share one instance."""
+        first = KnowledgeBaseFactory.create("sales_agent")
+        second = KnowledgeBaseFactory.create("sales_agent_copy")
+
+        assert first is second
+        assert registry.get_stats()["ref_counts"][registry.make_key(KB_CONFIGS["sales_agent"])] == 2
+
+    def test_reset_and_recreate_reuses_provider(self, registry):
+        """Test that the reset-then-create pattern used by agent creation keeps the instance."""
+        first = KnowledgeBaseFactory.create("sales_agent")
+        for _ in range(10):
+            reset_knowledge_base_provider("sales_agent")
+            provider = KnowledgeBaseFactory.create("sales_agent")
+
+        assert provider is first
+        assert len(FakeProvider.constructed) == 1
+        assert registry.get_stats()["ref_counts"][registry.make_key(KB_CONFIGS["sales_agent"])] == 1
+
+    def test_config_change_creates_new_provider_and_idles_old(self, registry, monkeypatch):
+        """Test that a changed configuration gets a new instance and the old one is evicted when idle."""
+        old = KnowledgeBaseFactory.create("sales_agent")
+        monkeypatch.setitem(KB_CONFIGS, "sales_agent", KB_CONFIGS["support_agent"])
+        new = KnowledgeBaseFactory.create("sales_agent")
+
+        assert new is not old
+        assert registry.evict_idle() == 0
+
+        assert registry.evict_idle(now=old_time_plus_ttl(registry)) == 1
+        assert old.closed
+        assert not new.closed
+
+    def test_referenced_providers_are_never_evicted(self, registry):
+        """Test that providers still held by an agent survive idle eviction."""
+        provider = KnowledgeBaseFactory.create("sales_agent")
+
+        assert registry.evict_idle(now=old_time_plus_ttl(registry)) == 0
+        assert not provider.closed
+
+    def test_disabled_kb_releases_previous_provider(self, registry, monkeypatch):
+        """Test that disabling the KB for an agent releases its reference."""
+        KnowledgeBaseFactory.create("sales_agent")
+        monkeypatch.setitem(KB_CONFIGS, "sales_agent", KB_CONFIGS["no_kb_agent"])
+
+        assert KnowledgeBaseFactory.create("sales_agent") is None
+        assert registry.get_stats()["owners"] == 0
+
+    def test_close_all_runs_close_hooks(self, registry):
+        """Test that closing the registry closes every provider."""
+        KnowledgeBaseFactory.create("sales_agent")
+        KnowledgeBaseFactory.create("support_agent")
+
+        knowledge_base.close_knowledge_base_providers()
+
+        assert all(provider.closed for provider in FakeProvider.constructed)
+        assert registry.get_stats()["providers"] == 0
+
+
+def old_time_plus_ttl(registry):
+    """Return a timestamp past the idle TTL of every current entry."""
+    return time.time() + registry.idle_ttl_seconds + 1
+
+
+class TestConcurrentAcquire:
+    """Test cases for building providers outside the registry lock."""
+
+    def test_slow_build_does_not_block_other_keys(self):
+        """Test that building one provider does not stall acquires of other keys."""
+        registry = KnowledgeBaseProviderRegistry()
+        registry.acquire("fast_agent", "fast", lambda: FakeProvider({}))
+        started = threading.Event()
+
+        def slow_factory():
+            started.set()
+            time.sleep(0.5)
+            return FakeProvider({})
+
+        builder = threading.Thread(target=registry.acquire, args=("slow_agent", "slow", slow_factory))
+        builder.start()
+        started.wait()
+
+        start = time.time()
+        registry.acquire("other_agent", "fast", lambda: FakeProvider({}))
+        registry.acquire("new_agent", "new", lambda: FakeProvider({}))
+        elapsed = time.time() - start
+        builder.join()
+
+        assert elapsed < 0.2
+        assert registry.get_stats()["constructions"] == 3
+
+    def test_concurrent_acquires_of_one_key_build_once(self):
+        """Test that callers racing for the same key share one construction."""
+        registry = KnowledgeBaseProviderRegistry()
+
+        def slow_factory():
+            time.sleep(0.2)
+            return FakeProvider({})
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda n=n: results.append(registry.acquire(f"agent_{n}", "shared", slow_factory)))
+            for n in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert registry.constructions == 1
+        assert len({id(provider) for provider in results}) == 1
+        assert registry.get_stats()["ref_counts"]["shared"] == 5
+
+    def test_failed_build_lets_the_next_caller_retry(self):
+        """Test that a factory error is raised and does not leave the key stuck."""
+        registry = KnowledgeBaseProviderRegistry()
+
+        def failing_factory():
+            raise RuntimeError("connection refused")
+
+        with pytest.raises(RuntimeError):
+            registry.acquire("sales_agent", "sales", failing_factory)
+
+        assert registry.acquire("sales_agent", "sales", lambda: FakeProvider({})) is not None
+        assert registry.constructions == 1
+
+    def test_slow_close_does_not_block_other_keys(self):
+        """Test that closing an idle provider does not stall acquires of other keys."""
+        registry = KnowledgeBaseProviderRegistry(idle_ttl_seconds=0)
+        started = threading.Event()
+        slow = FakeProvider({})
+
+        def slow_close():
+            started.set()
+            time.sleep(0.5)
+
+        slow.close = slow_close
+        registry.acquire("old_agent", "old", lambda: slow)
+        registry.release("old_agent")
+        evictor = threading.Thread(target=registry.evict_idle)
+        evictor.start()
+        started.wait()
+
+        start = time.time()
+        registry.get_stats()
+        registry.acquire("new_agent", "new", lambda: FakeProvider({}))
+        elapsed = time.time() - start
+        evictor.join()
+
+        assert elapsed < 0.2
+
+    def test_registry_requires_make_key(self):
+        """Test that a registry without make_key cannot be created."""
+        with pytest.raises(TypeError):
+            ProviderRegistry()
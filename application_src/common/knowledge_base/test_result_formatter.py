@@ -0,0 +1,105 @@
+"""
+Tests for the tabular result formatter.
+
+This module tests budget adherence, truncation reporting and formatting modes,
+and benchmarks the formatter on a large synthetic result.
+"""
+
+import time
+
+import pytest
+from knowledge_base.result_formatter import TabularResultFormatter
+
+
+def synthetic_rows(count, width=8):
+    """Generate synthetic result rows."""
+    return [[f"row{i}_col{j}" * (1 + j % 3) for j in range(width)] for i in range(count)]
+
+
+class TestTabularResultFormatter:
+    """Test cases for the tabular result formatter."""
+
+    @pytest.mark.parametrize("mode", ["markdown", "csv"])
+    @pytest.mark.parametrize("max_chars", [500, 2000, 8000])
+    def test_output_respects_character_budget(self, mode, max_chars):
+        """Test that output never exceeds the character budget."""
+        columns = [f"column_{j}" for j in range(8)]
+        formatter = TabularResultFormatter(mode=mode, max_chars=max_chars, max_rows=10000)
+        result = formatter.format(columns, synthetic_rows(5000))
+
+        assert len(result) <= max_chars
+        assert "[Truncated: showing" in result
+        assert "(character budget)" in result
+        assert result.endswith("Total rows: 5000")
+
+    def test_token_budget_tightens_character_budget(self):
+        """Test that a token budget is converted into a character cap."""
+        formatter = TabularResultFormatter(max_chars=8000, max_tokens=300)
+        result = formatter.format(["a", "b"], synthetic_rows(1000, width=2), total_rows=1000)
+
+        assert formatter.max_chars == 1200
+        assert len(result) <= 1200
+
+    def test_row_column_and_cell_caps_are_reported(self):
+        """Test that row, column and cell clipping are reported explicitly."""
+        columns = [f"c{j}" for j in range(30)]
+        rows = [["x" * 100] * 30 for _ in range(20)]
+        formatter = TabularResultFormatter(max_rows=5, max_columns=10, max_cell_width=12, max_chars=100000)
+        result = formatter.format(columns, rows)
+
+        assert "showing 5 of 20 rows (row limit)" in result
+        assert "showing 10 of 30 columns" in result
+        assert "cells clipped to 12 chars" in result
+        assert "x" * 13 not in result
+
+    def test_small_result_is_not_truncated(self):
+        """Test that results within every cap are rendered in full without a notice."""
+        result = TabularResultFormatter().format(["name", "total"], [["alice", 10], ["bob", None]])
+
+        assert result == "| name | total |\n| --- | --- |\n| alice | 10 |\n| bob | NULL |\n\nTotal rows: 2"
+
+    def test_csv_mode_quotes_special_characters(self):
+        """Test that compact CSV mode quotes cells containing separators."""
+        result = TabularResultFormatter(mode="csv").format(["name", "note"], [["a,b", 'say "hi"']])
+
+        assert result.startswith('name,note\n"a,b","say ""hi"""\n')
+
+    def test_markdown_mode_escapes_pipes(self):
+        """Test that markdown mode escapes pipes and newlines inside cells."""
+        result = TabularResultFormatter().format(["v"], [["a|b\nc"]])
+
+        assert "| a\\|b c |" in result
+
+    def test_unsized_rows_are_consumed_lazily(self):
+        """Test that generator input stops being consumed once the cap is reached."""
+        consumed = []
+
+        def rows():
+            for i in range(100000):
+                consumed.append(i)
+                yield [i]
+
+        result = TabularResultFormatter(max_rows=10).format(["i"], rows())
+
+        assert len(consumed) == 11
+        assert "showing 10 of more rows" in result
+        assert result.endswith("Total rows: unknown")
+
+    def test_invalid_mode_raises(self):
+        """Test that an unsupported mode is rejected."""
+        with pytest.raises(ValueError, match="Unsupported result format mode"):
+            TabularResultFormatter(mode="html")
+
+    def test_benchmark_100k_rows(self):
+        """Benchmark formatting a 100k-row result under the default budget."""
+        columns = [f"column_{j}" for j in range(12)]
+        rows = synthetic_rows(100000, width=12)
+
+        start = time.perf_counter()
+        result = TabularResultFormatter(max_rows=100000).format(columns, rows)
+        elapsed = time.perf_counter() - start
+        print(f"\nFormatted 100k-row result into {len(result)} chars in {elapsed * 1000:.2f}ms")
+
+        assert len(result) <= 8000
+        assert result.endswith("Total rows: 100000")
+        assert elapsed < 0.5
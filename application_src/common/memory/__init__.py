@@ -12,13 +12,18 @@ from .mem0 import Mem0MemoryProvider
 from .opensearch import OpenSearchMemoryProvider
 from .bedrock_agentcore import BedrockAgentCoreMemoryProvider
 from .elasticsearch import ElasticsearchMemory
+from .registry import MemoryProviderRegistry
+from .write_behind import drain_all
+
+# Process-wide registry of provider instances, keyed by provider name and config hash
+_memory_registry = MemoryProviderRegistry()
 
 class MemoryFactory:
     """Factory for creating memory providers."""
     
     @staticmethod
     def create(agent_name="qa_agent"):
-        """Create a memory provider based on configuration."""
+        """Create or reuse a memory provider based on configuration."""
         # Create a config instance with the specified agent_name
         agent_config = Config(agent_name)
         
@@ -26,10 +31,22 @@ class MemoryFactory:
         
         if not memory_config["enabled"]:
             print("Memory is disabled")
+            _memory_registry.release(agent_name)
             return None
         
         provider = memory_config["provider"].lower()
         
+        # Rebuilding an agent with unchanged memory settings reuses the initialized provider
+        key = _memory_registry.make_key(memory_config)
+        return _memory_registry.acquire(
+            agent_name,
+            key,
+            lambda: MemoryFactory._create_provider(provider, memory_config)
+        )
+    
+    @staticmethod
+    def _create_provider(provider, memory_config):
+        """Create a new provider instance for the given provider name."""
         if provider == "mem0":
             return Mem0MemoryProvider(memory_config)
         elif provider == "opensearch":
@@ -42,6 +59,19 @@ class MemoryFactory:
             print(f"Unknown memory provider: {provider}")
             return None
 
+def drain_memory_writes(timeout=10.0):
+    """Write all queued memory interactions and stop the writers, e.g. on application shutdown."""
+    if drain_all(timeout):
+        print("All queued memory writes have been flushed")
+    else:
+        print("⚠️ Some queued memory writes could not be flushed before shutdown")
+
+def close_memory_providers(timeout=10.0):
+    """Flush queued memory writes and close all cached memory providers, e.g. on application shutdown."""
+    drain_memory_writes(timeout)
+    _memory_registry.close_all()
+    print("All memory providers have been closed")
+
 def get_memory_tools(agent_name="qa_agent"):
     """Get memory tools for use with Strands Agent."""
     memory_provider = MemoryFactory.create(agent_name)
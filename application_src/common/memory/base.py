@@ -33,3 +33,7 @@ class BaseMemoryProvider(ABC):
             if provider.get("name", "").lower() == self.provider_name.lower():
                 return provider.get("config", {})
         return {}
+    
+    def close(self):
+        """Release provider resources. Providers holding clients or threads override this."""
+        pass
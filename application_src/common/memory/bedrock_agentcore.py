@@ -5,12 +5,22 @@ Based on the official AWS Bedrock AgentCore samples and patterns.
 """
 
 import os
+import re
+import time
 import uuid
 import traceback
 import json
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from .base import BaseMemoryProvider
+from .context_assembler import MemoryContextAssembler, memory_score, memory_text
+from .context_cache import SessionContextCache
+from .write_behind import WriteBehindQueue
+try:
+    from ..text_similarity import normalize_text
+except ImportError:
+    from text_similarity import normalize_text
 
 # Import Bedrock AgentCore components
 try:
@@ -24,6 +34,41 @@ except ImportError:
 # Default user ID for memory operations when none is provided (must comply with AWS namespace pattern)
 DEFAULT_USER_ID = "ayanray_amazon_com"
 
+# Defaults for long-term memory lookups in the MessageAddedEvent hook
+DEFAULT_RETRIEVAL_TIMEOUT_SECONDS = 2.0
+# Room for the namespaces of concurrent turns plus lookups still running past their deadline
+DEFAULT_RETRIEVAL_MAX_WORKERS = 16
+DEFAULT_RETRIEVAL_TOP_K = 3
+DEFAULT_CONTEXT_LIMIT = 5
+
+
+def merge_memories(memory_lists: List[List[Any]]) -> List[Any]:
+    """
+    Merge memory records retrieved from several namespaces.
+
+    Records sharing a memoryRecordId or normalized text are kept once, with the
+    highest score seen. The result is ordered by score, with unscored records
+    keeping their retrieval order. Near-duplicates with different wording are
+    left to the context assembler.
+    """
+    merged: List[Any] = []
+    positions: Dict[str, int] = {}
+    for memories in memory_lists:
+        for memory in memories or []:
+            keys = ["text:" + normalize_text(memory_text(memory))]
+            if isinstance(memory, dict) and memory.get('memoryRecordId'):
+                keys.append(f"id:{memory['memoryRecordId']}")
+            position = next((positions[key] for key in keys if key in positions), None)
+            if position is None:
+                position = len(merged)
+                merged.append(memory)
+            elif memory_score(memory) > memory_score(merged[position]):
+                merged[position] = memory
+            for key in keys:
+                positions.setdefault(key, position)
+    return sorted(merged, key=lambda memory: -memory_score(memory))
+
+
 class BedrockAgentCoreMemoryProvider(BaseMemoryProvider):
     """Memory provider for Bedrock AgentCore with short-term and long-term memory capabilities."""
     
@@ -44,12 +89,46 @@ class BedrockAgentCoreMemoryProvider(BaseMemoryProvider):
         self.region = provider_config.get("region", "us-east-1")
         self.memory_id = provider_config.get("memory_id", None)
         self.memory_name = provider_config.get("memory_name", "GenAI_In_A_Box_Memory")
+        self.retrieval_timeout = float(provider_config.get("retrieval_timeout_seconds", DEFAULT_RETRIEVAL_TIMEOUT_SECONDS))
+        self.retrieval_top_k = int(provider_config.get("retrieval_top_k", DEFAULT_RETRIEVAL_TOP_K))
+        # Shared by the hooks of every agent created from this provider, so rebuilds do not add threads
+        self.retrieval_executor = ThreadPoolExecutor(
+            max_workers=int(provider_config.get("retrieval_max_workers", DEFAULT_RETRIEVAL_MAX_WORKERS)),
+            thread_name_prefix="agentcore-memory"
+        )
+        self.writer = None
+        self.context_assembler = MemoryContextAssembler(
+            token_budget=int(provider_config.get("context_token_budget", 1000)),
+            max_items=int(provider_config.get("context_max_items", DEFAULT_CONTEXT_LIMIT)),
+            dedupe_threshold=float(provider_config.get("context_dedupe_threshold", 0.85)),
+            recency_weight=float(provider_config.get("context_recency_weight", 0.1)),
+            recency_half_life_days=float(provider_config.get("context_recency_half_life_days", 30))
+        )
+        self.context_cache = None
+        if provider_config.get("context_cache", True):
+            self.context_cache = SessionContextCache(
+                max_turns=int(provider_config.get("context_cache_max_turns", 5)),
+                ttl_seconds=float(provider_config.get("context_cache_ttl_seconds", 300)),
+                similarity_threshold=float(provider_config.get("context_cache_similarity", 0.5))
+            )
         
         # Initialize Bedrock AgentCore Memory client
         try:
             self.memory_client = MemoryClient(region_name=self.region)
             print(f"✅ Bedrock AgentCore Memory client initialized for region: {self.region}")
             
+            # Interactions saved by the hooks are written in the background
+            if provider_config.get("write_behind", True):
+                self.writer = WriteBehindQueue(
+                    self.memory_client,
+                    max_queue_size=int(provider_config.get("write_queue_size", 1000)),
+                    batch_size=int(provider_config.get("write_batch_size", 20)),
+                    max_retries=int(provider_config.get("write_max_retries", 3)),
+                    retry_delay=float(provider_config.get("write_retry_delay", 0.5)),
+                    # New interactions can change what a session's lookups return
+                    on_written=self.context_cache.invalidate if self.context_cache else None
+                )
+            
             # Initialize or get existing memory resource
             if not self.memory_id:
                 self.memory_id = self._initialize_memory_resource()
@@ -287,7 +366,10 @@ class BedrockAgentCoreMemoryProvider(BaseMemoryProvider):
                         except Exception as e:
                             print(f"⚠️ Could not retrieve from semantic namespace: {e}")
                         
-                        memories = all_memories[:limit]
+                        memories = all_memories
+                    
+                    # Drop near-duplicates and keep the best memories within the token budget
+                    memories = self.context_assembler.assemble(memories or [], max_items=limit)
                     
                     if memories:
                         print(f"✅ Retrieved {len(memories)} memories")
@@ -745,7 +827,13 @@ class BedrockAgentCoreMemoryProvider(BaseMemoryProvider):
             memory_id=self.memory_id,
             memory_client=self.memory_client,
             actor_id=actor_id,
-            session_id=session_id
+            session_id=session_id,
+            executor=self.retrieval_executor,
+            retrieval_timeout=self.retrieval_timeout,
+            top_k=self.retrieval_top_k,
+            writer=self.writer,
+            context_cache=self.context_cache,
+            context_assembler=self.context_assembler
         )
     
     def get_tools(self) -> List:
@@ -754,16 +842,55 @@ class BedrockAgentCoreMemoryProvider(BaseMemoryProvider):
             return self.initialize()
         return self.tools
 
+    def close(self, timeout: float = 10.0):
+        """Write queued interactions and stop the background threads."""
+        if getattr(self, 'writer', None) is not None:
+            self.writer.close(timeout)
+        if hasattr(self, 'retrieval_executor'):
+            self.retrieval_executor.shutdown(wait=False, cancel_futures=True)
+
 
 class BedrockAgentCoreMemoryHooks:
-    """Memory hooks for Bedrock AgentCore following the official samples pattern."""
+    """
+    Memory hooks for Bedrock AgentCore following the official samples pattern.
+
+    Namespaces are searched concurrently on a bounded executor under one total
+    deadline of ``retrieval_timeout`` seconds, so a user turn waits for the
+    slowest namespace rather than the sum of all of them. Namespaces that miss
+    the deadline or fail are skipped and the turn continues with the rest;
+    lookups that have not started by then are cancelled, and a namespace whose
+    lookup from an earlier turn is still running is skipped rather than
+    queried again, so slow namespaces cannot occupy every worker. Without an
+    ``executor``, the hooks create their own and shut it down in ``close``.
+
+    With a ``writer``, interactions are queued for a background write instead
+    of being written inside the AfterInvocationEvent hook. With a
+    ``context_cache``, namespaces whose memories were fetched for a similar
+    message earlier in the session are not queried again; the cache entries of
+    the session are dropped once a new interaction is stored, by the writer's
+    ``on_written`` callback or after a direct write. The injected context
+    is selected by a ``context_assembler``, which drops near-duplicates and
+    keeps it within a token budget; ``context_limit`` is only the item limit of
+    the default assembler used when none is given.
+    """
     
-    def __init__(self, memory_id: str, memory_client, actor_id: str, session_id: str):
+    def __init__(self, memory_id: str, memory_client, actor_id: str, session_id: str,
+                 executor: Optional[ThreadPoolExecutor] = None,
+                 retrieval_timeout: float = DEFAULT_RETRIEVAL_TIMEOUT_SECONDS,
+                 top_k: int = DEFAULT_RETRIEVAL_TOP_K, context_limit: int = DEFAULT_CONTEXT_LIMIT,
+                 writer: Optional[WriteBehindQueue] = None,
+                 context_cache: Optional[SessionContextCache] = None,
+                 context_assembler: Optional[MemoryContextAssembler] = None):
         """Initialize memory hooks."""
         self.memory_id = memory_id
         self.memory_client = memory_client
         self.actor_id = actor_id
         self.session_id = session_id
+        self.retrieval_timeout = retrieval_timeout
+        self.top_k = top_k
+        self.context_assembler = context_assembler or MemoryContextAssembler(max_items=context_limit)
+        self.writer = writer
+        self.context_cache = context_cache
         
         # Get namespaces from memory strategies with validation
         try:
@@ -787,12 +914,79 @@ class BedrockAgentCoreMemoryHooks:
             }
             print(f"✅ Using fallback namespaces: {list(self.namespaces.keys())}")
 
+        # Twice the namespaces, so stragglers from an earlier turn leave room for the next one
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max(2 * len(self.namespaces), 1),
+            thread_name_prefix="agentcore-memory"
+        )
+        self._in_flight: Dict[str, Future] = {}
+
+    def close(self):
+        """Shut down the executor if the hooks created it."""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
     def _is_valid_memory_id(self, memory_id: str) -> bool:
         """Validate memory ID format: [a-zA-Z][a-zA-Z0-9-_]{0,99}-[a-zA-Z0-9]{10}"""
         import re
         # Pattern allows: letter + alphanumeric/underscore/dash (0-99 chars) + dash + alphanumeric (exactly 10 chars)
         pattern = r'^[a-zA-Z][a-zA-Z0-9_-]{0,99}-[a-zA-Z0-9]{10}$'  
         return bool(re.match(pattern, memory_id))
+
+    def _retrieve_namespace(self, namespace: str, query: str) -> Tuple[List[Any], float]:
+        """Search one namespace and measure how long it took."""
+        start = time.time()
+        memories = self.memory_client.retrieve_memories(
+            memory_id=self.memory_id,
+            namespace=namespace.format(actorId=self.actor_id),
+            query=query,
+            top_k=self.top_k
+        )
+        return memories or [], time.time() - start
+
+    def retrieve_namespaces(self, query: str) -> List[Any]:
+        """
+        Search all namespaces concurrently and return the merged, deduplicated memories.
+
+        Namespaces still running when the deadline expires, or raising an error,
+        contribute nothing. Namespaces served from the context cache are not queried.
+        """
+        results: Dict[str, List[Any]] = {}
+        futures = {}
+        for context_type, namespace in self.namespaces.items():
+            cached = self.context_cache.get(self.actor_id, self.session_id, namespace, query) if self.context_cache else None
+            if cached is not None:
+                results[context_type] = cached
+                continue
+            straggler = self._in_flight.get(context_type)
+            if straggler is not None and not straggler.done():
+                print(f"⚠️ Skipping {context_type}, its lookup from an earlier turn is still running")
+                continue
+            futures[context_type] = self._in_flight[context_type] = self.executor.submit(
+                self._retrieve_namespace, namespace, query
+            )
+        if results:
+            print(f"📚 Reusing cached memories from {list(results)}")
+        done, _ = wait(futures.values(), timeout=self.retrieval_timeout) if futures else (set(), set())
+
+        for context_type, future in futures.items():
+            if future not in done:
+                # Only lookups that have not started yet can be cancelled
+                future.cancel()
+                print(f"⚠️ Timed out retrieving from {context_type} after {self.retrieval_timeout}s")
+                continue
+            try:
+                memories, elapsed = future.result()
+            except Exception as e:
+                print(f"⚠️ Could not retrieve from {context_type}: {e}")
+                continue
+            if memories:
+                print(f"📚 Retrieved {len(memories)} memories from {context_type} in {elapsed * 1000:.0f}ms")
+            if self.context_cache:
+                self.context_cache.put(self.actor_id, self.session_id, self.namespaces[context_type], query, memories)
+            results[context_type] = memories
+        return merge_memories([results[context_type] for context_type in self.namespaces if context_type in results])
     
     def retrieve_user_context(self, event):
         """Retrieve user context before processing query (MessageAddedEvent handler)."""
@@ -810,44 +1004,23 @@ class BedrockAgentCoreMemoryHooks:
                 user_query = messages[-1]["content"][0]["text"]
                 print(f"🔍 Retrieving context for query: {user_query[:100]}...")
                 
-                # Retrieve context from all namespaces
-                all_context = []
+                # Retrieve context from all namespaces concurrently
+                all_context = self.retrieve_namespaces(user_query)
                 
-                for context_type, namespace in self.namespaces.items():
-                    try:
-                        # Format namespace with actual actor_id
-                        formatted_namespace = namespace.format(actorId=self.actor_id)
-                        
-                        memories = self.memory_client.retrieve_memories(
-                            memory_id=self.memory_id,
-                            namespace=formatted_namespace,
-                            query=user_query,
-                            top_k=3
-                        )
-                        
-                        if memories:
-                            all_context.extend(memories)
-                            print(f"📚 Retrieved {len(memories)} memories from {context_type}")
-                            
-                    except Exception as e:
-                        print(f"⚠️ Could not retrieve from {context_type}: {e}")
+                # Keep the most relevant distinct memories within the token budget
+                selected = self.context_assembler.assemble(all_context)
                 
                 # Inject context into the conversation if found
-                if all_context:
-                    context_text = "\n".join([
-                        f"Context: {mem.get('content', mem.get('text', str(mem)))}" 
-                        for mem in all_context[:5]  # Limit to top 5 most relevant
-                    ])
-                    
+                if selected:
                     # Add context as a system message
                     context_message = {
                         "role": "system",
-                        "content": [{"text": f"Relevant user context:\n{context_text}"}]
+                        "content": [{"text": self.context_assembler.render(selected)}]
                     }
                     
                     # Insert context before the user message
                     event.agent.messages.insert(-1, context_message)
-                    print(f"✅ Injected {len(all_context)} context items into conversation")
+                    print(f"✅ Injected {len(selected)} of {len(all_context)} context items into conversation")
                     
         except Exception as e:
             print(f"❌ Error retrieving user context: {e}")
@@ -877,6 +1050,13 @@ class BedrockAgentCoreMemoryHooks:
                         break
                 
                 if user_message:
+                    interaction = [(user_message, "USER"), (assistant_message, "ASSISTANT")]
+                    
+                    # Queue the interaction so the response is not held up by the write
+                    if self.writer is not None and not self.writer.closed:
+                        self.writer.enqueue(self.memory_id, self.actor_id, self.session_id, interaction)
+                        return
+                    
                     # Create event for memory storage
                     event_id = str(uuid.uuid4())
                     
@@ -885,8 +1065,10 @@ class BedrockAgentCoreMemoryHooks:
                         memory_id=self.memory_id,
                         actor_id=self.actor_id,
                         session_id=self.session_id,
-                        messages=[(user_message, "USER"), (assistant_message, "ASSISTANT")]
+                        messages=interaction
                     )
+                    if self.context_cache:
+                        self.context_cache.invalidate(self.actor_id, self.session_id)
                     
                     print(f"✅ Saved interaction to memory: {event_id}")
                     
@@ -0,0 +1,141 @@
+"""
+Token-budgeted memory context assembly for GenAI-In-A-Box agent.
+This module selects which retrieved memories go into the prompt: near-duplicates
+are dropped, the rest are ranked by score and recency and packed into a budget.
+"""
+
+import math
+import time
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+
+try:
+    from ..text_similarity import jaccard_similarity, token_set
+except ImportError:
+    from text_similarity import jaccard_similarity, token_set
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text.
+
+    Uses the common four-characters-per-token approximation, rounded up, so the
+    estimate is deterministic and never zero for non-empty text.
+    """
+    return math.ceil(len(text or "") / 4)
+
+
+def memory_text(memory: Any) -> str:
+    """Get the text of a memory record, whose content may be a string or a {"text": ...} dict."""
+    if not isinstance(memory, dict):
+        return str(memory)
+    content = memory.get('content', memory.get('text', memory.get('message')))
+    if isinstance(content, dict):
+        content = content.get('text', content)
+    return str(content) if content is not None else str(memory)
+
+
+def memory_score(memory: Any) -> float:
+    """Relevance score of a memory record, 0 when the record has none."""
+    if isinstance(memory, dict) and isinstance(memory.get('score'), (int, float)):
+        return float(memory['score'])
+    return 0.0
+
+
+def memory_timestamp(memory: Any) -> Optional[float]:
+    """Creation time of a memory record as epoch seconds, if the record has one."""
+    if not isinstance(memory, dict):
+        return None
+    value = memory.get('createdAt', memory.get('created_at', memory.get('timestamp')))
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class MemoryContextAssembler:
+    """
+    Select and render retrieved memories within a token budget.
+
+    Memories are ranked by ``score + recency_weight * 0.5 ** (age / half_life)``,
+    where records without a timestamp get no recency bonus and ties keep the
+    retrieval order. Walking that ranking, a memory whose token overlap with an
+    already selected one is at least ``dedupe_threshold`` is dropped, and a
+    memory whose rendered line does not fit the remaining budget is skipped in
+    favour of smaller ones further down. The budget covers the rendered
+    context including its header.
+    """
+
+    def __init__(self, token_budget: int = 1000, max_items: Optional[int] = None,
+                 dedupe_threshold: float = 0.85, recency_weight: float = 0.1,
+                 recency_half_life_days: float = 30, header: str = "Relevant user context:",
+                 line_prefix: str = "Context: ", token_estimator: Callable[[str], int] = estimate_tokens,
+                 clock: Callable[[], float] = time.time):
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.dedupe_threshold = dedupe_threshold
+        self.recency_weight = recency_weight
+        self.recency_half_life_days = recency_half_life_days
+        self.header = header
+        self.line_prefix = line_prefix
+        self.token_estimator = token_estimator
+        self._clock = clock
+
+    def rank_score(self, memory: Any) -> float:
+        """Combined score and recency rank of a memory."""
+        score = memory_score(memory)
+        created_at = memory_timestamp(memory)
+        if created_at is None or not self.recency_weight:
+            return score
+        age_days = max(self._clock() - created_at, 0) / 86400
+        return score + self.recency_weight * 0.5 ** (age_days / self.recency_half_life_days)
+
+    def _line(self, memory: Any) -> str:
+        return f"{self.line_prefix}{memory_text(memory)}"
+
+    def assemble(self, memories: List[Any], max_items: Optional[int] = None) -> List[Any]:
+        """
+        Select the memories to inject, best first.
+
+        Args:
+            memories: Retrieved memory records
+            max_items: Maximum number of memories, overriding the configured limit
+
+        Returns:
+            The selected memory records, deduplicated and within the token budget
+        """
+        max_items = max_items if max_items is not None else self.max_items
+        ranked = sorted(memories or [], key=lambda memory: -self.rank_score(memory))
+
+        remaining = self.token_budget - self.token_estimator(self.header + "\n")
+        selected: List[Any] = []
+        selected_tokens: List[frozenset] = []
+        for memory in ranked:
+            if max_items is not None and len(selected) >= max_items:
+                break
+            tokens = token_set(memory_text(memory))
+            if any(jaccard_similarity(tokens, other) >= self.dedupe_threshold for other in selected_tokens):
+                continue
+            cost = self.token_estimator(self._line(memory) + "\n")
+            if cost > remaining:
+                continue
+            selected.append(memory)
+            selected_tokens.append(tokens)
+            remaining -= cost
+        return selected
+
+    def render(self, memories: List[Any]) -> str:
+        """Render selected memories as context text; empty if there are none."""
+        if not memories:
+            return ""
+        return "\n".join([self.header] + [self._line(memory) for memory in memories])
+
+    def build_context(self, memories: List[Any], max_items: Optional[int] = None) -> str:
+        """Select memories within the budget and render them."""
+        return self.render(self.assemble(memories, max_items))
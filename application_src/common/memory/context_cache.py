@@ -0,0 +1,95 @@
+"""
+Session-scoped cache of long-term memory lookups for GenAI-In-A-Box agent.
+This module lets consecutive turns of a conversation reuse the memories
+retrieved for an earlier, similar message instead of querying memory again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from ..text_similarity import jaccard_similarity, token_set
+except ImportError:
+    from text_similarity import jaccard_similarity, token_set
+
+
+class _CacheEntry:
+    """Memories retrieved for one query and how many turns they have served."""
+
+    def __init__(self, query_tokens: frozenset, memories: List[Any], created_at: float):
+        self.query_tokens = query_tokens
+        self.memories = memories
+        self.created_at = created_at
+        self.turns = 1
+
+
+class SessionContextCache:
+    """
+    Cache of memory lookups keyed by (actor, session, namespace).
+
+    An entry serves at most ``max_turns`` turns (including the one that
+    fetched it) and expires ``ttl_seconds`` after it was fetched. A new
+    message only reuses an entry while its token overlap with the query that
+    fetched the entry is at least ``similarity_threshold``; a message that
+    diverges further is re-queried and replaces the entry. At most
+    ``max_entries`` entries are kept, least recently used first out.
+    """
+
+    def __init__(self, max_turns: int = 5, ttl_seconds: float = 300, similarity_threshold: float = 0.5,
+                 max_entries: int = 1000, clock: Callable[[], float] = time.time):
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str, str], _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "diverged": 0}
+
+    def get(self, actor_id: str, session_id: str, namespace: str, query: str) -> Optional[List[Any]]:
+        """
+        Get cached memories for a namespace if they can serve this query.
+
+        Returns:
+            The cached memories, or None if the namespace must be queried
+        """
+        key = (actor_id, session_id, namespace)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.turns >= self.max_turns or self._clock() - entry.created_at >= self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                return None
+            if jaccard_similarity(entry.query_tokens, token_set(query)) < self.similarity_threshold:
+                self.stats["diverged"] += 1
+                return None
+            entry.turns += 1
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.memories
+
+    def put(self, actor_id: str, session_id: str, namespace: str, query: str, memories: List[Any]):
+        """Cache the memories retrieved from a namespace for a query."""
+        key = (actor_id, session_id, namespace)
+        with self._lock:
+            self._entries[key] = _CacheEntry(token_set(query), list(memories), self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, actor_id: str, session_id: Optional[str] = None):
+        """Drop the entries of an actor, or of one of the actor's sessions."""
+        with self._lock:
+            for key in [key for key in self._entries
+                        if key[0] == actor_id and (session_id is None or key[1] == session_id)]:
+                del self._entries[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
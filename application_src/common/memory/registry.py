@@ -0,0 +1,30 @@
+"""
+Memory provider registry for GenAI-In-A-Box agent.
+This module keeps initialized memory providers keyed by provider name and configuration hash.
+"""
+
+from typing import Any, Dict
+
+try:
+    from ..provider_registry import ProviderRegistry
+except ImportError:
+    from provider_registry import ProviderRegistry
+
+
+class MemoryProviderRegistry(ProviderRegistry):
+    """
+    Registry of memory provider instances.
+
+    Providers are keyed by provider name and a hash of the memory
+    configuration, so rebuilding an agent with unchanged memory settings
+    reuses the initialized provider (client, memory resource, tools) instead
+    of setting it up again.
+    """
+
+    log_prefix = "Memory Registry"
+
+    @staticmethod
+    def make_key(memory_config: Dict[str, Any]) -> str:
+        """Build the registry key for a memory configuration."""
+        provider = str(memory_config.get("provider", "")).lower()
+        return f"{provider}:{ProviderRegistry.config_hash(memory_config)}"
@@ -0,0 +1,358 @@
+"""
+Tests for the Bedrock AgentCore memory hooks.
+
+This module tests concurrent namespace retrieval in the MessageAddedEvent hook
+and write-behind saving in the AfterInvocationEvent hook with a fake memory
+client that sleeps per call, and reuse of cached context across turns.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from strands.hooks import AfterInvocationEvent, MessageAddedEvent
+from memory.bedrock_agentcore import BedrockAgentCoreMemoryHooks, merge_memories
+from memory.context_assembler import MemoryContextAssembler, estimate_tokens
+from memory.context_cache import SessionContextCache
+from memory.write_behind import WriteBehindQueue
+
+MEMORY_ID = "GenAI_Memory-abcdefghij"
+
+
+class FakeMemoryClient:
+    """Memory client returning fixed records per namespace after a per-namespace delay."""
+
+    def __init__(self, namespaces, delays=None, errors=None, write_delay=0.0):
+        self.namespaces = namespaces
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.write_delay = write_delay
+        self.records = {}
+        self.calls = []
+        self.events = []
+        self.lock = threading.Lock()
+
+    def get_memory_strategies(self, memory_id):
+        return [{"type": name, "namespaces": [namespace]} for name, namespace in self.namespaces.items()]
+
+    def retrieve_memories(self, memory_id, namespace, query, top_k=3):
+        with self.lock:
+            self.calls.append(namespace)
+        time.sleep(self.delays.get(namespace, 0))
+        if namespace in self.errors:
+            raise self.errors[namespace]
+        return self.records.get(namespace, [{"content": {"text": f"fact from {namespace}"}}])[:top_k]
+
+    def create_event(self, memory_id, actor_id, session_id, messages):
+        time.sleep(self.write_delay)
+        with self.lock:
+            self.events.append((session_id, list(messages)))
+
+
+def make_hooks(client, **kwargs):
+    return BedrockAgentCoreMemoryHooks(MEMORY_ID, client, actor_id="user1", session_id="session1", **kwargs)
+
+
+def user_turn(text):
+    """Create a MessageAddedEvent for a user message on a fake agent."""
+    message = {"role": "user", "content": [{"text": text}]}
+    agent = SimpleNamespace(messages=[message])
+    return MessageAddedEvent(agent=agent, message=message)
+
+
+def injected_context(event):
+    system_messages = [m for m in event.agent.messages if m["role"] == "system"]
+    return system_messages[0]["content"][0]["text"] if system_messages else None
+
+
+def finished_turn(question, answer):
+    """Create an AfterInvocationEvent after the agent answered a question."""
+    agent = SimpleNamespace(messages=[
+        {"role": "user", "content": [{"text": question}]},
+        {"role": "assistant", "content": [{"text": answer}]}
+    ])
+    return AfterInvocationEvent(agent=agent)
+
+
+NAMESPACES = {
+    "userPreferenceMemoryStrategy": "genai/user/{actorId}/preferences",
+    "semanticMemoryStrategy": "genai/user/{actorId}/semantic",
+    "summaryMemoryStrategy": "genai/user/{actorId}/summaries",
+    "episodicMemoryStrategy": "genai/user/{actorId}/episodes"
+}
+
+
+class TestConcurrentRetrieval:
+    """Test cases for concurrent namespace retrieval."""
+
+    def test_latency_close_to_slowest_namespace(self):
+        """Test that a turn waits for the slowest namespace, not the sum of all of them."""
+        delays = {
+            "genai/user/user1/preferences": 0.2,
+            "genai/user/user1/semantic": 0.2,
+            "genai/user/user1/summaries": 0.2,
+            "genai/user/user1/episodes": 0.3
+        }
+        hooks = make_hooks(FakeMemoryClient(NAMESPACES, delays=delays))
+        event = user_turn("what do I like?")
+
+        start = time.time()
+        hooks.retrieve_user_context(event)
+        elapsed = time.time() - start
+
+        assert elapsed < 0.45  # sequential lookups would take 0.9s
+        context = injected_context(event)
+        for namespace in delays:
+            assert f"fact from {namespace}" in context
+        assert event.agent.messages[-1]["role"] == "user"
+
+    def test_namespaces_past_deadline_are_skipped(self):
+        """Test that namespaces missing the deadline are skipped without failing the turn."""
+        delays = {"genai/user/user1/episodes": 2.0}
+        hooks = make_hooks(FakeMemoryClient(NAMESPACES, delays=delays), retrieval_timeout=0.2)
+        event = user_turn("hello")
+
+        start = time.time()
+        hooks.retrieve_user_context(event)
+        elapsed = time.time() - start
+
+        assert elapsed < 0.5
+        context = injected_context(event)
+        assert "fact from genai/user/user1/preferences" in context
+        assert "episodes" not in context
+
+    def test_failing_namespace_is_skipped(self):
+        """Test that a namespace raising an error does not affect the others."""
+        errors = {"genai/user/user1/semantic": RuntimeError("throttled")}
+        hooks = make_hooks(FakeMemoryClient(NAMESPACES, errors=errors))
+        event = user_turn("hello")
+
+        hooks.retrieve_user_context(event)
+
+        context = injected_context(event)
+        assert "fact from genai/user/user1/preferences" in context
+        assert "semantic" not in context
+
+    def test_straggling_namespace_is_not_queried_again(self):
+        """Test that a namespace still running from an earlier turn is skipped on the next one."""
+        delays = {"genai/user/user1/episodes": 1.0}
+        client = FakeMemoryClient(NAMESPACES, delays=delays)
+        hooks = make_hooks(client, retrieval_timeout=0.2)
+
+        hooks.retrieve_user_context(user_turn("hello"))
+        event = user_turn("what did we discuss?")
+        hooks.retrieve_user_context(event)
+
+        assert client.calls.count("genai/user/user1/episodes") == 1
+        assert client.calls.count("genai/user/user1/preferences") == 2
+        assert "fact from genai/user/user1/preferences" in injected_context(event)
+        hooks.close()
+
+    def test_lookups_not_started_by_deadline_are_cancelled(self):
+        """Test that lookups still queued at the deadline never reach the client."""
+        executor = ThreadPoolExecutor(max_workers=1)
+        client = FakeMemoryClient(NAMESPACES, delays={namespace.format(actorId="user1"): 0.3 for namespace in NAMESPACES.values()})
+        hooks = make_hooks(client, executor=executor, retrieval_timeout=0.1)
+
+        hooks.retrieve_user_context(user_turn("hello"))
+        executor.shutdown(wait=True)
+
+        assert len(client.calls) == 1
+
+    def test_close_shuts_down_owned_executor(self):
+        """Test that close stops the executor the hooks created but not an injected one."""
+        hooks = make_hooks(FakeMemoryClient(NAMESPACES))
+        hooks.close()
+        with pytest.raises(RuntimeError):
+            hooks.executor.submit(time.sleep, 0)
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        make_hooks(FakeMemoryClient(NAMESPACES), executor=executor).close()
+        assert executor.submit(lambda: "open").result() == "open"
+        executor.shutdown()
+
+    def test_results_are_merged_and_deduplicated(self):
+        """Test that records found in several namespaces are injected once, best score first."""
+        client = FakeMemoryClient(NAMESPACES)
+        client.records = {
+            "genai/user/user1/preferences": [
+                {"memoryRecordId": "r1", "content": {"text": "Likes green tea"}, "score": 0.4},
+                {"memoryRecordId": "r2", "content": {"text": "Lives in Berlin"}, "score": 0.9}
+            ],
+            "genai/user/user1/semantic": [
+                {"memoryRecordId": "r3", "content": {"text": "likes  green tea"}, "score": 0.7}
+            ],
+            "genai/user/user1/summaries": [
+                {"memoryRecordId": "r2", "content": {"text": "Lives in Berlin"}, "score": 0.9}
+            ],
+            "genai/user/user1/episodes": []
+        }
+        hooks = make_hooks(client)
+        event = user_turn("tell me about me")
+
+        hooks.retrieve_user_context(event)
+
+        lines = injected_context(event).splitlines()[1:]
+        assert lines == ["Context: Lives in Berlin", "Context: likes  green tea"]
+
+    def test_injected_context_respects_token_budget(self):
+        """Test that the injected context is cut to the assembler's token budget."""
+        client = FakeMemoryClient(NAMESPACES)
+        client.records = {
+            namespace.format(actorId="user1"): [
+                {"content": {"text": f"{name} fact {i} " + "detail " * 20}, "score": 1 - i / 10}
+                for i in range(3)
+            ]
+            for name, namespace in NAMESPACES.items()
+        }
+        hooks = make_hooks(client, context_assembler=MemoryContextAssembler(token_budget=120))
+        event = user_turn("tell me everything")
+
+        hooks.retrieve_user_context(event)
+
+        context = injected_context(event)
+        assert estimate_tokens(context) <= 120
+        assert 0 < len(context.splitlines()) - 1 < 12
+
+    def test_tool_results_do_not_trigger_retrieval(self):
+        """Test that tool result messages do not query memory."""
+        client = FakeMemoryClient(NAMESPACES)
+        hooks = make_hooks(client)
+        message = {"role": "user", "content": [{"toolResult": {"toolUseId": "1", "content": []}}]}
+        event = MessageAddedEvent(agent=SimpleNamespace(messages=[message]), message=message)
+
+        hooks.retrieve_user_context(event)
+
+        assert client.calls == []
+        assert len(event.agent.messages) == 1
+
+
+class TestSessionContextCache:
+    """Test cases for reusing cached context across the turns of a session."""
+
+    def test_twenty_turn_session(self):
+        """Test that a 20-turn session only queries memory when the cache cannot serve a turn."""
+        namespaces = dict(list(NAMESPACES.items())[:2])
+        client = FakeMemoryClient(namespaces)
+        hooks = make_hooks(client, context_cache=SessionContextCache(max_turns=5, similarity_threshold=0.5))
+        messages = [f"tell me about my tea preferences {n}" for n in range(10)]
+        messages += [f"plan a trip to Berlin next week day {n}" for n in range(10)]
+
+        queried_turns = []
+        for turn, message in enumerate(messages):
+            calls_before = len(client.calls)
+            event = user_turn(message)
+            hooks.retrieve_user_context(event)
+            if len(client.calls) > calls_before:
+                queried_turns.append(turn)
+            assert "fact from genai/user/user1/preferences" in injected_context(event)
+
+        # Expiry after 5 turns at turns 5 and 15, divergence at turn 10
+        assert queried_turns == [0, 5, 10, 15]
+        assert len(client.calls) == 8
+
+    def test_timed_out_namespace_is_not_cached(self):
+        """Test that a namespace missing the deadline is queried again on the next turn."""
+        client = FakeMemoryClient(NAMESPACES, delays={"genai/user/user1/episodes": 0.5})
+        hooks = make_hooks(client, retrieval_timeout=0.2, context_cache=SessionContextCache())
+
+        hooks.retrieve_user_context(user_turn("what tea do I like"))
+        time.sleep(0.4)  # let the timed-out lookup finish so it is not skipped as a straggler
+        client.delays = {}
+        client.calls.clear()
+        event = user_turn("what tea do I like")
+        hooks.retrieve_user_context(event)
+
+        assert client.calls == ["genai/user/user1/episodes"]
+        assert "fact from genai/user/user1/episodes" in injected_context(event)
+
+    def test_stored_interaction_invalidates_cached_context(self):
+        """Test that a lookup after a written interaction queries memory again."""
+        client = FakeMemoryClient(NAMESPACES)
+        cache = SessionContextCache()
+        writer = WriteBehindQueue(client, on_written=cache.invalidate)
+        hooks = make_hooks(client, writer=writer, context_cache=cache)
+
+        hooks.retrieve_user_context(user_turn("what tea do I like"))
+        hooks.save_interaction(finished_turn("what tea do I like", "green tea"))
+        assert writer.flush(timeout=5)
+        client.calls.clear()
+        hooks.retrieve_user_context(user_turn("what tea do I like"))
+
+        assert len(client.calls) == len(NAMESPACES)
+        writer.close()
+
+    def test_direct_write_invalidates_cached_context(self):
+        """Test that a synchronous write also drops the session's cached lookups."""
+        client = FakeMemoryClient(NAMESPACES)
+        hooks = make_hooks(client, context_cache=SessionContextCache())
+
+        hooks.retrieve_user_context(user_turn("what tea do I like"))
+        hooks.save_interaction(finished_turn("what tea do I like", "green tea"))
+        client.calls.clear()
+        hooks.retrieve_user_context(user_turn("what tea do I like"))
+
+        assert len(client.calls) == len(NAMESPACES)
+
+
+class TestSaveInteraction:
+    """Test cases for saving interactions in the AfterInvocationEvent hook."""
+
+    def test_hook_returns_before_write_completes(self):
+        """Test that the hook queues the interaction instead of waiting for create_event."""
+        client = FakeMemoryClient(NAMESPACES, write_delay=0.5)
+        writer = WriteBehindQueue(client)
+        hooks = make_hooks(client, writer=writer)
+
+        start = time.time()
+        hooks.save_interaction(finished_turn("hi", "hello"))
+        assert time.time() - start < 0.1
+        assert client.events == []
+
+        assert writer.close(timeout=5)
+        assert client.events == [("session1", [("hi", "USER"), ("hello", "ASSISTANT")])]
+
+    def test_turns_are_written_in_order(self):
+        """Test that a session's turns reach memory in the order they happened."""
+        client = FakeMemoryClient(NAMESPACES, write_delay=0.01)
+        writer = WriteBehindQueue(client)
+        hooks = make_hooks(client, writer=writer)
+        for n in range(10):
+            hooks.save_interaction(finished_turn(f"q{n}", f"a{n}"))
+
+        assert writer.close(timeout=5)
+        texts = [text for _, messages in client.events for text, _ in messages]
+        assert texts == [text for n in range(10) for text in (f"q{n}", f"a{n}")]
+
+    def test_writes_synchronously_without_open_writer(self):
+        """Test that the hook writes directly when there is no writer or it has been closed."""
+        client = FakeMemoryClient(NAMESPACES)
+        writer = WriteBehindQueue(client)
+        writer.close()
+        hooks = make_hooks(client, writer=writer)
+
+        hooks.save_interaction(finished_turn("hi", "hello"))
+
+        assert len(client.events) == 1
+
+
+class TestMergeMemories:
+    """Test cases for merging namespace results."""
+
+    def test_unscored_records_keep_retrieval_order(self):
+        """Test that records without scores keep the order they were retrieved in."""
+        merged = merge_memories([[{"content": "b"}, {"content": "a"}], [{"content": "c"}, {"content": "B"}]])
+        assert [m["content"] for m in merged] == ["b", "a", "c"]
+
+    def test_records_differing_in_case_and_punctuation_are_merged(self):
+        """Test that records whose text differs only in case, spacing or punctuation are kept once."""
+        merged = merge_memories([[{"content": "Likes green tea.", "score": 0.2}],
+                                 [{"content": "likes, green  tea", "score": 0.6}]])
+        assert merged == [{"content": "likes, green  tea", "score": 0.6}]
+
+    @pytest.mark.parametrize("records", [[], [[]], [None]])
+    def test_empty_inputs(self, records):
+        """Test that empty namespace results merge to an empty list."""
+        assert merge_memories(records) == []
@@ -0,0 +1,121 @@
+"""
+Tests for token-budgeted memory context assembly.
+
+This module tests budget adherence, near-duplicate removal and ranking on
+synthetic memory sets.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from memory.context_assembler import MemoryContextAssembler, estimate_tokens, memory_text
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+WORDS = ["user", "likes", "tea", "coffee", "lives", "berlin", "works", "remote", "prefers", "email",
+         "meetings", "mornings", "python", "hiking", "cats", "jazz", "vegetarian", "travel", "budget", "team"]
+
+
+def synthetic_memories(count, seed=0):
+    """Generate memories of varying length, score and age."""
+    rng = random.Random(seed)
+    return [
+        {
+            "memoryRecordId": f"r{i}",
+            "content": {"text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))},
+            "score": round(rng.random(), 3),
+            "createdAt": (NOW - timedelta(days=rng.randint(0, 365))).isoformat()
+        }
+        for i in range(count)
+    ]
+
+
+def make_assembler(**kwargs):
+    return MemoryContextAssembler(clock=NOW.timestamp, **kwargs)
+
+
+class TestEstimateTokens:
+    """Test cases for the token estimator."""
+
+    def test_estimate_is_deterministic_and_monotonic(self):
+        """Test that the estimate depends only on the text length and rounds up."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abc") == 1
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+        assert estimate_tokens("x" * 400) == estimate_tokens("y" * 400) == 100
+
+
+class TestMemoryContextAssembler:
+    """Test cases for the memory context assembler."""
+
+    @pytest.mark.parametrize("budget", [20, 50, 100, 250, 1000])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_rendered_context_stays_within_budget(self, budget, seed):
+        """Test that the rendered context never exceeds the token budget."""
+        assembler = make_assembler(token_budget=budget)
+        selected = assembler.assemble(synthetic_memories(50, seed))
+
+        assert estimate_tokens(assembler.render(selected)) <= budget
+        ranks = [assembler.rank_score(memory) for memory in selected]
+        assert ranks == sorted(ranks, reverse=True)
+
+    def test_smaller_memories_fill_remaining_budget(self):
+        """Test that a memory too large for the remaining budget is skipped for smaller ones."""
+        memories = [
+            {"content": "short fact one", "score": 0.9},
+            {"content": "x " * 200, "score": 0.8},
+            {"content": "short fact two", "score": 0.7}
+        ]
+        selected = make_assembler(token_budget=40).assemble(memories)
+
+        assert [memory_text(memory) for memory in selected] == ["short fact one", "short fact two"]
+
+    def test_near_identical_memories_are_deduplicated(self):
+        """Test that near-identical memories are injected once, keeping the best-ranked."""
+        memories = [
+            {"content": "The user prefers green tea in the morning", "score": 0.6},
+            {"content": "the user prefers green tea in the morning!", "score": 0.8},
+            {"content": "The user lives in Berlin", "score": 0.5}
+        ]
+        selected = make_assembler().assemble(memories)
+
+        assert [memory["score"] for memory in selected] == [0.8, 0.5]
+
+    def test_dedupe_threshold_controls_similarity(self):
+        """Test that memories sharing most but not all words are kept below the threshold."""
+        memories = [
+            {"content": "user likes tea and coffee", "score": 0.9},
+            {"content": "user likes tea and jazz", "score": 0.8}
+        ]
+        assert len(make_assembler(dedupe_threshold=0.85).assemble(memories)) == 2
+        assert len(make_assembler(dedupe_threshold=0.5).assemble(memories)) == 1
+
+    def test_recency_breaks_score_ties(self):
+        """Test that with equal scores the more recent memory ranks first."""
+        memories = [
+            {"content": "old fact", "score": 0.5, "createdAt": (NOW - timedelta(days=300)).isoformat()},
+            {"content": "new fact", "score": 0.5, "createdAt": NOW - timedelta(days=1)},
+            {"content": "undated fact", "score": 0.5}
+        ]
+        selected = make_assembler().assemble(memories)
+
+        assert [memory_text(memory) for memory in selected] == ["new fact", "old fact", "undated fact"]
+
+    def test_max_items(self):
+        """Test that at most max_items memories are selected."""
+        assembler = make_assembler(max_items=3, token_budget=100000)
+        memories = synthetic_memories(20)
+
+        assert len(assembler.assemble(memories)) == 3
+        assert len(assembler.assemble(memories, max_items=5)) == 5
+
+    def test_assembly_is_deterministic(self):
+        """Test that the same input always produces the same context."""
+        memories = synthetic_memories(40, seed=3)
+        assert make_assembler(token_budget=300).build_context(memories) == \
+            make_assembler(token_budget=300).build_context(list(memories))
+
+    def test_empty_input_renders_nothing(self):
+        """Test that no memories render as an empty string."""
+        assert make_assembler().build_context([]) == ""
@@ -0,0 +1,88 @@
+"""
+Tests for the session-scoped memory context cache.
+
+This module tests turn-count and time-based expiry, query divergence and
+eviction with a controllable clock.
+"""
+
+from memory.context_cache import SessionContextCache
+
+
+class FakeClock:
+    """Clock advanced manually by the tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+MEMORIES = [{"content": {"text": "Likes green tea"}}]
+
+
+class TestSessionContextCache:
+    """Test cases for the session context cache."""
+
+    def test_entry_serves_max_turns(self):
+        """Test that an entry serves max_turns turns including the fetching turn."""
+        cache = SessionContextCache(max_turns=3)
+        cache.put("actor", "s1", "ns", "what tea do I like", MEMORIES)
+
+        assert cache.get("actor", "s1", "ns", "what tea do I like") == MEMORIES
+        assert cache.get("actor", "s1", "ns", "what tea do I like") == MEMORIES
+        assert cache.get("actor", "s1", "ns", "what tea do I like") is None
+        assert cache.get_stats()["expired"] == 1
+
+    def test_entry_expires_after_ttl(self):
+        """Test that an entry is not served once its TTL has passed."""
+        clock = FakeClock()
+        cache = SessionContextCache(ttl_seconds=60, clock=clock)
+        cache.put("actor", "s1", "ns", "what tea do I like", MEMORIES)
+
+        clock.now += 59
+        assert cache.get("actor", "s1", "ns", "what tea do I like") == MEMORIES
+        clock.now += 1
+        assert cache.get("actor", "s1", "ns", "what tea do I like") is None
+
+    def test_diverging_query_is_not_served(self):
+        """Test that a message with little overlap with the cached query misses."""
+        cache = SessionContextCache(similarity_threshold=0.5)
+        cache.put("actor", "s1", "ns", "what tea do I like", MEMORIES)
+
+        assert cache.get("actor", "s1", "ns", "What tea do I like best?") == MEMORIES
+        assert cache.get("actor", "s1", "ns", "book a flight to Berlin") is None
+        assert cache.get_stats()["diverged"] == 1
+
+    def test_entries_are_scoped_to_actor_session_and_namespace(self):
+        """Test that other actors, sessions and namespaces do not see an entry."""
+        cache = SessionContextCache()
+        cache.put("actor", "s1", "ns", "tea", MEMORIES)
+
+        assert cache.get("other", "s1", "ns", "tea") is None
+        assert cache.get("actor", "s2", "ns", "tea") is None
+        assert cache.get("actor", "s1", "other-ns", "tea") is None
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test that the cache keeps at most max_entries entries."""
+        cache = SessionContextCache(max_entries=2)
+        cache.put("actor", "s1", "ns", "tea", MEMORIES)
+        cache.put("actor", "s2", "ns", "tea", MEMORIES)
+        cache.get("actor", "s1", "ns", "tea")
+        cache.put("actor", "s3", "ns", "tea", MEMORIES)
+
+        assert cache.get("actor", "s2", "ns", "tea") is None
+        assert cache.get("actor", "s1", "ns", "tea") == MEMORIES
+        assert cache.get_stats()["entries"] == 2
+
+    def test_invalidate(self):
+        """Test that invalidation drops one session or all sessions of an actor."""
+        cache = SessionContextCache()
+        for session in ("s1", "s2"):
+            cache.put("actor", session, "ns", "tea", MEMORIES)
+
+        cache.invalidate("actor", "s1")
+        assert cache.get("actor", "s1", "ns", "tea") is None
+        assert cache.get("actor", "s2", "ns", "tea") == MEMORIES
+        cache.invalidate("actor")
+        assert cache.get_stats()["entries"] == 0
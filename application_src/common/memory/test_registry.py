@@ -0,0 +1,168 @@
+"""
+Tests for the memory provider registry.
+
+This module tests that MemoryFactory reuses initialized memory providers across
+agent rebuilds, keyed by configuration, with close hooks and idle eviction.
+"""
+
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+import memory
+from memory import MemoryFactory, get_memory_tools
+from memory.mem0 import Mem0MemoryProvider
+from memory.registry import MemoryProviderRegistry
+
+
+def mem0_config(api_key):
+    return {
+        "enabled": True,
+        "provider": "mem0",
+        "provider_details": [{"name": "mem0", "config": {"mem0_api_key": api_key}}]
+    }
+
+
+MEMORY_CONFIGS = {
+    "qa_agent": mem0_config("key-a"),
+    "other_agent": mem0_config("key-b"),
+    "no_memory_agent": {"enabled": False}
+}
+
+
+class FakeConfig:
+    """Fake Config returning per-agent memory configuration."""
+
+    def __init__(self, agent_name="qa_agent"):
+        self.agent_name = agent_name
+
+    def get_memory_config(self):
+        return MEMORY_CONFIGS[self.agent_name]
+
+
+class Counters:
+    constructions = 0
+    initializations = 0
+    closed = []
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Install a fresh registry, fake configuration and a fake mem0 tool module."""
+    Counters.constructions = 0
+    Counters.initializations = 0
+    Counters.closed = []
+    fresh_registry = MemoryProviderRegistry(idle_ttl_seconds=900)
+    monkeypatch.setattr(memory, "_memory_registry", fresh_registry)
+    monkeypatch.setattr(memory, "Config", FakeConfig)
+    # Mem0MemoryProvider sets these; let monkeypatch restore them afterwards
+    for name in ("AWS_REGION", "MEM0_EMBEDDING_MODEL", "MEM0_DEBUG", "MEM0_API_KEY"):
+        if name in os.environ:
+            monkeypatch.setenv(name, os.environ[name])
+        else:
+            monkeypatch.delenv(name, raising=False)
+
+    mem0_module = types.ModuleType("strands_tools.mem0_memory")
+    mem0_module.mem0_memory = lambda tool_input: {"status": "success"}
+    monkeypatch.setitem(sys.modules, "strands_tools.mem0_memory", mem0_module)
+
+    original_init = Mem0MemoryProvider.__init__
+    original_initialize = Mem0MemoryProvider.initialize
+
+    def counting_init(self, config):
+        Counters.constructions += 1
+        original_init(self, config)
+
+    def counting_initialize(self):
+        Counters.initializations += 1
+        return original_initialize(self)
+
+    monkeypatch.setattr(Mem0MemoryProvider, "__init__", counting_init)
+    monkeypatch.setattr(Mem0MemoryProvider, "initialize", counting_initialize)
+    monkeypatch.setattr(Mem0MemoryProvider, "close", lambda self: Counters.closed.append(self), raising=False)
+    return fresh_registry
+
+
+def rebuild_agent(agent_name):
+    """Run the memory part of agent_template.create_agent."""
+    tools = get_memory_tools(agent_name)
+    provider = MemoryFactory.create(agent_name) if tools else None
+    return provider, tools
+
+
+class TestMemoryProviderRegistry:
+    """Test cases for the keyed memory provider registry."""
+
+    def test_fifty_rebuilds_initialize_backend_once(self, registry):
+        """Test that rebuilding an agent 50 times with the same config initializes mem0 once."""
+        results = [rebuild_agent("qa_agent") for _ in range(50)]
+
+        assert Counters.constructions == 1
+        assert Counters.initializations == 1
+        assert len({id(provider) for provider, _ in results}) == 1
+        assert all(tools == results[0][1] for _, tools in results)
+        assert registry.get_stats()["ref_counts"] == {registry.make_key(MEMORY_CONFIGS["qa_agent"]): 1}
+
+    def test_different_configs_get_separate_providers(self, registry):
+        """Test that agents with different memory configs do not share a provider."""
+        for _ in range(10):
+            qa_provider, _ = rebuild_agent("qa_agent")
+            other_provider, _ = rebuild_agent("other_agent")
+
+        assert qa_provider is not other_provider
+        assert Counters.constructions == 2
+
+    def test_config_change_creates_new_provider_and_evicts_old(self, registry, monkeypatch):
+        """Test that a reloaded config builds a new provider and the old one is closed once idle."""
+        old, _ = rebuild_agent("qa_agent")
+        monkeypatch.setitem(MEMORY_CONFIGS, "qa_agent", mem0_config("key-rotated"))
+        new, _ = rebuild_agent("qa_agent")
+
+        assert new is not old
+        assert registry.evict_idle() == 0
+        assert registry.evict_idle(now=time.time() + registry.idle_ttl_seconds + 1) == 1
+        assert Counters.closed == [old]
+
+    def test_disabling_memory_releases_provider(self, registry, monkeypatch):
+        """Test that disabling memory for an agent releases its reference."""
+        rebuild_agent("qa_agent")
+        monkeypatch.setitem(MEMORY_CONFIGS, "qa_agent", MEMORY_CONFIGS["no_memory_agent"])
+
+        assert MemoryFactory.create("qa_agent") is None
+        assert registry.get_stats()["owners"] == 0
+
+    def test_close_memory_providers_runs_close_hooks(self, registry):
+        """Test that closing on shutdown closes every cached provider."""
+        qa_provider, _ = rebuild_agent("qa_agent")
+        other_provider, _ = rebuild_agent("other_agent")
+
+        memory.close_memory_providers(timeout=1)
+
+        assert set(map(id, Counters.closed)) == {id(qa_provider), id(other_provider)}
+        assert registry.get_stats()["providers"] == 0
+
+    def test_slow_build_does_not_block_other_agents(self):
+        """Test that initializing one memory provider does not stall acquires of other keys."""
+        registry = MemoryProviderRegistry()
+        registry.acquire("qa_agent", "fast", object)
+        started = threading.Event()
+
+        def slow_factory():
+            started.set()
+            time.sleep(0.5)
+            return object()
+
+        builder = threading.Thread(target=registry.acquire, args=("slow_agent", "slow", slow_factory))
+        builder.start()
+        started.wait()
+
+        start = time.time()
+        registry.acquire("other_agent", "fast", object)
+        elapsed = time.time() - start
+        builder.join()
+
+        assert elapsed < 0.2
+        assert registry.constructions == 2
@@ -0,0 +1,146 @@
+"""
+Tests for the write-behind queue for AgentCore memory events.
+
+This module tests batching, per-session ordering, retries and draining with a
+fake memory client.
+"""
+
+import threading
+import time
+
+from memory.write_behind import WriteBehindQueue, drain_all
+
+
+class FakeEventClient:
+    """Memory client recording create_event calls, optionally slow or failing."""
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.events = []
+        self.lock = threading.Lock()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def create_event(self, memory_id, actor_id, session_id, messages):
+        self.gate.wait()
+        time.sleep(self.delay)
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("throttled")
+            self.events.append((session_id, list(messages)))
+
+    def messages_for(self, session_id):
+        return [text for session, messages in self.events if session == session_id for text, _ in messages]
+
+
+def interaction(n):
+    return [(f"question {n}", "USER"), (f"answer {n}", "ASSISTANT")]
+
+
+class TestWriteBehindQueue:
+    """Test cases for the write-behind queue."""
+
+    def test_enqueue_does_not_wait_for_write(self):
+        """Test that enqueue returns while the write is still in flight."""
+        client = FakeEventClient(delay=0.5)
+        writer = WriteBehindQueue(client)
+
+        start = time.time()
+        assert writer.enqueue("mem", "actor", "s1", interaction(1))
+        assert time.time() - start < 0.1
+
+        assert writer.close(timeout=5)
+        assert client.messages_for("s1") == ["question 1", "answer 1"]
+
+    def test_order_is_preserved_per_session_with_one_event_per_interaction(self):
+        """Test that interleaved sessions keep their order and every interaction is its own event."""
+        client = FakeEventClient()
+        client.gate.clear()
+        writer = WriteBehindQueue(client, batch_size=100)
+        for n in range(30):
+            writer.enqueue("mem", "actor", f"s{n % 3}", interaction(n))
+        client.gate.set()
+
+        assert writer.flush(timeout=5)
+        for session in range(3):
+            expected = [text for n in range(session, 30, 3) for text in (f"question {n}", f"answer {n}")]
+            assert client.messages_for(f"s{session}") == expected
+        assert len(client.events) == 30
+        assert all(len(messages) == 2 for _, messages in client.events)
+        assert writer.get_stats()["written"] == 30
+
+    def test_failed_writes_are_retried_with_backoff(self):
+        """Test that a failing write is retried with growing delays and ordering survives."""
+        delays = []
+        client = FakeEventClient(failures=2)
+        writer = WriteBehindQueue(client, retry_delay=0.1, sleep=delays.append)
+        writer.enqueue("mem", "actor", "s1", interaction(1))
+        writer.enqueue("mem", "actor", "s1", interaction(2))
+
+        assert writer.close(timeout=5)
+        assert delays == [0.1, 0.2]
+        assert client.messages_for("s1") == ["question 1", "answer 1", "question 2", "answer 2"]
+        assert writer.get_stats()["retries"] == 2
+
+    def test_gives_up_after_max_retries(self):
+        """Test that a batch failing past max_retries is counted and later ones are still written."""
+        client = FakeEventClient(failures=3)
+        writer = WriteBehindQueue(client, max_retries=2, sleep=lambda delay: None)
+        writer.enqueue("mem", "actor", "s1", interaction(1))
+        assert writer.flush(timeout=5)
+        writer.enqueue("mem", "actor", "s1", interaction(2))
+
+        assert writer.close(timeout=5)
+        assert writer.get_stats()["failed"] == 1
+        assert client.messages_for("s1") == ["question 2", "answer 2"]
+
+    def test_on_written_is_called_for_stored_interactions_only(self):
+        """Test that the callback gets the actor and session of each interaction that was stored."""
+        written = []
+        client = FakeEventClient(failures=3)
+        writer = WriteBehindQueue(client, max_retries=2, sleep=lambda delay: None,
+                                  on_written=lambda actor_id, session_id: written.append((actor_id, session_id)))
+        writer.enqueue("mem", "actor", "s1", interaction(1))
+        writer.enqueue("mem", "actor", "s2", interaction(2))
+
+        assert writer.close(timeout=5)
+        assert written == [("actor", "s2")]
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test that a full queue drops interactions after the enqueue timeout."""
+        client = FakeEventClient()
+        client.gate.clear()
+        writer = WriteBehindQueue(client, max_queue_size=2, batch_size=1, enqueue_timeout=0.01)
+        results = [writer.enqueue("mem", "actor", "s1", interaction(n)) for n in range(6)]
+        client.gate.set()
+
+        assert writer.close(timeout=5)
+        assert results.count(False) == writer.get_stats()["dropped"] >= 1
+        assert len(client.events) == results.count(True)
+
+    def test_close_with_full_queue_does_not_block(self):
+        """Test that closing returns within its timeout while the flusher is stuck and the queue is full."""
+        client = FakeEventClient()
+        client.gate.clear()
+        writer = WriteBehindQueue(client, max_queue_size=2, batch_size=1, enqueue_timeout=0.01)
+        for n in range(4):
+            writer.enqueue("mem", "actor", "s1", interaction(n))
+
+        start = time.time()
+        assert not writer.close(timeout=0.2)
+        assert time.time() - start < 1
+        client.gate.set()
+
+    def test_drain_all_flushes_queued_events_on_shutdown(self):
+        """Test that draining on shutdown writes everything queued and closes the queues."""
+        client = FakeEventClient(delay=0.01)
+        writers = [WriteBehindQueue(client), WriteBehindQueue(client)]
+        for n in range(10):
+            writers[n % 2].enqueue("mem", "actor", f"s{n % 2}", interaction(n))
+
+        assert drain_all(timeout=5)
+        assert sum(len(messages) for _, messages in client.events) == 20
+        assert all(writer.closed for writer in writers)
+        assert not writers[0].enqueue("mem", "actor", "s0", interaction(99))
@@ -0,0 +1,203 @@
+"""
+Write-behind queue for Bedrock AgentCore memory events.
+This module moves create_event calls off the response path: hooks enqueue
+interactions and a background thread writes them, one event per interaction.
+"""
+
+import queue
+import threading
+import time
+import traceback
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Every live queue, so application shutdown can drain them all
+_queues: "weakref.WeakSet[WriteBehindQueue]" = weakref.WeakSet()
+
+
+class WriteBehindQueue:
+    """
+    Bounded in-process queue of memory events written by a background flusher.
+
+    The flusher takes whatever is queued (up to ``batch_size`` interactions)
+    and writes each interaction as its own create_event call, in enqueue
+    order, so stored events keep the turn granularity of synchronous writes;
+    batching only saves wake-ups of the flusher. A single flusher thread
+    retries a failed event with exponential backoff before moving on, so
+    events of a session are never reordered. When the queue is full,
+    ``enqueue`` waits up to ``enqueue_timeout`` seconds and then drops the
+    interaction. ``on_written`` is called with the actor and session ID of
+    every stored interaction, e.g. to invalidate cached lookups of the session.
+    """
+
+    def __init__(self, memory_client, max_queue_size: int = 1000, batch_size: int = 20,
+                 max_retries: int = 3, retry_delay: float = 0.5, enqueue_timeout: float = 0.05,
+                 sleep: Callable[[float], None] = time.sleep,
+                 on_written: Optional[Callable[[str, str], None]] = None):
+        self.memory_client = memory_client
+        self.on_written = on_written
+        self.batch_size = max(batch_size, 1)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.enqueue_timeout = enqueue_timeout
+        self._sleep = sleep
+        self._queue: "queue.Queue[Optional[Tuple[str, str, str, List[Tuple[str, str]]]]]" = queue.Queue(max_queue_size)
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Set on close, so the flusher stops even if the stop marker does not fit in the queue
+        self._stop = threading.Event()
+        self.closed = False
+        self.stats = {"enqueued": 0, "written": 0, "retries": 0, "failed": 0, "dropped": 0}
+        _queues.add(self)
+
+    def enqueue(self, memory_id: str, actor_id: str, session_id: str, messages: List[Tuple[str, str]]) -> bool:
+        """
+        Queue one interaction for writing.
+
+        Returns:
+            True if the interaction was queued, False if the queue is closed or stayed full
+        """
+        if self.closed:
+            return False
+        self._ensure_started()
+        with self._condition:
+            self._pending += 1
+        try:
+            self._queue.put((memory_id, actor_id, session_id, list(messages)), timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._done(1)
+            with self._condition:
+                self.stats["dropped"] += 1
+            print(f"⚠️ Memory write queue full, dropped interaction for session {session_id}")
+            return False
+        with self._condition:
+            self.stats["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued interaction has been written or given up on.
+
+        Returns:
+            True if the queue was drained within the timeout
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._condition:
+            while self._pending:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        Stop accepting interactions, write everything still queued and stop the flusher.
+
+        Returns:
+            True if the queue was drained within the timeout
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        self.closed = True
+        drained = self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            remaining = max(deadline - time.time(), 0) if deadline is not None else None
+            try:
+                self._queue.put(None, timeout=remaining)
+            except queue.Full:
+                # The flusher stops on its own once it has emptied the queue
+                pass
+            self._thread.join(max(deadline - time.time(), 0) if deadline is not None else None)
+        _queues.discard(self)
+        if not drained:
+            print(f"⚠️ Memory write queue closed with {self._pending} interactions not written")
+        return drained
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics."""
+        with self._condition:
+            return dict(self.stats, pending=self._pending)
+
+    def _ensure_started(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="agentcore-memory-writer", daemon=True)
+                self._thread.start()
+
+    def _done(self, count: int):
+        with self._condition:
+            self._pending -= count
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            if self._stop.is_set() and self._queue.empty():
+                return
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # The stop event ends the loop once this batch is written
+                    break
+                batch.append(item)
+            for memory_id, actor_id, session_id, messages in batch:
+                try:
+                    self._write_event(memory_id, actor_id, session_id, messages)
+                finally:
+                    self._done(1)
+
+    def _write_event(self, memory_id: str, actor_id: str, session_id: str, messages: List[Tuple[str, str]]):
+        """Write one interaction as one event, retrying with exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.memory_client.create_event(
+                    memory_id=memory_id,
+                    actor_id=actor_id,
+                    session_id=session_id,
+                    messages=messages
+                )
+                with self._condition:
+                    self.stats["written"] += 1
+                if self.on_written is not None:
+                    try:
+                        self.on_written(actor_id, session_id)
+                    except Exception as e:
+                        print(f"⚠️ Error in memory write callback for session {session_id}: {e}")
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Giving up writing interaction for session {session_id}: {e}")
+                    traceback.print_exc()
+                    with self._condition:
+                        self.stats["failed"] += 1
+                    return
+                delay = self.retry_delay * (2 ** attempt)
+                print(f"⚠️ Error writing memory event for session {session_id}, retrying in {delay}s: {e}")
+                with self._condition:
+                    self.stats["retries"] += 1
+                self._sleep(delay)
+
+
+def drain_all(timeout: float = 10.0) -> bool:
+    """
+    Drain and close every live write-behind queue.
+
+    Args:
+        timeout: Seconds to wait for all queues together
+
+    Returns:
+        True if every queue was drained in time
+    """
+    deadline = time.time() + timeout
+    drained = True
+    for write_queue in list(_queues):
+        drained = write_queue.close(max(deadline - time.time(), 0)) and drained
+    return drained
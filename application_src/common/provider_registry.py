@@ -0,0 +1,173 @@
+"""
+Provider registry for GenAI-In-A-Box agent.
+This module keeps initialized provider instances keyed by configuration, shared
+by the knowledge base and memory registries.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import traceback
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+
+class _RegistryEntry:
+    """A registered provider with its reference count."""
+
+    def __init__(self, provider: Any):
+        self.provider = provider
+        self.ref_count = 0
+        self.last_used = time.time()
+
+
+class _PendingBuild:
+    """A provider being constructed outside the registry lock."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ProviderRegistry(ABC):
+    """
+    Registry of provider instances keyed by configuration.
+
+    Subclasses define ``make_key`` and the ``log_prefix`` of their messages.
+    Each owner (usually an agent name) holds at most one reference; providers
+    without references are closed once they have been idle for ``idle_ttl_seconds``.
+    Providers are constructed outside the registry lock; concurrent requests
+    for a key that is being built wait for that build instead of starting another.
+    """
+
+    log_prefix = "Provider Registry"
+
+    def __init__(self, idle_ttl_seconds: float = 900):
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._entries: Dict[str, _RegistryEntry] = {}
+        self._owners: Dict[str, str] = {}
+        self._pending: Dict[str, _PendingBuild] = {}
+        self._lock = threading.RLock()
+        self.constructions = 0
+
+    @staticmethod
+    def config_hash(config: Dict[str, Any]) -> str:
+        """Hash a configuration for use in registry keys."""
+        return hashlib.sha256(
+            json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+    @staticmethod
+    @abstractmethod
+    def make_key(config: Dict[str, Any]) -> str:
+        """Build the registry key for a configuration."""
+
+    def acquire(self, owner: str, key: str, factory: Callable[[], Any]) -> Optional[Any]:
+        """
+        Get the provider for ``key`` on behalf of ``owner``, creating it if needed.
+
+        The owner's previous reference, if any, is released, so switching an
+        agent to another configuration lets the old provider become idle.
+        """
+        while True:
+            self.evict_idle()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    print(f"{self.log_prefix}: Reusing provider {getattr(entry.provider, 'provider_name', 'unknown')} for key {key}")
+                    return self._hold(owner, key, entry)
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = _PendingBuild()
+                    break
+            # Another caller is building this provider; use it once it is registered
+            pending.done.wait()
+
+        try:
+            provider = factory()
+        except Exception:
+            with self._lock:
+                self._finish_build(key, pending)
+            raise
+        with self._lock:
+            self._finish_build(key, pending)
+            if provider is None:
+                self.release(owner)
+                return None
+            self.constructions += 1
+            entry = _RegistryEntry(provider)
+            self._entries[key] = entry
+            print(f"{self.log_prefix}: Created provider {getattr(provider, 'provider_name', 'unknown')} for key {key}")
+            return self._hold(owner, key, entry)
+
+    def _finish_build(self, key: str, pending: _PendingBuild):
+        """Wake callers waiting for a build; the caller holds the lock."""
+        del self._pending[key]
+        pending.done.set()
+
+    def _hold(self, owner: str, key: str, entry: _RegistryEntry) -> Any:
+        """Move ``owner``'s reference to ``entry``; the caller holds the lock."""
+        entry.ref_count += 1
+        entry.last_used = time.time()
+        self.release(owner)
+        self._owners[owner] = key
+        return entry.provider
+
+    def release(self, owner: str):
+        """Release the reference held by ``owner``, if any."""
+        with self._lock:
+            key = self._owners.pop(owner, None)
+            entry = self._entries.get(key) if key else None
+            if entry is not None:
+                entry.ref_count = max(entry.ref_count - 1, 0)
+                entry.last_used = time.time()
+
+    def release_all(self):
+        """Release every owner's reference without closing providers."""
+        with self._lock:
+            for owner in list(self._owners):
+                self.release(owner)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Close providers that have no references and have been idle past the TTL."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            idle_keys = [
+                key for key, entry in self._entries.items()
+                if entry.ref_count == 0 and now - entry.last_used >= self.idle_ttl_seconds
+            ]
+            idle = [self._entries.pop(key).provider for key in idle_keys]
+        # Closing can be slow, so other callers are not kept waiting for the lock
+        for key, provider in zip(idle_keys, idle):
+            print(f"{self.log_prefix}: Evicting idle provider for key {key}")
+            self._close_provider(provider)
+        return len(idle_keys)
+
+    def close_all(self):
+        """Close every registered provider and forget all references."""
+        with self._lock:
+            entries, self._entries = self._entries, {}
+            self._owners.clear()
+        for entry in entries.values():
+            self._close_provider(entry.provider)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry statistics."""
+        with self._lock:
+            return {
+                "providers": len(self._entries),
+                "owners": len(self._owners),
+                "constructions": self.constructions,
+                "ref_counts": {key: entry.ref_count for key, entry in self._entries.items()}
+            }
+
+    def _close_provider(self, provider: Any):
+        """Run a provider's close hook, ignoring errors."""
+        close = getattr(provider, "close", None)
+        if not callable(close):
+            return
+        try:
+            close()
+        except Exception as e:
+            print(f"{self.log_prefix}: Error closing provider: {str(e)}")
+            traceback.print_exc()
@@ -0,0 +1,101 @@
+"""
+Tests for the custom Bedrock Knowledge Base retrieve tool.
+
+This module verifies client reuse and bounded output with a botocore Stubber.
+"""
+
+import json
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import custom_retrieve
+
+
+@pytest.fixture
+def stubbed_client(monkeypatch):
+    """Provide a stubbed bedrock-agent-runtime client and count client constructions."""
+    monkeypatch.setenv("STRANDS_KNOWLEDGE_BASE_ID", "KB12345678")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setattr(custom_retrieve, "_clients", {})
+
+    client = boto3.client("bedrock-agent-runtime", region_name="us-east-1",
+                          aws_access_key_id="testing", aws_secret_access_key="testing")
+    stubber = Stubber(client)
+    constructions = []
+
+    def fake_client(service_name, **kwargs):
+        constructions.append((service_name, kwargs.get("region_name")))
+        return client
+
+    monkeypatch.setattr(custom_retrieve.boto3, "client", fake_client)
+    with stubber:
+        yield stubber, constructions
+
+
+def retrieve_response(text_length=10000, count=5):
+    """Build a retrieve response with large chunks and extra metadata."""
+    return {
+        "retrievalResults": [
+            {
+                "content": {"text": f"chunk {i} " + "x" * text_length},
+                "location": {"type": "S3", "s3Location": {"uri": f"s3://bucket/doc{i}.pdf"}},
+                "score": 0.9 - i * 0.1,
+                "metadata": {"x-amz-bedrock-kb-chunk-id": f"chunk-{i}", "page": i}
+            }
+            for i in range(count)
+        ]
+    }
+
+
+class TestCustomRetrieve:
+    """Test cases for the custom retrieve tool."""
+
+    def test_single_client_across_calls(self, stubbed_client):
+        """Test that 100 retrieve calls share one client."""
+        stubber, constructions = stubbed_client
+        for _ in range(100):
+            stubber.add_response("retrieve", retrieve_response(text_length=100))
+
+        for i in range(100):
+            result = custom_retrieve.custom_retrieve(text=f"question {i}")
+            assert result["status"] == "success"
+
+        assert constructions == [("bedrock-agent-runtime", "us-east-1")]
+        stubber.assert_no_pending_responses()
+
+    def test_output_is_trimmed_and_bounded(self, stubbed_client):
+        """Test that results keep only needed fields and respect the text budgets."""
+        stubber, _ = stubbed_client
+        stubber.add_response("retrieve", retrieve_response(text_length=10000, count=5))
+
+        result = custom_retrieve.custom_retrieve(text="question")
+
+        assert all(set(item) == {"text", "source", "score"} for item in result["content"])
+        assert all(len(item["text"]) <= custom_retrieve.MAX_RESULT_CHARS for item in result["content"])
+        total_text = sum(len(item["text"]) for item in result["content"])
+        assert total_text <= custom_retrieve.MAX_TOTAL_CHARS
+        assert len(json.dumps(result)) < custom_retrieve.MAX_TOTAL_CHARS + 1000
+        assert result["content"][0]["source"] == "s3://bucket/doc0.pdf"
+
+    def test_last_result_is_cut_to_remaining_budget(self, monkeypatch):
+        """Test that the result crossing the total budget is truncated to exactly what is left."""
+        monkeypatch.setattr(custom_retrieve, "MAX_RESULT_CHARS", 2000)
+        monkeypatch.setattr(custom_retrieve, "MAX_TOTAL_CHARS", 5000)
+        results = [{"content": {"text": "x" * 1900}, "score": 0.5} for _ in range(4)]
+
+        content = custom_retrieve._format_results(results)
+
+        assert [len(item["text"]) for item in content] == [1900, 1900, 1200]
+        assert content[-1]["text"].endswith("...")
+
+    def test_missing_knowledge_base_id(self, stubbed_client, monkeypatch):
+        """Test that a missing knowledge base ID returns an error without calling Bedrock."""
+        _, constructions = stubbed_client
+        monkeypatch.delenv("STRANDS_KNOWLEDGE_BASE_ID")
+
+        result = custom_retrieve.custom_retrieve(text="question")
+
+        assert result["status"] == "error"
+        assert constructions == []
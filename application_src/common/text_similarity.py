@@ -0,0 +1,33 @@
+"""
+Text similarity helpers for GenAI-In-A-Box agent.
+This module compares texts by their lower-cased word tokens. Memory context
+caching and assembly and federated knowledge base retrieval use it to detect
+similar queries and near-duplicate results.
+"""
+
+import re
+from typing import List
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokens(text: str) -> List[str]:
+    """Lower-cased word tokens of a text, in order."""
+    return _TOKEN_PATTERN.findall((text or "").lower())
+
+
+def normalize_text(text: str) -> str:
+    """Text reduced to its word tokens, so case, spacing and punctuation do not matter."""
+    return " ".join(tokens(text))
+
+
+def token_set(text: str) -> frozenset:
+    """Set of word tokens used for similarity comparisons."""
+    return frozenset(tokens(text))
+
+
+def jaccard_similarity(first: frozenset, second: frozenset) -> float:
+    """Jaccard similarity of two token sets; two empty sets are identical."""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
@@ -10,10 +10,15 @@ from typing import List, Dict, Any
 from config import Config
 from strands_tools import http_request
 from .mcp import get_mcp_tools
+from .semantic_cache import BedrockQueryEmbedder, SemanticCache, config_fingerprint, create_cached_retrieve_tool
 
 # Global in-memory storage for MCP connection info
 _mcp_connections = {}  # Dictionary keyed by agent_name containing connection info
 
+# Semantic caches for retrieve tools keyed by their settings, and the (cache key, namespace) last used per agent
+_retrieve_caches = {}
+_retrieve_cache_namespaces = {}
+
 def get_mcp_connection_info(agent_name=None):
     """Get MCP connection info with fallback logic for common agent names."""
     global _mcp_connections
@@ -343,6 +348,40 @@ def initialize_tool(tool_name: str, tool_config: Dict[str, Any]) -> List:
     print(f"Unknown tool name: {tool_name}")
     return []
 
+def _get_retrieve_cache(agent_config_instance, provider_config):
+    """Get the semantic cache for an agent's cache settings, creating it on first use."""
+    embedding_model_id = agent_config_instance.get_model_config().get("embedding_model_id", "amazon.titan-embed-text-v2:0")
+    region = provider_config.get("region", "us-east-1")
+    threshold = float(provider_config.get("semantic_cache_threshold", 0.95))
+    ttl_seconds = float(provider_config.get("semantic_cache_ttl_seconds", 3600))
+    max_entries = int(provider_config.get("semantic_cache_max_entries", 512))
+    
+    # Agents with the same settings share a cache; entries are still namespaced per KB
+    cache_key = (embedding_model_id, region, threshold, ttl_seconds, max_entries)
+    if cache_key not in _retrieve_caches:
+        _retrieve_caches[cache_key] = SemanticCache(
+            BedrockQueryEmbedder(embedding_model_id, region=region),
+            threshold=threshold,
+            ttl_seconds=ttl_seconds,
+            max_entries=max_entries
+        )
+    return cache_key, _retrieve_caches[cache_key]
+
+def _get_cached_retrieve_tool(retrieve_module, agent_name, agent_config_instance, kb_config, provider_config):
+    """Wrap the retrieve tool with the semantic cache for this agent's cache settings, KB and config version."""
+    cache_key, cache = _get_retrieve_cache(agent_config_instance, provider_config)
+    
+    # Entries are namespaced by KB and config version; drop the agent's old version on change
+    namespace = f"{provider_config.get('knowledge_base_id', '')}:{config_fingerprint(kb_config)}"
+    previous = _retrieve_cache_namespaces.get(agent_name)
+    if previous and previous != (cache_key, namespace) and previous[0] in _retrieve_caches:
+        removed = _retrieve_caches[previous[0]].invalidate(previous[1])
+        print(f"🔄 Knowledge base config changed for {agent_name}, invalidated {removed} cached retrieve results")
+    _retrieve_cache_namespaces[agent_name] = (cache_key, namespace)
+    
+    print(f"✅ Semantic cache enabled for retrieve tool (namespace {namespace})")
+    return create_cached_retrieve_tool(retrieve_module, cache, namespace)
+
 def get_retrieve_tool(agent_name="qa_agent"):
     """Get the retrieve tool for Bedrock Knowledge Base."""
     try:
@@ -396,6 +435,10 @@ def get_retrieve_tool(agent_name="qa_agent"):
         from strands_tools import retrieve
         print(f"Successfully imported retrieve tool: {retrieve}")
         
+        # Opt-in: every cached lookup costs an embedding call and may answer a paraphrase from cache
+        if str(provider_config.get("semantic_cache_enabled", "false")).lower() in ["yes", "true"]:
+            return [_get_cached_retrieve_tool(retrieve, agent_name, agent_config_instance, kb_config, provider_config)]
+        
         return [retrieve]
     except ImportError as e:
         print(f"Failed to import retrieve tool: {e}")
@@ -0,0 +1,203 @@
+"""
+Semantic retrieval cache for GenAI-In-A-Box agent.
+This module provides a similarity-based cache for knowledge base retrieve results.
+"""
+
+import copy
+import hashlib
+import json
+import math
+import operator
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import boto3
+
+
+def config_fingerprint(value: Any) -> str:
+    """Stable short hash of a JSON-serializable configuration."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(vector: List[float]) -> Tuple[float, ...]:
+    """Scale a vector to unit length so cosine similarity is a dot product."""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return tuple(vector)
+    return tuple(x / norm for x in vector)
+
+
+def _dot(first: Tuple[float, ...], second: Tuple[float, ...]) -> float:
+    return sum(map(operator.mul, first, second))
+
+
+class BedrockQueryEmbedder:
+    """Embed cache queries with a Bedrock Titan embedding model."""
+
+    def __init__(self, model_id: str = "amazon.titan-embed-text-v2:0", region: Optional[str] = None,
+                 dimensions: int = 256):
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self.client = boto3.client("bedrock-runtime", region_name=region)
+
+    def __call__(self, text: str) -> List[float]:
+        body = {"inputText": text}
+        # Titan v2 accepts smaller vectors, which are plenty for query matching
+        if "v2" in self.model_id:
+            body.update({"dimensions": self.dimensions, "normalize": True})
+        response = self.client.invoke_model(modelId=self.model_id, body=json.dumps(body))
+        return json.loads(response["body"].read())["embedding"]
+
+
+class _CacheEntry:
+    """A cached query embedding and its retrieve result."""
+
+    def __init__(self, namespace: str, query: str, embedding: Tuple[float, ...], value: Any):
+        self.namespace = namespace
+        self.query = query
+        self.embedding = embedding
+        self.value = value
+        self.created_at = time.time()
+
+
+class SemanticCache:
+    """
+    Similarity-based cache of retrieve results.
+
+    Entries live in a namespace (knowledge base ID plus configuration version),
+    so a configuration change never serves results from the previous version.
+    A lookup is a hit when the query's cosine similarity to a cached query in the
+    same namespace is at least ``threshold``. Entries expire after
+    ``ttl_seconds`` and the least recently used entries are evicted beyond
+    ``max_entries``.
+
+    Entries are also bucketed by namespace, so a lookup only scores the entries
+    of its own namespace, on a snapshot taken under the lock; the similarity
+    math runs without holding it.
+    """
+
+    def __init__(self, embedder: Callable[[str], List[float]], threshold: float = 0.95,
+                 ttl_seconds: float = 3600, max_entries: int = 512):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # All entries in least recently used order, and the same entries per namespace
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._buckets: Dict[str, Dict[int, _CacheEntry]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _is_expired(self, entry: _CacheEntry, now: float) -> bool:
+        return now - entry.created_at >= self.ttl_seconds
+
+    def _remove(self, entry_id: int) -> Optional[_CacheEntry]:
+        """Remove an entry from the LRU order and its bucket; the caller holds the lock."""
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            bucket = self._buckets[entry.namespace]
+            del bucket[entry_id]
+            if not bucket:
+                del self._buckets[entry.namespace]
+        return entry
+
+    def lookup(self, namespace: str, query: str) -> Tuple[Optional[Any], Tuple[float, ...]]:
+        """
+        Find a cached value for a similar query.
+
+        Returns the cached value (or None on a miss) and the query embedding, so
+        a miss can be stored without embedding the query twice.
+        """
+        embedding = _normalize(self.embedder(query))
+        now = time.time()
+        with self._lock:
+            candidates = list(self._buckets.get(namespace, {}).items())
+
+        best_id, best_entry, best_score = None, None, self.threshold
+        expired = []
+        for entry_id, entry in candidates:
+            if self._is_expired(entry, now):
+                expired.append(entry_id)
+                continue
+            score = _dot(entry.embedding, embedding)
+            if score >= best_score:
+                best_id, best_entry, best_score = entry_id, entry, score
+
+        with self._lock:
+            for entry_id in expired:
+                if self._remove(entry_id) is not None:
+                    self.stats["evictions"] += 1
+            if best_entry is None:
+                self.stats["misses"] += 1
+                return None, embedding
+            if best_id in self._entries:
+                self._entries.move_to_end(best_id)
+            self.stats["hits"] += 1
+        # Cached values are never modified in place, so copying needs no lock
+        return copy.deepcopy(best_entry.value), embedding
+
+    def store(self, namespace: str, query: str, value: Any, embedding: Optional[Tuple[float, ...]] = None):
+        """Cache a value for a query, evicting the least recently used entries beyond the limit."""
+        if embedding is None:
+            embedding = _normalize(self.embedder(query))
+        entry = _CacheEntry(namespace, query, embedding, copy.deepcopy(value))
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._buckets.setdefault(namespace, {})[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """Drop the entries of a namespace and its sub-namespaces, or all entries if none is given."""
+        with self._lock:
+            stale = [entry_id for bucket_namespace, bucket in self._buckets.items()
+                     if namespace is None or bucket_namespace == namespace
+                     or bucket_namespace.startswith(f"{namespace}:")
+                     for entry_id in bucket]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.stats["invalidations"] += len(stale)
+            return len(stale)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def create_cached_retrieve_tool(retrieve_module, cache: SemanticCache, namespace: str):
+    """
+    Wrap the strands retrieve tool so similar queries are answered from the cache.
+
+    The cache namespace is extended with the retrieve parameters other than the
+    query text, so requests with different filters or result counts never share
+    entries. Only successful results are cached.
+    """
+    from strands.tools.tools import PythonAgentTool
+
+    def cached_retrieve(tool: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        tool_input = tool.get("input", {})
+        query = tool_input.get("text", "")
+        request_namespace = f"{namespace}:{config_fingerprint({k: v for k, v in tool_input.items() if k != 'text'})}"
+
+        try:
+            cached, embedding = cache.lookup(request_namespace, query)
+        except Exception as e:
+            print(f"⚠️ Semantic cache lookup failed, querying knowledge base: {e}")
+            return retrieve_module.retrieve(tool, **kwargs)
+
+        if cached is not None:
+            print(f"✅ Semantic cache hit for retrieve query: {query}")
+            return {"toolUseId": tool["toolUseId"], "status": cached["status"], "content": cached["content"]}
+
+        result = retrieve_module.retrieve(tool, **kwargs)
+        if result.get("status") == "success":
+            cache.store(request_namespace, query, {"status": result["status"], "content": result["content"]},
+                        embedding=embedding)
+        return result
+
+    return PythonAgentTool(retrieve_module.TOOL_SPEC["name"], retrieve_module.TOOL_SPEC, cached_retrieve)
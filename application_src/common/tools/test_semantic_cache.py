@@ -0,0 +1,198 @@
+"""
+Tests for the semantic retrieve cache.
+
+This module tests similarity thresholds, TTL and LRU eviction, and invalidation on
+knowledge base configuration change with a deterministic fake embedder.
+"""
+
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+
+import tools
+import tools.semantic_cache as semantic_cache_module
+from tools.semantic_cache import SemanticCache, create_cached_retrieve_tool
+
+
+def fake_embedder(text):
+    """Deterministic bag-of-words embedding hashed into 64 dimensions."""
+    vector = [0.0] * 64
+    for word in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+    return vector
+
+
+class FakeRetrieveModule:
+    """Fake strands retrieve module counting knowledge base calls."""
+
+    TOOL_SPEC = {"name": "retrieve", "description": "Retrieve", "inputSchema": {"json": {"type": "object"}}}
+
+    def __init__(self):
+        self.calls = 0
+
+    def retrieve(self, tool, **kwargs):
+        self.calls += 1
+        return {"toolUseId": tool["toolUseId"], "status": "success",
+                "content": [{"text": f"chunks for {tool['input']['text']} #{self.calls}"}]}
+
+
+def call(tool, text, tool_use_id="t1", **extra):
+    """Invoke a wrapped retrieve tool synchronously."""
+    return tool._tool_func({"toolUseId": tool_use_id, "input": dict(text=text, **extra)})
+
+
+class TestSemanticCache:
+    """Test cases for the semantic cache."""
+
+    def test_similar_query_hits_and_unrelated_query_misses(self):
+        """Test that only queries above the similarity threshold are served from the cache."""
+        cache = SemanticCache(fake_embedder, threshold=0.8)
+        cache.store("kb", "what is the refund policy for online orders", "refund chunks")
+
+        assert cache.lookup("kb", "What is the refund policy for online orders?")[0] == "refund chunks"
+        assert cache.lookup("kb", "what is the refund policy for orders")[0] == "refund chunks"
+        assert cache.lookup("kb", "how do I reset my password")[0] is None
+
+    def test_threshold_is_configurable(self):
+        """Test that a strict threshold rejects paraphrases that a loose one accepts."""
+        loose = SemanticCache(fake_embedder, threshold=0.8)
+        strict = SemanticCache(fake_embedder, threshold=0.99)
+        for cache in (loose, strict):
+            cache.store("kb", "what is the refund policy for online orders", "refund chunks")
+
+        assert loose.lookup("kb", "what is the refund policy for orders")[0] == "refund chunks"
+        assert strict.lookup("kb", "what is the refund policy for orders")[0] is None
+
+    def test_namespaces_are_isolated(self):
+        """Test that entries from another KB or config version are never served."""
+        cache = SemanticCache(fake_embedder, threshold=0.8)
+        cache.store("kb-1:v1", "refund policy", "v1 chunks")
+
+        assert cache.lookup("kb-1:v2", "refund policy")[0] is None
+        assert cache.lookup("kb-2:v1", "refund policy")[0] is None
+
+    def test_expired_entries_are_evicted(self):
+        """Test that entries older than the TTL are dropped on lookup."""
+        cache = SemanticCache(fake_embedder, ttl_seconds=60)
+        cache.store("kb", "refund policy", "chunks")
+        for entry in cache._entries.values():
+            entry.created_at = time.time() - 61
+
+        assert cache.lookup("kb", "refund policy")[0] is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test that memory stays bounded by evicting the least recently used entry."""
+        cache = SemanticCache(fake_embedder, threshold=0.99, max_entries=2)
+        cache.store("kb", "refund policy", "refund")
+        cache.store("kb", "shipping times", "shipping")
+        cache.lookup("kb", "refund policy")
+        cache.store("kb", "store hours", "hours")
+
+        assert len(cache) == 2
+        assert cache.lookup("kb", "refund policy")[0] == "refund"
+        assert cache.lookup("kb", "shipping times")[0] is None
+
+    def test_lookup_scores_only_its_namespace(self, monkeypatch):
+        """Test that entries of other namespaces are not scored on lookup."""
+        cache = SemanticCache(fake_embedder, threshold=0.8)
+        for n in range(200):
+            cache.store("kb-1:v1", f"question number {n}", n)
+        cache.store("kb-2:v1", "refund policy", "refund chunks")
+        scored = []
+        original_dot = semantic_cache_module._dot
+        monkeypatch.setattr(semantic_cache_module, "_dot",
+                            lambda first, second: scored.append(1) or original_dot(first, second))
+
+        assert cache.lookup("kb-2:v1", "refund policy")[0] == "refund chunks"
+        assert len(scored) == 1
+
+    def test_invalidate_and_eviction_keep_buckets_consistent(self):
+        """Test that invalidated and evicted entries are no longer served from their namespace."""
+        cache = SemanticCache(fake_embedder, threshold=0.99, max_entries=2)
+        cache.store("kb-1:v1", "refund policy", "refund")
+        cache.store("kb-1:v1:filtered", "shipping times", "shipping")
+        cache.store("kb-2:v1", "store hours", "hours")
+
+        assert cache.lookup("kb-1:v1", "refund policy")[0] is None
+        assert cache.invalidate("kb-1:v1") == 1
+        assert cache.lookup("kb-1:v1:filtered", "shipping times")[0] is None
+        assert cache.lookup("kb-2:v1", "store hours")[0] == "hours"
+        assert len(cache) == 1
+
+
+class TestCachedRetrieveTool:
+    """Test cases for the cached retrieve tool wrapper."""
+
+    def test_paraphrase_skips_knowledge_base(self):
+        """Test that a paraphrased query is answered without calling the knowledge base."""
+        module = FakeRetrieveModule()
+        tool = create_cached_retrieve_tool(module, SemanticCache(fake_embedder, threshold=0.8), "kb:v1")
+
+        first = call(tool, "what is the refund policy for online orders", tool_use_id="a")
+        second = call(tool, "What is the refund policy for online orders?", tool_use_id="b")
+
+        assert module.calls == 1
+        assert second["content"] == first["content"]
+        assert second["toolUseId"] == "b"
+
+    def test_different_parameters_do_not_share_entries(self):
+        """Test that a different result count or filter bypasses cached results."""
+        module = FakeRetrieveModule()
+        tool = create_cached_retrieve_tool(module, SemanticCache(fake_embedder), "kb:v1")
+
+        call(tool, "refund policy")
+        call(tool, "refund policy", numberOfResults=3)
+
+        assert module.calls == 2
+
+    def test_config_change_invalidates_agent_entries(self, monkeypatch):
+        """Test that changing the KB configuration drops the agent's cached results."""
+        module = FakeRetrieveModule()
+        monkeypatch.setattr(tools, "BedrockQueryEmbedder", lambda model_id, region: fake_embedder)
+        monkeypatch.setattr(tools, "_retrieve_caches", {})
+        monkeypatch.setattr(tools, "_retrieve_cache_namespaces", {})
+        provider_config = {"knowledge_base_id": "KB1", "region": "us-east-1"}
+        kb_v1 = {"enabled": True, "provider": "bedrock_kb", "provider_details": [{"name": "bedrock_kb", "config": provider_config}]}
+        kb_v2 = dict(kb_v1, retrieval_settings={"min_score": 0.6})
+        agent_config = SimpleNamespace(get_model_config=lambda: {})
+
+        tool_v1 = tools._get_cached_retrieve_tool(module, "qa_agent", agent_config, kb_v1, provider_config)
+        call(tool_v1, "refund policy")
+        call(tool_v1, "refund policy")
+        assert module.calls == 1
+
+        tool_v2 = tools._get_cached_retrieve_tool(module, "qa_agent", agent_config, kb_v2, provider_config)
+        assert all(len(cache) == 0 for cache in tools._retrieve_caches.values())
+        call(tool_v2, "refund policy")
+        assert module.calls == 2
+
+    def test_agents_with_different_settings_get_separate_caches(self, monkeypatch):
+        """Test that each agent's threshold and TTL apply instead of the first agent's."""
+        monkeypatch.setattr(tools, "BedrockQueryEmbedder", lambda model_id, region: fake_embedder)
+        monkeypatch.setattr(tools, "_retrieve_caches", {})
+        monkeypatch.setattr(tools, "_retrieve_cache_namespaces", {})
+        agent_config = SimpleNamespace(get_model_config=lambda: {})
+        strict = {"knowledge_base_id": "KB1", "semantic_cache_threshold": 0.99}
+        loose = {"knowledge_base_id": "KB2", "semantic_cache_threshold": 0.8, "semantic_cache_ttl_seconds": 60}
+
+        _, strict_cache = tools._get_retrieve_cache(agent_config, strict)
+        _, loose_cache = tools._get_retrieve_cache(agent_config, loose)
+
+        assert strict_cache is not loose_cache
+        assert (strict_cache.threshold, loose_cache.threshold) == (0.99, 0.8)
+        assert loose_cache.ttl_seconds == 60
+        assert tools._get_retrieve_cache(agent_config, dict(strict, knowledge_base_id="KB3"))[1] is strict_cache
+
+    def test_errors_are_not_cached(self):
+        """Test that failed retrievals are retried on the next call."""
+        module = FakeRetrieveModule()
+        module.retrieve = lambda tool, **kwargs: {"toolUseId": tool["toolUseId"], "status": "error",
+                                                  "content": [{"text": "throttled"}]}
+        cache = SemanticCache(fake_embedder)
+        tool = create_cached_retrieve_tool(module, cache, "kb:v1")
+
+        call(tool, "refund policy")
+
+        assert len(cache) == 0